@@ -7,7 +7,7 @@ Feature ID: F-2025-017-stripe-payment
 ⚠️ КРИТИЧНО:
 - Idempotency через UNIQUE(stripe_event_id)
 - Event-идемпотентность + out-of-order guard на уровне repository
-- Cache invalidation после обработки
+- Точечная cache invalidation (только затронутые hardware_id) после обработки
 """
 import logging
 import json
@@ -46,7 +46,7 @@ async def stripe_webhook_handler(request: web.Request) -> web.Response:
     ⚠️ КРИТИЧНО:
     1. Verify signature
     2. Process event with idempotency in repository
-    3. Invalidate cache after terminal handling
+    3. Invalidate cache of affected hardware_ids after terminal handling
     4. Return 5xx for retryable failures
     """
     from config.unified_config import get_config
@@ -91,11 +91,11 @@ async def stripe_webhook_handler(request: web.Request) -> web.Response:
             if result_status not in TERMINAL_SUCCESS_STATUSES:
                 raise RuntimeError(f"unknown_result_status:{result_status or 'empty'}")
             
-            # Invalidate cache
+            # Invalidate cache (только затронутые устройства)
             try:
                 subscription_module = get_subscription_module()
                 if subscription_module:
-                    subscription_module.invalidate_all_cache()
+                    _invalidate_affected_cache(subscription_module, result)
             except Exception as e:
                 logger.warning(f"[F-2025-017] Cache invalidation failed: {e}")
             
@@ -240,6 +240,10 @@ async def _process_event(event: Dict[str, Any]) -> Dict[str, Any]:
             stripe_event_at
         )
 
+        if hardware_id:
+            # Для точечной инвалидации кэша в stripe_webhook_handler
+            result.setdefault('hardware_id', hardware_id)
+
         result_status = str(result.get("status", "")).strip().lower()
         if result_status in TERMINAL_SUCCESS_STATUSES:
             # Mark as processed only for terminal outcomes.
@@ -261,6 +265,31 @@ async def _process_event(event: Dict[str, Any]) -> Dict[str, Any]:
         return {'status': 'error', 'reason': 'processing_exception', 'message': str(e)}
 
 
+def _invalidate_affected_cache(subscription_module, result: Dict[str, Any]) -> None:
+    """
+    Инвалидация кэша gate только для устройств, затронутых событием.
+
+    hardware_id берётся из результата обработки (metadata или
+    _resolve_hardware_id_from_repo в _process_event, либо из reconcile).
+    Если устройство не определено, а состояние могло измениться —
+    эпоха кэша с jitter (записи обновятся лениво, не все сразу).
+    """
+    result_status = str(result.get("status", "")).strip().lower()
+    if result_status == "ignored":
+        return
+
+    nested = result.get("result")
+    hardware_ids = {
+        result.get("hardware_id"),
+        nested.get("hardware_id") if isinstance(nested, dict) else None,
+    }
+    if subscription_module.invalidate_hardware_ids(hardware_ids):
+        return
+    if result_status in ("processed", "subscription_synced"):
+        logger.warning("[F-2025-017] Webhook hardware_id not resolved - bumping cache epoch")
+        subscription_module.bump_cache_epoch()
+
+
 def _extract_hardware_id(event_data: Dict[str, Any]) -> Optional[str]:
     """Extract hardware_id from event metadata"""
     # Try metadata first
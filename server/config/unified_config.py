@@ -74,6 +74,12 @@ class DatabaseConfig:
     name: str = "voice_assistant_db"
     user: str = "postgres"
     password: str = ""
+    # Общий пул соединений репозиториев (subscriptions, token_usage)
+    shared_pool_min_connections: int = 1
+    shared_pool_max_connections: int = 10
+    shared_pool_acquire_timeout_sec: float = 5.0
+    # Соединение, простоявшее дольше, проверяется SELECT 1 перед выдачей
+    shared_pool_health_check_idle_sec: float = 30.0
     
     @classmethod
     def from_env(cls) -> 'DatabaseConfig':
@@ -82,7 +88,11 @@ class DatabaseConfig:
             port=int(os.getenv('DB_PORT', '5432')),
             name=os.getenv('DB_NAME', 'voice_assistant_db'),
             user=os.getenv('DB_USER', 'postgres'),
-            password=os.getenv('DB_PASSWORD', '')
+            password=os.getenv('DB_PASSWORD', ''),
+            shared_pool_min_connections=int(os.getenv('DB_SHARED_POOL_MIN', '1')),
+            shared_pool_max_connections=int(os.getenv('DB_SHARED_POOL_MAX', '10')),
+            shared_pool_acquire_timeout_sec=float(os.getenv('DB_SHARED_POOL_ACQUIRE_TIMEOUT_SEC', '5.0')),
+            shared_pool_health_check_idle_sec=float(os.getenv('DB_SHARED_POOL_HEALTH_CHECK_IDLE_SEC', '30.0'))
         )
 
 @dataclass
@@ -91,6 +101,17 @@ class GrpcConfig:
     host: str = "0.0.0.0"
     port: int = 50051
     max_workers: int = 10
+    # COLLECT буфер: TTL простоя, бюджет байт (LRU вытеснение), лимит записей на устройство
+    collect_buffer_ttl_sec: float = 60.0
+    collect_buffer_max_bytes: int = 64 * 1024 * 1024
+    collect_buffer_max_per_device: int = 4
+    collect_buffer_shards: int = 64
+    # Процессы-воркеры на одном порту (SO_REUSEPORT); 1 — один процесс без супервизора
+    workers: int = 1
+    worker_heartbeat_sec: float = 2.0
+    worker_health_timeout_sec: float = 15.0
+    # Время на завершение открытых стримов при остановке (SIGTERM)
+    drain_grace_sec: float = 5.0
     
     @classmethod
     def from_env(cls) -> 'GrpcConfig':
@@ -101,7 +122,15 @@ class GrpcConfig:
         return cls(
             host=host_value,
             port=int(os.getenv('GRPC_PORT', '50051')),
-            max_workers=int(os.getenv('MAX_WORKERS', '10'))
+            max_workers=int(os.getenv('MAX_WORKERS', '10')),
+            collect_buffer_ttl_sec=float(os.getenv('COLLECT_BUFFER_TTL_SEC', '60.0')),
+            collect_buffer_max_bytes=int(os.getenv('COLLECT_BUFFER_MAX_BYTES', str(64 * 1024 * 1024))),
+            collect_buffer_max_per_device=int(os.getenv('COLLECT_BUFFER_MAX_PER_DEVICE', '4')),
+            collect_buffer_shards=int(os.getenv('COLLECT_BUFFER_SHARDS', '64')),
+            workers=int(os.getenv('GRPC_WORKERS', '1')),
+            worker_heartbeat_sec=float(os.getenv('GRPC_WORKER_HEARTBEAT_SEC', '2.0')),
+            worker_health_timeout_sec=float(os.getenv('GRPC_WORKER_HEALTH_TIMEOUT_SEC', '15.0')),
+            drain_grace_sec=float(os.getenv('GRPC_DRAIN_GRACE_SEC', '5.0')),
         )
 
 @dataclass
@@ -151,6 +180,45 @@ class AudioConfig:
     streaming_chunk_size: int = 4096
     streaming_enabled: bool = True
     
+    # Пул прогретых ffmpeg декодеров MP3 → PCM
+    decoder_pool_warm_size: int = 4
+    decoder_pool_max_active: int = 0  # 0 = max_concurrent_streams × tts_lookahead_max_inflight
+    
+    # Кэш синтезированного PCM (память + диск)
+    tts_cache_enabled: bool = True
+    tts_cache_memory_bytes: int = 32 * 1024 * 1024
+    tts_cache_disk_dir: str = ""  # пусто = server/cache/tts_audio
+    tts_cache_disk_bytes: int = 256 * 1024 * 1024
+    tts_cache_max_text_chars: int = 120
+    tts_cache_admit_after: int = 2  # фраза кэшируется со второго появления
+    
+    # Предрасчитанное приветствие (GenerateWelcomeAudio)
+    welcome_text: str = "Hi! Nexy is here. How can I help you?"
+    # Варианты по языку/голосу: [{'language': 'ru', 'voice': 'ru-RU-SvetlanaNeural', 'text': '...'}]
+    welcome_variants: list = field(default_factory=list)
+    welcome_audio_dir: str = ""  # пусто = server/cache/welcome_audio
+    
+    # Сжатый транспорт аудио (Opus по запросу клиента, PCM по умолчанию)
+    opus_frame_ms: int = 20
+    opus_bitrate: int = 24000
+    audio_encoder_workers: int = 4
+    # Склейка TTS фрагментов в сообщения StreamAudio (0 = каждый фрагмент отдельным сообщением)
+    audio_coalesce_ms: int = 200
+    
+    @staticmethod
+    def _parse_welcome_variants(raw: str) -> list:
+        """WELCOME_AUDIO_VARIANTS: 'language:voice:text;language:voice:text'"""
+        variants = []
+        for item in raw.split(';'):
+            parts = item.strip().split(':', 2)
+            if len(parts) == 3 and parts[2].strip():
+                variants.append({
+                    'language': parts[0].strip() or None,
+                    'voice': parts[1].strip() or None,
+                    'text': parts[2].strip(),
+                })
+        return variants
+    
     @classmethod
     def from_env(cls) -> 'AudioConfig':
         return cls(
@@ -165,7 +233,22 @@ class AudioConfig:
             edge_tts_pitch=os.getenv('EDGE_TTS_PITCH', '+0Hz'),
             audio_format=os.getenv('AUDIO_FORMAT', 'pcm'),
             streaming_chunk_size=int(os.getenv('STREAMING_CHUNK_SIZE', '4096')),
-            streaming_enabled=os.getenv('STREAMING_ENABLED', 'true').lower() == 'true'
+            streaming_enabled=os.getenv('STREAMING_ENABLED', 'true').lower() == 'true',
+            decoder_pool_warm_size=int(os.getenv('EDGE_TTS_DECODER_POOL_WARM', '4')),
+            decoder_pool_max_active=int(os.getenv('EDGE_TTS_DECODER_POOL_MAX_ACTIVE', '0')),
+            tts_cache_enabled=os.getenv('TTS_CACHE_ENABLED', 'true').lower() == 'true',
+            tts_cache_memory_bytes=int(os.getenv('TTS_CACHE_MEMORY_BYTES', str(32 * 1024 * 1024))),
+            tts_cache_disk_dir=os.getenv('TTS_CACHE_DIR', ''),
+            tts_cache_disk_bytes=int(os.getenv('TTS_CACHE_DISK_BYTES', str(256 * 1024 * 1024))),
+            tts_cache_max_text_chars=int(os.getenv('TTS_CACHE_MAX_TEXT_CHARS', '120')),
+            tts_cache_admit_after=int(os.getenv('TTS_CACHE_ADMIT_AFTER', '2')),
+            welcome_text=os.getenv('WELCOME_AUDIO_TEXT', "Hi! Nexy is here. How can I help you?"),
+            welcome_variants=cls._parse_welcome_variants(os.getenv('WELCOME_AUDIO_VARIANTS', '')),
+            welcome_audio_dir=os.getenv('WELCOME_AUDIO_DIR', ''),
+            opus_frame_ms=int(os.getenv('OPUS_FRAME_MS', '20')),
+            opus_bitrate=int(os.getenv('OPUS_BITRATE', '24000')),
+            audio_encoder_workers=int(os.getenv('AUDIO_ENCODER_WORKERS', '4')),
+            audio_coalesce_ms=int(os.getenv('AUDIO_COALESCE_MS', '200'))
         )
 
 @dataclass
@@ -196,6 +279,9 @@ class TextProcessingConfig:
     
     # Производительность
     max_concurrent_requests: int = 10
+    # Admission control LLM: очередь ожидания слота и дедлайн ожидания
+    llm_max_queue_size: int = 50
+    llm_queue_timeout_sec: float = 10.0
     request_timeout: int = 300  # Увеличено до 5 минут для длинных TTS ответов (было 60)
     
     @classmethod
@@ -216,6 +302,8 @@ class TextProcessingConfig:
             circuit_breaker_threshold=int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '3')),
             circuit_breaker_timeout=int(os.getenv('CIRCUIT_BREAKER_TIMEOUT', '300')),
             max_concurrent_requests=int(os.getenv('MAX_CONCURRENT_REQUESTS', '10')),
+            llm_max_queue_size=int(os.getenv('LLM_MAX_QUEUE_SIZE', '50')),
+            llm_queue_timeout_sec=float(os.getenv('LLM_QUEUE_TIMEOUT_SEC', '10.0')),
             request_timeout=int(os.getenv('REQUEST_TIMEOUT', '300'))  # Синхронизировано: 5 минут для длинных TTS ответов
         )
 
@@ -232,6 +320,12 @@ class MemoryConfig:
     short_term_cleanup_enabled: bool = True
     short_term_cleanup_interval_seconds: int = 7200
     short_term_cleanup_idle_hours: int = 2
+    # Консолидация: один анализ на пачку реплик устройства (N реплик или T секунд тишины)
+    consolidation_max_turns: int = 4
+    consolidation_idle_sec: float = 20.0
+    consolidation_workers: int = 2
+    consolidation_queue_max: int = 256
+    consolidation_max_buffered_turns: int = 16
     
     @classmethod
     def from_env(cls) -> 'MemoryConfig':
@@ -246,7 +340,12 @@ class MemoryConfig:
             memory_analysis_temperature=float(os.getenv('MEMORY_ANALYSIS_TEMPERATURE', '0.3')),
             short_term_cleanup_enabled=os.getenv('MEMORY_SHORT_TERM_CLEANUP_ENABLED', 'true').lower() == 'true',
             short_term_cleanup_interval_seconds=int(os.getenv('MEMORY_SHORT_TERM_CLEANUP_INTERVAL_SECONDS', '7200')),
-            short_term_cleanup_idle_hours=int(os.getenv('MEMORY_SHORT_TERM_CLEANUP_IDLE_HOURS', '2'))
+            short_term_cleanup_idle_hours=int(os.getenv('MEMORY_SHORT_TERM_CLEANUP_IDLE_HOURS', '2')),
+            consolidation_max_turns=int(os.getenv('MEMORY_CONSOLIDATION_MAX_TURNS', '4')),
+            consolidation_idle_sec=float(os.getenv('MEMORY_CONSOLIDATION_IDLE_SEC', '20.0')),
+            consolidation_workers=int(os.getenv('MEMORY_CONSOLIDATION_WORKERS', '2')),
+            consolidation_queue_max=int(os.getenv('MEMORY_CONSOLIDATION_QUEUE_MAX', '256')),
+            consolidation_max_buffered_turns=int(os.getenv('MEMORY_CONSOLIDATION_MAX_BUFFERED_TURNS', '16'))
         )
 
 @dataclass
@@ -291,6 +390,25 @@ class WorkflowConfig:
     # Guard по hardware_id: если True, блокирует параллельные сессии одного устройства
     # Если False (по умолчанию), допускаются параллельные сессии одного hardware_id
     prevent_concurrent_hardware_id_sessions: bool = False
+    # Инкрементальная сегментация stream_buffer вместо повторного split_sentences на каждый чанк
+    stream_incremental_segmenter: bool = True
+    # Look-ahead TTS: сколько предложений синтезируется параллельно (1 = последовательно)
+    tts_lookahead_max_inflight: int = 3
+    # Лимит буферизованного (ещё не отправленного) аудио на один стрим, байт
+    tts_lookahead_max_buffered_bytes: int = 2 * 1024 * 1024
+    # Write-behind персистенция request trace (не задерживает final_result)
+    trace_write_behind_enabled: bool = True
+    trace_queue_max_size: int = 2000
+    trace_flush_batch_size: int = 100
+    trace_flush_interval_ms: int = 250
+    # Backpressure: сколько ждать места в очереди перед применением drop policy
+    trace_enqueue_timeout_ms: int = 5
+    trace_drop_policy: str = "drop_oldest"  # drop_oldest | drop_newest
+    # Pre-LLM: спекулятивный старт LLM до решения subscription gate (off | on)
+    pre_llm_speculation: str = "off"
+    # COLLECT pre-warm: первый COLLECT сессии прогревает gate и память для COMMIT
+    collect_prewarm_enabled: bool = True
+    collect_prewarm_ttl_sec: float = 30.0
 
     @classmethod
     def from_env(cls) -> 'WorkflowConfig':
@@ -309,7 +427,23 @@ class WorkflowConfig:
             force_flush_max_chars=int(os.getenv('STREAM_FORCE_FLUSH_MAX_CHARS', '0') or 0),
             prevent_concurrent_hardware_id_sessions=os.getenv(
                 'PREVENT_CONCURRENT_HARDWARE_ID_SESSIONS', 'false'
-            ).lower() == 'true'
+            ).lower() == 'true',
+            stream_incremental_segmenter=os.getenv(
+                'STREAM_INCREMENTAL_SEGMENTER', 'true'
+            ).lower() == 'true',
+            tts_lookahead_max_inflight=int(os.getenv('STREAM_TTS_LOOKAHEAD', '3')),
+            tts_lookahead_max_buffered_bytes=int(
+                os.getenv('STREAM_TTS_MAX_BUFFERED_BYTES', str(2 * 1024 * 1024))
+            ),
+            trace_write_behind_enabled=os.getenv('TRACE_WRITE_BEHIND', 'true').lower() == 'true',
+            trace_queue_max_size=int(os.getenv('TRACE_QUEUE_MAX_SIZE', '2000')),
+            trace_flush_batch_size=int(os.getenv('TRACE_FLUSH_BATCH_SIZE', '100')),
+            trace_flush_interval_ms=int(os.getenv('TRACE_FLUSH_INTERVAL_MS', '250')),
+            trace_enqueue_timeout_ms=int(os.getenv('TRACE_ENQUEUE_TIMEOUT_MS', '5')),
+            trace_drop_policy=os.getenv('TRACE_DROP_POLICY', 'drop_oldest'),
+            pre_llm_speculation=os.getenv('PRE_LLM_SPECULATION', 'off').lower(),
+            collect_prewarm_enabled=os.getenv('COLLECT_PREWARM', 'true').lower() == 'true',
+            collect_prewarm_ttl_sec=float(os.getenv('COLLECT_PREWARM_TTL_SEC', '30.0')),
         )
 
 
@@ -433,11 +567,17 @@ class BackpressureConfig:
         max_message_rate_per_second: Максимальное количество сообщений в секунду на стрим.
         Если установлено в 0 или меньше, rate limit отключается полностью.
         Используйте 0 для отключения ограничения частоты сообщений (например, для аудио стримов с высокой частотой).
+        max_audio_sec_per_second: Лимит аудио в секундах длительности за секунду на стрим.
+        Аудио не входит в max_message_rate_per_second; 0 или меньше — без ограничения.
+        max_message_rate_per_device: Лимит сообщений в секунду суммарно по стримам одного hardware_id.
+        0 или меньше — без ограничения.
     """
     max_concurrent_streams: int = 50
     idle_timeout_seconds: int = 900  # Увеличено до 15 минут для длинных TTS ответов (было 300)
     max_message_rate_per_second: int = 0  # Синхронизировано: 0 = отключить rate limit по умолчанию (было 20)
     grace_period_seconds: int = 30
+    max_audio_sec_per_second: float = 0.0
+    max_message_rate_per_device: int = 0
     
     @classmethod
     def from_env(cls) -> 'BackpressureConfig':
@@ -445,7 +585,9 @@ class BackpressureConfig:
             max_concurrent_streams=int(os.getenv('BACKPRESSURE_MAX_STREAMS', '50')),
             idle_timeout_seconds=int(os.getenv('BACKPRESSURE_IDLE_TIMEOUT', '900')),  # Синхронизировано: 15 минут для длинных TTS ответов
             max_message_rate_per_second=int(os.getenv('BACKPRESSURE_MAX_RATE', '0')),  # Синхронизировано: 0 = отключить rate limit по умолчанию
-            grace_period_seconds=int(os.getenv('BACKPRESSURE_GRACE_PERIOD', '30'))
+            grace_period_seconds=int(os.getenv('BACKPRESSURE_GRACE_PERIOD', '30')),
+            max_audio_sec_per_second=float(os.getenv('BACKPRESSURE_MAX_AUDIO_RATE', '0')),
+            max_message_rate_per_device=int(os.getenv('BACKPRESSURE_MAX_DEVICE_RATE', '0'))
         )
     
     @classmethod
@@ -455,7 +597,8 @@ class BackpressureConfig:
             max_concurrent_streams=10,
             idle_timeout_seconds=60,
             max_message_rate_per_second=5,
-            grace_period_seconds=10
+            grace_period_seconds=10,
+            max_audio_sec_per_second=20.0
         )
     
     @classmethod
@@ -465,7 +608,8 @@ class BackpressureConfig:
             max_concurrent_streams=25,
             idle_timeout_seconds=180,
             max_message_rate_per_second=8,
-            grace_period_seconds=20
+            grace_period_seconds=20,
+            max_audio_sec_per_second=20.0
         )
     
     @classmethod
@@ -569,12 +713,19 @@ class SubscriptionConfig:
     
     # Cache configuration
     cache_ttl_seconds: int = 30
+    cache_stale_ttl_seconds: int = 30  # stale-while-revalidate окно после cache_ttl
+    cache_max_entries: int = 10000
+    cache_epoch_jitter_seconds: int = 5  # после глобального сброса записи обновляются вразброс
+    known_users_max: int = 100000  # hardware_id с уже записанным user anchor
     pending_ttl_seconds: int = 30
     
     # Scheduler intervals (in hours)
     trial_check_interval_hours: int = 6
     grace_period_check_interval_hours: int = 6
     
+    # Сброс квот: строк на один UPDATE (set-based, чанками)
+    quota_reset_chunk_size: int = 5000
+    
     @classmethod
     def from_env(cls) -> 'SubscriptionConfig':
         mode_raw = os.getenv('STRIPE_MODE', 'test').strip().lower()
@@ -602,9 +753,14 @@ class SubscriptionConfig:
             grandfather_auto_assign_existing=os.getenv('SUBSCRIPTION_GRANDFATHER_AUTO_ASSIGN_EXISTING', 'false').lower() == 'true',
             grandfather_cutoff_date=os.getenv('SUBSCRIPTION_GRANDFATHER_CUTOFF_DATE', '').strip(),
             cache_ttl_seconds=int(os.getenv('SUBSCRIPTION_CACHE_TTL', '30')),
+            cache_stale_ttl_seconds=int(os.getenv('SUBSCRIPTION_CACHE_STALE_TTL', '30')),
+            cache_max_entries=int(os.getenv('SUBSCRIPTION_CACHE_MAX_ENTRIES', '10000')),
+            cache_epoch_jitter_seconds=int(os.getenv('SUBSCRIPTION_CACHE_EPOCH_JITTER', '5')),
+            known_users_max=int(os.getenv('SUBSCRIPTION_KNOWN_USERS_MAX', '100000')),
             pending_ttl_seconds=int(os.getenv('SUBSCRIPTION_PENDING_TTL', '30')),
             trial_check_interval_hours=int(os.getenv('SUBSCRIPTION_TRIAL_CHECK_HOURS', '6')),
-            grace_period_check_interval_hours=int(os.getenv('SUBSCRIPTION_GRACE_CHECK_HOURS', '6'))
+            grace_period_check_interval_hours=int(os.getenv('SUBSCRIPTION_GRACE_CHECK_HOURS', '6')),
+            quota_reset_chunk_size=int(os.getenv('SUBSCRIPTION_QUOTA_RESET_CHUNK', '5000'))
         )
     
     def is_active(self) -> bool:
@@ -627,6 +783,42 @@ class WhatsappConfig:
             enabled=os.getenv('WHATSAPP_ENABLED', 'false').lower() == 'true'
         )
 
+@dataclass
+class StateBackendConfig:
+    """
+    Общее состояние воркеров (реестр in-flight, прерывания, лимиты стримов, инвалидация кэшей)
+    
+    Note:
+        backend: "memory" — состояние в памяти процесса (один воркер);
+        "kv" — сетевое key-value хранилище с протоколом RESP (Redis/Valkey
+        или локальный stand-in integrations.core.local_state_server) —
+        несколько воркеров на одном порту (SO_REUSEPORT) делят состояние.
+        op_timeout_sec: Таймаут одной операции; при недоступности хранилища
+        решения принимаются локально (fail-open).
+        lease_ttl_sec: TTL ключей воркера (счётчик стримов, in-flight) —
+        ключи упавшего воркера истекают сами.
+        inflight_ttl_sec: TTL записи in-flight запроса (не меньше самого длинного ответа).
+    """
+    backend: str = "memory"
+    host: str = "127.0.0.1"
+    port: int = 6379
+    key_prefix: str = "nexy:"
+    op_timeout_sec: float = 0.5
+    lease_ttl_sec: float = 30.0
+    inflight_ttl_sec: float = 900.0
+    
+    @classmethod
+    def from_env(cls) -> 'StateBackendConfig':
+        return cls(
+            backend=os.getenv('STATE_BACKEND', 'memory').lower(),
+            host=os.getenv('STATE_BACKEND_HOST', '127.0.0.1'),
+            port=int(os.getenv('STATE_BACKEND_PORT', '6379')),
+            key_prefix=os.getenv('STATE_BACKEND_PREFIX', 'nexy:'),
+            op_timeout_sec=float(os.getenv('STATE_BACKEND_OP_TIMEOUT_SEC', '0.5')),
+            lease_ttl_sec=float(os.getenv('STATE_BACKEND_LEASE_TTL_SEC', '30')),
+            inflight_ttl_sec=float(os.getenv('STATE_BACKEND_INFLIGHT_TTL_SEC', '900'))
+        )
+
 @dataclass
 class UnifiedServerConfig:
     """Централизованная конфигурация всего сервера"""
@@ -649,6 +841,7 @@ class UnifiedServerConfig:
     payment_use: PaymentUseConfig = field(default_factory=PaymentUseConfig.from_env)
     subscription: SubscriptionConfig = field(default_factory=SubscriptionConfig.from_env)
     whatsapp: WhatsappConfig = field(default_factory=WhatsappConfig.from_env)
+    state_backend: StateBackendConfig = field(default_factory=StateBackendConfig.from_env)
     
     def __post_init__(self):
         """Пост-инициализация для валидации"""
@@ -883,7 +1076,8 @@ class UnifiedServerConfig:
             'kill_switches': self.kill_switches.__dict__,
             'backpressure': self.backpressure.__dict__,
             'browser_use': self.browser_use.__dict__,
-            'payment_use': self.payment_use.__dict__
+            'payment_use': self.payment_use.__dict__,
+            'state_backend': self.state_backend.__dict__
         }
         
         with open(file_path, 'w', encoding='utf-8') as f:
@@ -932,6 +1126,7 @@ class UnifiedServerConfig:
         browser_use = BrowserUseConfig(**config_dict.get('browser_use', {}))
         payment_use = PaymentUseConfig(**config_dict.get('payment_use', {}))
         whatsapp = WhatsappConfig(**config_dict.get('whatsapp', {}))
+        state_backend = StateBackendConfig(**config_dict.get('state_backend', {}))
         
         # Backpressure config с учетом окружения
         env = os.getenv('NEXY_ENV', 'prod').lower()
@@ -960,7 +1155,8 @@ class UnifiedServerConfig:
             backpressure=backpressure,
             browser_use=browser_use,
             payment_use=payment_use,
-            whatsapp=whatsapp
+            whatsapp=whatsapp,
+            state_backend=state_backend
         )
     
     def get_status(self) -> Dict[str, Any]:
@@ -1014,7 +1210,8 @@ class UnifiedServerConfig:
             'kill_switches': self.kill_switches.__dict__,
             'backpressure': self.backpressure.__dict__,
             'browser_use': self.browser_use.__dict__,
-            'payment_use': self.payment_use.__dict__
+            'payment_use': self.payment_use.__dict__,
+            'state_backend': self.state_backend.__dict__
         }
 
 # Глобальный экземпляр конфигурации
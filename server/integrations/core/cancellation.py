@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Cancellation - push-отмена активных стримов по InterruptSession
+
+Раньше прерывание только ставило флаг, а workflow проверял его между
+выданными элементами: in-flight llm.astream, websocket Edge TTS и ffmpeg
+декодер работали до следующего элемента.
+
+Каждый COMMIT стрим открывает CancellationToken в реестре. Ответ workflow
+итерируется через token.guard() в задаче обработчика, и при
+InterruptSession эта задача, ожидающая следующего элемента workflow,
+отменяется немедленно. CancelledError доходит до текущей точки
+ожидания (поток LLM, конвейер синтеза, чтение декодера), и их finally
+закрывают LLM поток, отменяют TTS задачи и завершают процесс декодера.
+
+Токен также замеряет interrupt → silence: от приёма InterruptSession до
+последнего аудио, отданного клиенту.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional
+
+from utils.metrics_collector import record_metric
+
+logger = logging.getLogger(__name__)
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class CancellationToken:
+    """Токен отмены одного стрима (hardware_id, session_id)"""
+
+    def __init__(self, hardware_id: str, session_id: str, clock: Callable[[], float] = time.monotonic):
+        self.hardware_id = hardware_id
+        self.session_id = session_id
+        self._clock = clock
+        self._event = asyncio.Event()
+        self.reason: Optional[str] = None
+        # Время приёма прерывания (monotonic) и последнего отданного аудио
+        self.received_at: Optional[float] = None
+        self.last_audio_at: Optional[float] = None
+        # Задача потребителя, ожидающая следующего элемента в guard()
+        self._waiting_task: Optional[asyncio.Task] = None
+        self._cancel_requested = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "interrupt", received_at: Optional[float] = None) -> bool:
+        """Отмена (идемпотентно); False если токен уже отменён"""
+        if self._event.is_set():
+            return False
+        self.reason = reason
+        self.received_at = received_at if received_at is not None else self._clock()
+        self._event.set()
+        task = self._waiting_task
+        if task is not None and not task.done() and task is not _current_task():
+            self._cancel_requested = True
+            task.cancel(f"stream cancelled: {reason}")
+        return True
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+    def note_audio(self) -> None:
+        """Аудио отдано клиенту"""
+        self.last_audio_at = self._clock()
+
+    def silence_ms(self) -> Optional[float]:
+        """От приёма прерывания до последнего аудио после него (0 — после прерывания аудио не было)"""
+        if self.received_at is None:
+            return None
+        if self.last_audio_at is None or self.last_audio_at <= self.received_at:
+            return 0.0
+        return (self.last_audio_at - self.received_at) * 1000
+
+    async def guard(self, source: AsyncIterator[Any]) -> AsyncGenerator[Any, None]:
+        """
+        Итерирует source до исчерпания или отмены токена.
+
+        source исполняется в задаче потребителя. При отмене токена эта задача
+        отменяется, пока ждёт следующего элемента (CancelledError внутри
+        source), source закрывается, итерация завершается без ошибки —
+        вызывающий проверяет token.cancelled. Внешняя отмена задачи (отключение
+        клиента) проходит как обычно, source закрывается в той же задаче.
+        """
+        iterator = source.__aiter__()
+        task = asyncio.current_task()
+        try:
+            while not self.cancelled:
+                self._waiting_task = task
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except asyncio.CancelledError:
+                    if self._consume_cancel(task):
+                        return
+                    raise
+                finally:
+                    self._waiting_task = None
+                yield item
+        finally:
+            # source поглотил CancelledError и отдал элемент: снимаем свою отмену с задачи
+            self._consume_cancel(task)
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"Cancellation guard: ошибка закрытия источника: {e}")
+
+    def _consume_cancel(self, task: Optional[asyncio.Task]) -> bool:
+        """True если CancelledError вызвана отменой токена, а не внешней отменой задачи"""
+        if not self._cancel_requested:
+            return False
+        self._cancel_requested = False
+        if task is not None and hasattr(task, "uncancel"):
+            task.uncancel()
+            return task.cancelling() == 0
+        return True
+
+
+class CancellationRegistry:
+    """Активные токены по hardware_id: InterruptSession отменяет все стримы устройства"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._tokens: Dict[str, Dict[str, CancellationToken]] = {}
+        self.cancelled_total = 0
+
+    def open(self, hardware_id: str, session_id: str) -> CancellationToken:
+        token = CancellationToken(hardware_id, session_id, clock=self._clock)
+        self._tokens.setdefault(hardware_id, {})[session_id] = token
+        return token
+
+    def close(self, token: CancellationToken) -> None:
+        """Стрим завершён: токен снимается, для отменённого пишутся метрики прерывания"""
+        device_tokens = self._tokens.get(token.hardware_id)
+        if device_tokens is not None and device_tokens.get(token.session_id) is token:
+            del device_tokens[token.session_id]
+            if not device_tokens:
+                del self._tokens[token.hardware_id]
+        if token.cancelled:
+            silence_ms = token.silence_ms() or 0.0
+            stream_end_ms = (self._clock() - token.received_at) * 1000
+            record_metric("interrupt_to_silence", silence_ms)
+            record_metric("interrupt_to_stream_end", stream_end_ms)
+            logger.info(
+                f"🛑 Стрим {token.session_id} остановлен прерыванием: silence={silence_ms:.1f}ms, "
+                f"stream_end={stream_end_ms:.1f}ms",
+                extra={
+                    'scope': 'interrupt',
+                    'method': 'CancellationRegistry',
+                    'decision': 'stream_cancelled',
+                    'ctx': {
+                        'hardware_id': token.hardware_id,
+                        'session_id': token.session_id,
+                        'reason': token.reason,
+                        'interrupt_to_silence_ms': round(silence_ms, 2),
+                        'interrupt_to_stream_end_ms': round(stream_end_ms, 2),
+                    }
+                }
+            )
+
+    def get(self, hardware_id: str, session_id: str) -> Optional[CancellationToken]:
+        return self._tokens.get(hardware_id, {}).get(session_id)
+
+    def cancel(self, hardware_id: str, reason: str = "interrupt", received_at: Optional[float] = None) -> List[str]:
+        """Отменяет все активные стримы устройства; возвращает их session_id"""
+        received_at = received_at if received_at is not None else self._clock()
+        cancelled = [
+            session_id
+            for session_id, token in list(self._tokens.get(hardware_id, {}).items())
+            if token.cancel(reason, received_at)
+        ]
+        self.cancelled_total += len(cancelled)
+        return cancelled
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'active_streams': sum(len(tokens) for tokens in self._tokens.values()),
+            'active_devices': len(self._tokens),
+            'cancelled_total': self.cancelled_total,
+        }
+
+
+_registry: Optional[CancellationRegistry] = None
+
+
+def get_cancellation_registry() -> CancellationRegistry:
+    """Глобальный реестр токенов отмены"""
+    global _registry
+    if _registry is None:
+        _registry = CancellationRegistry()
+    return _registry
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Local State Server - локальный stand-in key-value хранилища для KVStateBackend
+
+Подмножество RESP команд Redis, которое использует KVStateBackend (строки,
+счётчики, множества, TTL, pub/sub), поверх MemoryKeySpace. Для тестов,
+нагрузочных скриптов и запуска нескольких воркеров на одной машине без
+Redis; в production — Redis/Valkey с тем же протоколом.
+
+Запуск:
+    python -m integrations.core.local_state_server [--host 127.0.0.1] [--port 6379]
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from integrations.core.state_backend import MemoryKeySpace, StateBackendError, read_reply
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, Exception):
+        message = str(value)
+        return b"-%s\r\n" % (message if " " in message and message.split()[0].isupper() else f"ERR {message}").encode()
+    if isinstance(value, (list, set, tuple)):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    if isinstance(value, _Status):
+        return b"+%s\r\n" % value.text.encode()
+    data = str(value).encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class _Status:
+    def __init__(self, text: str):
+        self.text = text
+
+
+_OK = _Status("OK")
+
+
+class LocalStateServer:
+    """RESP сервер поверх MemoryKeySpace (один event loop, команды атомарны)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, sweep_interval_sec: float = 5.0):
+        self.host = host
+        self.port = port
+        self.sweep_interval_sec = sweep_interval_sec
+        self.space = MemoryKeySpace()
+        self._subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self.commands = 0
+
+    async def start(self) -> int:
+        """Запуск; возвращает фактический порт (port=0 — свободный)"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+        logger.info(f"Local state server слушает {self.host}:{self.port}")
+        return self.port
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            for writers in self._subscribers.values():
+                for writer in writers:
+                    writer.close()
+            await self._server.wait_closed()
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_sec)
+            self.space.sweep()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: Set[str] = set()
+        try:
+            while True:
+                request = await read_reply(reader)
+                if not isinstance(request, list) or not request:
+                    writer.write(_encode(StateBackendError("ERR protocol error")))
+                    continue
+                self.commands += 1
+                command, args = request[0].upper(), request[1:]
+                if command == "SUBSCRIBE":
+                    for channel in args:
+                        subscribed.add(channel)
+                        self._subscribers.setdefault(channel, set()).add(writer)
+                        writer.write(_encode(["subscribe", channel, len(subscribed)]))
+                    continue
+                try:
+                    reply = self._execute(command, args)
+                except StateBackendError as e:
+                    reply = e
+                except (ValueError, IndexError):
+                    reply = StateBackendError(f"ERR wrong arguments for '{command.lower()}' command")
+                writer.write(_encode(reply))
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            for channel in subscribed:
+                self._subscribers.get(channel, set()).discard(writer)
+            writer.close()
+
+    def _execute(self, command: str, args: List[str]) -> Any:
+        space = self.space
+        if command == "PING":
+            return _Status("PONG")
+        if command == "GET":
+            return space.get(args[0])
+        if command == "SET":
+            ttl_sec = None
+            nx = False
+            options = [option.upper() for option in args[2:]]
+            for index, option in enumerate(options):
+                if option == "NX":
+                    nx = True
+                elif option == "PX":
+                    ttl_sec = int(args[2 + index + 1]) / 1000
+                elif option == "EX":
+                    ttl_sec = float(args[2 + index + 1])
+            return _OK if space.set(args[0], args[1], ttl_sec=ttl_sec, nx=nx) else None
+        if command == "DEL":
+            return space.delete(*args)
+        if command in ("INCR", "INCRBY", "DECR", "DECRBY"):
+            amount = int(args[1]) if command.endswith("BY") else 1
+            return space.incr(args[0], -amount if command.startswith("DECR") else amount)
+        if command == "PEXPIRE":
+            return space.expire(args[0], int(args[1]) / 1000)
+        if command == "EXPIRE":
+            return space.expire(args[0], float(args[1]))
+        if command == "MGET":
+            return space.mget(args)
+        if command == "SADD":
+            return space.sadd(args[0], *args[1:])
+        if command == "SREM":
+            return space.srem(args[0], *args[1:])
+        if command == "SMEMBERS":
+            return sorted(space.smembers(args[0]))
+        if command == "SCARD":
+            return len(space.smembers(args[0]))
+        if command == "PUBLISH":
+            writers = self._subscribers.get(args[0], set())
+            message = _encode(["message", args[0], args[1]])
+            for writer in list(writers):
+                writer.write(message)
+            return len(writers)
+        if command == "FLUSHALL":
+            space.flush()
+            return _OK
+        raise StateBackendError(f"ERR unknown command '{command.lower()}'")
+
+
+async def _serve(host: str, port: int) -> None:
+    server = LocalStateServer(host, port)
+    await server.start()
+    print(f"📡 Local state server: {host}:{server.port}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local RESP state server for KVStateBackend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
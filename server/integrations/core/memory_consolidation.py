@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Memory Consolidation - пакетный анализ памяти вместо LLM вызова на каждую реплику
+
+Раньше каждая реплика запускала отдельную фоновую задачу: полный вызов
+Gemini (MemoryAnalyzer) и перезапись обеих колонок памяти. Под нагрузкой это
+удваивает число LLM вызовов и плодит неограниченное число задач.
+
+MemoryConsolidator буферизует реплики по hardware_id и отдаёт пачку на
+анализ одним вызовом:
+- после max_turns реплик устройства;
+- после idle_sec без новых реплик (разговор закончился или пауза);
+- сразу, если реплика помечена urgent (явное «запомни»).
+
+Пачки обрабатывает фиксированный пул воркеров из очереди с лимитом
+queue_max. Если очередь полна, реплики остаются в буфере устройства
+(не более max_buffered_turns, старые вытесняются) и уходят при следующей
+проверке. По одному устройству одновременно обрабатывается не больше одной
+пачки, поэтому порядок обновлений памяти сохраняется.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from utils.metrics_collector import record_decision_metric
+
+logger = logging.getLogger(__name__)
+
+FlushCallback = Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]
+
+
+@dataclass
+class _TurnBuffer:
+    """Накопленные реплики одного устройства"""
+    turns: Deque[Dict[str, Any]] = field(default_factory=deque)
+    last_turn_at: float = 0.0
+    urgent: bool = False
+
+
+class MemoryConsolidator:
+    """Буфер реплик по hardware_id + ограниченный пул воркеров анализа"""
+
+    def __init__(
+        self,
+        max_turns: int = 4,
+        idle_sec: float = 20.0,
+        workers: int = 2,
+        queue_max: int = 256,
+        max_buffered_turns: int = 16,
+        flush_timeout_sec: float = 10.0,
+        sweep_interval_sec: Optional[float] = None
+    ):
+        self.max_turns = max(1, max_turns)
+        self.idle_sec = idle_sec
+        self.workers = max(1, workers)
+        self.queue_max = max(1, queue_max)
+        self.max_buffered_turns = max(self.max_turns, max_buffered_turns)
+        self.flush_timeout_sec = flush_timeout_sec
+        # 0 — проверку тишины вызывает владелец (sweep(now)), например симуляция с виртуальным временем
+        self.sweep_interval_sec = (
+            max(0.05, min(1.0, idle_sec / 4)) if sweep_interval_sec is None else sweep_interval_sec
+        )
+
+        self._buffers: Dict[str, _TurnBuffer] = {}
+        self._inflight: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._flush: Optional[FlushCallback] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._started_at = time.monotonic()
+
+        self.turns_total = 0
+        self.turns_analyzed = 0
+        self.batches_total = 0
+        self.batches_failed = 0
+        self.turns_dropped = 0
+        self.queue_full = 0
+
+    @property
+    def running(self) -> bool:
+        return self._flush is not None
+
+    async def start(self, flush: FlushCallback) -> None:
+        """Запуск пула; flush(hardware_id, turns) выполняет анализ и запись пачки"""
+        if self.running:
+            return
+        self._flush = flush
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._started_at = time.monotonic()
+        self._worker_tasks = [asyncio.create_task(self._worker_loop()) for _ in range(self.workers)]
+        if self.sweep_interval_sec > 0:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+        logger.info("🧠 Memory consolidator запущен", extra={
+            'scope': 'memory',
+            'method': 'consolidator_start',
+            'decision': 'start',
+            'ctx': {
+                'max_turns': self.max_turns,
+                'idle_sec': self.idle_sec,
+                'workers': self.workers,
+                'queue_max': self.queue_max
+            }
+        })
+
+    async def stop(self, drain_timeout_sec: Optional[float] = None) -> None:
+        """
+        Отправляет все накопленные реплики и останавливает пул.
+
+        По умолчанию ждёт не меньше flush_timeout_sec: пачка, начатая перед
+        остановкой, успевает завершиться, а не отменяется вместе с воркером.
+        """
+        if not self.running:
+            return
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if drain_timeout_sec is None:
+            drain_timeout_sec = self.flush_timeout_sec + 1.0
+        deadline = time.monotonic() + drain_timeout_sec
+        # Очередь ограничена: досылаем буферы по мере её освобождения
+        while (self._buffers or self._inflight) and time.monotonic() < deadline:
+            self.sweep(force=True)
+            await asyncio.sleep(0.05)
+        if self._buffers or self._inflight:
+            logger.warning(
+                f"⚠️ Memory consolidator остановлен с {len(self._buffers)} неотправленными буферами "
+                f"и {len(self._inflight)} незавершёнными пачками",
+                extra={
+                    'scope': 'memory',
+                    'method': 'consolidator_stop',
+                    'decision': 'dropped',
+                    'ctx': {
+                        'devices': len(self._buffers),
+                        'inflight_batches': len(self._inflight),
+                        'drain_timeout_sec': drain_timeout_sec
+                    }
+                }
+            )
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._flush = None
+        self._queue = None
+        self._buffers.clear()
+        self._inflight.clear()
+
+    def add_turn(
+        self,
+        hardware_id: str,
+        turn: Dict[str, Any],
+        urgent: bool = False,
+        now: Optional[float] = None
+    ) -> bool:
+        """
+        Добавляет реплику в буфер устройства (без ожидания).
+
+        Returns:
+            False если консолидатор не запущен — вызывающий сохраняет реплику сам
+        """
+        if not self.running:
+            return False
+        now = time.monotonic() if now is None else now
+        buffer = self._buffers.get(hardware_id)
+        if buffer is None:
+            buffer = self._buffers[hardware_id] = _TurnBuffer()
+        buffer.turns.append(turn)
+        buffer.last_turn_at = now
+        buffer.urgent = buffer.urgent or urgent
+        self.turns_total += 1
+        if len(buffer.turns) > self.max_buffered_turns:
+            # Анализ не успевает (очередь полна / пачка устройства в работе): старые реплики теряются
+            buffer.turns.popleft()
+            self.turns_dropped += 1
+            record_decision_metric("memory_consolidation", "turn_dropped")
+        if len(buffer.turns) >= self.max_turns or buffer.urgent:
+            self._try_enqueue(hardware_id, buffer)
+        return True
+
+    def sweep(self, now: Optional[float] = None, force: bool = False) -> int:
+        """Отправляет буферы устройств без реплик дольше idle_sec; возвращает число пачек"""
+        now = time.monotonic() if now is None else now
+        enqueued = 0
+        for hardware_id, buffer in list(self._buffers.items()):
+            if force or buffer.urgent or len(buffer.turns) >= self.max_turns or now - buffer.last_turn_at >= self.idle_sec:
+                enqueued += int(self._try_enqueue(hardware_id, buffer))
+        return enqueued
+
+    async def wait_idle(self) -> None:
+        """Ожидание обработки всех поставленных в очередь пачек"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _try_enqueue(self, hardware_id: str, buffer: _TurnBuffer) -> bool:
+        if hardware_id in self._inflight or self._queue is None:
+            # Пачка устройства ещё в работе: реплики дождутся её завершения в буфере
+            return False
+        turns = list(buffer.turns)
+        try:
+            self._queue.put_nowait((hardware_id, turns))
+        except asyncio.QueueFull:
+            self.queue_full += 1
+            record_decision_metric("memory_consolidation", "queue_full")
+            return False
+        self._inflight.add(hardware_id)
+        del self._buffers[hardware_id]
+        return True
+
+    async def _worker_loop(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            hardware_id, turns = await queue.get()
+            try:
+                await asyncio.wait_for(self._flush(hardware_id, turns), timeout=self.flush_timeout_sec)
+                self.batches_total += 1
+                self.turns_analyzed += len(turns)
+                record_decision_metric("memory_consolidation", "batch")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.batches_failed += 1
+                record_decision_metric("memory_consolidation", "batch_failed")
+                logger.warning(f"⚠️ Ошибка консолидации памяти для {hardware_id}: {e}", extra={
+                    'scope': 'memory',
+                    'method': 'consolidator_flush',
+                    'decision': 'error',
+                    'ctx': {'hardware_id': hardware_id, 'turns': len(turns), 'error': str(e)}
+                })
+            finally:
+                self._inflight.discard(hardware_id)
+                # Реплики, пришедшие во время анализа, не ждут следующей проверки, если пачка уже набрана
+                buffer = self._buffers.get(hardware_id)
+                if buffer is not None and (len(buffer.turns) >= self.max_turns or buffer.urgent):
+                    self._try_enqueue(hardware_id, buffer)
+                queue.task_done()
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_sec)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.debug(f"Memory consolidator sweep failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        uptime_hours = max((time.monotonic() - self._started_at) / 3600, 1e-9)
+        # Без консолидации каждая реплика = отдельный LLM вызов
+        calls_saved = self.turns_analyzed - self.batches_total
+        return {
+            'running': self.running,
+            'buffered_devices': len(self._buffers),
+            'buffered_turns': sum(len(b.turns) for b in self._buffers.values()),
+            'inflight_batches': len(self._inflight),
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'turns_total': self.turns_total,
+            'batches_total': self.batches_total,
+            'batches_failed': self.batches_failed,
+            'turns_dropped': self.turns_dropped,
+            'queue_full': self.queue_full,
+            'turns_analyzed': self.turns_analyzed,
+            'turns_per_batch': round(self.turns_analyzed / self.batches_total, 2) if self.batches_total else 0.0,
+            'llm_calls_saved': calls_saved,
+            'llm_calls_saved_per_hour': round(calls_saved / uptime_hours, 1),
+        }
+
+
+_memory_consolidator: Optional[MemoryConsolidator] = None
+
+
+def get_memory_consolidator() -> MemoryConsolidator:
+    """Глобальный консолидатор памяти (параметры из unified_config.memory)"""
+    global _memory_consolidator
+    if _memory_consolidator is None:
+        from config.unified_config import get_config
+        config = get_config().memory
+        _memory_consolidator = MemoryConsolidator(
+            max_turns=config.consolidation_max_turns,
+            idle_sec=config.consolidation_idle_sec,
+            workers=config.consolidation_workers,
+            queue_max=config.consolidation_queue_max,
+            max_buffered_turns=config.consolidation_max_buffered_turns,
+            flush_timeout_sec=config.analysis_timeout + config.memory_timeout,
+        )
+    return _memory_consolidator
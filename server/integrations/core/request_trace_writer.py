@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+RequestTraceWriter - write-behind персистенция request trace
+
+Запись session/command/answer/screenshot в БД не должна задерживать
+final_result стрима. Трейсы кладутся в ограниченную очередь, фоновый
+flusher забирает их пачками (по размеру или по таймеру) и пишет одной
+batched операцией. Если БД не успевает, очередь применяет backpressure
+(короткое ожидание места) и затем drop policy.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils.metrics_collector import percentile, record_decision_metric, record_metric
+
+logger = logging.getLogger(__name__)
+
+METRIC_METHOD = "request_trace_flush"
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+TraceSink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+
+class RequestTraceWriter:
+    """
+    Ограниченная write-behind очередь с фоновым batched flush.
+
+    Использование:
+        writer = RequestTraceWriter(sink=database_manager.persist_request_traces)
+        await writer.enqueue({'session_id': ..., 'hardware_id': ..., ...})
+        ...
+        await writer.drain()  # при остановке сервера
+    """
+
+    def __init__(
+        self,
+        sink: Optional[TraceSink] = None,
+        max_queue_size: int = 2000,
+        batch_size: int = 100,
+        flush_interval_ms: int = 250,
+        enqueue_timeout_ms: int = 5,
+        drop_policy: str = DROP_OLDEST,
+    ):
+        """
+        Args:
+            sink: Batched запись пачки трейсов
+            max_queue_size: Максимальная глубина очереди
+            batch_size: Максимум трейсов в одном flush
+            flush_interval_ms: Период flush неполной пачки
+            enqueue_timeout_ms: Ожидание места в полной очереди (backpressure)
+            drop_policy: drop_oldest | drop_newest при переполнении
+        """
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+
+        self._sink = sink
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000
+        self.enqueue_timeout = max(0, int(enqueue_timeout_ms)) / 1000
+        self.drop_policy = drop_policy
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Метрики
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.row_fallbacks = 0
+        self.backpressure_waits = 0
+        self.peak_depth = 0
+        self._flush_ms: Deque[float] = deque(maxlen=256)
+
+    def set_sink(self, sink: TraceSink) -> None:
+        """Назначение batched записи (DatabaseManager внедряется позже очереди)"""
+        self._sink = sink
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    async def enqueue(self, trace: Dict[str, Any]) -> bool:
+        """
+        Постановка трейса в очередь
+
+        Returns:
+            True если трейс принят, False если отброшен
+        """
+        if self._closed:
+            self._drop("closed")
+            return False
+
+        if len(self._queue) >= self.max_queue_size and self.enqueue_timeout > 0:
+            self.backpressure_waits += 1
+            self._wakeup.set()
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if len(self._queue) >= self.max_queue_size:
+            if self.drop_policy == DROP_NEWEST:
+                self._drop(DROP_NEWEST)
+                return False
+            self._queue.popleft()
+            self._drop(DROP_OLDEST)
+
+        self._queue.append(trace)
+        self.enqueued += 1
+        self.peak_depth = max(self.peak_depth, len(self._queue))
+        self._ensure_flusher()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _drop(self, reason: str) -> None:
+        self.dropped += 1
+        record_decision_metric(METRIC_METHOD, reason)
+        logger.warning(
+            f"⚠️ Request trace отброшен: reason={reason}, depth={len(self._queue)}",
+            extra={
+                'scope': 'workflow',
+                'method': 'RequestTraceWriter.enqueue',
+                'decision': 'drop',
+                'ctx': {'reason': reason, 'depth': len(self._queue), 'dropped_total': self.dropped},
+            }
+        )
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Неполную пачку ждём до flush_interval (или до заполнения)
+            if len(self._queue) < self.batch_size and not self._closed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._space.set()
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        is_error = False
+        try:
+            if self._sink is None:
+                raise RuntimeError("request trace sink is not configured")
+            await self._sink(batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            is_error = True
+            logger.error(
+                f"❌ Ошибка batched persistence request trace: {e}",
+                extra={
+                    'scope': 'workflow',
+                    'method': 'RequestTraceWriter.flush',
+                    'decision': 'error',
+                    'ctx': {'batch_size': len(batch), 'error': str(e)},
+                }
+            )
+            if self._sink is None or len(batch) == 1:
+                self.failed += len(batch)
+            else:
+                # Транзакция пачки откатилась целиком: пишем построчно,
+                # чтобы потерять только битые трейсы
+                await self._flush_rows(batch)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self._flush_ms.append(duration_ms)
+            record_metric(METRIC_METHOD, duration_ms, is_error=is_error)
+
+    async def _flush_rows(self, batch: List[Dict[str, Any]]) -> None:
+        """Построчная запись пачки после ошибки batched flush"""
+        failed = 0
+        for trace in batch:
+            try:
+                await self._sink([trace])
+                self.flushed += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(
+                    f"⚠️ Request trace не записан: {e}",
+                    extra={
+                        'scope': 'workflow',
+                        'method': 'RequestTraceWriter.flush',
+                        'decision': 'drop_row',
+                        'ctx': {'session_id': trace.get('session_id'), 'error': str(e)},
+                    }
+                )
+        self.failed += failed
+        self.row_fallbacks += 1
+        logger.info(
+            f"🔁 Построчный flush request trace: записано={len(batch) - failed}, отброшено={failed}",
+            extra={
+                'scope': 'workflow',
+                'method': 'RequestTraceWriter.flush',
+                'decision': 'row_fallback',
+                'ctx': {'batch_size': len(batch), 'failed': failed},
+            }
+        )
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Остановка приёма и запись всего, что осталось в очереди"""
+        self._closed = True
+        self._wakeup.set()
+        try:
+            if self._flusher is not None and not self._flusher.done():
+                await asyncio.wait_for(asyncio.shield(self._flusher), timeout=timeout)
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                await asyncio.wait_for(self._flush(batch), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ RequestTraceWriter drain timeout, не записано: {len(self._queue)}")
+        logger.info(f"✅ RequestTraceWriter drained: flushed={self.flushed}, dropped={self.dropped}, failed={self.failed}")
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Глубина очереди и latency flush"""
+        return {
+            'queue_depth': len(self._queue),
+            'peak_depth': self.peak_depth,
+            'max_queue_size': self.max_queue_size,
+            'enqueued': self.enqueued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'row_fallbacks': self.row_fallbacks,
+            'backpressure_waits': self.backpressure_waits,
+            'flush_p50_ms': round(percentile(self._flush_ms, 0.5), 2),
+            'flush_p95_ms': round(percentile(self._flush_ms, 0.95), 2),
+        }
+
+
+_request_trace_writer: Optional[RequestTraceWriter] = None
+
+
+def get_request_trace_writer() -> RequestTraceWriter:
+    """Глобальный экземпляр (параметры из WorkflowConfig)"""
+    global _request_trace_writer
+    if _request_trace_writer is None:
+        from config.unified_config import get_config
+
+        cfg = get_config().workflow
+        _request_trace_writer = RequestTraceWriter(
+            max_queue_size=cfg.trace_queue_max_size,
+            batch_size=cfg.trace_flush_batch_size,
+            flush_interval_ms=cfg.trace_flush_interval_ms,
+            enqueue_timeout_ms=cfg.trace_enqueue_timeout_ms,
+            drop_policy=cfg.trace_drop_policy,
+        )
+    return _request_trace_writer
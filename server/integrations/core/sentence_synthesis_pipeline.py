@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+SentenceSynthesisPipeline - конвейерный (look-ahead) синтез TTS по предложениям
+
+Пока клиенту стримится аудио предложения N, синтез предложений N+1..N+K
+уже идёт в фоне. Порядок выдачи строго по sentence_index: текст и аудио
+каждого предложения отдаются только когда все предыдущие предложения выданы.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _SentenceSlot:
+    """Слот одного предложения в буфере переупорядочивания"""
+    sentence_index: int
+    text_event: Dict[str, Any]
+    chunks: Deque[bytes] = field(default_factory=deque)
+    text_sent: bool = False
+    emitted_chunks: int = 0
+    done: bool = False
+    error: Optional[BaseException] = None
+    task: Optional[asyncio.Task] = None
+
+
+class SentenceSynthesisPipeline:
+    """
+    Конвейер синтеза аудио с ограниченным look-ahead.
+
+    - Не более max_inflight предложений синтезируются одновременно.
+    - Буферизованное (ещё не выданное) аудио ограничено max_buffered_bytes:
+      при превышении синтез «будущих» предложений приостанавливается.
+      Головное предложение никогда не блокируется, поэтому дедлока нет.
+    - Ошибка синтеза пробрасывается потребителю в момент, когда до
+      соответствующего предложения доходит очередь.
+
+    Использование:
+        pipeline = SentenceSynthesisPipeline(synthesize, max_inflight=3)
+
+        pipeline.submit(1, {'success': True, 'text_response': 'Hi.', 'sentence_index': 1}, 'Hi.')
+        for event in pipeline.pop_ready():   # неблокирующая выдача готового
+            yield event
+
+        async for event in pipeline.drain():  # дождаться всего остального
+            yield event
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str, int], AsyncIterator[bytes]],
+        max_inflight: int = 3,
+        max_buffered_bytes: int = 2 * 1024 * 1024,
+    ):
+        """
+        Args:
+            synthesize: Фабрика async-итератора аудио чанков (text, sentence_index)
+            max_inflight: Сколько предложений синтезируется параллельно (1 = последовательно)
+            max_buffered_bytes: Лимит невыданного аудио на стрим (<= 0 — без лимита)
+        """
+        self._synthesize = synthesize
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_buffered_bytes = int(max_buffered_bytes)
+        self._semaphore = asyncio.Semaphore(self.max_inflight)
+        self._slots: Deque[_SentenceSlot] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._closed = False
+
+        # Метрики
+        self.buffered_bytes: int = 0
+        self.peak_buffered_bytes: int = 0
+        self.peak_inflight: int = 0
+        self._inflight: int = 0
+        self.backpressure_waits: int = 0
+
+    @property
+    def pending(self) -> int:
+        """Количество предложений, ещё не выданных полностью"""
+        return len(self._slots)
+
+    def submit(self, sentence_index: int, text_event: Dict[str, Any], tts_text: Optional[str]) -> None:
+        """
+        Регистрирует предложение и (если есть tts_text) запускает его синтез в фоне.
+
+        Args:
+            sentence_index: Индекс предложения (порядок выдачи = порядок submit)
+            text_event: Текстовое событие, выдаваемое перед аудио предложения
+            tts_text: Текст для синтеза; None/пустая строка — только текст
+        """
+        if self._closed:
+            raise RuntimeError("SentenceSynthesisPipeline is closed")
+
+        slot = _SentenceSlot(sentence_index=sentence_index, text_event=text_event)
+        self._slots.append(slot)
+        if tts_text and tts_text.strip():
+            slot.task = asyncio.create_task(self._run(slot, tts_text))
+        else:
+            slot.done = True
+        self._ready.set()
+
+    async def _run(self, slot: _SentenceSlot, tts_text: str) -> None:
+        """Синтез одного предложения с учётом лимитов параллелизма и памяти"""
+        try:
+            async with self._semaphore:
+                self._inflight += 1
+                self.peak_inflight = max(self.peak_inflight, self._inflight)
+                try:
+                    async for chunk in self._synthesize(tts_text, slot.sentence_index):
+                        if not chunk:
+                            continue
+                        while self._over_budget() and not self._is_head(slot):
+                            self.backpressure_waits += 1
+                            self._space.clear()
+                            await self._space.wait()
+                        slot.chunks.append(chunk)
+                        self.buffered_bytes += len(chunk)
+                        self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+                        self._ready.set()
+                finally:
+                    self._inflight -= 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка синтеза предложения #{slot.sentence_index}: {e}")
+            slot.error = e
+        finally:
+            slot.done = True
+            self._ready.set()
+
+    def _over_budget(self) -> bool:
+        return self.max_buffered_bytes > 0 and self.buffered_bytes >= self.max_buffered_bytes
+
+    def _is_head(self, slot: _SentenceSlot) -> bool:
+        return bool(self._slots) and self._slots[0] is slot
+
+    def pop_ready(self) -> Iterator[Dict[str, Any]]:
+        """
+        Неблокирующая выдача всего, что уже готово, строго по порядку предложений.
+
+        Yields:
+            Текстовые события и события {'audio_chunk', 'sentence_index', 'audio_chunk_index'}
+
+        Raises:
+            Исключение синтеза головного предложения
+        """
+        self._ready.clear()
+        while self._slots:
+            head = self._slots[0]
+            if not head.text_sent:
+                head.text_sent = True
+                yield head.text_event
+            while head.chunks:
+                chunk = head.chunks.popleft()
+                self.buffered_bytes -= len(chunk)
+                head.emitted_chunks += 1
+                self._space.set()
+                yield {
+                    'success': True,
+                    'audio_chunk': chunk,
+                    'sentence_index': head.sentence_index,
+                    'audio_chunk_index': head.emitted_chunks,
+                }
+            if not head.done:
+                return
+            self._slots.popleft()
+            # Новое головное предложение может продолжить синтез
+            self._space.set()
+            if head.error is not None:
+                raise head.error
+
+    async def wait_ready(self) -> None:
+        """Ожидает появления новых данных для выдачи"""
+        await self._ready.wait()
+
+    async def drain(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """Выдаёт все оставшиеся события, дожидаясь завершения синтеза"""
+        while True:
+            for event in self.pop_ready():
+                yield event
+            if not self._slots:
+                return
+            await self._ready.wait()
+
+    async def aclose(self) -> None:
+        """Отменяет незавершённый синтез (идемпотентно)"""
+        self._closed = True
+        tasks = [slot.task for slot in self._slots if slot.task and not slot.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._slots.clear()
+        self.buffered_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика конвейера"""
+        return {
+            'max_inflight': self.max_inflight,
+            'max_buffered_bytes': self.max_buffered_bytes,
+            'pending_sentences': len(self._slots),
+            'buffered_bytes': self.buffered_bytes,
+            'peak_buffered_bytes': self.peak_buffered_bytes,
+            'peak_inflight': self.peak_inflight,
+            'backpressure_waits': self.backpressure_waits,
+        }
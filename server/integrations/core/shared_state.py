@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Shared State - компоненты, согласованные между воркерами через StateBackend
+
+- SharedInflight: single-flight по session_id / hardware_id между воркерами
+  (SET NX с TTL + множество сессий устройства);
+- SharedStreamCounter: общий лимит одновременно открытых стримов. Каждый
+  воркер держит свой счётчик под TTL (аренда, продлевается heartbeat), лимит
+  проверяется по сумме счётчиков живых воркеров — счётчик упавшего воркера
+  истекает сам и не занимает лимит навсегда.
+
+Компоненты существуют только для разделяемого backend (KV); с in-memory
+backend get_shared_*() возвращают None и вызывающий работает как раньше.
+
+При недоступности хранилища решение принимается локально (fail-open):
+локальные проверки продолжают работать, в лог пишется decision=degraded.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional, Set, Tuple
+
+from integrations.core.state_backend import StateBackend, StateBackendError, get_state_backend
+from utils.metrics_collector import record_decision_metric
+
+logger = logging.getLogger(__name__)
+
+
+# Откаты захватов, прерванных отменой: задачи держим до завершения
+_rollback_tasks: Set[asyncio.Task] = set()
+
+
+def _rollback_soon(rollback: Awaitable[Any]) -> None:
+    """Откат частичного захвата в фоне: вызывающий уже отменён и ждать не может"""
+    task = asyncio.ensure_future(rollback)
+    _rollback_tasks.add(task)
+    task.add_done_callback(_rollback_tasks.discard)
+
+
+def _degraded(component: str, error: Exception) -> None:
+    record_decision_metric("shared_state", f"degraded_{component}")
+    logger.warning(
+        f"⚠️ Shared state недоступен ({component}), решение принято локально: {error}",
+        extra={
+            'scope': 'shared_state',
+            'method': component,
+            'decision': 'degraded',
+            'ctx': {'error': str(error)}
+        }
+    )
+
+
+class SharedInflight:
+    """In-flight запросы всех воркеров: повторный session_id / параллельный hardware_id"""
+
+    def __init__(self, backend: StateBackend, ttl_sec: float = 900.0):
+        self.backend = backend
+        self.ttl_sec = ttl_sec
+
+    def _session_key(self, session_id: str) -> str:
+        return self.backend.key("inflight", "session", session_id)
+
+    def _hardware_key(self, hardware_id: str) -> str:
+        return self.backend.key("inflight", "hardware", hardware_id)
+
+    async def try_acquire(
+        self,
+        session_id: str,
+        hardware_id: str,
+        prevent_concurrent_hardware: bool = False
+    ) -> Dict[str, Any]:
+        """Тот же контракт, что у SessionRegistry.try_acquire_inflight"""
+        backend = self.backend
+        session_key = self._session_key(session_id)
+        hardware_key = self._hardware_key(hardware_id)
+        acquired = False
+        try:
+            if not await backend.set(session_key, hardware_id, ttl_sec=self.ttl_sec, nx=True):
+                return {"ok": False, "reason": "concurrent_request", "active_sessions": [session_id]}
+            acquired = True
+
+            await backend.sadd(hardware_key, session_id)
+            await backend.expire(hardware_key, self.ttl_sec)
+            others = sorted(await backend.smembers(hardware_key) - {session_id})
+            if others:
+                # Сессии без ключа — остатки упавшего воркера (ключ истёк, член множества остался)
+                alive = await backend.mget([self._session_key(other) for other in others])
+                stale = [other for other, value in zip(others, alive) if value is None]
+                if stale:
+                    await backend.srem(hardware_key, *stale)
+                others = [other for other, value in zip(others, alive) if value is not None]
+
+            if prevent_concurrent_hardware and others:
+                # Одновременные захваты с разных воркеров могут отклонить друг друга:
+                # консервативно, но второй параллельный запрос не пройдёт никогда
+                await backend.srem(hardware_key, session_id)
+                await backend.delete(session_key)
+                return {"ok": False, "reason": "concurrent_hardware_id", "active_sessions": others}
+
+            return {"ok": True, "active_sessions": others}
+        except StateBackendError as e:
+            _degraded("inflight_acquire", e)
+            return {"ok": True, "active_sessions": [], "degraded": True}
+        except BaseException:
+            # Отмена посреди захвата: ключ сессии не должен висеть до истечения TTL
+            if acquired:
+                _rollback_soon(self.release(session_id, hardware_id))
+            raise
+
+    async def release(self, session_id: str, hardware_id: Optional[str]) -> None:
+        try:
+            await self.backend.delete(self._session_key(session_id))
+            if hardware_id:
+                await self.backend.srem(self._hardware_key(hardware_id), session_id)
+        except StateBackendError as e:
+            # Ключ истечёт по TTL
+            _degraded("inflight_release", e)
+
+
+class SharedStreamCounter:
+    """Общий лимит открытых стримов: счётчики воркеров под арендой TTL"""
+
+    def __init__(self, backend: StateBackend, lease_ttl_sec: float = 30.0):
+        self.backend = backend
+        self.lease_ttl_sec = lease_ttl_sec
+        self.local_streams = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def _own_key(self) -> str:
+        return self.backend.key("streams", self.backend.worker_id)
+
+    @property
+    def _workers_key(self) -> str:
+        return self.backend.key("workers")
+
+    async def try_acquire(self, limit: int) -> Tuple[bool, int]:
+        """
+        Занимает место в общем лимите.
+
+        Returns:
+            (разрешено, открытых стримов на всех воркерах с учётом этого)
+        """
+        backend = self.backend
+        self.local_streams += 1
+        counted = True
+        incremented = False
+        try:
+            # INCR до проверки суммы: из двух одновременных захватов последнего места
+            # хотя бы один увидит превышение — лимит не превышается
+            await backend.incr(self._own_key)
+            incremented = True
+            await backend.expire(self._own_key, self.lease_ttl_sec)
+            await backend.sadd(self._workers_key, backend.worker_id)
+            workers = sorted(await backend.smembers(self._workers_key))
+            counts = await backend.mget([backend.key("streams", worker) for worker in workers])
+            dead = [worker for worker, count in zip(workers, counts) if count is None and worker != backend.worker_id]
+            if dead:
+                await backend.srem(self._workers_key, *dead)
+            total = sum(int(count) for count in counts if count)
+            if total > limit:
+                self.local_streams -= 1
+                counted = incremented = False
+                await backend.incr(self._own_key, -1)
+                return (False, total - 1)
+            return (True, total)
+        except StateBackendError as e:
+            _degraded("stream_acquire", e)
+            return (counted, self.local_streams)
+        except BaseException:
+            # Отмена посреди захвата: место не занято ни локально, ни в общем счётчике
+            if counted:
+                self.local_streams = max(0, self.local_streams - 1)
+            if incremented:
+                _rollback_soon(self._decrement())
+            raise
+
+    async def _decrement(self) -> None:
+        try:
+            await self.backend.incr(self._own_key, -1)
+        except StateBackendError as e:
+            # Heartbeat перезапишет счётчик локальным значением
+            _degraded("stream_release", e)
+
+    async def release(self) -> None:
+        self.local_streams = max(0, self.local_streams - 1)
+        await self._decrement()
+
+    async def start(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        try:
+            await self.backend.delete(self._own_key)
+            await self.backend.srem(self._workers_key, self.backend.worker_id)
+        except StateBackendError:
+            pass
+
+    async def heartbeat(self) -> None:
+        """Продление аренды; счётчик выравнивается по локальному числу стримов"""
+        await self.backend.set(self._own_key, str(self.local_streams), ttl_sec=self.lease_ttl_sec)
+        await self.backend.sadd(self._workers_key, self.backend.worker_id)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                await self.heartbeat()
+            except StateBackendError as e:
+                logger.debug(f"Shared stream counter heartbeat failed: {e}")
+            await asyncio.sleep(self.lease_ttl_sec / 3)
+
+
+_shared_inflight: Optional[SharedInflight] = None
+_shared_stream_counter: Optional[SharedStreamCounter] = None
+
+
+def _state_config() -> Any:
+    from config.unified_config import get_config
+    return get_config().state_backend
+
+
+def get_shared_inflight() -> Optional[SharedInflight]:
+    """Single-flight между воркерами (None для in-memory backend)"""
+    global _shared_inflight
+    backend = get_state_backend()
+    if not backend.shared:
+        return None
+    if _shared_inflight is None:
+        _shared_inflight = SharedInflight(backend, ttl_sec=_state_config().inflight_ttl_sec)
+    return _shared_inflight
+
+
+def get_shared_stream_counter() -> Optional[SharedStreamCounter]:
+    """Общий лимит стримов (None для in-memory backend)"""
+    global _shared_stream_counter
+    backend = get_state_backend()
+    if not backend.shared:
+        return None
+    if _shared_stream_counter is None:
+        _shared_stream_counter = SharedStreamCounter(backend, lease_ttl_sec=_state_config().lease_ttl_sec)
+    return _shared_stream_counter
+
+
+def reset_shared_state() -> None:
+    """Сброс компонентов (после замены backend)"""
+    global _shared_inflight, _shared_stream_counter
+    _shared_inflight = None
+    _shared_stream_counter = None
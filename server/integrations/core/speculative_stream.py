@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+SpeculativeStream - спекулятивный запуск асинхронного потока
+
+Поток (например, LLM) начинает читаться в фоне до того, как принято
+решение о допуске запроса. Элементы копятся в буфере:
+- commit: потребитель итерирует SpeculativeStream как обычный поток,
+  сначала получая накопленное, затем — живые элементы
+- cancel: фоновое чтение отменяется, источник закрывается, возвращается
+  число элементов, полученных впустую (потраченные токены)
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _SourceError:
+    """Исключение источника, доставляемое потребителю в порядке элементов"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class SpeculativeStream:
+    """Фоновое чтение источника с буфером до commit/cancel"""
+
+    def __init__(self, source: AsyncIterator[Any], max_buffered: int = 256):
+        """
+        Args:
+            source: Асинхронный поток (async generator)
+            max_buffered: Максимум буферизованных элементов (дальше чтение ждёт потребителя)
+        """
+        self._source = source
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_buffered))
+        self._task: Optional[asyncio.Task] = None
+        self.items_received = 0
+
+    def start(self) -> "SpeculativeStream":
+        if self._task is None:
+            self._task = asyncio.create_task(self._pump())
+        return self
+
+    async def _pump(self) -> None:
+        try:
+            async for item in self._source:
+                self.items_received += 1
+                await self._queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            await self._queue.put(_SourceError(e))
+            return
+        await self._queue.put(_END)
+
+    def __aiter__(self) -> "SpeculativeStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        self.start()
+        item = await self._queue.get()
+        if item is _END:
+            self._queue.put_nowait(_END)
+            raise StopAsyncIteration
+        if isinstance(item, _SourceError):
+            raise item.error
+        return item
+
+    async def aclose(self) -> None:
+        await self.cancel()
+
+    async def cancel(self) -> int:
+        """
+        Отменить спекуляцию.
+
+        Returns:
+            Сколько элементов источник успел выдать (потраченная работа)
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(self._source, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception as e:
+                logger.debug(f"SpeculativeStream: ошибка закрытия источника: {e}")
+        return self.items_received
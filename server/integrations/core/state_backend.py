@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+State Backend - общее состояние воркеров сервера
+
+Реестр in-flight запросов, флаги прерываний, число открытых стримов и кэши
+жили в памяти процесса, поэтому сервер работал одним процессом на хост.
+Здесь — абстракция хранилища с двумя реализациями:
+
+- InMemoryStateBackend: состояние в памяти процесса (один воркер, по умолчанию);
+- KVStateBackend: сетевое key-value хранилище с протоколом RESP (Redis/Valkey
+  или локальный stand-in integrations.core.local_state_server). Клиент без
+  внешних зависимостей: команды конвейеризуются по одному соединению,
+  pub/sub идёт по отдельному соединению с переподключением.
+
+Поверх примитивов (ключи с TTL, счётчики, множества) — широковещательные
+события между воркерами: broadcast()/on_broadcast() доставляют payload
+всем воркерам, кроме отправителя. Компоненты общего состояния — в
+integrations.core.shared_state.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+BroadcastHandler = Callable[[Dict[str, Any]], Any]
+
+BACKEND_MEMORY = "memory"
+BACKEND_KV = "kv"
+
+
+class StateBackendError(Exception):
+    """Хранилище недоступно, таймаут операции или ошибка команды"""
+
+
+class MemoryKeySpace:
+    """
+    Ключи со строками и множествами и ленивым TTL.
+
+    Общая часть InMemoryStateBackend и локального stand-in сервера: семантика
+    команд совпадает с Redis (INCRBY по отсутствующему ключу начинает с 0,
+    SET NX не перезаписывает, пустое множество удаляется).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Union[str, Set[str]]] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> Optional[Union[str, Set[str]]]:
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= self._clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return None
+        return self._data.get(key)
+
+    def _set_of(self, key: str, create: bool = False) -> Optional[Set[str]]:
+        value = self._live(key)
+        if value is None:
+            if not create:
+                return None
+            value = self._data[key] = set()
+        if not isinstance(value, set):
+            raise StateBackendError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._live(key)
+        if isinstance(value, set):
+            raise StateBackendError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def set(self, key: str, value: str, ttl_sec: Optional[float] = None, nx: bool = False) -> bool:
+        if nx and self._live(key) is not None:
+            return False
+        self._data[key] = value
+        if ttl_sec is not None:
+            self._expires[key] = self._clock() + ttl_sec
+        else:
+            self._expires.pop(key, None)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        value = int(self.get(key) or 0) + amount
+        self._data[key] = str(value)
+        return value
+
+    def expire(self, key: str, ttl_sec: float) -> bool:
+        if self._live(key) is None:
+            return False
+        self._expires[key] = self._clock() + ttl_sec
+        return True
+
+    def mget(self, keys: Iterable[str]) -> List[Optional[str]]:
+        return [self.get(key) for key in keys]
+
+    def sadd(self, key: str, *members: str) -> int:
+        values = self._set_of(key, create=True)
+        added = len(set(members) - values)
+        values.update(members)
+        return added
+
+    def srem(self, key: str, *members: str) -> int:
+        values = self._set_of(key)
+        if values is None:
+            return 0
+        removed = len(values.intersection(members))
+        values.difference_update(members)
+        if not values:
+            self.delete(key)
+        return removed
+
+    def smembers(self, key: str) -> Set[str]:
+        return set(self._set_of(key) or ())
+
+    def sweep(self) -> int:
+        """Удаляет истёкшие ключи (для долгоживущего stand-in)"""
+        now = self._clock()
+        expired = [key for key, deadline in self._expires.items() if deadline <= now]
+        for key in expired:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return len(expired)
+
+    def flush(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class StateBackend(ABC):
+    """Хранилище общего состояния воркеров"""
+
+    # True — состояние видят другие процессы (компоненты shared_state включаются)
+    shared = False
+
+    def __init__(self, key_prefix: str = "nexy:", worker_id: Optional[str] = None):
+        self.key_prefix = key_prefix
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._broadcast_handlers: Dict[str, List[BroadcastHandler]] = {}
+        self._handler_tasks: Set[asyncio.Task] = set()
+
+        # Метрики
+        self.broadcasts_sent = 0
+        self.broadcasts_received = 0
+
+    def key(self, *parts: str) -> str:
+        """Ключ с префиксом: key("inflight", "session", sid) -> "nexy:inflight:session:<sid>" """
+        return self.key_prefix + ":".join(parts)
+
+    async def start(self) -> None:
+        """Подключение (ленивое у KV: команды подключаются сами)"""
+
+    async def close(self) -> None:
+        """Закрытие соединений и задач обработчиков"""
+        for task in list(self._handler_tasks):
+            task.cancel()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl_sec: Optional[float] = None, nx: bool = False) -> bool: ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> int: ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1) -> int: ...
+
+    @abstractmethod
+    async def expire(self, key: str, ttl_sec: float) -> bool: ...
+
+    @abstractmethod
+    async def mget(self, keys: List[str]) -> List[Optional[str]]: ...
+
+    @abstractmethod
+    async def sadd(self, key: str, *members: str) -> int: ...
+
+    @abstractmethod
+    async def srem(self, key: str, *members: str) -> int: ...
+
+    @abstractmethod
+    async def smembers(self, key: str) -> Set[str]: ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> int: ...
+
+    @abstractmethod
+    async def _subscribe(self, channel: str) -> None:
+        """Начать получение сообщений канала (доставляются в _dispatch)"""
+
+    async def broadcast(self, channel: str, payload: Dict[str, Any]) -> None:
+        """Событие для всех воркеров, кроме текущего"""
+        message = json.dumps({'origin': self.worker_id, 'payload': payload})
+        await self.publish(self.key("events", channel), message)
+        self.broadcasts_sent += 1
+
+    def broadcast_soon(self, channel: str, payload: Dict[str, Any]) -> None:
+        """broadcast из синхронного кода: отправка фоновой задачей (ошибки только логируются)"""
+        if not self.shared:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def _send() -> None:
+            try:
+                await self.broadcast(channel, payload)
+            except Exception as e:
+                logger.warning(f"⚠️ StateBackend: событие {channel} не отправлено: {e}")
+
+        self._track(loop.create_task(_send()))
+
+    async def on_broadcast(self, channel: str, handler: BroadcastHandler) -> None:
+        """Подписка на события других воркеров: handler(payload), sync или async"""
+        full_channel = self.key("events", channel)
+        handlers = self._broadcast_handlers.setdefault(full_channel, [])
+        handlers.append(handler)
+        if len(handlers) == 1:
+            await self._subscribe(full_channel)
+
+    def _dispatch(self, channel: str, message: str) -> None:
+        try:
+            envelope = json.loads(message)
+        except (TypeError, ValueError):
+            logger.warning(f"⚠️ StateBackend: некорректное событие в {channel}")
+            return
+        if envelope.get('origin') == self.worker_id:
+            return
+        self.broadcasts_received += 1
+        payload = envelope.get('payload') or {}
+        for handler in self._broadcast_handlers.get(channel, ()):
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    self._track(asyncio.ensure_future(result))
+            except Exception as e:
+                logger.error(f"❌ StateBackend: ошибка обработчика {channel}: {e}")
+
+    def _track(self, task: "asyncio.Future[Any]") -> None:
+        self._handler_tasks.add(task)  # type: ignore[arg-type]
+        task.add_done_callback(self._handler_tasks.discard)  # type: ignore[arg-type]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': BACKEND_KV if self.shared else BACKEND_MEMORY,
+            'worker_id': self.worker_id,
+            'channels': len(self._broadcast_handlers),
+            'broadcasts_sent': self.broadcasts_sent,
+            'broadcasts_received': self.broadcasts_received,
+        }
+
+
+class InMemoryStateBackend(StateBackend):
+    """Состояние в памяти процесса: один воркер, события никуда не уходят"""
+
+    shared = False
+
+    def __init__(self, key_prefix: str = "nexy:", worker_id: Optional[str] = None):
+        super().__init__(key_prefix=key_prefix, worker_id=worker_id)
+        self._space = MemoryKeySpace()
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._space.get(key)
+
+    async def set(self, key: str, value: str, ttl_sec: Optional[float] = None, nx: bool = False) -> bool:
+        return self._space.set(key, value, ttl_sec=ttl_sec, nx=nx)
+
+    async def delete(self, *keys: str) -> int:
+        return self._space.delete(*keys)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return self._space.incr(key, amount)
+
+    async def expire(self, key: str, ttl_sec: float) -> bool:
+        return self._space.expire(key, ttl_sec)
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return self._space.mget(keys)
+
+    async def sadd(self, key: str, *members: str) -> int:
+        return self._space.sadd(key, *members)
+
+    async def srem(self, key: str, *members: str) -> int:
+        return self._space.srem(key, *members)
+
+    async def smembers(self, key: str) -> Set[str]:
+        return self._space.smembers(key)
+
+    async def publish(self, channel: str, message: str) -> int:
+        if channel in self._broadcast_handlers:
+            self._dispatch(channel, message)
+        return 1 if channel in self._broadcast_handlers else 0
+
+    async def _subscribe(self, channel: str) -> None:
+        return None
+
+
+# --- RESP (REdis Serialization Protocol) ---
+
+class RespError(Exception):
+    """Ошибка, возвращённая сервером ("-ERR ...")"""
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Один ответ RESP2; ошибка сервера возвращается как RespError (не выбрасывается)"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RespError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"protocol error: {line[:32]!r}")
+
+
+class KVStateBackend(StateBackend):
+    """Сетевое key-value хранилище (RESP): общее состояние нескольких воркеров"""
+
+    shared = True
+
+    # Пауза перед переподключением pub/sub (удваивается до максимума)
+    _RECONNECT_MIN_SEC = 0.2
+    _RECONNECT_MAX_SEC = 5.0
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        key_prefix: str = "nexy:",
+        op_timeout_sec: float = 0.5,
+        worker_id: Optional[str] = None,
+    ):
+        super().__init__(key_prefix=key_prefix, worker_id=worker_id)
+        self.host = host
+        self.port = port
+        self.op_timeout_sec = op_timeout_sec
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+
+        self._pubsub_writer: Optional[asyncio.StreamWriter] = None
+        self._pubsub_task: Optional[asyncio.Task] = None
+        self._pubsub_ready = asyncio.Event()
+        self._closed = False
+
+        # Метрики
+        self.commands = 0
+        self.errors = 0
+        self.reconnects = 0
+
+    async def start(self) -> None:
+        await self._ensure_connected()
+
+    async def close(self) -> None:
+        self._closed = True
+        await super().close()
+        for task in (self._reader_task, self._pubsub_task):
+            if task is not None:
+                task.cancel()
+        for writer in (self._writer, self._pubsub_writer):
+            if writer is not None:
+                writer.close()
+        self._writer = self._pubsub_writer = None
+        self._fail_pending(StateBackendError("backend closed"))
+
+    async def execute(self, *args: Any) -> Any:
+        """Команда по общему соединению; ответы сопоставляются с запросами по порядку"""
+        writer = self._writer if self._writer is not None else await self._ensure_connected()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        writer.write(encode_command(*args))
+        self.commands += 1
+        try:
+            reply = await asyncio.wait_for(future, timeout=self.op_timeout_sec)
+        except asyncio.TimeoutError:
+            self.errors += 1
+            raise StateBackendError(f"{args[0]} timeout after {self.op_timeout_sec}s")
+        if isinstance(reply, RespError):
+            self.errors += 1
+            raise StateBackendError(str(reply))
+        return reply
+
+    async def _ensure_connected(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is not None:
+                return self._writer
+            if self._closed:
+                raise StateBackendError("backend closed")
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=self.op_timeout_sec
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.errors += 1
+                raise StateBackendError(f"connect {self.host}:{self.port} failed: {e}") from e
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_loop(reader, writer))
+            return writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                reply = await read_reply(reader)
+                future = self._pending.popleft()
+                # Ожидавший мог уйти по таймауту: ответ просто отбрасывается
+                if not future.done():
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, IndexError) as e:
+            if not self._closed:
+                logger.warning(f"⚠️ StateBackend: соединение с {self.host}:{self.port} потеряно: {e}")
+                self.reconnects += 1
+        finally:
+            if self._writer is writer:
+                self._writer = None
+                writer.close()
+                self._fail_pending(StateBackendError("connection lost"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    # --- команды ---
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: str, ttl_sec: Optional[float] = None, nx: bool = False) -> bool:
+        args: List[Any] = ["SET", key, value]
+        if ttl_sec is not None:
+            args += ["PX", max(1, int(ttl_sec * 1000))]
+        if nx:
+            args.append("NX")
+        return await self.execute(*args) == "OK"
+
+    async def delete(self, *keys: str) -> int:
+        return await self.execute("DEL", *keys) if keys else 0
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self.execute("INCRBY", key, amount)
+
+    async def expire(self, key: str, ttl_sec: float) -> bool:
+        return await self.execute("PEXPIRE", key, max(1, int(ttl_sec * 1000))) == 1
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return await self.execute("MGET", *keys) if keys else []
+
+    async def sadd(self, key: str, *members: str) -> int:
+        return await self.execute("SADD", key, *members)
+
+    async def srem(self, key: str, *members: str) -> int:
+        return await self.execute("SREM", key, *members)
+
+    async def smembers(self, key: str) -> Set[str]:
+        return set(await self.execute("SMEMBERS", key) or ())
+
+    async def publish(self, channel: str, message: str) -> int:
+        return await self.execute("PUBLISH", channel, message)
+
+    # --- pub/sub ---
+
+    async def _subscribe(self, channel: str) -> None:
+        if self._pubsub_task is None:
+            self._pubsub_task = asyncio.create_task(self._pubsub_loop())
+        elif self._pubsub_writer is not None:
+            self._pubsub_writer.write(encode_command("SUBSCRIBE", channel))
+        # Первое подключение ждём недолго: без хранилища воркер работает локально
+        try:
+            await asyncio.wait_for(self._pubsub_ready.wait(), timeout=self.op_timeout_sec)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ StateBackend: pub/sub {self.host}:{self.port} пока недоступен, подписка отложена")
+
+    async def _pubsub_loop(self) -> None:
+        delay = self._RECONNECT_MIN_SEC
+        while not self._closed:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                channels = list(self._broadcast_handlers)
+                writer.write(encode_command("SUBSCRIBE", *channels))
+                self._pubsub_writer = writer
+                delay = self._RECONNECT_MIN_SEC
+                while True:
+                    reply = await read_reply(reader)
+                    if not isinstance(reply, list) or len(reply) < 3:
+                        continue
+                    if reply[0] == "subscribe":
+                        self._pubsub_ready.set()
+                    elif reply[0] == "message":
+                        self._dispatch(reply[1], reply[2])
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                if self._closed:
+                    break
+                logger.warning(f"⚠️ StateBackend: pub/sub переподключение через {delay:.1f}s: {e}")
+                self.reconnects += 1
+            finally:
+                self._pubsub_ready.clear()
+                if self._pubsub_writer is not None:
+                    self._pubsub_writer.close()
+                    self._pubsub_writer = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._RECONNECT_MAX_SEC)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats.update({
+            'address': f"{self.host}:{self.port}",
+            'connected': self._writer is not None,
+            'pubsub_connected': self._pubsub_ready.is_set(),
+            'pending': len(self._pending),
+            'commands': self.commands,
+            'errors': self.errors,
+            'reconnects': self.reconnects,
+        })
+        return stats
+
+
+def create_state_backend(config: Any, worker_id: Optional[str] = None) -> StateBackend:
+    """Backend по StateBackendConfig"""
+    if config.backend == BACKEND_KV:
+        return KVStateBackend(
+            host=config.host,
+            port=config.port,
+            key_prefix=config.key_prefix,
+            op_timeout_sec=config.op_timeout_sec,
+            worker_id=worker_id,
+        )
+    if config.backend != BACKEND_MEMORY:
+        logger.warning(f"⚠️ Неизвестный STATE_BACKEND={config.backend!r}, используется memory")
+    return InMemoryStateBackend(key_prefix=config.key_prefix, worker_id=worker_id)
+
+
+_state_backend: Optional[StateBackend] = None
+
+
+def get_state_backend() -> StateBackend:
+    """Глобальный backend общего состояния (из конфигурации state_backend)"""
+    global _state_backend
+    if _state_backend is None:
+        from config.unified_config import get_config
+        _state_backend = create_state_backend(get_config().state_backend)
+    return _state_backend
+
+
+def set_state_backend(backend: Optional[StateBackend]) -> None:
+    """Замена глобального backend (тесты, нагрузочные скрипты)"""
+    global _state_backend
+    _state_backend = backend
+    # Компоненты shared_state привязаны к backend — пересоздаются при следующем обращении
+    from integrations.core import shared_state
+    shared_state.reset_shared_state()
@@ -72,6 +72,47 @@ class TokenUsageTracker:
             logger.error(f"[TokenUsage] Error recording usage: {e}")
             return False
 
+    async def record_usage_async(
+        self,
+        hardware_id: str,
+        source: str,
+        input_tokens: int,
+        output_tokens: int,
+        session_id: Optional[str] = None,
+        model_name: Optional[str] = None
+    ) -> bool:
+        """
+        Record token usage from async code without blocking the event loop.
+        
+        The insert runs on the shared connection pool's threads.
+        """
+        if not self.repository:
+            return False
+            
+        if input_tokens == 0 and output_tokens == 0:
+            return True
+            
+        try:
+            success = await self.repository.record_usage_async(
+                hardware_id=hardware_id,
+                source=source,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                session_id=session_id,
+                model_name=model_name
+            )
+            
+            if success:
+                logger.debug(f"[TokenUsage] Recorded {input_tokens}+{output_tokens} tokens for {source} (user: {hardware_id[:8]})")
+            else:
+                logger.warning(f"[TokenUsage] Failed to record usage for {source}")
+                
+            return success
+            
+        except Exception as e:
+            logger.error(f"[TokenUsage] Error recording usage: {e}")
+            return False
+
     def get_stats(self, hardware_id: str, period: str = 'daily') -> Dict[str, Any]:
         """Get token usage statistics."""
         if not self.repository:
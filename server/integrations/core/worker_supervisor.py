@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Worker Supervisor - несколько процессов gRPC сервера на одном порту
+
+Один процесс упирается в GIL: очистка текста, JSON, сериализация protobuf и
+логирование всех стримов выполняются по очереди. В режиме grpc.workers > 1
+main.py запускает супервизор, который поднимает N процессов-воркеров
+(тот же main.py с NEXY_WORKER_INDEX), каждый слушает gRPC порт с
+SO_REUSEPORT — ядро распределяет соединения между ними.
+
+- Воркер 0 (primary) дополнительно запускает HTTP/update сервер и
+  планировщик подписок; остальные — только gRPC.
+- Здоровье: каждый воркер пишет heartbeat-файл (pid, задержка event loop,
+  метрики) в общий каталог. Воркер без heartbeat дольше таймаута или
+  завершившийся процесс перезапускается с экспоненциальной задержкой.
+- SIGTERM: супервизор перестаёт перезапускать воркеры, рассылает SIGTERM
+  всем сразу (каждый закрывает порт и дожидается открытых стримов) и
+  добивает SIGKILL тех, кто не уложился в drain таймаут.
+- Метрики: супервизор суммирует счётчики из heartbeat-файлов, логирует
+  агрегат и пишет его в supervisor.json (его отдаёт /status воркера 0).
+
+Общие лимиты, single-flight и interrupt между воркерами — через
+state_backend kv (integrations.core.state_backend).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_INDEX_ENV = "NEXY_WORKER_INDEX"
+WORKER_COUNT_ENV = "NEXY_WORKER_COUNT"
+WORKER_STATE_DIR_ENV = "NEXY_WORKER_STATE_DIR"
+SUPERVISOR_PID_ENV = "NEXY_SUPERVISOR_PID"
+
+AGGREGATE_FILE = "supervisor.json"
+
+
+def _write_json(path: str, payload: Dict[str, Any]) -> None:
+    """Атомарная запись: читатель никогда не видит половину файла"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@dataclass
+class WorkerContext:
+    """Процесс запущен супервизором как воркер index из count"""
+    index: int
+    count: int
+    state_dir: str
+    supervisor_pid: int
+
+    @property
+    def primary(self) -> bool:
+        """Воркер 0 запускает HTTP/update сервер и планировщики"""
+        return self.index == 0
+
+    @property
+    def heartbeat_path(self) -> str:
+        return os.path.join(self.state_dir, f"worker-{self.index}.json")
+
+    @property
+    def aggregate_path(self) -> str:
+        return os.path.join(self.state_dir, AGGREGATE_FILE)
+
+
+def get_worker_context() -> Optional[WorkerContext]:
+    """Контекст воркера из окружения (None — обычный одиночный процесс)"""
+    index = os.getenv(WORKER_INDEX_ENV)
+    if index is None:
+        return None
+    return WorkerContext(
+        index=int(index),
+        count=int(os.getenv(WORKER_COUNT_ENV, "1")),
+        state_dir=os.getenv(WORKER_STATE_DIR_ENV, tempfile.gettempdir()),
+        supervisor_pid=int(os.getenv(SUPERVISOR_PID_ENV, "0")),
+    )
+
+
+def read_supervisor_stats(context: WorkerContext) -> Optional[Dict[str, Any]]:
+    """Последний агрегат супервизора (для /status)"""
+    return _read_json(context.aggregate_path)
+
+
+class WorkerHeartbeat:
+    """Сторона воркера: периодический heartbeat-файл со статистикой процесса"""
+
+    def __init__(
+        self,
+        context: WorkerContext,
+        interval_sec: float = 2.0,
+        stats_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+        on_orphaned: Optional[Callable[[], None]] = None
+    ):
+        self.context = context
+        self.interval_sec = interval_sec
+        self.stats_provider = stats_provider
+        self.on_orphaned = on_orphaned
+        self.started_at = time.time()
+        self.loop_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self) -> None:
+        stats: Dict[str, Any] = {}
+        if self.stats_provider is not None:
+            try:
+                stats = self.stats_provider()
+            except Exception as e:
+                stats = {'error': str(e)}
+        _write_json(self.context.heartbeat_path, {
+            'index': self.context.index,
+            'pid': os.getpid(),
+            'ts': time.time(),
+            'started_at': self.started_at,
+            'loop_lag_ms': round(self.loop_lag_ms, 2),
+            'stats': stats,
+        })
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.debug(f"Worker heartbeat write failed: {e}")
+            if self.context.supervisor_pid and os.getppid() != self.context.supervisor_pid:
+                # Супервизор умер — воркер без присмотра завершается сам
+                logger.warning("⚠️ Супервизор завершился, воркер останавливается", extra={
+                    'scope': 'supervisor',
+                    'method': 'heartbeat',
+                    'decision': 'orphaned',
+                    'ctx': {'worker': self.context.index}
+                })
+                if self.on_orphaned is not None:
+                    self.on_orphaned()
+                return
+            # Задержка пробуждения = насколько event loop занят CPU-работой
+            expected = time.monotonic() + self.interval_sec
+            await asyncio.sleep(self.interval_sec)
+            self.loop_lag_ms = max(0.0, (time.monotonic() - expected) * 1000)
+
+
+@dataclass
+class WorkerProcess:
+    """Состояние одного воркера в супервизоре"""
+    index: int
+    process: Optional[subprocess.Popen] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    next_start_at: float = 0.0
+    backoff_sec: float = 0.0
+    last_heartbeat: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class WorkerSupervisor:
+    """Запуск, контроль здоровья, перезапуск и согласованная остановка воркеров"""
+
+    def __init__(
+        self,
+        command: List[str],
+        workers: int,
+        heartbeat_timeout_sec: float = 15.0,
+        drain_timeout_sec: float = 10.0,
+        check_interval_sec: float = 1.0,
+        startup_timeout_sec: float = 120.0,
+        restart_backoff_sec: float = 1.0,
+        max_restart_backoff_sec: float = 30.0,
+        metrics_interval_sec: float = 60.0,
+        state_dir: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        cwd: Optional[str] = None
+    ):
+        self.command = command
+        self.heartbeat_timeout_sec = heartbeat_timeout_sec
+        self.drain_timeout_sec = drain_timeout_sec
+        self.check_interval_sec = check_interval_sec
+        self.startup_timeout_sec = startup_timeout_sec
+        self.restart_backoff_sec = restart_backoff_sec
+        self.max_restart_backoff_sec = max_restart_backoff_sec
+        self.metrics_interval_sec = metrics_interval_sec
+        self._own_state_dir = state_dir is None
+        self.state_dir = state_dir or tempfile.mkdtemp(prefix="nexy-workers-")
+        self.env = env
+        self.cwd = cwd
+        self.workers = [WorkerProcess(index=i) for i in range(workers)]
+        self.draining = False
+
+    def _heartbeat_path(self, index: int) -> str:
+        return os.path.join(self.state_dir, f"worker-{index}.json")
+
+    def spawn(self, worker: WorkerProcess) -> None:
+        env = dict(self.env if self.env is not None else os.environ)
+        env.update({
+            WORKER_INDEX_ENV: str(worker.index),
+            WORKER_COUNT_ENV: str(len(self.workers)),
+            WORKER_STATE_DIR_ENV: self.state_dir,
+            SUPERVISOR_PID_ENV: str(os.getpid()),
+        })
+        try:
+            os.unlink(self._heartbeat_path(worker.index))
+        except FileNotFoundError:
+            pass
+        worker.process = subprocess.Popen(self.command, env=env, cwd=self.cwd)
+        worker.started_at = time.time()
+        worker.last_heartbeat = {}
+        logger.info(f"🚀 Воркер {worker.index} запущен (pid {worker.process.pid})", extra={
+            'scope': 'supervisor',
+            'method': 'spawn',
+            'decision': 'start',
+            'ctx': {'worker': worker.index, 'pid': worker.process.pid, 'restarts': worker.restarts}
+        })
+
+    def _schedule_restart(self, worker: WorkerProcess, reason: str, now: float) -> None:
+        # Рано упавший воркер перезапускается всё реже; проработавший дольше таймаута — сразу
+        if now - worker.started_at > self.startup_timeout_sec:
+            worker.backoff_sec = 0.0
+        else:
+            worker.backoff_sec = min(
+                self.max_restart_backoff_sec,
+                max(self.restart_backoff_sec, worker.backoff_sec * 2)
+            )
+        worker.next_start_at = now + worker.backoff_sec
+        worker.restarts += 1
+        worker.process = None
+        logger.warning(f"⚠️ Воркер {worker.index} будет перезапущен: {reason}", extra={
+            'scope': 'supervisor',
+            'method': 'check_workers',
+            'decision': 'restart',
+            'ctx': {'worker': worker.index, 'reason': reason, 'backoff_sec': worker.backoff_sec}
+        })
+
+    def check_workers(self, now: Optional[float] = None) -> None:
+        """Один проход контроля здоровья: упавшие и зависшие воркеры перезапускаются"""
+        if self.draining:
+            return
+        now = time.time() if now is None else now
+        for worker in self.workers:
+            if worker.process is None:
+                if now >= worker.next_start_at:
+                    self.spawn(worker)
+                continue
+
+            returncode = worker.process.poll()
+            if returncode is not None:
+                self._schedule_restart(worker, f"exit code {returncode}", now)
+                continue
+
+            heartbeat = _read_json(self._heartbeat_path(worker.index))
+            if heartbeat and heartbeat.get('pid') == worker.process.pid:
+                worker.last_heartbeat = heartbeat
+            last_seen = worker.last_heartbeat.get('ts')
+            if last_seen is None:
+                stale = now - worker.started_at > self.startup_timeout_sec
+            else:
+                stale = now - last_seen > self.heartbeat_timeout_sec
+            if stale:
+                # Процесс жив, но event loop не отвечает — убиваем и поднимаем заново
+                worker.process.kill()
+                worker.process.wait()
+                self._schedule_restart(worker, "heartbeat timeout", now)
+
+    def aggregate(self) -> Dict[str, Any]:
+        """
+        Сводные метрики воркеров: счётчики суммируются, p95 — максимум по
+        воркерам (верхняя оценка без исходных выборок)
+        """
+        total_requests: Dict[str, int] = {}
+        total_errors: Dict[str, int] = {}
+        p95_latency: Dict[str, float] = {}
+        decision_rate: Dict[str, Dict[str, int]] = {}
+        active_streams = 0
+        workers = []
+        for worker in self.workers:
+            heartbeat = worker.last_heartbeat
+            stats = heartbeat.get('stats', {})
+            metrics = stats.get('metrics', {})
+            for method, count in metrics.get('total_requests', {}).items():
+                total_requests[method] = total_requests.get(method, 0) + count
+            for method, count in metrics.get('total_errors', {}).items():
+                total_errors[method] = total_errors.get(method, 0) + count
+            for method, value in metrics.get('p95_latency', {}).items():
+                p95_latency[method] = max(p95_latency.get(method, 0.0), value)
+            for method, decisions in metrics.get('decision_rate', {}).items():
+                merged = decision_rate.setdefault(method, {})
+                for decision, count in decisions.items():
+                    merged[decision] = merged.get(decision, 0) + count
+            active_streams += stats.get('backpressure', {}).get('active_streams', 0)
+            workers.append({
+                'index': worker.index,
+                'pid': worker.process.pid if worker.process is not None else None,
+                'alive': worker.alive,
+                'restarts': worker.restarts,
+                'heartbeat_age_sec': round(time.time() - heartbeat['ts'], 2) if 'ts' in heartbeat else None,
+                'loop_lag_ms': heartbeat.get('loop_lag_ms'),
+            })
+        return {
+            'workers': workers,
+            'alive': sum(1 for worker in self.workers if worker.alive),
+            'restarts': sum(worker.restarts for worker in self.workers),
+            'active_streams': active_streams,
+            'total_requests': total_requests,
+            'total_errors': total_errors,
+            'p95_latency': p95_latency,
+            'decision_rate': decision_rate,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.aggregate()
+        stats['draining'] = self.draining
+        return stats
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """Работает до stop_event, затем согласованно останавливает воркеры"""
+        logger.info(f"🧭 Супервизор: {len(self.workers)} воркеров", extra={
+            'scope': 'supervisor',
+            'method': 'run',
+            'decision': 'start',
+            'ctx': {'workers': len(self.workers), 'state_dir': self.state_dir}
+        })
+        last_metrics = time.time()
+        try:
+            while not stop_event.is_set():
+                self.check_workers()
+                now = time.time()
+                _write_json(os.path.join(self.state_dir, AGGREGATE_FILE), self.get_stats())
+                if now - last_metrics >= self.metrics_interval_sec:
+                    last_metrics = now
+                    logger.info("Supervisor metrics snapshot", extra={
+                        'scope': 'metrics',
+                        'decision': 'supervisor_snapshot',
+                        'ctx': self.aggregate()
+                    })
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.check_interval_sec)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.drain()
+
+    async def drain(self) -> None:
+        """SIGTERM всем воркерам сразу, ожидание drain_timeout_sec, затем SIGKILL"""
+        self.draining = True
+        running = [worker for worker in self.workers if worker.alive]
+        logger.info(f"🛑 Остановка {len(running)} воркеров", extra={
+            'scope': 'supervisor',
+            'method': 'drain',
+            'decision': 'shutdown',
+            'ctx': {'workers': [worker.index for worker in running], 'timeout_sec': self.drain_timeout_sec}
+        })
+        for worker in running:
+            worker.process.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + self.drain_timeout_sec
+        while any(worker.alive for worker in running) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        killed = []
+        for worker in running:
+            if worker.alive:
+                worker.process.kill()
+                killed.append(worker.index)
+            worker.process.wait()
+        if killed:
+            logger.warning(f"⚠️ Воркеры не завершились за {self.drain_timeout_sec}s: {killed}", extra={
+                'scope': 'supervisor',
+                'method': 'drain',
+                'decision': 'killed',
+                'ctx': {'workers': killed}
+            })
+        if self._own_state_dir:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
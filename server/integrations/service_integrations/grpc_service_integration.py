@@ -9,6 +9,8 @@ import logging
 from typing import Dict, Any, AsyncGenerator, Optional
 from datetime import datetime
 
+from config.unified_config import get_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -252,6 +254,8 @@ class GrpcServiceIntegration:
             has_emitted = False
             final_response_text = ''
             prompt_text = request_data.get('text', '')
+            audio_config = get_config().audio
+            audio_bytes_per_second = audio_config.sample_rate * audio_config.channels * 2
             
             # ДИАГНОСТИКА: Логирование промпта для диагностики пустых ответов
             logger.info(
@@ -301,15 +305,24 @@ class GrpcServiceIntegration:
                 if inspect.isawaitable(stream_iter):
                     stream_iter = await stream_iter
                 async for result in stream_iter:
-                    will_emit = bool(result.get('text_response')) or bool(result.get('command_payload'))
+                    emits_message = bool(result.get('text_response')) or bool(result.get('command_payload'))
+                    audio_bytes = 0
                     if isinstance(result.get('audio_chunk'), (bytes, bytearray)):
-                        will_emit = True
-                    if result.get('audio_chunks'):
-                        will_emit = True
+                        audio_bytes += len(result['audio_chunk'])
+                    for chunk in result.get('audio_chunks') or []:
+                        audio_bytes += len(chunk or b'')
 
-                    # CENTRALIZED BACKPRESSURE GUARD: проверяем rate limit только для реальных отправок
-                    if will_emit:
-                        message_allowed, rate_error = await backpressure_manager.check_message_rate(session_id)
+                    # CENTRALIZED BACKPRESSURE GUARD: проверяем rate limit только для реальных отправок.
+                    # Текст/действия считаются сообщениями, аудио — длительностью (размер TTS фрагментов
+                    # и склейка в StreamAudio не влияют на лимит)
+                    if emits_message or audio_bytes:
+                        message_allowed, rate_error = True, None
+                        if emits_message:
+                            message_allowed, rate_error = await backpressure_manager.check_message_rate(session_id)
+                        if message_allowed and audio_bytes:
+                            message_allowed, rate_error = await backpressure_manager.check_audio_rate(
+                                session_id, audio_bytes, audio_bytes_per_second
+                            )
                         if not message_allowed:
                             logger.warning(
                                 f"⚠️ Backpressure guard: message rate limit exceeded for {session_id}",
@@ -362,7 +375,7 @@ class GrpcServiceIntegration:
                     except Exception:
                         pass
                     yield result
-                    if will_emit:
+                    if emits_message or audio_bytes:
                         has_emitted = True
             else:
                 logger.warning("⚠️ StreamingWorkflowIntegration не доступен, возвращаем базовый ответ")
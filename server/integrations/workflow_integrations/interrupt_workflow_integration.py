@@ -5,9 +5,12 @@ InterruptWorkflowIntegration - управляет прерываниями на
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, Callable, Optional, AsyncGenerator
 from datetime import datetime
 
+from integrations.core.cancellation import get_cancellation_registry
+from integrations.core.state_backend import get_state_backend
 from modules.session_management.core.session_registry import SessionRegistry
 
 logger = logging.getLogger(__name__)
@@ -50,6 +53,12 @@ class InterruptWorkflowIntegration:
             if not self.interrupt_module:
                 logger.warning("⚠️ InterruptManager не предоставлен")
             
+            # Несколько воркеров: InterruptSession мог прийти в другой процесс
+            state_backend = get_state_backend()
+            if state_backend.shared:
+                await state_backend.on_broadcast("interrupt", self._on_remote_interrupt)
+                logger.info(f"📡 Прерывания других воркеров: подписка ({state_backend.worker_id})")
+            
             self.is_initialized = True
             logger.info("✅ InterruptWorkflowIntegration инициализирован успешно")
             return True
@@ -94,12 +103,23 @@ class InterruptWorkflowIntegration:
             logger.warning(f"⚠️ Ошибка проверки прерываний: {e}")
             return False
 
-    async def interrupt_session(self, hardware_id: str) -> Dict[str, Any]:
+    async def interrupt_session(
+        self,
+        hardware_id: str,
+        received_at: Optional[float] = None,
+        broadcast: bool = True
+    ) -> Dict[str, Any]:
         """
         Прерывание сессии по hardware_id
 
+        Активные стримы устройства отменяются сразу через токены отмены
+        (workflow останавливается в текущей точке ожидания), затем
+        InterruptManager ставит глобальный флаг и уведомляет модули.
+
         Args:
             hardware_id: Идентификатор оборудования
+            received_at: time.monotonic() приёма InterruptSession (для метрики interrupt → silence)
+            broadcast: Разослать прерывание другим воркерам (False — событие уже пришло от воркера)
 
         Returns:
             Результат прерывания в формате:
@@ -117,6 +137,16 @@ class InterruptWorkflowIntegration:
                 'interrupted_sessions': []
             }
 
+        # Push-отмена активных стримов — до флага и уведомления модулей
+        cancelled_streams = get_cancellation_registry().cancel(
+            hardware_id, reason="interrupt_session", received_at=received_at
+        )
+        if cancelled_streams:
+            logger.info(f"🛑 Отменены стримы {cancelled_streams} для {hardware_id}")
+        if broadcast:
+            # Стрим устройства может обслуживаться другим воркером; отправка не задерживает локальное прерывание
+            get_state_backend().broadcast_soon("interrupt", {"hardware_id": hardware_id})
+
         try:
             if not self.interrupt_module:
                 logger.error("❌ InterruptManager не доступен")
@@ -130,6 +160,10 @@ class InterruptWorkflowIntegration:
                 "action": "interrupt_session",
                 "hardware_id": hardware_id
             }) or {}
+            if cancelled_streams:
+                cleaned = list(interrupt_result.get('cleaned_sessions') or [])
+                interrupt_result['cleaned_sessions'] = cleaned + [sid for sid in cancelled_streams if sid not in cleaned]
+                interrupt_result['cancelled_streams'] = cancelled_streams
 
             logger.info(f"✅ Прерывание сессии для {hardware_id}: {interrupt_result}")
             return interrupt_result
@@ -142,6 +176,14 @@ class InterruptWorkflowIntegration:
                 'interrupted_sessions': []
             }
     
+    async def _on_remote_interrupt(self, payload: Dict[str, Any]) -> None:
+        """Прерывание, принятое другим воркером"""
+        hardware_id = payload.get("hardware_id")
+        if not hardware_id:
+            return
+        logger.info(f"📡 Прерывание от другого воркера для {hardware_id}")
+        await self.interrupt_session(hardware_id, received_at=time.monotonic(), broadcast=False)
+    
     async def process_with_interrupts(self, workflow_func: Callable, hardware_id: str, session_id: Optional[str] = None) -> AsyncGenerator[Any, None]:
         """
         Обработка с проверкой прерываний на каждом этапе
@@ -169,10 +211,14 @@ class InterruptWorkflowIntegration:
             
             logger.debug(f"Выполнение workflow для {hardware_id}")
             
+            # Стрим с токеном отмены останавливается push-отменой (InterruptSession),
+            # опрос флага между элементами нужен только без токена
+            token = get_cancellation_registry().get(hardware_id, session_id) if session_id else None
+            
             # Выполняем основную функцию как async generator
             async for result in workflow_func():
                 # Проверяем прерывания перед каждым yield
-                if await self.check_interrupts(hardware_id):
+                if token is None and await self.check_interrupts(hardware_id):
                     logger.info(f"🛑 Прерывание обнаружено во время выполнения для {hardware_id}")
                     raise InterruptException(f"Interrupted during processing for {hardware_id}")
                 
@@ -5,25 +5,37 @@ MemoryWorkflowIntegration - управляет памятью параллель
 
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+from integrations.core.memory_consolidation import MemoryConsolidator, get_memory_consolidator
+from integrations.core.state_backend import get_state_backend
+
 logger = logging.getLogger(__name__)
 
+# Явная просьба запомнить: пачка устройства анализируется сразу, не дожидаясь N реплик / тишины
+_REMEMBER_INTENT = re.compile(
+    r"\b(запомни|не забудь|remember this|remember that|keep (this|that) in mind)\b",
+    re.IGNORECASE,
+)
+
 
 class MemoryWorkflowIntegration:
     """
     Управляет памятью параллельно основному потоку обработки
     """
     
-    def __init__(self, memory_manager=None):
+    def __init__(self, memory_manager=None, consolidator: Optional[MemoryConsolidator] = None):
         """
         Инициализация MemoryWorkflowIntegration
         
         Args:
             memory_manager: Модуль управления памятью
+            consolidator: Пакетный анализ реплик (по умолчанию глобальный)
         """
         self.memory_module = memory_manager
+        self.consolidator = consolidator or get_memory_consolidator()
         self.is_initialized = False
         self.memory_cache = {}  # Кэш для быстрого доступа
         self._cache_lock = asyncio.Lock()  # Защита кэша
@@ -52,6 +64,13 @@ class MemoryWorkflowIntegration:
                 logger.warning("⚠️ MemoryManager не предоставлен")
             else:
                 await self._warmup_memory_manager()
+                # Реплики копятся по устройству и анализируются пачкой одним LLM вызовом
+                await self.consolidator.start(self._consolidate_turns)
+            
+            # Несколько воркеров: память, обновлённая другим процессом, сбрасывает локальный кэш
+            state_backend = get_state_backend()
+            if state_backend.shared:
+                await state_backend.on_broadcast("memory_cache", self._on_remote_memory_update)
             
             self.is_initialized = True
             logger.info("✅ MemoryWorkflowIntegration инициализирован успешно")
@@ -143,7 +162,22 @@ class MemoryWorkflowIntegration:
                 logger.warning("⚠️ MemoryModule не доступен для сохранения")
                 return False
             
-            # Запускаем сохранение в фоне
+            memory_data = self._prepare_memory_data(data)
+            hardware_id = memory_data.get('hardware_id')
+            prompt = memory_data.get('prompt') or memory_data.get('text')
+            response = memory_data.get('response') or memory_data.get('processed_text')
+            if hardware_id and prompt and response and self.consolidator.add_turn(
+                hardware_id,
+                {"prompt": prompt, "response": response},
+                urgent=bool(_REMEMBER_INTENT.search(prompt)),
+            ):
+                # В пачку уходит только LLM анализ: short-term summary обновляем сразу,
+                # иначе следующий запрос не увидит эту реплику до анализа пачки
+                await self._note_turn(hardware_id, prompt, response)
+                logger.debug("✅ Реплика добавлена в пачку консолидации памяти")
+                return True
+            
+            # Консолидатор не запущен: сохранение одной реплики в фоне
             asyncio.create_task(
                 self._save_memory_background(data)
             )
@@ -225,22 +259,65 @@ class MemoryWorkflowIntegration:
                 timeout=self.memory_update_timeout
             )
 
-            updated_memory = self._extract_memory_from_response(update_response)
-            if updated_memory:
-                # Fast-path: кэшируем свежую память сразу из ответа update,
-                # без дополнительного roundtrip get_context в БД.
-                self._cache_memory(hardware_id, updated_memory)
-                logger.debug("✅ Кэш памяти обновлен через fast-path из update_background")
-            else:
-                # Fallback: если update не вернул память, пробуем старый путь через fetch.
-                logger.debug("Memory update не вернул контекст, используем fallback fetch")
-                await self._fetch_and_cache_memory(hardware_id)
-            
+            await self._apply_memory_update(hardware_id, update_response)
             logger.debug("✅ Фоновое сохранение в память завершено")
             
         except Exception as e:
             logger.error(f"❌ Ошибка фонового сохранения в память: {e}")
 
+    async def _note_turn(self, hardware_id: str, prompt: str, response: str) -> None:
+        """Обновляет short-term summary реплики в модуле памяти и в кэше (без LLM и БД)"""
+        try:
+            result = await self._call_memory_module({
+                "action": "note_turn",
+                "hardware_id": hardware_id,
+                "prompt": prompt,
+                "response": response
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка обновления short-term памяти: {e}")
+            return
+        recent_context = (result or {}).get("recent_context") if isinstance(result, dict) else None
+        if not recent_context:
+            return
+        cached_context = self._get_cached_memory(hardware_id)
+        if isinstance(cached_context, dict):
+            self._cache_memory(hardware_id, {**cached_context, "recent_context": recent_context})
+        # Без кэша следующий запрос прочитает память из модуля — там summary уже обновлён
+
+    async def _consolidate_turns(self, hardware_id: str, turns: List[Dict[str, Any]]) -> None:
+        """Анализ пачки реплик устройства (воркер MemoryConsolidator, таймаут — на его стороне)"""
+        update_response = await self._call_memory_module({
+            "action": "update_background",
+            "hardware_id": hardware_id,
+            "turns": turns
+        })
+        await self._apply_memory_update(hardware_id, update_response)
+        logger.debug(f"✅ Память обновлена по пачке из {len(turns)} реплик")
+
+    async def _apply_memory_update(self, hardware_id: str, update_response: Optional[Dict[str, Any]]) -> None:
+        """Кэширует память из ответа update_background и оповещает другие воркеры"""
+        updated_memory = self._extract_memory_from_response(update_response)
+        if updated_memory:
+            # Fast-path: кэшируем свежую память сразу из ответа update,
+            # без дополнительного roundtrip get_context в БД.
+            self._cache_memory(hardware_id, updated_memory)
+            logger.debug("✅ Кэш памяти обновлен через fast-path из update_background")
+        else:
+            # Fallback: если update не вернул память, пробуем старый путь через fetch.
+            logger.debug("Memory update не вернул контекст, используем fallback fetch")
+            await self._fetch_and_cache_memory(hardware_id)
+        
+        # Память не изменилась (запись в БД пропущена) — у других воркеров кэш актуален
+        if not isinstance(update_response, dict) or update_response.get("changed", True):
+            get_state_backend().broadcast_soon("memory_cache", {"hardware_id": hardware_id})
+
+    def _on_remote_memory_update(self, payload: Dict[str, Any]) -> None:
+        """Память обновлена другим воркером: следующий запрос перечитает её из БД"""
+        hardware_id = payload.get("hardware_id")
+        if hardware_id and self.memory_cache.pop(hardware_id, None) is not None:
+            logger.debug(f"Кэш памяти сброшен по событию другого воркера: {hardware_id}")
+
     async def _call_memory_module(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Унифицированный вызов memory_module.process."""
         if not self.memory_module or not hasattr(self.memory_module, 'process'):
@@ -470,6 +547,9 @@ class MemoryWorkflowIntegration:
         try:
             logger.info("Очистка MemoryWorkflowIntegration...")
             
+            # Накопленные реплики анализируются до остановки (пока модуль памяти доступен)
+            await self.consolidator.stop()
+            
             # Очищаем кэш
             self.memory_cache.clear()
             
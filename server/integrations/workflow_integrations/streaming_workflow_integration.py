@@ -5,17 +5,25 @@ StreamingWorkflowIntegration - управляет потоком: текст →
 
 import logging
 import asyncio
+import time
 import json
 import inspect
-from typing import Dict, Any, AsyncGenerator, Optional, Union, Set
+from typing import Dict, Any, AsyncGenerator, AsyncIterator, Iterator, List, Optional, Tuple, Union, Set
 from datetime import datetime
 from dataclasses import dataclass, field
 
 from config.unified_config import WorkflowConfig, get_config
 from integrations.core.assistant_response_parser import AssistantResponseParser
 from integrations.core.json_stream_extractor import JsonStreamExtractor
+from integrations.core.request_trace_writer import RequestTraceWriter, get_request_trace_writer
+from integrations.core.sentence_synthesis_pipeline import SentenceSynthesisPipeline
+from integrations.core.shared_state import get_shared_inflight
+from integrations.core.speculative_stream import SpeculativeStream
 from modules.session_management.core.session_registry import SessionRegistry
+from modules.text_processing.core.admission_controller import AdmissionRejected
+from modules.text_filtering.core.incremental_sentence_segmenter import IncrementalSentenceSegmenter
 from utils.logging_formatter import log_structured
+from utils.metrics_collector import record_decision_metric, record_metric
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +47,10 @@ class RequestContext:
     total_audio_bytes: int = 0
     # [STREAMING] Потоковый экстрактор текста из JSON
     json_extractor: Optional["JsonStreamExtractor"] = None
+    # Look-ahead синтез аудио (порядок выдачи по sentence_index)
+    synthesis: Optional["SentenceSynthesisPipeline"] = None
+    # Инкрементальный сегментатор stream_buffer (None — разбиение через text_filter_module)
+    segmenter: Optional["IncrementalSentenceSegmenter"] = None
 
 
 class StreamingWorkflowIntegration:
@@ -94,7 +106,10 @@ class StreamingWorkflowIntegration:
         self.stream_first_sentence_min_words: int = cfg.stream_first_sentence_min_words
         self.stream_punct_flush_strict: bool = bool(cfg.stream_punct_flush_strict)
         self.force_flush_max_chars: int = cfg.force_flush_max_chars
+        self.tts_lookahead_max_inflight: int = max(1, int(cfg.tts_lookahead_max_inflight))
+        self.tts_lookahead_max_buffered_bytes: int = int(cfg.tts_lookahead_max_buffered_bytes)
         self.sentence_joiner: str = " "
+        self.stream_incremental_segmenter: bool = bool(cfg.stream_incremental_segmenter)
         self.end_punctuations = ('.', '!', '?')
         
         # Single-flight защита: lock + централизованный SessionRegistry.
@@ -105,6 +120,22 @@ class StreamingWorkflowIntegration:
         # Если prevent_concurrent_hardware_id_sessions=True, блокирует параллельные сессии одного устройства
         # Если False (по умолчанию), допускаются параллельные сессии одного hardware_id
         self._prevent_concurrent_hardware_id_sessions: bool = bool(cfg.prevent_concurrent_hardware_id_sessions)
+
+        # Write-behind персистенция request trace: final_result не ждёт БД
+        self._trace_writer: Optional[RequestTraceWriter] = (
+            get_request_trace_writer() if cfg.trace_write_behind_enabled else None
+        )
+
+        # Pre-LLM: спекулятивный старт LLM до ответа subscription gate
+        self.pre_llm_speculation: str = str(cfg.pre_llm_speculation).strip().lower()
+        self._speculation_stats: Dict[str, Any] = {
+            'started': 0,
+            'committed': 0,
+            'aborted': 0,
+            'wasted': 0,
+            'wasted_chunks': 0,
+            'saved_ms_total': 0.0,
+        }
         
         # ДИАГНОСТИКА: Логирование создания экземпляра
         logger.info(
@@ -151,6 +182,8 @@ class StreamingWorkflowIntegration:
     def set_database_manager(self, database_manager) -> None:
         """Внедрение DatabaseManager (single owner-path через GrpcServiceManager)."""
         self._database_manager = database_manager
+        if self._trace_writer is not None:
+            self._trace_writer.set_sink(self._write_request_traces)
         logger.info("✅ DatabaseManager wired to StreamingWorkflowIntegration")
     
     async def _process_text_for_tts(self, text_chunk: str, ctx: RequestContext) -> AsyncGenerator[Dict[str, Any], None]:
@@ -192,16 +225,23 @@ class StreamingWorkflowIntegration:
 
         # Sanitize and buffer
         sanitized = await self._sanitize_for_tts(text_chunk)
-        if sanitized:
-            ctx.stream_buffer = (f"{ctx.stream_buffer}{self.sentence_joiner}{sanitized}" if ctx.stream_buffer else sanitized)
-            logger.debug(f"📦 stream_buffer обновлен: {len(ctx.stream_buffer)} символов")
-        else:
+        if not sanitized:
             logger.warning(f"⚠️ sanitized пустой для chunk: '{text_chunk[:50]}...'")
 
-        # Split into complete sentences
-        logger.debug(f"🔍 Вызов _split_complete_sentences с stream_buffer: {len(ctx.stream_buffer)} символов")
-        complete_sentences, remainder = await self._split_complete_sentences(ctx.stream_buffer)
-        logger.debug(f"✅ _split_complete_sentences вернул: {len(complete_sentences)} предложений, remainder={len(remainder) if remainder else 0} символов")
+        if ctx.segmenter is not None:
+            # Инкрементально: сканируются только новые символы, а не весь stream_buffer
+            complete_sentences = ctx.segmenter.feed(sanitized) if sanitized else []
+            remainder = ctx.segmenter.remainder
+            logger.debug(f"✅ IncrementalSentenceSegmenter: {len(complete_sentences)} предложений, remainder={len(remainder)} символов")
+        else:
+            if sanitized:
+                ctx.stream_buffer = (f"{ctx.stream_buffer}{self.sentence_joiner}{sanitized}" if ctx.stream_buffer else sanitized)
+                logger.debug(f"📦 stream_buffer обновлен: {len(ctx.stream_buffer)} символов")
+
+            # Split into complete sentences
+            logger.debug(f"🔍 Вызов _split_complete_sentences с stream_buffer: {len(ctx.stream_buffer)} символов")
+            complete_sentences, remainder = await self._split_complete_sentences(ctx.stream_buffer)
+            logger.debug(f"✅ _split_complete_sentences вернул: {len(complete_sentences)} предложений, remainder={len(remainder) if remainder else 0} символов")
         ctx.stream_buffer = remainder
 
         for complete in complete_sentences:
@@ -227,33 +267,117 @@ class StreamingWorkflowIntegration:
                 ctx.pending_segment = ""
                 ctx.has_emitted = True
                 ctx.captured_segments.append(to_emit)
-                
-                yield {
-                    'success': True,
-                    'text_response': to_emit,
-                    'sentence_index': ctx.emitted_segment_counter
-                }
 
-                # Generate Audio
-                if to_emit.strip():
-                    tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                    segment_audio_chunks = 0
-                    async for audio_chunk in self._stream_audio_for_sentence(tts_text, ctx.emitted_segment_counter):
-                        if not audio_chunk: continue
-                        segment_audio_chunks += 1
-                        ctx.total_audio_chunks += 1
-                        ctx.total_audio_bytes += len(audio_chunk)
-                        yield {
-                            'success': True,
-                            'audio_chunk': audio_chunk,
-                            'sentence_index': ctx.emitted_segment_counter
-                        }
-                    ctx.sentence_audio_map[ctx.emitted_segment_counter] = segment_audio_chunks
-                else:
-                    logger.debug(f"⏭️ Пропуск аудио для пустого текста в segment #{ctx.emitted_segment_counter}")
+                # Текст и аудио сегмента выдаются конвейером строго по порядку,
+                # синтез при этом идёт параллельно с уже стримящимися предложениями
+                self._submit_segment_for_synthesis(ctx, to_emit)
             else:
                 ctx.pending_segment = candidate
 
+        for event in self._pop_ready_synthesis(ctx):
+            yield event
+
+    def _get_synthesis_pipeline(self, ctx: RequestContext) -> SentenceSynthesisPipeline:
+        """Возвращает (создаёт при необходимости) look-ahead конвейер синтеза запроса"""
+        if ctx.synthesis is None:
+            ctx.synthesis = SentenceSynthesisPipeline(
+                self._stream_audio_for_sentence,
+                max_inflight=self.tts_lookahead_max_inflight,
+                max_buffered_bytes=self.tts_lookahead_max_buffered_bytes,
+            )
+        return ctx.synthesis
+
+    def _submit_segment_for_synthesis(self, ctx: RequestContext, to_emit: str) -> None:
+        """Ставит уже учтённый сегмент (ctx.emitted_segment_counter) в конвейер синтеза"""
+        sentence_index = ctx.emitted_segment_counter
+        text_event = {
+            'success': True,
+            'text_response': to_emit,
+            'sentence_index': sentence_index
+        }
+        tts_text = None
+        if to_emit.strip():
+            tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
+            ctx.sentence_audio_map[sentence_index] = 0
+        else:
+            logger.debug(f"⏭️ Пропуск аудио для пустого текста в segment #{sentence_index}")
+        self._get_synthesis_pipeline(ctx).submit(sentence_index, text_event, tts_text)
+
+    def _account_synthesis_event(self, ctx: RequestContext, event: Dict[str, Any]) -> None:
+        """Учитывает выданный аудио чанк в метриках запроса"""
+        audio_chunk = event.get('audio_chunk')
+        if audio_chunk:
+            ctx.total_audio_chunks += 1
+            ctx.total_audio_bytes += len(audio_chunk)
+            ctx.sentence_audio_map[event['sentence_index']] = event['audio_chunk_index']
+
+    def _pop_ready_synthesis(self, ctx: RequestContext) -> Iterator[Dict[str, Any]]:
+        """Неблокирующая выдача готовых событий конвейера синтеза"""
+        if ctx.synthesis is None:
+            return
+        for event in ctx.synthesis.pop_ready():
+            self._account_synthesis_event(ctx, event)
+            yield event
+
+    async def _drain_synthesis(self, ctx: RequestContext) -> AsyncGenerator[Dict[str, Any], None]:
+        """Дожидается и выдаёт все оставшиеся события конвейера синтеза"""
+        if ctx.synthesis is None:
+            return
+        async for event in ctx.synthesis.drain():
+            self._account_synthesis_event(ctx, event)
+            yield event
+
+    async def _interleave_synthesis(
+        self,
+        source: AsyncIterator[Any],
+        ctx: RequestContext,
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """
+        Итерирует source (поток LLM), параллельно выдавая готовое аудио конвейера.
+
+        Пока LLM генерирует следующий фрагмент, уже синтезированное аудио
+        уходит клиенту, не дожидаясь очередного чанка текста.
+
+        Yields:
+            ('source', item) для элементов source и ('synthesis', event) для событий конвейера
+        """
+        pipeline = self._get_synthesis_pipeline(ctx)
+        iterator = source.__aiter__()
+        next_item = asyncio.ensure_future(iterator.__anext__())
+        try:
+            while True:
+                if not next_item.done():
+                    ready_wait = asyncio.ensure_future(pipeline.wait_ready())
+                    try:
+                        await asyncio.wait({next_item, ready_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        if not ready_wait.done():
+                            ready_wait.cancel()
+                for event in self._pop_ready_synthesis(ctx):
+                    yield ('synthesis', event)
+                if next_item.done():
+                    try:
+                        item = next_item.result()
+                    except StopAsyncIteration:
+                        return
+                    yield ('source', item)
+                    next_item = asyncio.ensure_future(iterator.__anext__())
+        finally:
+            if not next_item.done():
+                next_item.cancel()
+                try:
+                    await next_item
+                except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                    pass
+            # Потребитель мог уйти между элементами: закрываем source явно (освобождает слот LLM),
+            # не дожидаясь финализации генератора сборщиком мусора
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"Interleave synthesis: ошибка закрытия источника: {e}")
+
     async def process_request_streaming(self, request_data: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
         """Потоковая обработка запроса: предложения и аудио стримятся параллельно."""
         if not self.is_initialized:
@@ -312,63 +436,17 @@ class StreamingWorkflowIntegration:
         from modules.subscription import get_subscription_module
         
         subscription_module = get_subscription_module()
-        if subscription_module:
-            gate_result = await subscription_module.can_process(hardware_id)
-            
-            if not gate_result.allowed:
-                logger.info(
-                    f"[F-2025-017] subscription_gate=deny reason={gate_result.reason} "
-                    f"hardware_id={hardware_id[:8]}... session_id={session_id}",
-                    extra={
-                        'scope': 'workflow',
-                        'method': 'process_request_streaming',
-                        'decision': 'deny',
-                        'feature_id': 'F-2025-017',
-                        'ctx': {
-                            'hardware_id': hardware_id,
-                            'session_id': session_id,
-                            'reason': gate_result.reason,
-                            'status': gate_result.status
-                        }
-                    }
-                )
-                yield {
-                    'success': False,
-                    'error': gate_result.message or 'Access denied by subscription gate',
-                    'error_code': 'PERMISSION_DENIED',
-                    'error_type': 'subscription_gate_denied',
-                    'subscription_status': gate_result.status,
-                    'subscription_reason': gate_result.reason,
-                    'text_response': '',
-                }
-                return
-            else:
-                logger.info(
-                    f"[F-2025-017] subscription_gate=allow reason={gate_result.reason} "
-                    f"hardware_id={hardware_id[:8]}... session_id={session_id}",
-                    extra={
-                        'scope': 'workflow',
-                        'method': 'process_request_streaming',
-                        'decision': 'allow',
-                        'feature_id': 'F-2025-017',
-                        'ctx': {
-                            'hardware_id': hardware_id,
-                            'session_id': session_id,
-                            'reason': gate_result.reason,
-                            'status': gate_result.status
-                        }
-                    }
-                )
-                
-            # Сохраняем контекст подписки для промпта
-            subscription_context = gate_result.subscription_context
-            
-        else:
-            subscription_context = None
+
+        speculative_stream: Optional[SpeculativeStream] = None
         
         # СОЗДАЕМ request-scoped контекст
 
         ctx = RequestContext(session_id=session_id)
+        self._get_synthesis_pipeline(ctx)
+        # Семантика сегментатора совпадает с SentenceProcessingProvider модуля фильтрации,
+        # без модуля остаётся прежний fallback (весь буфер — одно предложение)
+        if self.stream_incremental_segmenter and self.text_filter_module is not None:
+            ctx.segmenter = IncrementalSentenceSegmenter(joiner=self.sentence_joiner)
         
         # ДИАГНОСТИКА: Логирование перед single-flight проверкой
         logger.info(
@@ -391,6 +469,27 @@ class StreamingWorkflowIntegration:
                 prevent_concurrent_hardware=self._prevent_concurrent_hardware_id_sessions,
             )
 
+        inflight_acquired = bool(acquire_result.get('ok'))
+        shared_inflight = get_shared_inflight()
+        shared_inflight_acquired = False
+        # Pre-LLM задачи создаются только после захвата single-flight (отклонённый запрос их не запускает)
+        gate_task: Optional[asyncio.Future] = None
+        memory_task: Optional[asyncio.Future] = None
+
+        try:
+            # Между воркерами (общее хранилище состояния): тот же single-flight, без удержания локального lock.
+            # Внутри try: отмена или ошибка во время захвата освобождает локальную запись в finally
+            if inflight_acquired and shared_inflight is not None:
+                shared_result = await shared_inflight.try_acquire(
+                    session_id=session_id,
+                    hardware_id=hardware_id,
+                    prevent_concurrent_hardware=self._prevent_concurrent_hardware_id_sessions,
+                )
+                if shared_result.get('ok'):
+                    shared_inflight_acquired = True
+                else:
+                    acquire_result = shared_result
+
             if not acquire_result.get('ok'):
                 reason = acquire_result.get('reason', 'concurrent_request')
                 active_sessions = acquire_result.get('active_sessions', [])
@@ -449,9 +548,25 @@ class StreamingWorkflowIntegration:
                     'action': 'added_to_inflight'
                 }
             )
-        
-        try:
-            import time
+
+            # PRE-LLM FAN-OUT: gate подписки и контекст памяти — независимый I/O,
+            # запускаем параллельно и ждём только перед стартом LLM
+            pre_llm_start = time.monotonic()
+            gate_task = (
+                asyncio.ensure_future(subscription_module.can_process(hardware_id))
+                if subscription_module else None
+            )
+            # Результат COLLECT pre-warm (если COMMIT пришёл после прогрева)
+            prewarmed_memory = (request_data.get('prewarm') or {}).get('memory_context')
+            if hardware_id != 'unknown' and self.memory_workflow and prewarmed_memory is None:
+                # Предзагрузка памяти в фоне (не блокируем обработку)
+                asyncio.create_task(
+                    self.memory_workflow.prefetch_memory(hardware_id)
+                )
+            memory_task = asyncio.ensure_future(
+                self._fetch_memory_context_timed(hardware_id, prewarmed_memory)
+            )
+
             request_start_time = time.time()
             
             logger.info(f"🔄 Начало обработки запроса: session_id={session_id}, hardware_id={hardware_id}")
@@ -494,19 +609,90 @@ class StreamingWorkflowIntegration:
 
             # КРИТИЧНО: hardware_id уже получен и валидирован выше (в guard проверке)
             
-            # Оптимизация: предзагрузка памяти для нового hardware_id
-            if hardware_id != 'unknown' and self.memory_workflow:
-                # Запускаем предзагрузку в фоне (не блокируем обработку)
-                asyncio.create_task(
-                    self.memory_workflow.prefetch_memory(hardware_id)
+            # Спекулятивный старт LLM: память готова, а gate ещё думает
+            if (
+                self.pre_llm_speculation == 'on'
+                and gate_task is not None
+                and not gate_task.done()
+            ):
+                memory_context, memory_time = await memory_task
+                if not gate_task.done():
+                    speculative_stream = SpeculativeStream(
+                        self._iter_processed_sentences(
+                            prompt_text_stripped,
+                            request_data.get('screenshot'),
+                            memory_context,
+                            subscription_context=None,  # решение gate ещё неизвестно
+                            session_id=session_id,
+                            hardware_id=hardware_id
+                        )
+                    ).start()
+                    speculation_started = time.monotonic()
+
+            gate_result = await gate_task if gate_task is not None else None
+            if gate_result is not None and not gate_result.allowed:
+                if speculative_stream is not None:
+                    wasted_chunks = await speculative_stream.cancel()
+                    speculative_stream = None
+                    self._record_speculation('abort', wasted_chunks=wasted_chunks)
+                logger.info(
+                    f"[F-2025-017] subscription_gate=deny reason={gate_result.reason} "
+                    f"hardware_id={hardware_id[:8]}... session_id={session_id}",
+                    extra={
+                        'scope': 'workflow',
+                        'method': 'process_request_streaming',
+                        'decision': 'deny',
+                        'feature_id': 'F-2025-017',
+                        'ctx': {
+                            'hardware_id': hardware_id,
+                            'session_id': session_id,
+                            'reason': gate_result.reason,
+                            'status': gate_result.status
+                        }
+                    }
+                )
+                yield {
+                    'success': False,
+                    'error': gate_result.message or 'Access denied by subscription gate',
+                    'error_code': 'PERMISSION_DENIED',
+                    'error_type': 'subscription_gate_denied',
+                    'subscription_status': gate_result.status,
+                    'subscription_reason': gate_result.reason,
+                    'text_response': '',
+                }
+                return
+            if gate_result is not None:
+                logger.info(
+                    f"[F-2025-017] subscription_gate=allow reason={gate_result.reason} "
+                    f"hardware_id={hardware_id[:8]}... session_id={session_id}",
+                    extra={
+                        'scope': 'workflow',
+                        'method': 'process_request_streaming',
+                        'decision': 'allow',
+                        'feature_id': 'F-2025-017',
+                        'ctx': {
+                            'hardware_id': hardware_id,
+                            'session_id': session_id,
+                            'reason': gate_result.reason,
+                            'status': gate_result.status
+                        }
+                    }
+                )
+            if speculative_stream is not None:
+                self._record_speculation(
+                    'commit', saved_ms=(time.monotonic() - speculation_started) * 1000
                 )
+                
+            # Сохраняем контекст подписки для промпта
+            subscription_context = gate_result.subscription_context if gate_result is not None else None
             
-            # Получаем память (из кэша или запрашиваем)
-            memory_start_time = time.time()
-            memory_context = await self._get_memory_context_parallel(hardware_id)
-            memory_time = (time.time() - memory_start_time) * 1000
+            # Память (из кэша или запрашиваем) — запрошена параллельно с gate
+            memory_context, memory_time = await memory_task
             memory_size = len(str(memory_context)) if memory_context else 0
             logger.info(f"⏱️  Memory context получен за {memory_time:.2f}ms (размер: {memory_size} символов)")
+            pre_llm_time = (time.monotonic() - pre_llm_start) * 1000
+            record_metric("pre_llm_stage", pre_llm_time)
+            logger.info(f"⏱️  Pre-LLM стадия (gate ‖ memory): {pre_llm_time:.2f}ms")
             MAX_JSON_BUFFER_SIZE = 10000  # Максимальный размер буфера (10KB)
             json_parse_attempts = 0  # Счетчик попыток парсинга JSON
             MAX_JSON_PARSE_ATTEMPTS = 10  # Максимум попыток парсинга JSON
@@ -534,13 +720,24 @@ class StreamingWorkflowIntegration:
 
 
 
-            async for processed_sentence in self._iter_processed_sentences(
+            llm_source = speculative_stream or self._iter_processed_sentences(
                 prompt_text_stripped,
                 request_data.get('screenshot'),
                 memory_context,
                 subscription_context=subscription_context, # Передаем контекст подписки
-                session_id=session_id
+                session_id=session_id,
+                hardware_id=hardware_id
+            )
+            async for source_kind, processed_sentence in self._interleave_synthesis(
+                llm_source,
+                ctx,
             ):
+                if source_kind == 'synthesis':
+                    # Аудио look-ahead синтеза готово раньше следующего фрагмента LLM
+                    if 'audio_chunk' in processed_sentence and first_audio_time is None:
+                        first_audio_time = (time.time() - request_start_time) * 1000
+                    yield processed_sentence
+                    continue
                 sentence = processed_sentence
                 if not llm_iteration_started:
                     llm_iteration_started = True
@@ -746,24 +943,12 @@ class StreamingWorkflowIntegration:
                         ctx.pending_segment = ""
                         ctx.has_emitted = True
                         ctx.captured_segments.append(to_emit)
-                        yield {'success': True, 'text_response': to_emit, 'sentence_index': ctx.emitted_segment_counter}
-                        # Фаза 2: Пропускаем аудио-генерацию, если text пустой
-                        if to_emit.strip():
-                            tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                            # Генерируем и стримим аудио чанки
-                            segment_audio_chunks = 0
-                            async for audio_chunk in self._stream_audio_for_sentence(tts_text, ctx.emitted_segment_counter):
-                                if not audio_chunk:
-                                    continue
-                                # Отправляем чанк сразу для снижения latency
-                                ctx.total_audio_chunks += 1
-                                ctx.total_audio_bytes += len(audio_chunk)
-                                segment_audio_chunks += 1
-                                yield {'success': True, 'audio_chunk': audio_chunk, 'sentence_index': ctx.emitted_segment_counter}
-                            ctx.sentence_audio_map[ctx.emitted_segment_counter] = segment_audio_chunks
-                            logger.debug(f"🎧 Final segment #{ctx.emitted_segment_counter} → {segment_audio_chunks} чанков, {ctx.total_audio_bytes} байт")
-                        else:
-                            logger.debug(f"⏭️ Пропуск аудио для пустого текста в final segment #{ctx.emitted_segment_counter}")
+                        # Фаза 2: аудио-генерация пропускается, если text пустой
+                        self._submit_segment_for_synthesis(ctx, to_emit)
+                        for event in self._pop_ready_synthesis(ctx):
+                            if 'audio_chunk' in event and first_audio_time is None:
+                                first_audio_time = (time.time() - request_start_time) * 1000
+                            yield event
                     else:
                         ctx.pending_segment = candidate
                 
@@ -789,22 +974,17 @@ class StreamingWorkflowIntegration:
                 ctx.pending_segment = ""
                 ctx.has_emitted = True
                 ctx.captured_segments.append(to_emit)
-                yield {'success': True, 'text_response': to_emit, 'sentence_index': ctx.emitted_segment_counter}
-                # Фаза 2: Пропускаем аудио-генерацию, если text пустой
-                if to_emit.strip():
-                    tts_text = to_emit if to_emit.endswith(self.end_punctuations) else f"{to_emit}."
-                    sentence_audio_chunks = 0
-                    async for audio_chunk in self._stream_audio_for_sentence(tts_text, ctx.emitted_segment_counter):
-                        if not audio_chunk:
-                            continue
-                        sentence_audio_chunks += 1
-                        ctx.total_audio_chunks += 1
-                        ctx.total_audio_bytes += len(audio_chunk)
-                        yield {'success': True, 'audio_chunk': audio_chunk, 'sentence_index': ctx.emitted_segment_counter, 'audio_chunk_index': sentence_audio_chunks}
-                    ctx.sentence_audio_map[ctx.emitted_segment_counter] = sentence_audio_chunks
-                    logger.info(f"🎧 Forced final segment #{ctx.emitted_segment_counter} → audio_chunks={sentence_audio_chunks}, total_audio_chunks={ctx.total_audio_chunks}, total_bytes={ctx.total_audio_bytes}")
-                else:
-                    logger.debug(f"⏭️ Пропуск аудио для пустого текста в forced segment #{ctx.emitted_segment_counter}")
+                # Фаза 2: аудио-генерация пропускается, если text пустой
+                self._submit_segment_for_synthesis(ctx, to_emit)
+                logger.info(f"🎧 Forced final segment #{ctx.emitted_segment_counter} поставлен в синтез")
+
+            # Дожидаемся look-ahead синтеза: весь текст и аудио уходят до финального ответа
+            async for event in self._drain_synthesis(ctx):
+                if 'audio_chunk' in event and first_audio_time is None:
+                    first_audio_time = (time.time() - request_start_time) * 1000
+                yield event
+            if ctx.synthesis is not None:
+                logger.debug(f"🎧 Look-ahead TTS stats: {ctx.synthesis.get_stats()}")
 
             full_text = " ".join(ctx.captured_segments).strip()
 
@@ -831,7 +1011,8 @@ class StreamingWorkflowIntegration:
                     logger.debug("Фича-флаг forward_assistant_actions выключен или kill-switch активен, пропускаем command_payload")
 
             # Централизованная персистенция пользовательского запроса/ответа в БД.
-            await self._persist_request_trace(
+            # Write-behind: трейс уходит в очередь, запись — фоновым batched flush.
+            trace = self._build_request_trace(
                 session_id=session_id,
                 hardware_id=hardware_id,
                 prompt_text=prompt_text_stripped,
@@ -841,6 +1022,10 @@ class StreamingWorkflowIntegration:
                 total_audio_chunks=ctx.total_audio_chunks,
                 total_audio_bytes=ctx.total_audio_bytes,
             )
+            if self._trace_writer is not None and self._database_manager is not None:
+                await self._trace_writer.enqueue(trace)
+            else:
+                await self._persist_request_trace(trace)
 
             total_time = (time.time() - request_start_time) * 1000
             
@@ -900,6 +1085,23 @@ class StreamingWorkflowIntegration:
             logger.info(f"   • Общее время: {total_time:.2f}ms ({total_time/1000:.2f} сек)")
             yield final_result
 
+        except AdmissionRejected as e:
+            logger.warning(
+                f"⚠️ LLM перегружен, запрос {session_id} отклонён: {e.reason}",
+                extra={
+                    'scope': 'workflow',
+                    'method': 'process_request_streaming',
+                    'decision': 'reject',
+                    'ctx': {'session_id': session_id, 'reason': e.reason}
+                }
+            )
+            yield {
+                'success': False,
+                'error': str(e),
+                'error_code': e.error_code,
+                'error_type': 'llm_overloaded',
+                'text_response': '',
+            }
         except Exception as e:
             logger.error(f"❌ Ошибка обработки запроса {session_id}: {e}")
             yield {
@@ -910,27 +1112,37 @@ class StreamingWorkflowIntegration:
                 'text_response': '',
             }
         finally:
-            # Удаляем session_id из in-flight set (гарантированно выполняется)
-            async with self._inflight_lock:
-                hardware_id = request_data.get('hardware_id')
-                was_present = self._session_registry.release_inflight(session_id, hardware_id)
+            # Незавершённые pre-LLM задачи и спекулятивный LLM поток (ранний выход/ошибка)
+            await self._cancel_pending(gate_task, memory_task)
+            if speculative_stream is not None:
+                await speculative_stream.cancel()
+            # Отменяем незавершённый look-ahead синтез (ошибка/прерывание клиента)
+            if ctx.synthesis is not None:
+                await ctx.synthesis.aclose()
+            # Удаляем session_id из in-flight set (только свою запись: отклонённый запрос её не занимал)
+            if inflight_acquired:
+                async with self._inflight_lock:
+                    hardware_id = request_data.get('hardware_id')
+                    was_present = self._session_registry.release_inflight(session_id, hardware_id)
                 
-                logger.info(
-                    f"🧹 Session удалён из inflight: session_id={session_id}, hardware_id={hardware_id}, instance_id={id(self)}, "
-                    f"was_present={was_present}",
-                    extra={
-                        'scope': 'workflow',
-                        'method': 'process_request_streaming',
-                        'session_id': session_id,
-                        'hardware_id': hardware_id,
-                        'instance_id': id(self),
-                        'remaining_inflight': self._session_registry.get_inflight_session_ids(),
-                        'action': 'removed_from_inflight',
-                        'was_present': was_present
-                    }
-                )
+                    logger.info(
+                        f"🧹 Session удалён из inflight: session_id={session_id}, hardware_id={hardware_id}, instance_id={id(self)}, "
+                        f"was_present={was_present}",
+                        extra={
+                            'scope': 'workflow',
+                            'method': 'process_request_streaming',
+                            'session_id': session_id,
+                            'hardware_id': hardware_id,
+                            'instance_id': id(self),
+                            'remaining_inflight': self._session_registry.get_inflight_session_ids(),
+                            'action': 'removed_from_inflight',
+                            'was_present': was_present
+                        }
+                    )
+            if shared_inflight_acquired and shared_inflight is not None:
+                await shared_inflight.release(session_id, request_data.get('hardware_id'))
 
-    async def _persist_request_trace(
+    def _build_request_trace(
         self,
         session_id: str,
         hardware_id: str,
@@ -940,12 +1152,59 @@ class StreamingWorkflowIntegration:
         emitted_segments: int,
         total_audio_chunks: int,
         total_audio_bytes: int,
-    ) -> None:
-        """Сохраняет request trace (session/command/answer/screenshot) в едином owner-path."""
+    ) -> Dict[str, Any]:
+        """Request trace в форме записи БД (без самого скриншота — только его размер)."""
+        return {
+            "hardware_id": hardware_id,
+            "session_id": session_id,
+            "session_metadata": {
+                "hardware_id": hardware_id,
+                "source": "streaming_workflow",
+                "last_request_at": datetime.utcnow().isoformat(),
+            },
+            "prompt": prompt_text,
+            "response": full_text or "",
+            "language": "en",
+            "command_metadata": {
+                "source": "streaming_workflow",
+                "has_screenshot": bool(screenshot_b64),
+                "request_key": session_id,
+            },
+            "model_info": {"provider": "langchain", "module": "text_processing"},
+            "performance_metrics": {
+                "sentences_processed": emitted_segments,
+                "audio_chunks_processed": total_audio_chunks,
+                "audio_bytes_processed": total_audio_bytes,
+            },
+            "screenshot_metadata": (
+                {"encoding": "base64", "size_b64": len(screenshot_b64)} if screenshot_b64 else None
+            ),
+        }
+
+    async def _write_request_traces(self, traces: List[Dict[str, Any]]) -> None:
+        """Flush пачки request trace (sink для RequestTraceWriter)."""
         if not self._database_manager or not getattr(self._database_manager, "is_initialized", False):
             logger.debug("DatabaseManager недоступен, пропускаем request trace persistence")
             return
 
+        persist_batch = getattr(self._database_manager, "persist_request_traces", None)
+        if persist_batch is None:
+            for trace in traces:
+                await self._persist_request_trace(trace)
+            return
+
+        persisted = await persist_batch(traces)
+        if persisted is None:
+            raise Exception(f"batched persistence failed for {len(traces)} request traces")
+
+    async def _persist_request_trace(self, trace: Dict[str, Any]) -> None:
+        """Сохраняет один request trace (session/command/answer/screenshot) последовательными вызовами."""
+        if not self._database_manager or not getattr(self._database_manager, "is_initialized", False):
+            logger.debug("DatabaseManager недоступен, пропускаем request trace persistence")
+            return
+
+        session_id = trace["session_id"]
+        hardware_id = trace["hardware_id"]
         try:
             user = await self._database_manager.get_user_by_hardware_id(hardware_id)
             if not user or not user.get("id"):
@@ -957,11 +1216,7 @@ class StreamingWorkflowIntegration:
             db_session_id = await self._database_manager.ensure_session(
                 user_id=user["id"],
                 session_id=session_id,
-                metadata={
-                    "hardware_id": hardware_id,
-                    "source": "streaming_workflow",
-                    "last_request_at": datetime.utcnow().isoformat(),
-                },
+                metadata=trace["session_metadata"],
             )
             if not db_session_id:
                 logger.warning(f"⚠️ Не удалось обеспечить сессию в БД для session_id={session_id}")
@@ -969,13 +1224,9 @@ class StreamingWorkflowIntegration:
 
             command_id = await self._database_manager.ensure_command(
                 session_id=db_session_id,
-                prompt=prompt_text,
-                metadata={
-                    "source": "streaming_workflow",
-                    "has_screenshot": bool(screenshot_b64),
-                    "request_key": session_id,
-                },
-                language="en",
+                prompt=trace["prompt"],
+                metadata=trace["command_metadata"],
+                language=trace["language"],
             )
             if not command_id:
                 logger.warning(f"⚠️ Не удалось сохранить команду для session_id={session_id}")
@@ -983,27 +1234,120 @@ class StreamingWorkflowIntegration:
 
             await self._database_manager.ensure_llm_answer(
                 command_id=command_id,
-                prompt=prompt_text,
-                response=full_text or "",
-                model_info={"provider": "langchain", "module": "text_processing"},
-                performance_metrics={
-                    "sentences_processed": emitted_segments,
-                    "audio_chunks_processed": total_audio_chunks,
-                    "audio_bytes_processed": total_audio_bytes,
-                },
+                prompt=trace["prompt"],
+                response=trace["response"],
+                model_info=trace["model_info"],
+                performance_metrics=trace["performance_metrics"],
             )
 
-            if screenshot_b64:
+            if trace["screenshot_metadata"]:
                 await self._database_manager.create_screenshot(
                     session_id=db_session_id,
-                    metadata={
-                        "encoding": "base64",
-                        "size_b64": len(screenshot_b64),
-                    },
+                    metadata=trace["screenshot_metadata"],
                 )
         except Exception as persist_error:
             logger.error(f"❌ Ошибка persistence request trace (session_id={session_id}): {persist_error}")
 
+    async def _fetch_memory_context_timed(
+        self,
+        hardware_id: str,
+        prewarmed: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Контекст памяти и время его получения (мс) — для pre-LLM fan-out"""
+        if prewarmed is not None:
+            return prewarmed, 0.0
+        started = time.monotonic()
+        memory_context = await self._get_memory_context_parallel(hardware_id)
+        return memory_context, (time.monotonic() - started) * 1000
+
+    async def prewarm(self, hardware_id: str) -> Dict[str, Any]:
+        """
+        Прогрев всего, что понадобится COMMIT (вызывается на первом COLLECT).
+
+        Параллельно: решение subscription gate (+ user anchor) и контекст памяти.
+        Gate-решение остаётся в DecisionCache, контекст памяти возвращается
+        для request_data['prewarm']. Секции промпта не прогреваются: их выбирает
+        text processor по полному тексту COMMIT (сопоставление ключевых слов).
+        """
+        started = time.monotonic()
+        from modules.subscription import get_subscription_module
+
+        subscription_module = get_subscription_module()
+        warm_gate = getattr(subscription_module, 'prewarm', None)
+
+        async def gate() -> bool:
+            return bool(await warm_gate(hardware_id)) if warm_gate is not None else False
+
+        gate_warmed, memory_context = await asyncio.gather(
+            gate(),
+            self._get_memory_context_parallel(hardware_id),
+            return_exceptions=True,
+        )
+        if isinstance(gate_warmed, BaseException):
+            logger.warning(f"⚠️ Prewarm gate error: {gate_warmed}")
+            gate_warmed = False
+        if isinstance(memory_context, BaseException):
+            memory_context = None
+
+        duration_ms = (time.monotonic() - started) * 1000
+        record_metric("collect_prewarm", duration_ms)
+        logger.info(
+            f"🔥 COLLECT prewarm готов за {duration_ms:.1f}ms",
+            extra={
+                'scope': 'workflow',
+                'method': 'prewarm',
+                'decision': 'prewarm',
+                'ctx': {
+                    'hardware_id': hardware_id[:8],
+                    'gate_warmed': gate_warmed,
+                    'has_memory': memory_context is not None,
+                }
+            }
+        )
+        return {
+            'gate_warmed': gate_warmed,
+            'memory_context': memory_context,
+            'duration_ms': duration_ms,
+        }
+
+    @staticmethod
+    async def _cancel_pending(*tasks: Optional[asyncio.Future]) -> None:
+        """Отмена незавершённых задач pre-LLM стадии"""
+        for task in tasks:
+            if task is None:
+                continue
+            if not task.done():
+                task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def _record_speculation(self, outcome: str, saved_ms: float = 0.0, wasted_chunks: int = 0) -> None:
+        """Учёт спекулятивного старта LLM: сэкономленное время и впустую потраченные токены"""
+        stats = self._speculation_stats
+        stats['started'] += 1
+        if outcome == 'commit':
+            stats['committed'] += 1
+            stats['saved_ms_total'] += saved_ms
+            record_metric("pre_llm_speculation_saved", saved_ms)
+        else:
+            stats['aborted'] += 1
+            if wasted_chunks:
+                stats['wasted'] += 1
+                stats['wasted_chunks'] += wasted_chunks
+        record_decision_metric("pre_llm_speculation", outcome)
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Статистика спекулятивного старта LLM"""
+        stats = dict(self._speculation_stats)
+        stats['mode'] = self.pre_llm_speculation
+        stats['saved_ms_avg'] = (
+            round(stats['saved_ms_total'] / stats['committed'], 3) if stats['committed'] else 0.0
+        )
+        stats['waste_rate'] = round(stats['wasted'] / stats['started'], 3) if stats['started'] else 0.0
+        return stats
+
     async def _get_memory_context_parallel(self, hardware_id: str) -> Optional[Dict[str, Any]]:
         """
         Неблокирующее получение контекста памяти
@@ -1040,7 +1384,8 @@ class StreamingWorkflowIntegration:
         screenshot: Optional[str],
         memory_context: Optional[Dict[str, Any]],
         subscription_context: Optional[Dict[str, Any]] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        hardware_id: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """Стримингово возвращает предложения с учётом памяти и скриншота."""
         import time
@@ -1066,7 +1411,7 @@ class StreamingWorkflowIntegration:
             try:
                 chunk_count = 0
                 logger.info(f"🔄 Вызов _stream_text_module: text_len={len(enriched_text)}, has_screenshot={screenshot_data is not None}")
-                async for chunk in self._stream_text_module(enriched_text, screenshot_data, session_id):
+                async for chunk in self._stream_text_module(enriched_text, screenshot_data, session_id, hardware_id):
                     chunk_count += 1
                     logger.debug(f"📦 Получен chunk #{chunk_count} от Text Module: type={type(chunk)}, value={str(chunk)[:100] if chunk else 'None'}...")
                     sentence = (self._extract_text_chunk(chunk) or '').strip()
@@ -1097,6 +1442,9 @@ class StreamingWorkflowIntegration:
                             }
                         }
                     )
+            except AdmissionRejected:
+                # Перегрузка LLM — не degrade, а RESOURCE_EXHAUSTED клиенту
+                raise
             except Exception as processing_error:
                 llm_runtime_error = str(processing_error)
                 logger.error(f"⚠️ Ошибка Text Module: {processing_error}. Используем fail-open ответ")
@@ -1111,7 +1459,9 @@ class StreamingWorkflowIntegration:
                 MAX_JSON_BUFFER_SIZE = 10000  # Максимальный размер буфера (10KB)
                 MAX_JSON_ATTEMPTS = 10  # Максимум попыток парсинга JSON
                 
-                async for processed_sentence in self.text_module.process_text_streaming(enriched_text, screenshot_data, session_id=session_id):
+                async for processed_sentence in self.text_module.process_text_streaming(
+                    enriched_text, screenshot_data, session_id=session_id, hardware_id=hardware_id
+                ):
                     # Убедиться, что processed_sentence - это строка, а не функция
                     if callable(processed_sentence):
                         logger.warning("⚠️ processed_sentence is callable, skipping")
@@ -1174,6 +1524,8 @@ class StreamingWorkflowIntegration:
                     logger.debug(f"📦 Legacy: Остался необработанный буфер ({len(json_buffer)} символов), возвращаем как текст")
                     yielded_any = True
                     yield json_buffer
+            except AdmissionRejected:
+                raise
             except Exception as processing_error:
                 logger.warning(f"⚠️ Ошибка legacy TextProcessor: {processing_error}. Используем fallback")
                 import traceback
@@ -1274,7 +1626,13 @@ class StreamingWorkflowIntegration:
 
         return len([w for w in text.split() if w.strip()])
 
-    async def _stream_text_module(self, text: str, screenshot_data: Optional[str], session_id: Optional[str] = None):
+    async def _stream_text_module(
+        self,
+        text: str,
+        screenshot_data: Optional[str],
+        session_id: Optional[str] = None,
+        hardware_id: Optional[str] = None
+    ):
         """Стриминг ответов из текстового модуля."""
         logger.info(
             f"🔄 _stream_text_module вызван: text_len={len(text)}, has_screenshot={screenshot_data is not None}",
@@ -1294,6 +1652,8 @@ class StreamingWorkflowIntegration:
         
         if session_id:
             payload["session_id"] = session_id
+        if hardware_id:
+            payload["hardware_id"] = hardware_id
 
         chunk_count = 0
         async for chunk in self._stream_module_results(self.text_module, payload, raise_errors=True):
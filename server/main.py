@@ -19,6 +19,13 @@ from utils.logging_formatter import (
 )
 from utils.metrics_collector import get_metrics_collector
 from modules.grpc_service.core.backpressure import get_backpressure_manager
+from integrations.core.state_backend import StateBackendError, get_state_backend
+from integrations.core.worker_supervisor import (
+    WorkerHeartbeat,
+    WorkerSupervisor,
+    get_worker_context,
+    read_supervisor_stats,
+)
 
 # 🚀 Тест автоматического деплоя - 30 сентября 2025
 
@@ -98,6 +105,9 @@ validate_database_config()
 SERVER_VERSION = server_metadata.version
 SERVER_BUILD = server_metadata.build
 
+# Процесс-воркер супервизора (grpc.workers > 1) или None для одиночного процесса
+worker_context = get_worker_context()
+
 # Импорт системы обновлений
 try:
     from modules.update.core.update_manager import UpdateManager
@@ -373,7 +383,7 @@ async def status_handler(request):
         - latest_build: string (must equal version per Section 11)
         - service info and endpoints
     """
-    return web.json_response({
+    payload = {
         "status": "running",
         "service": "voice-assistant",
         "latest_version": SERVER_VERSION,
@@ -389,7 +399,11 @@ async def status_handler(request):
                 else "disabled"
             )
         }
-    })
+    }
+    if worker_context is not None:
+        # Воркеры за SO_REUSEPORT: сводка супервизора (здоровье и метрики всех процессов)
+        payload["workers"] = read_supervisor_stats(worker_context)
+    return web.json_response(payload)
 
 async def periodic_metrics_logging():
     """Периодическое логирование метрик (PR-4)"""
@@ -399,6 +413,32 @@ async def periodic_metrics_logging():
         try:
             await asyncio.sleep(60)  # Логируем каждые 60 секунд
             collector.log_metrics()
+            from integrations.core.request_trace_writer import get_request_trace_writer
+            logger.info("Request trace writer stats", extra={
+                'scope': 'metrics',
+                'decision': 'request_trace_queue',
+                'ctx': get_request_trace_writer().get_stats()
+            })
+            from modules.text_processing.core.admission_controller import get_llm_admission_controller
+            logger.info("LLM admission stats", extra={
+                'scope': 'metrics',
+                'decision': 'llm_admission',
+                'ctx': get_llm_admission_controller().get_stats()
+            })
+            from integrations.core.memory_consolidation import get_memory_consolidator
+            logger.info("Memory consolidation stats", extra={
+                'scope': 'metrics',
+                'decision': 'memory_consolidation',
+                'ctx': get_memory_consolidator().get_stats()
+            })
+            from modules.subscription import get_subscription_module
+            subscription_module = get_subscription_module()
+            if subscription_module is not None:
+                logger.info("Subscription gate stats", extra={
+                    'scope': 'metrics',
+                    'decision': 'subscription_gate',
+                    'ctx': subscription_module.get_gate_stats()
+                })
         except asyncio.CancelledError:
             break
         except Exception as e:
@@ -488,6 +528,23 @@ async def graceful_shutdown():
     except Exception as e:
         logger.debug(f"[F-2025-017] Error stopping subscription scheduler: {e}")
     
+    # Дописываем очередь request trace, пока БД ещё доступна (до cleanup серверов)
+    try:
+        from integrations.core.request_trace_writer import get_request_trace_writer
+        trace_writer = get_request_trace_writer()
+        await trace_writer.drain()
+        logger.info("Request trace writer drained", extra={
+            'scope': 'server',
+            'decision': 'shutdown',
+            'ctx': trace_writer.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error draining request trace writer: {e}", extra={
+            'scope': 'server',
+            'decision': 'error',
+            'ctx': {'error': str(e)}
+        })
+    
     # Логируем итоговые метрики
     collector = get_metrics_collector()
     collector.log_metrics()
@@ -503,14 +560,90 @@ async def graceful_shutdown():
                 'ctx': {'error': str(e)}
             })
     
+    # Соединения общего состояния закрываются последними (cleanup освобождает in-flight ключи)
+    await get_state_backend().close()
+    
+    log_server_stop(logger, reason="graceful_shutdown")
+
+
+def _worker_heartbeat_stats() -> dict:
+    """Статистика воркера для супервизора (агрегируется по всем процессам)"""
+    snapshot = get_metrics_collector().get_snapshot()
+    return {
+        'metrics': {
+            'p95_latency': snapshot.p95_latency,
+            'decision_rate': snapshot.decision_rate,
+            'total_requests': snapshot.total_requests,
+            'total_errors': snapshot.total_errors,
+        },
+        'backpressure': get_backpressure_manager().get_stats(),
+    }
+
+
+async def run_supervisor():
+    """Режим grpc.workers > 1: N процессов main.py на одном gRPC порту (SO_REUSEPORT)"""
+    setup_signal_handlers()
+    if unified_config.state_backend.backend == 'memory':
+        # Лимиты стримов, single-flight и interrupt останутся локальными для каждого воркера
+        logger.warning(
+            "⚠️ grpc.workers > 1 с state_backend=memory: общие лимиты и interrupt между воркерами не работают",
+            extra={
+                'scope': 'supervisor',
+                'decision': 'degrade',
+                'ctx': {'workers': grpc_config.workers, 'state_backend': 'memory'}
+            }
+        )
+    supervisor = WorkerSupervisor(
+        command=[sys.executable, str(Path(__file__).resolve())],
+        workers=grpc_config.workers,
+        heartbeat_timeout_sec=grpc_config.worker_health_timeout_sec,
+        # Запас сверх grace gRPC на graceful_shutdown воркера (trace writer, cleanup)
+        drain_timeout_sec=grpc_config.drain_grace_sec + 10.0,
+        check_interval_sec=min(1.0, grpc_config.worker_heartbeat_sec),
+        cwd=str(MAIN_DIR),
+    )
+    await supervisor.run(shutdown_event)
     log_server_stop(logger, reason="graceful_shutdown")
 
 
 async def main():
     """Запуск HTTP, gRPC и Update серверов одновременно"""
+    if grpc_config.workers > 1 and worker_context is None:
+        await run_supervisor()
+        return
+
     # Настройка обработчиков сигналов (PR-7)
     setup_signal_handlers()
     
+    # HTTP/update сервер и планировщики — в одном процессе (воркер 0 или одиночный процесс)
+    primary = worker_context is None or worker_context.primary
+    heartbeat = None
+    if worker_context is not None:
+        heartbeat = WorkerHeartbeat(
+            worker_context,
+            interval_sec=grpc_config.worker_heartbeat_sec,
+            stats_provider=_worker_heartbeat_stats,
+            on_orphaned=shutdown_event.set,
+        )
+        await heartbeat.start()
+    
+    # Общее состояние воркеров (memory — один процесс; kv — несколько воркеров на одном порту)
+    state_backend = get_state_backend()
+    try:
+        await state_backend.start()
+        logger.info("State backend started", extra={
+            'scope': 'server',
+            'decision': 'startup',
+            'ctx': state_backend.get_stats()
+        })
+    except StateBackendError as e:
+        # Хранилище может подняться позже: команды переподключаются сами, до тех пор решения локальные
+        logger.warning(f"State backend unavailable at startup: {e}", extra={
+            'scope': 'server',
+            'decision': 'degraded',
+            'ctx': {'error': str(e)}
+        })
+    
     # Запускаем backpressure manager (PR-7)
     backpressure_manager = get_backpressure_manager()
     await backpressure_manager.start()
@@ -553,8 +686,9 @@ async def main():
                 'ctx': {'routes': ['/webhook/stripe']}
             })
             
-            # Запускаем scheduler
-            subscription_module.start_scheduler()
+            # Запускаем scheduler (один на все воркеры, иначе задачи выполнятся N раз)
+            if primary:
+                subscription_module.start_scheduler()
         else:
             logger.info("[F-2025-017] Subscription module disabled by config", extra={
                 'scope': 'subscription',
@@ -571,46 +705,53 @@ async def main():
     
 
     # Запускаем HTTP сервер на порту 8080
-    try:
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, http_config.host, http_config.port)
-        await site.start()
-        servers_cleanup.append(runner.cleanup)
+    if primary:
+        try:
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, http_config.host, http_config.port)
+            await site.start()
+            servers_cleanup.append(runner.cleanup)
         
-        logger.info("HTTP server started", extra={
-            'scope': 'server',
-            'decision': 'start',
-            'ctx': {
-                'host': http_config.host,
-                'port': http_config.port,
-                'endpoints': ['/health', '/status']
-            }
-        })
-    except OSError as e:
-        if e.errno == 48:  # Address already in use
-            port_info = get_port_process_info(http_config.port)
-            error_msg = (
-                f"Не удалось запустить HTTP сервер на {http_config.host}:{http_config.port}. "
-                f"Порт занят процессом {port_info}. "
-                f"Решение: установите HTTP_PORT=<другой_порт> или остановите процесс: "
-                f"lsof -ti :{http_config.port} | xargs kill"
-            )
-            logger.error(error_msg, extra={
+            logger.info("HTTP server started", extra={
                 'scope': 'server',
-                'decision': 'error',
+                'decision': 'start',
                 'ctx': {
                     'host': http_config.host,
                     'port': http_config.port,
-                    'port_info': port_info,
-                    'error': str(e)
+                    'endpoints': ['/health', '/status']
                 }
             })
-        raise
+        except OSError as e:
+            if e.errno == 48:  # Address already in use
+                port_info = get_port_process_info(http_config.port)
+                error_msg = (
+                    f"Не удалось запустить HTTP сервер на {http_config.host}:{http_config.port}. "
+                    f"Порт занят процессом {port_info}. "
+                    f"Решение: установите HTTP_PORT=<другой_порт> или остановите процесс: "
+                    f"lsof -ti :{http_config.port} | xargs kill"
+                )
+                logger.error(error_msg, extra={
+                    'scope': 'server',
+                    'decision': 'error',
+                    'ctx': {
+                        'host': http_config.host,
+                        'port': http_config.port,
+                        'port_info': port_info,
+                        'error': str(e)
+                    }
+                })
+            raise
     
     # Запускаем сервер обновлений на порту 8081
     update_manager = None
-    if UPDATE_SERVER_AVAILABLE:
+    if not primary:
+        logger.info("Update server runs in worker 0", extra={
+            'scope': 'update',
+            'decision': 'skip',
+            'ctx': {'worker': worker_context.index}
+        })
+    elif UPDATE_SERVER_AVAILABLE:
         logger.info("Starting update server", extra={'scope': 'update', 'decision': 'start'})
         try:
             config = UpdateConfig.from_dict(asdict(unified_config.get_update_service_config()))
@@ -658,7 +799,8 @@ async def main():
             result = await serve(
                 host=grpc_config.host,
                 port=grpc_config.port,
-                max_workers=grpc_config.max_workers
+                max_workers=grpc_config.max_workers,
+                reuse_port=worker_context is not None
             )
             if result is False:
                 logger.error("gRPC server initialization failed", extra={
@@ -702,6 +844,9 @@ async def main():
         # Graceful shutdown
         await graceful_shutdown()
         
+        if heartbeat is not None:
+            await heartbeat.stop()
+        
         # Останавливаем периодическое логирование метрик
         metrics_task.cancel()
         try:
@@ -72,6 +72,7 @@ class AudioGenerationAdapter(UniversalModuleInterface):
                 - text: str - текст для генерации
                 - voice: str (опционально) - голос
                 - rate: float (опционально) - скорость
+                - cache: bool (опционально) - True для фиксированных фраз, False мимо кэша
         
         Returns:
             Результат обработки (может быть AsyncIterator для streaming)
@@ -86,9 +87,12 @@ class AudioGenerationAdapter(UniversalModuleInterface):
             if not text:
                 raise ValueError("Текст для генерации аудио не указан")
             
+            voice = request.get("voice") or None
+            cacheable = request.get("cache")
+            
             # Используем метод генерации аудио из процессора
             async def stream_audio():
-                async for audio_chunk in self._processor.generate_speech_streaming(text):
+                async for audio_chunk in self._processor.generate_speech_streaming(text, voice, cacheable):
                     yield {"audio": audio_chunk, "type": "audio_chunk"}
             
             return stream_audio()
@@ -130,6 +134,14 @@ class AudioGenerationAdapter(UniversalModuleInterface):
                 last_error=str(e)
             )
     
+    def get_voice_fingerprint(self) -> str:
+        """
+        Отпечаток текущих настроек голоса (пустая строка до инициализации)
+        """
+        if not self._processor:
+            return ""
+        return self._processor.get_voice_fingerprint()
+    
     def status(self) -> ModuleStatus:
         """
         Получение статуса адаптера
@@ -3,6 +3,7 @@
 Использует централизованную конфигурацию
 """
 
+from pathlib import Path
 from typing import Dict, Any, Optional
 
 from config.unified_config import get_config
@@ -46,6 +47,28 @@ class AudioGenerationConfig:
         # Настройки конвертации
         self.convert_to_pcm = self.config.get('convert_to_pcm', True)
         
+        # Пул декодеров: по умолчанию каждый активный стрим может синтезировать
+        # tts_lookahead_max_inflight предложений одновременно
+        self.decoder_pool_warm_size = self.config.get('decoder_pool_warm_size', unified_config.audio.decoder_pool_warm_size)
+        decoder_pool_max_active = self.config.get('decoder_pool_max_active', unified_config.audio.decoder_pool_max_active)
+        if decoder_pool_max_active <= 0:
+            decoder_pool_max_active = (
+                unified_config.backpressure.max_concurrent_streams
+                * unified_config.workflow.tts_lookahead_max_inflight
+            )
+        self.decoder_pool_max_active = decoder_pool_max_active
+        
+        # Кэш синтезированного аудио
+        self.tts_cache_enabled = self.config.get('tts_cache_enabled', unified_config.audio.tts_cache_enabled)
+        self.tts_cache_memory_bytes = self.config.get('tts_cache_memory_bytes', unified_config.audio.tts_cache_memory_bytes)
+        self.tts_cache_disk_dir = (
+            self.config.get('tts_cache_disk_dir', unified_config.audio.tts_cache_disk_dir)
+            or str(Path(__file__).resolve().parent.parent.parent / 'cache' / 'tts_audio')
+        )
+        self.tts_cache_disk_bytes = self.config.get('tts_cache_disk_bytes', unified_config.audio.tts_cache_disk_bytes)
+        self.tts_cache_max_text_chars = self.config.get('tts_cache_max_text_chars', unified_config.audio.tts_cache_max_text_chars)
+        self.tts_cache_admit_after = self.config.get('tts_cache_admit_after', unified_config.audio.tts_cache_admit_after)
+        
         # Настройки логирования
         self.log_level = self.config.get('log_level', unified_config.logging.level)
         self.log_requests = self.config.get('log_requests', unified_config.logging.log_requests)
@@ -70,7 +93,25 @@ class AudioGenerationConfig:
             'streaming_chunk_size': self.streaming_chunk_size,
             'timeout': self.request_timeout,
             'connection_timeout': self.connection_timeout,
-            'convert_to_pcm': self.convert_to_pcm
+            'convert_to_pcm': self.convert_to_pcm,
+            'decoder_pool_warm_size': self.decoder_pool_warm_size,
+            'decoder_pool_max_active': self.decoder_pool_max_active
+        }
+    
+    def get_tts_cache_config(self) -> Dict[str, Any]:
+        """
+        Получение конфигурации кэша синтезированного аудио
+        
+        Returns:
+            Словарь с конфигурацией кэша
+        """
+        return {
+            'enabled': self.tts_cache_enabled,
+            'max_memory_bytes': self.tts_cache_memory_bytes,
+            'disk_dir': self.tts_cache_disk_dir,
+            'max_disk_bytes': self.tts_cache_disk_bytes,
+            'max_text_chars': self.tts_cache_max_text_chars,
+            'admit_after': self.tts_cache_admit_after
         }
     
     def get_streaming_config(self) -> Dict[str, Any]:
@@ -17,7 +17,8 @@ if __name__ == "__main__":
 import logging
 from typing import Dict, Any, Optional, AsyncGenerator
 from modules.audio_generation.config import AudioGenerationConfig
-from modules.audio_generation.providers.edge_tts_provider import EdgeTTSProvider
+from modules.audio_generation.core.tts_audio_cache import TtsAudioCache
+from modules.audio_generation.providers.edge_tts_provider import EdgeTTSProvider, SynthesisStatus
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,18 @@ class AudioProcessor:
         self.provider = None
         self.is_initialized = False
         
+        # Кэш повторяющихся фраз (подтверждения, отказы, приветствие)
+        self.audio_cache: Optional[TtsAudioCache] = None
+        cache_config = self.config.get_tts_cache_config()
+        if cache_config['enabled']:
+            self.audio_cache = TtsAudioCache(
+                max_memory_bytes=cache_config['max_memory_bytes'],
+                disk_dir=cache_config['disk_dir'],
+                max_disk_bytes=cache_config['max_disk_bytes'],
+                max_text_chars=cache_config['max_text_chars'],
+                admit_after=cache_config['admit_after'],
+            )
+        
         logger.info("AudioProcessor initialized")
     
     async def initialize(self) -> bool:
@@ -90,12 +103,13 @@ class AudioProcessor:
             logger.error(f"Error creating provider: {e}")
             raise e
     
-    async def generate_speech(self, text: str) -> AsyncGenerator[bytes, None]:
+    async def generate_speech(self, text: str, voice: Optional[str] = None) -> AsyncGenerator[bytes, None]:
         """
         Генерация речи из текста
         
         Args:
             text: Текст для преобразования в речь
+            voice: Голос для этого запроса (по умолчанию — из настроек)
             
         Yields:
             Chunks аудио данных
@@ -109,19 +123,27 @@ class AudioProcessor:
             if not self.provider:
                 raise Exception("AudioProcessor provider not initialized")
             
-            async for audio_chunk in self.provider.process(text):
+            async for audio_chunk in self._provider_stream(text, voice):
                 yield audio_chunk
                 
         except Exception as e:
             logger.error(f"Error generating speech: {e}")
             raise e
     
-    async def generate_speech_streaming(self, text: str) -> AsyncGenerator[bytes, None]:
+    async def generate_speech_streaming(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        cacheable: Optional[bool] = None
+    ) -> AsyncGenerator[bytes, None]:
         """
         Потоковая генерация речи из текста
         
         Args:
             text: Текст для преобразования в речь
+            voice: Голос для этого запроса (по умолчанию — из настроек)
+            cacheable: True — фиксированная фраза, кэшируется сразу;
+                False — мимо кэша; None — кэш со второго появления фразы
             
         Yields:
             Chunks аудио данных в реальном времени
@@ -137,7 +159,7 @@ class AudioProcessor:
             
             if not streaming_config['enabled']:
                 logger.warning("Streaming is disabled, falling back to regular generation")
-                async for chunk in self.generate_speech(text):
+                async for chunk in self.generate_speech(text, voice):
                     yield chunk
                 return
             
@@ -145,18 +167,68 @@ class AudioProcessor:
             if not self.provider:
                 raise Exception("AudioProcessor provider not initialized")
             
-            async for audio_chunk in self.provider.process(text):
+            cache_key = None
+            if cacheable is not False and self.audio_cache is not None and self.audio_cache.is_cacheable(text):
+                cache_key = self._cache_key(text, voice)
+                cached = await self.audio_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("AudioProcessor → cache hit bytes=%s", len(cached))
+                    for audio_chunk in self.audio_cache.iter_chunks(cached, streaming_config['chunk_size']):
+                        yield audio_chunk
+                    return
+                # Уникальное предложение ответа не пишем в кэш (память и диск)
+                if not cacheable and not self.audio_cache.note_sighting(cache_key):
+                    cache_key = None
+            
+            synthesized = []
+            status = SynthesisStatus() if cache_key is not None else None
+            async for audio_chunk in self._provider_stream(text, voice, status):
                 if not audio_chunk:
                     continue
                 logger.info(
                     "AudioProcessor → emit sentence audio bytes=%s", len(audio_chunk)
                 )
+                if cache_key is not None:
+                    synthesized.append(audio_chunk)
                 yield audio_chunk
+            
+            # Сохраняем только фразу, которую провайдер подтвердил как полную (обрезанный поток не кэшируется)
+            if status is not None and status.complete and synthesized and self.audio_cache is not None:
+                await self.audio_cache.put(cache_key, synthesized)
                 
         except Exception as e:
             logger.error(f"Error in streaming speech generation: {e}")
             raise e
     
+    def _provider_stream(
+        self,
+        text: str,
+        voice: Optional[str],
+        status: Optional[SynthesisStatus] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """Поток провайдера; голос и status передаются только если заданы"""
+        assert self.provider is not None
+        kwargs: Dict[str, Any] = {}
+        if voice:
+            kwargs['voice'] = voice
+        if status is not None:
+            kwargs['status'] = status
+        return self.provider.process(text, **kwargs)
+    
+    def _cache_key(self, text: str, voice: Optional[str] = None) -> str:
+        """Ключ кэша: текст + текущие настройки голоса и формата"""
+        return TtsAudioCache.make_key(
+            text,
+            voice=voice or self.config.edge_tts_voice_name,
+            rate=self.config.edge_tts_rate,
+            volume=self.config.edge_tts_volume,
+            pitch=self.config.edge_tts_pitch,
+            sample_rate=self.config.sample_rate,
+            channels=self.config.channels,
+            bits_per_sample=self.config.bits_per_sample,
+            audio_format=self.config.audio_format,
+        )
+    
     async def cleanup(self) -> bool:
         """
         Очистка ресурсов процессора
@@ -214,6 +286,9 @@ class AudioProcessor:
         if self.provider:
             metrics["provider"] = self.provider.get_metrics()
         
+        if self.audio_cache is not None:
+            metrics["audio_cache"] = self.audio_cache.get_stats()
+        
         return metrics
     
     def get_audio_info(self) -> Dict[str, Any]:
@@ -237,6 +312,23 @@ class AudioProcessor:
                 "volume": self.config.edge_tts_volume
             }
     
+    def get_voice_fingerprint(self) -> str:
+        """
+        Отпечаток текущих настроек голоса и формата
+        
+        Меняется при update_voice_settings — по нему потребители
+        предрасчитанного аудио понимают, что его нужно перерендерить.
+        """
+        return "|".join(str(value) for value in (
+            self.config.edge_tts_voice_name,
+            self.config.edge_tts_rate,
+            self.config.edge_tts_volume,
+            self.config.edge_tts_pitch,
+            self.config.sample_rate,
+            self.config.channels,
+            self.config.bits_per_sample,
+        ))
+    
     def get_voice_options(self) -> Dict[str, list]:
         """
         Получение доступных опций голоса
@@ -281,6 +373,10 @@ class AudioProcessor:
             if hasattr(self.provider, 'volume'):
                 self.provider.volume = self.config.edge_tts_volume
             
+            # Закэшированное аудио синтезировано старым голосом
+            if self.audio_cache is not None:
+                self.audio_cache.invalidate()
+            
             logger.info(f"Voice settings updated: {voice_settings}")
             return True
             
@@ -0,0 +1,273 @@
+"""
+Пул прогретых декодеров MP3 → PCM для Edge TTS
+
+ffmpeg запускается заранее и ждёт данные на stdin, поэтому fork/exec и старт
+ffmpeg не попадают в latency предложения. Каждый процесс декодирует ровно
+одно высказывание (конец MP3 = EOF на stdin), после чего пул в фоне
+поднимает замену. Выходной контракт не меняется: raw PCM s16le,
+sample_rate/channels из конфигурации (48kHz mono).
+"""
+
+import asyncio
+import logging
+import subprocess
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterator, Deque, Dict, List, Optional
+
+from utils.metrics_collector import percentile, record_decision_metric, record_metric
+
+logger = logging.getLogger(__name__)
+
+METRIC_METHOD = "tts_pcm_decode"
+
+
+class PcmDecoderPool:
+    """
+    Пул одноразовых прогретых ffmpeg-процессов.
+
+    - warm_size: сколько процессов держать готовыми к работе
+    - max_active: предел одновременных декодирований (привязан к лимитам
+      конкурентности стримов); сверх лимита вызовы ждут — это и есть
+      насыщение пула, оно попадает в метрики
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        channels: int = 1,
+        warm_size: int = 4,
+        max_active: int = 64,
+        command: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            sample_rate: Частота дискретизации выходного PCM
+            channels: Количество каналов выходного PCM
+            warm_size: Размер прогретого резерва (0 — без прогрева)
+            max_active: Максимум одновременных декодирований
+            command: Команда декодера (по умолчанию ffmpeg MP3 → s16le)
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.warm_size = max(0, int(warm_size))
+        self.max_active = max(1, int(max_active))
+        self._command = command or [
+            "ffmpeg",
+            "-f", "mp3",             # Вход известен заранее: без probe задержки
+            "-i", "pipe:0",
+            "-f", "s16le",
+            "-ar", str(sample_rate),
+            "-ac", str(channels),
+            "-loglevel", "warning",
+            "pipe:1",
+        ]
+
+        self._idle: Deque[asyncio.subprocess.Process] = deque()
+        self._slots = asyncio.Semaphore(self.max_active)
+        self._spawning = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Метрики
+        self.active = 0
+        self.peak_active = 0
+        self.warm_hits = 0
+        self.cold_spawns = 0
+        self.saturation_waits = 0
+        self.max_wait_ms = 0.0
+        self.decodes_total = 0
+        self.decode_errors = 0
+        self.decodes_cancelled = 0
+        self._decode_ms: Deque[float] = deque(maxlen=256)
+        self._first_chunk_ms: Deque[float] = deque(maxlen=256)
+
+    async def start(self) -> None:
+        """Прогрев резерва процессов"""
+        self._closed = False
+        await self._refill()
+        logger.info(
+            f"PcmDecoderPool started: warm={len(self._idle)}/{self.warm_size}, max_active={self.max_active}"
+        )
+
+    async def stop(self) -> None:
+        """Остановка пула: завершение прогретых процессов (идемпотентно)"""
+        self._closed = True
+        if self._refill_task and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+        while self._idle:
+            await self._terminate(self._idle.popleft())
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            *self._command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def _refill(self) -> None:
+        """Доводит резерв прогретых процессов до warm_size"""
+        while not self._closed and len(self._idle) + self._spawning < self.warm_size:
+            self._spawning += 1
+            try:
+                process = await self._spawn()
+            except Exception as e:
+                logger.warning(f"⚠️ PcmDecoderPool: не удалось прогреть декодер: {e}")
+                return
+            finally:
+                self._spawning -= 1
+            if self._closed:
+                await self._terminate(process)
+                return
+            self._idle.append(process)
+
+    def _schedule_refill(self) -> None:
+        if self._closed or self.warm_size == 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _take_process(self) -> asyncio.subprocess.Process:
+        while self._idle:
+            process = self._idle.popleft()
+            if process.returncode is None:
+                self.warm_hits += 1
+                record_decision_metric(METRIC_METHOD, "warm_hit")
+                return process
+        self.cold_spawns += 1
+        record_decision_metric(METRIC_METHOD, "cold_spawn")
+        return await self._spawn()
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> None:
+        if process.returncode is not None:
+            return
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        try:
+            await process.wait()
+        except Exception:
+            pass
+
+    async def decode_stream(
+        self,
+        mp3_chunks: AsyncIterator[bytes],
+        read_size: int = 4096,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Потоковое декодирование одного высказывания.
+
+        Args:
+            mp3_chunks: MP3 данные по мере поступления от TTS
+            read_size: Размер чтения PCM из декодера
+
+        Yields:
+            PCM чанки (s16le, sample_rate, channels)
+        """
+        wait_start = time.perf_counter()
+        if self._slots.locked():
+            self.saturation_waits += 1
+            record_decision_metric(METRIC_METHOD, "saturated")
+
+        async with self._slots:
+            wait_ms = (time.perf_counter() - wait_start) * 1000
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+            process = await self._take_process()
+            self._schedule_refill()
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+            decode_start = time.perf_counter()
+            first_chunk = True
+            is_error = False
+
+            async def feed_stdin() -> None:
+                try:
+                    async for data in mp3_chunks:
+                        if data and process.stdin:
+                            process.stdin.write(data)
+                            await process.stdin.drain()
+                finally:
+                    if process.stdin and not process.stdin.is_closing():
+                        process.stdin.close()
+
+            feed_task = asyncio.create_task(feed_stdin())
+            try:
+                while True:
+                    pcm_chunk = await process.stdout.read(read_size) if process.stdout else b''
+                    if not pcm_chunk:
+                        break
+                    if first_chunk:
+                        first_chunk = False
+                        self._first_chunk_ms.append((time.perf_counter() - decode_start) * 1000)
+                    yield pcm_chunk
+
+                await feed_task
+                return_code = await process.wait()
+                stderr = await process.stderr.read() if process.stderr else b''
+                if return_code != 0:
+                    logger.error(f"PCM decoder error (code {return_code}): {stderr.decode(errors='replace')}")
+                    # Как subprocess.run(check=True): PCM обрезан, вызывающий не должен принять его как полный
+                    raise subprocess.CalledProcessError(return_code, self._command, stderr=stderr)
+                if stderr:
+                    logger.warning(f"PCM decoder warnings: {stderr.decode(errors='replace')}")
+            except (GeneratorExit, asyncio.CancelledError):
+                # Потребитель ушёл (прерывание/закрытие стрима) — это не ошибка декодера
+                self.decodes_cancelled += 1
+                raise
+            except BaseException:
+                is_error = True
+                raise
+            finally:
+                if not feed_task.done():
+                    feed_task.cancel()
+                    try:
+                        await feed_task
+                    except BaseException:
+                        pass
+                await self._terminate(process)
+                self.active -= 1
+                self.decodes_total += 1
+                if is_error:
+                    self.decode_errors += 1
+                duration_ms = (time.perf_counter() - decode_start) * 1000
+                self._decode_ms.append(duration_ms)
+                record_metric(METRIC_METHOD, duration_ms, is_error=is_error)
+
+    async def decode(self, mp3_data: bytes, read_size: int = 65536) -> bytes:
+        """Декодирование MP3 целиком (неблокирующая замена subprocess.run)"""
+
+        async def single() -> AsyncGenerator[bytes, None]:
+            yield mp3_data
+
+        parts = [chunk async for chunk in self.decode_stream(single(), read_size)]
+        return b''.join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики пула: насыщение и latency декодирования"""
+        return {
+            'warm_size': self.warm_size,
+            'max_active': self.max_active,
+            'idle': len(self._idle),
+            'active': self.active,
+            'peak_active': self.peak_active,
+            'saturation': round(self.active / self.max_active, 3),
+            'saturation_waits': self.saturation_waits,
+            'max_wait_ms': round(self.max_wait_ms, 2),
+            'warm_hits': self.warm_hits,
+            'cold_spawns': self.cold_spawns,
+            'decodes_total': self.decodes_total,
+            'decode_errors': self.decode_errors,
+            'decodes_cancelled': self.decodes_cancelled,
+            'first_chunk_p50_ms': round(percentile(self._first_chunk_ms, 0.5), 2),
+            'decode_p50_ms': round(percentile(self._decode_ms, 0.5), 2),
+            'decode_p95_ms': round(percentile(self._decode_ms, 0.95), 2),
+        }
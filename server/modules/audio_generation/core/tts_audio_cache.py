@@ -0,0 +1,371 @@
+"""
+Контент-адресуемый кэш PCM аудио для TTS
+
+Повторяющиеся фразы (подтверждения действий, отказы, сообщение о деградации,
+приветствие) не синтезируются заново: ключ — нормализованный текст плюс
+параметры голоса и формата. Фраза допускается в кэш только со второго
+появления (уникальные предложения ответов LLM не вытесняют повторяющиеся
+и не остаются на диске). Два уровня:
+- память: LRU с лимитом по байтам
+- диск: файл на ключ, переживает рестарт
+
+Файловые операции (чтение, запись, удаление, обход директории) выполняются
+в потоке, индекс диска меняется только в event loop. Запись и удаление
+файлов сериализованы: удаление старых файлов при инвалидации не заденет
+записанный после неё файл.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from utils.metrics_collector import record_decision_metric
+
+logger = logging.getLogger(__name__)
+
+METRIC_METHOD = "tts_audio_cache"
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_FILE_SUFFIX = ".pcm"
+
+
+def normalize_tts_text(text: str) -> str:
+    """Нормализация текста для ключа кэша (NFC + схлопывание пробелов)"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class TtsAudioCache:
+    """
+    Двухуровневый кэш синтезированного аудио.
+
+    Ключ строится через make_key(); в кэш попадает только полностью
+    синтезированная фраза (частичный поток при ошибке не сохраняется).
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_entry_bytes: int = 2 * 1024 * 1024,
+        max_text_chars: int = 120,
+        disk_dir: Optional[Union[str, Path]] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        admit_after: int = 2,
+        max_sightings: int = 4096,
+    ):
+        """
+        Args:
+            max_memory_bytes: Лимит памяти LRU уровня
+            max_entry_bytes: Максимальный размер одной записи
+            max_text_chars: Более длинные тексты не кэшируются (уникальные ответы)
+            disk_dir: Директория дискового уровня (None — только память)
+            max_disk_bytes: Лимит дискового уровня
+            admit_after: С какого появления фраза допускается в кэш
+            max_sightings: Сколько ключей-кандидатов помнить (LRU)
+        """
+        self.max_memory_bytes = max(0, int(max_memory_bytes))
+        self.max_entry_bytes = max(0, int(max_entry_bytes))
+        self.max_text_chars = max_text_chars
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self.admit_after = max(1, int(admit_after))
+        self.max_sightings = max(1, int(max_sightings))
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> размер файла, в порядке последнего использования
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_loaded = False
+        # Запись/удаление файлов по очереди; поколение меняется при инвалидации
+        self._disk_lock = asyncio.Lock()
+        self._generation = 0
+        self._disk_tasks: Set[asyncio.Task] = set()
+        # key -> число появлений ещё не допущенной фразы
+        self._sightings: "OrderedDict[str, int]" = OrderedDict()
+
+        # Метрики
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.admission_skips = 0
+
+    @staticmethod
+    def make_key(text: str, **params: Any) -> str:
+        """
+        Ключ кэша: sha256 от нормализованного текста и параметров синтеза
+
+        Args:
+            text: Текст фразы
+            **params: voice/rate/volume/pitch/sample_rate и т.п.
+        """
+        parts = [normalize_tts_text(text)]
+        parts.extend(f"{name}={params[name]}" for name in sorted(params))
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, text: str) -> bool:
+        """Короткие повторяющиеся фразы кэшируем, длинные уникальные ответы — нет"""
+        normalized = normalize_tts_text(text)
+        return bool(normalized) and len(normalized) <= self.max_text_chars
+
+    def note_sighting(self, key: str) -> bool:
+        """
+        Учёт промаха по ключу
+
+        Returns:
+            True если фраза встречается достаточно часто для записи в кэш
+        """
+        count = self._sightings.pop(key, 0) + 1
+        if count >= self.admit_after:
+            return True
+        self._sightings[key] = count
+        while len(self._sightings) > self.max_sightings:
+            self._sightings.popitem(last=False)
+        self.admission_skips += 1
+        return False
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """PCM по ключу: сначала память, затем диск (с подъёмом в память)"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_served += len(data)
+            record_decision_metric(METRIC_METHOD, "memory_hit")
+            return data
+
+        data = await self._read_disk(key)
+        if data is not None:
+            self.disk_hits += 1
+            self.bytes_served += len(data)
+            record_decision_metric(METRIC_METHOD, "disk_hit")
+            self._put_memory(key, data)
+            return data
+
+        self.misses += 1
+        record_decision_metric(METRIC_METHOD, "miss")
+        return None
+
+    def iter_chunks(self, data: bytes, chunk_size: int) -> Iterator[bytes]:
+        """Нарезка закэшированного PCM на streaming чанки"""
+        chunk_size = max(1, chunk_size)
+        for offset in range(0, len(data), chunk_size):
+            yield data[offset:offset + chunk_size]
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    async def put(self, key: str, chunks: Union[bytes, List[bytes]]) -> bool:
+        """
+        Сохранение полностью синтезированной фразы
+
+        Returns:
+            True если запись сохранена
+        """
+        data = chunks if isinstance(chunks, bytes) else b''.join(chunks)
+        if not data or len(data) > self.max_entry_bytes:
+            return False
+
+        self._put_memory(key, data)
+        if self.disk_dir is not None:
+            try:
+                await self._write_disk(key, data)
+            except Exception as e:
+                logger.warning(f"⚠️ TtsAudioCache: не удалось записать на диск: {e}")
+        self.stores += 1
+        self.bytes_stored += len(data)
+        return True
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Дисковый уровень
+    # ------------------------------------------------------------------
+
+    def _path(self, key: str) -> Path:
+        assert self.disk_dir is not None
+        return self.disk_dir / f"{key}{_FILE_SUFFIX}"
+
+    async def _ensure_disk_index(self) -> None:
+        """Индекс существующих файлов (старые первыми) — кэш переживает рестарт"""
+        if self._disk_loaded or self.disk_dir is None:
+            return
+        entries = await asyncio.to_thread(self._scan_disk)
+        if self._disk_loaded:
+            return
+        self._disk_loaded = True
+        for key, size in entries:
+            if key not in self._disk_index:
+                self._disk_index[key] = size
+                self._disk_bytes += size
+
+    def _scan_disk(self) -> List[Tuple[str, int]]:
+        """(key, размер) файлов директории по возрастанию mtime (в потоке)"""
+        assert self.disk_dir is not None
+        if not self.disk_dir.is_dir():
+            return []
+        entries = []
+        for path in self.disk_dir.glob(f"*{_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        return [(key, size) for _, key, size in sorted(entries)]
+
+    async def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.disk_dir is None:
+            return None
+        await self._ensure_disk_index()
+        if key not in self._disk_index:
+            return None
+        try:
+            data = await asyncio.to_thread(self._path(key).read_bytes)
+        except OSError as e:
+            logger.warning(f"⚠️ TtsAudioCache: повреждённая запись {key[:12]}: {e}")
+            await self._drop_disk([key])
+            return None
+        if key in self._disk_index:
+            self._disk_index.move_to_end(key)
+        return data
+
+    async def _write_disk(self, key: str, data: bytes) -> None:
+        assert self.disk_dir is not None
+        if len(data) > self.max_disk_bytes:
+            return
+        generation = self._generation
+        await self._ensure_disk_index()
+        async with self._disk_lock:
+            # Инвалидация во время ожидания: фраза синтезирована старым голосом
+            if generation != self._generation:
+                return
+            await asyncio.to_thread(self._write_file, key, data)
+            if generation != self._generation:
+                # Файл удалит задача инвалидации, она ждёт эту блокировку
+                return
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+
+        evicted = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            oldest, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(oldest)
+            self.evictions += 1
+        if evicted:
+            await self._drop_disk(evicted)
+
+    def _write_file(self, key: str, data: bytes) -> None:
+        assert self.disk_dir is not None
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        # Атомарная замена: читатели никогда не видят частично записанный файл
+        os.replace(tmp_path, path)
+
+    async def _drop_disk(self, keys: List[str]) -> None:
+        for key in keys:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+        async with self._disk_lock:
+            await asyncio.to_thread(self._unlink_files, [self._path(key) for key in keys])
+
+    @staticmethod
+    def _unlink_files(paths: List[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _unlink_all_files(self) -> None:
+        assert self.disk_dir is not None
+        if self.disk_dir.is_dir():
+            self._unlink_files(list(self.disk_dir.glob(f"*{_FILE_SUFFIX}")))
+
+    async def _clear_disk(self) -> None:
+        async with self._disk_lock:
+            await asyncio.to_thread(self._unlink_all_files)
+
+    # ------------------------------------------------------------------
+    # Инвалидация и метрики
+    # ------------------------------------------------------------------
+
+    def invalidate(self) -> Optional[asyncio.Task]:
+        """
+        Полная инвалидация (например, при смене настроек голоса)
+
+        Записи недоступны сразу, файлы удаляются в фоне.
+
+        Returns:
+            Задача удаления файлов (None — без диска или вне event loop)
+        """
+        self._memory.clear()
+        self._memory_bytes = 0
+        self._sightings.clear()
+        self._generation += 1
+        self.invalidations += 1
+        logger.info("🧹 TtsAudioCache invalidated")
+        if self.disk_dir is None:
+            return None
+        self._disk_index.clear()
+        self._disk_bytes = 0
+        # Файлы прошлых настроек удаляются целиком, повторный обход директории не нужен
+        self._disk_loaded = True
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._unlink_all_files()
+            return None
+        task = asyncio.create_task(self._clear_disk())
+        self._disk_tasks.add(task)
+        task.add_done_callback(self._disk_tasks.discard)
+        return task
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk_index),
+            'disk_bytes': self._disk_bytes,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            'stores': self.stores,
+            'bytes_served': self.bytes_served,
+            'bytes_stored': self.bytes_stored,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'admission_skips': self.admission_skips,
+        }
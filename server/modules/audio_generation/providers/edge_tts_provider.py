@@ -16,8 +16,10 @@ import io
 import asyncio
 import sys
 from array import array
+from dataclasses import dataclass
 from typing import AsyncGenerator, Dict, Any, Optional, List
 from integrations.core.universal_provider_interface import UniversalProviderInterface
+from modules.audio_generation.core.pcm_decoder_pool import PcmDecoderPool
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +50,18 @@ if not FFMPEG_AVAILABLE:
     logger.warning("⚠️ ffmpeg не найден - альтернативная конвертация MP3 в PCM будет недоступна")
 
 
+@dataclass
+class SynthesisStatus:
+    """
+    Итог одного синтеза для вызывающего
+
+    Ошибка чтения MP3 от Edge TTS не прерывает поток (клиент получает
+    успевшее аудио), поэтому полноту фразы сообщает complete.
+    """
+    complete: bool = False
+    error: Optional[str] = None
+
+
 class EdgeTTSProvider(UniversalProviderInterface):
     """
     Провайдер генерации речи с использованием Microsoft Edge TTS
@@ -96,6 +110,16 @@ class EdgeTTSProvider(UniversalProviderInterface):
         self.convert_to_pcm = config.get('convert_to_pcm', True)
         self._conversion_capability_logged = False
         
+        # Пул прогретых ffmpeg декодеров (вместо нового процесса на каждое предложение)
+        self._decoder_pool: Optional[PcmDecoderPool] = None
+        if self.convert_to_pcm and FFMPEG_AVAILABLE:
+            self._decoder_pool = PcmDecoderPool(
+                sample_rate=self.sample_rate,
+                channels=self.channels,
+                warm_size=config.get('decoder_pool_warm_size', 4),
+                max_active=config.get('decoder_pool_max_active', 64),
+            )
+        
         self.is_available = EDGE_TTS_AVAILABLE
         
         logger.info(f"Edge TTS Provider initialized: available={self.is_available}, voice={self.voice_name}")
@@ -119,6 +143,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
             test_result = await self._test_connection()
             
             if test_result:
+                if self._decoder_pool:
+                    await self._decoder_pool.start()
                 self.is_initialized = True
                 self._log_conversion_capability()
                 logger.info(f"Edge TTS Provider initialized successfully with voice: {self.voice_name}")
@@ -153,7 +179,12 @@ class EdgeTTSProvider(UniversalProviderInterface):
             "⚠️ EdgeTTS conversion degraded: no ffmpeg/pydub; streaming MP3 passthrough enabled"
         )
     
-    async def process(self, input_data: str) -> AsyncGenerator[bytes, None]:
+    async def process(
+        self,
+        input_data: str,
+        voice: Optional[str] = None,
+        status: Optional[SynthesisStatus] = None
+    ) -> AsyncGenerator[bytes, None]:
         """
         ✅ ОПТИМИЗИРОВАНО: Streaming обработка текста в речь
         
@@ -168,6 +199,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
         
         Args:
             input_data: Текст для преобразования в речь
+            voice: Голос для этого запроса (по умолчанию — из настроек)
+            status: Заполняется итогом синтеза (complete — фраза получена целиком)
             
         Yields:
             Chunks аудио данных (PCM формат)
@@ -188,7 +221,7 @@ class EdgeTTSProvider(UniversalProviderInterface):
                 # Создаем Communicate объект
                 communicate = edge_tts.Communicate(
                     text=input_data,
-                    voice=self.voice_name,
+                    voice=voice or self.voice_name,
                     rate=self.rate,
                     volume=self.volume,
                     pitch=self.pitch
@@ -197,7 +230,7 @@ class EdgeTTSProvider(UniversalProviderInterface):
                 # ✅ ОПТИМИЗАЦИЯ: Streaming конвертация MP3→PCM
                 if self.convert_to_pcm and FFMPEG_AVAILABLE:
                     # Используем async streaming через ffmpeg
-                    async for pcm_chunk in self._stream_mp3_to_pcm_async(communicate):
+                    async for pcm_chunk in self._stream_mp3_to_pcm_async(communicate, status):
                         yield pcm_chunk
                         has_yielded = True
                 else:
@@ -214,20 +247,15 @@ class EdgeTTSProvider(UniversalProviderInterface):
                     logger.info(f"EdgeTTS → received MP3: {len(mp3_data)} bytes (fallback mode)")
                     
                     if self.convert_to_pcm:
-                        # Конвертация через pydub или ffmpeg
+                        # Конвертация через pydub или ffmpeg вне event loop
                         if PYDUB_AVAILABLE:
                             try:
-                                assert AudioSegment is not None
-                                audio = AudioSegment.from_mp3(io.BytesIO(mp3_data))
-                                audio = audio.set_frame_rate(self.sample_rate)
-                                audio = audio.set_channels(self.channels)
-                                audio = audio.set_sample_width(self.bits_per_sample // 8)
-                                pcm_data = audio.raw_data
+                                pcm_data = await asyncio.to_thread(self._convert_mp3_to_pcm_pydub, mp3_data)
                             except Exception as e:
                                 logger.warning(f"pydub failed: {e}, trying ffmpeg...")
-                                pcm_data = self._convert_mp3_to_pcm_ffmpeg(mp3_data)
+                                pcm_data = await self._convert_mp3_to_pcm_async(mp3_data)
                         else:
-                            pcm_data = self._convert_mp3_to_pcm_ffmpeg(mp3_data)
+                            pcm_data = await self._convert_mp3_to_pcm_async(mp3_data)
                         
                         # Разбиваем на чанки
                         offset = 0
@@ -246,6 +274,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
                             offset = chunk_end
                 
                 # Если успешно завершили (или ничего не упало), выходим из цикла
+                if status is not None:
+                    status.complete = status.error is None
                 return
 
             except Exception as e:
@@ -265,7 +295,11 @@ class EdgeTTSProvider(UniversalProviderInterface):
                 # Небольшая пауза перед ретраем (exponential backoff)
                 await asyncio.sleep(0.5 * (2 ** attempt))
     
-    async def _stream_mp3_to_pcm_async(self, communicate) -> AsyncGenerator[bytes, None]:
+    async def _stream_mp3_to_pcm_async(
+        self,
+        communicate,
+        status: Optional[SynthesisStatus] = None
+    ) -> AsyncGenerator[bytes, None]:
         """
         ✅ НОВОЕ: Streaming конвертация MP3 в PCM через async ffmpeg pipe
         
@@ -276,27 +310,9 @@ class EdgeTTSProvider(UniversalProviderInterface):
         Yields:
             PCM chunks (48kHz, 16-bit, mono)
         """
-        if not FFMPEG_AVAILABLE:
+        if not FFMPEG_AVAILABLE or self._decoder_pool is None:
             raise Exception("ffmpeg not available for streaming conversion")
         
-        # Создаем async subprocess с pipe stdin/stdout
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-i", "pipe:0",         # Читаем MP3 из stdin
-            "-f", "s16le",           # Формат: signed 16-bit little-endian PCM
-            "-ar", str(self.sample_rate),  # Sample rate (единый формат)
-            "-ac", str(self.channels),     # Channels (1 = mono)
-            "-loglevel", "warning",  # Changed from error to warning for diagnostics
-            "pipe:1"                 # Выводим PCM в stdout
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *ffmpeg_cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
         chunk_count = 0
         total_mp3_bytes = 0
         total_pcm_bytes = 0
@@ -310,33 +326,24 @@ class EdgeTTSProvider(UniversalProviderInterface):
         max_silent_seconds = 0.8
         prebuffer_done = False
 
-        async def write_mp3_to_stdin():
-            """Фоновая задача: пишем MP3 chunks в stdin ffmpeg"""
+        async def mp3_from_edge_tts():
+            """MP3 chunks от Edge TTS для декодера (ошибка источника завершает поток)"""
             nonlocal total_mp3_bytes
             try:
                 async for chunk in communicate.stream():
                     if chunk.get("type") == "audio" and "data" in chunk:
                         mp3_data = chunk["data"]
                         total_mp3_bytes += len(mp3_data)
-                        if process.stdin:
-                            process.stdin.write(mp3_data)
-                            await process.stdin.drain()
+                        yield mp3_data
             except Exception as e:
-                logger.error(f"Error writing to ffmpeg stdin: {e}")
-            finally:
-                if process.stdin:
-                    process.stdin.close()
-                    await process.stdin.wait_closed()
-        
-        # Запускаем запись MP3 в фоне
-        write_task = asyncio.create_task(write_mp3_to_stdin())
+                logger.error(f"Error reading MP3 stream from Edge TTS: {e}")
+                # Аудио обрезано: клиент получит успевшее, но в кэш такая фраза не попадёт
+                if status is not None:
+                    status.error = str(e)
         
         try:
-            # Читаем PCM chunks из stdout и yield'им сразу
-            while True:
-                pcm_chunk = await process.stdout.read(self.streaming_chunk_size) if process.stdout else b''
-                if not pcm_chunk:
-                    break
+            # Читаем PCM chunks из прогретого декодера и yield'им сразу
+            async for pcm_chunk in self._decoder_pool.decode_stream(mp3_from_edge_tts(), self.streaming_chunk_size):
                 chunk_count += 1
                 total_pcm_bytes += len(pcm_chunk)
                 if not prebuffer_done:
@@ -387,20 +394,6 @@ class EdgeTTSProvider(UniversalProviderInterface):
                 prebuffer_peaks.clear()
                 prebuffer_done = True
             
-            # Ждем завершения записи
-            await write_task
-            
-            # Проверяем код возврата ffmpeg
-            return_code = await process.wait()
-            if return_code != 0:
-                stderr = await process.stderr.read() if process.stderr else b''
-                logger.error(f"ffmpeg error (code {return_code}): {stderr.decode()}")
-            else:
-                # Log stderr even on success if there are warnings
-                stderr = await process.stderr.read() if process.stderr else b''
-                if stderr:
-                    logger.warning(f"ffmpeg warnings: {stderr.decode()}")
-            
             logger.info(
                 f"EdgeTTS → streaming conversion complete: MP3={total_mp3_bytes} bytes, "
                 f"PCM={total_pcm_bytes} bytes, chunks={chunk_count}"
@@ -408,12 +401,6 @@ class EdgeTTSProvider(UniversalProviderInterface):
             
         except Exception as e:
             logger.error(f"Error in streaming MP3→PCM conversion: {e}")
-            # Отменяем задачу записи при ошибке
-            write_task.cancel()
-            try:
-                await write_task
-            except asyncio.CancelledError:
-                pass
             raise e
 
     def _pcm_peak_int16(self, pcm_bytes: bytes) -> int:
@@ -434,6 +421,27 @@ class EdgeTTSProvider(UniversalProviderInterface):
                     break
         return peak
     
+    def _convert_mp3_to_pcm_pydub(self, mp3_data: bytes) -> bytes:
+        """Конвертация MP3 в PCM через pydub (блокирующая, вызывать через to_thread)"""
+        assert AudioSegment is not None
+        audio = AudioSegment.from_mp3(io.BytesIO(mp3_data))
+        audio = audio.set_frame_rate(self.sample_rate)
+        audio = audio.set_channels(self.channels)
+        audio = audio.set_sample_width(self.bits_per_sample // 8)
+        return audio.raw_data
+    
+    async def _convert_mp3_to_pcm_async(self, mp3_data: bytes) -> bytes:
+        """
+        Неблокирующая конвертация MP3 в PCM: через пул декодеров,
+        без пула — синхронный ffmpeg в отдельном потоке
+        """
+        if self._decoder_pool is not None:
+            pcm_data = await self._decoder_pool.decode(mp3_data)
+            if not pcm_data:
+                raise Exception("Failed to convert MP3 to PCM: decoder returned no data")
+            return pcm_data
+        return await asyncio.to_thread(self._convert_mp3_to_pcm_ffmpeg, mp3_data)
+    
     def _convert_mp3_to_pcm_ffmpeg(self, mp3_data: bytes) -> bytes:
         """
         Конвертация MP3 в PCM через ffmpeg (альтернатива pydub)
@@ -508,6 +516,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
             True если очистка успешна, False иначе
         """
         try:
+            if self._decoder_pool:
+                await self._decoder_pool.stop()
             self.is_initialized = False
             logger.info("Edge TTS Provider cleaned up")
             return True
@@ -584,7 +594,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
             "is_available": self.is_available,
             "convert_to_pcm": self.convert_to_pcm,
             "pydub_available": PYDUB_AVAILABLE,
-            "edge_tts_available": EDGE_TTS_AVAILABLE
+            "edge_tts_available": EDGE_TTS_AVAILABLE,
+            "decoder_pool_enabled": self._decoder_pool is not None
         })
         
         return base_status
@@ -605,6 +616,8 @@ class EdgeTTSProvider(UniversalProviderInterface):
             "audio_format": self.audio_format,
             "is_available": self.is_available
         })
+        if self._decoder_pool:
+            base_metrics["decoder_pool"] = self._decoder_pool.get_stats()
         
         return base_metrics
     
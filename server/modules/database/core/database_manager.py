@@ -2,9 +2,11 @@
 Основной DatabaseManager - координатор модуля управления базой данных
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List, AsyncGenerator
 from modules.database.config import DatabaseConfig
+from modules.database.core.shared_pool import close_shared_connection_pools, get_shared_pool_stats
 from modules.database.providers.postgresql_provider import PostgreSQLProvider
 
 logger = logging.getLogger(__name__)
@@ -383,6 +385,26 @@ class DatabaseManager:
             logger.error(f"Error ensuring LLM answer: {e}")
             return None
     
+    async def persist_request_traces(self, traces: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        Batched персистенция request trace (session/command/answer/screenshot)
+
+        Returns:
+            Количество сохранённых трейсов или None при ошибке
+        """
+        try:
+            if not self.is_initialized:
+                raise Exception("DatabaseManager not initialized")
+
+            if self.postgresql_provider is None:
+                raise Exception("PostgreSQL Provider not initialized")
+
+            return await self.postgresql_provider.persist_request_traces(traces)
+
+        except Exception as e:
+            logger.error(f"Error persisting request traces: {e}")
+            return None
+
     # =====================================================
     # УПРАВЛЕНИЕ СКРИНШОТАМИ
     # =====================================================
@@ -681,6 +703,9 @@ class DatabaseManager:
             if self.postgresql_provider:
                 await self.postgresql_provider.cleanup()
             
+            # Закрываем общие пулы репозиториев (subscriptions, token_usage)
+            await asyncio.to_thread(close_shared_connection_pools)
+            
             self.is_initialized = False
             logger.info("DatabaseManager cleaned up successfully")
             return True
@@ -724,6 +749,9 @@ class DatabaseManager:
         if self.postgresql_provider:
             metrics["postgresql_provider"] = self.postgresql_provider.get_metrics()
         
+        # Метрики общих пулов репозиториев (ожидание, занятость, создание)
+        metrics["shared_pools"] = get_shared_pool_stats()
+        
         return metrics
     
     def get_config_status(self) -> Dict[str, Any]:
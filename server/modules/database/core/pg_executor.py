@@ -0,0 +1,247 @@
+"""
+PgExecutor - неблокирующий доступ к PostgreSQL поверх psycopg2
+
+psycopg2 синхронный: cursor.execute внутри async def останавливает весь
+event loop (и все аудио стримы). PgExecutor выполняет запросы в отдельном
+ограниченном пуле потоков: один поток на соединение пула, поэтому
+getconn() в потоке никогда не упирается в исчерпанный пул, а лишние
+запросы ждут своей очереди в executor, не в loop.
+
+Каждый запрос получает таймаут. При таймауте или отмене корутины
+(например, asyncio.wait_for снаружи) на соединении вызывается
+connection.cancel(): сервер прерывает выполняющийся запрос, поток
+откатывает транзакцию и возвращает соединение в пул.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+import psycopg2
+import psycopg2.pool
+
+from utils.metrics_collector import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class QueryCancelled(Exception):
+    """Запрос отменён до начала выполнения (таймаут ожидания в очереди)"""
+
+
+class _QueryState:
+    """Состояние одного запроса, разделяемое между loop и потоком"""
+
+    __slots__ = ("conn", "cancelled", "lock")
+
+    def __init__(self) -> None:
+        self.conn = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+
+class PgExecutor:
+    """
+    Ограниченный executor запросов PostgreSQL с таймаутами и отменой.
+
+    Использование:
+        executor = PgExecutor(min_connections=1, max_connections=10, host=..., ...)
+        await executor.start()
+        row = await executor.run(lambda conn: ..., timeout=2.0)
+        await executor.close()
+
+    fn выполняется в потоке executor и получает соединение первым
+    аргументом. Коммит — ответственность fn; при исключении executor
+    делает rollback.
+    """
+
+    def __init__(
+        self,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        default_timeout: Optional[float] = 60.0,
+        name: str = "pg",
+        pool_factory: Optional[Callable[..., Any]] = None,
+        **connect_kwargs: Any,
+    ):
+        """
+        Args:
+            min_connections: Минимум соединений пула
+            max_connections: Максимум соединений (и потоков executor)
+            default_timeout: Таймаут запроса по умолчанию, сек (None — без таймаута)
+            name: Префикс имён потоков и метрик
+            pool_factory: Фабрика пула (minconn, maxconn, **connect_kwargs)
+            **connect_kwargs: Параметры psycopg2.connect (host, port, dsn, ...)
+        """
+        self.min_connections = max(0, int(min_connections))
+        self.max_connections = max(1, int(max_connections))
+        self.default_timeout = default_timeout
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+        self._pool_factory = pool_factory or psycopg2.pool.ThreadedConnectionPool
+
+        self.pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Метрики
+        self.queries = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._queue_wait_ms: Deque[float] = deque(maxlen=512)
+        self._query_ms: Deque[float] = deque(maxlen=512)
+
+    @property
+    def is_started(self) -> bool:
+        return self.pool is not None and self._executor is not None
+
+    async def start(self) -> None:
+        """Создание пула соединений (подключение — в потоке, не в loop)"""
+        if self.is_started:
+            return
+        self.pool = await asyncio.to_thread(
+            self._pool_factory,
+            self.min_connections,
+            self.max_connections,
+            **self._connect_kwargs,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_connections,
+            thread_name_prefix=f"{self.name}-query",
+        )
+        logger.info(f"✅ PgExecutor[{self.name}] запущен: {self.min_connections}-{self.max_connections} соединений")
+
+    async def close(self) -> None:
+        """Остановка executor и закрытие соединений"""
+        executor, pool = self._executor, self.pool
+        self._executor = None
+        self.pool = None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True)
+        if pool is not None:
+            await asyncio.to_thread(pool.closeall)
+        logger.info(f"✅ PgExecutor[{self.name}] остановлен")
+
+    # ------------------------------------------------------------------
+    # Выполнение
+    # ------------------------------------------------------------------
+
+    def _call(self, state: _QueryState, submitted: float, fn: Callable[..., T], args: tuple) -> T:
+        """Выполнение fn(conn, *args) в потоке executor"""
+        self._queue_wait_ms.append((time.perf_counter() - submitted) * 1000)
+        pool = self.pool
+        if pool is None:
+            raise Exception("PgExecutor is not started")
+        if state.cancelled:
+            raise QueryCancelled("query cancelled before execution")
+
+        conn = pool.getconn()
+        broken = False
+        try:
+            with state.lock:
+                state.conn = conn
+            if state.cancelled:
+                raise QueryCancelled("query cancelled before execution")
+            return fn(conn, *args)
+        except Exception as e:
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) and not isinstance(
+                e, psycopg2.extensions.QueryCanceledError
+            )
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            with state.lock:
+                state.conn = None
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+    @staticmethod
+    def _cancel(state: _QueryState) -> None:
+        """Отмена запроса: до старта — флагом, во время выполнения — на сервере"""
+        with state.lock:
+            state.cancelled = True
+            conn = state.conn
+            if conn is not None and not conn.closed:
+                try:
+                    conn.cancel()
+                except Exception as e:
+                    logger.debug(f"PgExecutor cancel failed: {e}")
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """
+        Выполнение fn(conn, *args) без блокировки event loop
+
+        Args:
+            fn: Синхронная функция запроса
+            timeout: Таймаут, сек (по умолчанию default_timeout)
+
+        Raises:
+            asyncio.TimeoutError: запрос не уложился в таймаут (и был отменён на сервере)
+        """
+        if self._executor is None:
+            raise Exception("PgExecutor is not started")
+
+        timeout = self.default_timeout if timeout is None else timeout
+        state = _QueryState()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        future = loop.run_in_executor(self._executor, self._call, state, started, fn, args)
+
+        self.queries += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._cancel(state)
+            self._consume(future)
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            self._cancel(state)
+            self._consume(future)
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._query_ms.append((time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _consume(future: "asyncio.Future[Any]") -> None:
+        """Результат отменённого запроса никому не нужен — гасим 'exception never retrieved'"""
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика executor"""
+        return {
+            'name': self.name,
+            'max_connections': self.max_connections,
+            'queries': self.queries,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'queue_wait_p50_ms': round(percentile(self._queue_wait_ms, 0.5), 2),
+            'queue_wait_p95_ms': round(percentile(self._queue_wait_ms, 0.95), 2),
+            'query_p50_ms': round(percentile(self._query_ms, 0.5), 2),
+            'query_p95_ms': round(percentile(self._query_ms, 0.95), 2),
+        }
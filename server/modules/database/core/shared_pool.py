@@ -0,0 +1,323 @@
+"""
+SharedConnectionPool - общий пул соединений для репозиториев
+
+SubscriptionRepository и TokenUsageRepository открывали psycopg2.connect()
+на каждую операцию (TCP + TLS + auth на каждую проверку квоты). Пул
+держит соединения открытыми, ограничивает их число, проверяет "здоровье"
+простоявших соединений перед выдачей и даёт async entry point: работа
+репозитория выполняется в потоках пула, а не в event loop.
+
+Репозитории получают PooledConnection: это прокси над psycopg2
+соединением, у которого close() возвращает соединение в пул. Поэтому
+существующий код вида "conn = ...; try: ... finally: conn.close()"
+продолжает работать без изменений.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Set, TypeVar
+
+import psycopg2
+import psycopg2.pool
+
+from utils.metrics_collector import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за acquire_timeout"""
+
+
+class PooledConnection:
+    """Соединение из пула: close() возвращает его в пул, остальное делегируется"""
+
+    def __init__(self, pool: "SharedConnectionPool", conn, cursor_factory=None):
+        self._pool = pool
+        self._conn = conn
+        self._cursor_factory = cursor_factory
+        self._released = False
+
+    def cursor(self, *args, **kwargs):
+        if self._cursor_factory is not None and not args:
+            kwargs.setdefault('cursor_factory', self._cursor_factory)
+        return self._conn.cursor(*args, **kwargs)
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            self._pool._release(self._conn)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Семантика psycopg2: commit при успехе, rollback при исключении
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+
+
+class SharedConnectionPool:
+    """
+    Ограниченный пул соединений с health check и метриками.
+
+    Использование (sync):
+        conn = pool.connection(cursor_factory=RealDictCursor)
+        try: ...
+        finally: conn.close()
+
+    Использование (async):
+        result = await pool.run(repository.get_subscription, hardware_id)
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_connections: int = 1,
+        max_connections: int = 10,
+        acquire_timeout: float = 5.0,
+        health_check_idle_sec: float = 30.0,
+        name: str = "shared",
+        pool_factory: Optional[Callable[..., Any]] = None,
+    ):
+        """
+        Args:
+            dsn: Строка подключения
+            min_connections: Минимум открытых соединений
+            max_connections: Максимум соединений (и потоков async entry point)
+            acquire_timeout: Ожидание свободного соединения, сек
+            health_check_idle_sec: Простой, после которого соединение проверяется SELECT 1
+            name: Имя пула в логах и метриках
+            pool_factory: Фабрика пула (minconn, maxconn, dsn)
+        """
+        self.dsn = dsn
+        self.min_connections = max(0, int(min_connections))
+        self.max_connections = max(1, int(max_connections))
+        self.acquire_timeout = acquire_timeout
+        self.health_check_idle_sec = health_check_idle_sec
+        self.name = name
+        self._pool_factory = pool_factory or psycopg2.pool.ThreadedConnectionPool
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._known: Set[int] = set()
+        self._last_used: Dict[int, float] = {}
+        self._stats_lock = threading.Lock()
+
+        # Метрики
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.created = 0
+        self.discarded = 0
+        self.health_checks = 0
+        self.health_check_failures = 0
+        self.acquire_timeouts = 0
+        self.acquired = 0
+        self._wait_ms: Deque[float] = deque(maxlen=1024)
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self._pool_factory(self.min_connections, self.max_connections, self.dsn)
+                    logger.info(
+                        f"✅ SharedConnectionPool[{self.name}] создан: "
+                        f"{self.min_connections}-{self.max_connections} соединений"
+                    )
+        return self._pool
+
+    # ------------------------------------------------------------------
+    # Выдача и возврат соединений
+    # ------------------------------------------------------------------
+
+    def connection(self, cursor_factory=None) -> PooledConnection:
+        """Соединение из пула (блокирует поток до acquire_timeout)"""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._stats_lock:
+                self.acquire_timeouts += 1
+            raise PoolTimeout(
+                f"SharedConnectionPool[{self.name}]: no free connection within {self.acquire_timeout}s"
+            )
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self._wait_ms.append((time.perf_counter() - started) * 1000)
+            self.acquired += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return PooledConnection(self, conn, cursor_factory)
+
+    def _checkout(self):
+        pool = self._ensure_pool()
+        conn = pool.getconn()
+        key = id(conn)
+        if key not in self._known:
+            with self._stats_lock:
+                self._known.add(key)
+                self.created += 1
+            return conn
+
+        idle = time.monotonic() - self._last_used.get(key, 0.0)
+        if conn.closed or idle >= self.health_check_idle_sec:
+            if conn.closed or not self._is_healthy(conn):
+                self._discard(pool, conn)
+                return self._checkout()
+        return conn
+
+    def _is_healthy(self, conn) -> bool:
+        with self._stats_lock:
+            self.health_checks += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            conn.rollback()
+            return True
+        except Exception as e:
+            with self._stats_lock:
+                self.health_check_failures += 1
+            logger.warning(f"⚠️ SharedConnectionPool[{self.name}]: соединение не прошло health check: {e}")
+            return False
+
+    def _discard(self, pool, conn) -> None:
+        key = id(conn)
+        with self._stats_lock:
+            self._known.discard(key)
+            self._last_used.pop(key, None)
+            self.discarded += 1
+        pool.putconn(conn, close=True)
+
+    def _release(self, conn) -> None:
+        pool = self._pool
+        try:
+            if pool is None:
+                conn.close()
+                return
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    # Незакоммиченная транзакция не должна перейти к следующему владельцу
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            if broken:
+                self._discard(pool, conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                pool.putconn(conn)
+        finally:
+            with self._stats_lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    # ------------------------------------------------------------------
+    # Async entry point
+    # ------------------------------------------------------------------
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполнение синхронной работы репозитория в потоке пула"""
+        if self._executor is None:
+            with self._pool_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_connections,
+                        thread_name_prefix=f"{self.name}-db",
+                    )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self) -> None:
+        """Закрытие всех соединений и потоков пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+        self._known.clear()
+        self._last_used.clear()
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика пула: ожидание, занятость, создание"""
+        with self._stats_lock:
+            waits = list(self._wait_ms)
+
+        return {
+            'name': self.name,
+            'max_connections': self.max_connections,
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'open': len(self._known),
+            'created': self.created,
+            'discarded': self.discarded,
+            'acquired': self.acquired,
+            'acquire_timeouts': self.acquire_timeouts,
+            'health_checks': self.health_checks,
+            'health_check_failures': self.health_check_failures,
+            'wait_p50_ms': round(percentile(waits, 0.5), 3),
+            'wait_p95_ms': round(percentile(waits, 0.95), 3),
+            'wait_max_ms': round(max(waits), 3) if waits else 0.0,
+        }
+
+
+_pools: Dict[str, SharedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_shared_connection_pool(dsn: str, name: str = "shared") -> SharedConnectionPool:
+    """Общий пул для DSN (один на процесс; параметры из unified_config.database)"""
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            from config.unified_config import get_config
+
+            db_cfg = get_config().database
+            pool = SharedConnectionPool(
+                dsn,
+                min_connections=db_cfg.shared_pool_min_connections,
+                max_connections=db_cfg.shared_pool_max_connections,
+                acquire_timeout=db_cfg.shared_pool_acquire_timeout_sec,
+                health_check_idle_sec=db_cfg.shared_pool_health_check_idle_sec,
+                name=name,
+            )
+            _pools[dsn] = pool
+        return pool
+
+
+def get_shared_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Метрики всех общих пулов"""
+    with _pools_lock:
+        return {pool.name: pool.get_stats() for pool in _pools.values()}
+
+
+def close_shared_connection_pools() -> None:
+    """Закрытие всех общих пулов (при остановке сервера)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
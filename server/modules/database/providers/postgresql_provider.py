@@ -13,6 +13,7 @@ import psycopg2
 import psycopg2.extras
 import psycopg2.pool
 from integrations.core.universal_provider_interface import UniversalProviderInterface
+from modules.database.core.pg_executor import PgExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -71,8 +72,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
         self.enable_metrics = config.get('enable_metrics', True)
         self.health_check_interval = config.get('health_check_interval', 300)
         
-        # Пулы соединений
-        self.connection_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        # Пул соединений + ограниченный executor запросов (psycopg2 не блокирует event loop)
+        self._executor: Optional[PgExecutor] = None
         self.connection = None
         
         logger.info(f"PostgreSQL Provider initialized with host: {self.host}:{self.port}")
@@ -151,10 +152,10 @@ class PostgreSQLProvider(UniversalProviderInterface):
         try:
             logger.info("Cleaning up PostgreSQL Provider...")
             
-            # Закрываем пул соединений
-            if self.connection_pool:
-                self.connection_pool.closeall()
-                self.connection_pool = None
+            # Останавливаем executor и закрываем пул соединений
+            if self._executor is not None:
+                await self._executor.close()
+                self._executor = None
             
             # Закрываем основное соединение
             if self.connection:
@@ -169,13 +170,19 @@ class PostgreSQLProvider(UniversalProviderInterface):
             logger.error(f"Error cleaning up PostgreSQL Provider: {e}")
             return False
     
+    @property
+    def connection_pool(self) -> Optional[psycopg2.pool.ThreadedConnectionPool]:
+        """Пул соединений executor (None до инициализации)"""
+        return self._executor.pool if self._executor is not None else None
+
     async def _create_connection_pool(self):
-        """Создание пула соединений"""
+        """Создание пула соединений и executor запросов"""
         try:
-            # Создаем пул соединений
-            self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=self.min_connections,
-                maxconn=self.max_connections,
+            executor = PgExecutor(
+                min_connections=self.min_connections,
+                max_connections=self.max_connections,
+                default_timeout=self.command_timeout,
+                name="postgresql",
                 host=self.host,
                 port=self.port,
                 database=self.database,
@@ -183,12 +190,25 @@ class PostgreSQLProvider(UniversalProviderInterface):
                 password=self.password,
                 connect_timeout=self.connection_timeout
             )
+            await executor.start()
+            self._executor = executor
             
             logger.info(f"Connection pool created: {self.min_connections}-{self.max_connections} connections")
             
         except Exception as e:
             logger.error(f"Error creating connection pool: {e}")
             raise e
+
+    async def _run(self, query, *args, timeout: Optional[float] = None):
+        """
+        Выполнение синхронного запроса query(conn, *args) в executor
+
+        Event loop не блокируется; по таймауту (command_timeout) или при
+        отмене вызывающей корутины запрос отменяется на сервере.
+        """
+        if self._executor is None:
+            raise Exception("Connection pool is not initialized")
+        return await self._executor.run(query, *args, timeout=timeout)
     
     async def _test_connection(self) -> bool:
         """Тестирование подключения к БД"""
@@ -197,10 +217,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
                 logger.error("Connection pool is not initialized")
                 return False
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 # Выполняем простой запрос
                 with conn.cursor() as cursor:
                     cursor.execute("SELECT 1")
@@ -212,11 +229,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                 else:
                     logger.error("Database connection test failed")
                     return False
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Database connection test error: {e}")
@@ -267,10 +281,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     # Генерируем ID если не указан
                     if 'id' not in data:
@@ -314,11 +325,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                             'operation': 'create',
                             'table': table
                         }
-                        
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error creating record in {table}: {e}")
@@ -335,10 +343,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                     # Формируем SQL запрос
                     sql = f"SELECT * FROM {table}"
@@ -384,11 +389,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                         'operation': 'read',
                         'table': table
                     }
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error reading records from {table}: {e}")
@@ -405,10 +407,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     # Подготавливаем данные
                     prepared_data = self._prepare_data_for_db(data)
@@ -461,11 +460,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                             'operation': 'update',
                             'table': table
                         }
-                        
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error updating record in {table}: {e}")
@@ -587,8 +583,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
 
-            conn = self.connection_pool.getconn()
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     sql = """
                         INSERT INTO sessions (id, user_id, metadata, status)
@@ -610,9 +605,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     result = cursor.fetchone()
                     conn.commit()
                     return result[0] if result else None
-            finally:
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
         except Exception as e:
             logger.error(f"Failed to ensure session: {e}")
             return None
@@ -665,8 +659,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if not request_key:
                 raise Exception("ensure_command requires metadata.request_key")
 
-            conn = self.connection_pool.getconn()
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     # Блокируем сессию как координационный ключ (anti-race across workers)
                     cursor.execute("SELECT id FROM sessions WHERE id = %s FOR UPDATE", (session_id,))
@@ -707,9 +700,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     created = cursor.fetchone()
                     conn.commit()
                     return created[0] if created else None
-            finally:
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
         except Exception as e:
             logger.error(f"Failed to ensure command: {e}")
             return None
@@ -750,8 +742,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
 
-            conn = self.connection_pool.getconn()
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     cursor.execute("SELECT id FROM commands WHERE id = %s FOR UPDATE", (command_id,))
                     if not cursor.fetchone():
@@ -810,13 +801,193 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     created = cursor.fetchone()
                     conn.commit()
                     return created[0] if created else None
-            finally:
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
         except Exception as e:
             logger.error(f"Failed to ensure LLM answer: {e}")
             return None
     
+    async def persist_request_traces(self, traces: List[Dict[str, Any]]) -> int:
+        """
+        Batched персистенция request trace (write-behind flush).
+
+        Пачка трейсов многих запросов пишется одной транзакцией: пользователи
+        резолвятся одним запросом, сессии/команды/ответы/скриншоты —
+        multi-row операциями. Семантика совпадает с ensure_session /
+        ensure_command / ensure_llm_answer (идемпотентно по request_key).
+
+        Каждый трейс: hardware_id, session_id, session_metadata, prompt,
+        response, command_metadata (с request_key), language, model_info,
+        performance_metrics, screenshot_metadata (None если без скриншота).
+
+        Returns:
+            Количество сохранённых трейсов
+        """
+        if self.connection_pool is None:
+            raise Exception("Connection pool is not initialized")
+        if not traces:
+            return 0
+        return await self._run(self._persist_request_traces_sync, traces)
+
+    def _persist_request_traces_sync(self, conn, traces: List[Dict[str, Any]]) -> int:
+        with conn.cursor() as cursor:
+            hardware_ids = sorted({trace['hardware_id'] for trace in traces})
+            cursor.execute(
+                "SELECT hardware_id_hash, id::text FROM users WHERE hardware_id_hash = ANY(%s)",
+                (hardware_ids,),
+            )
+            users = dict(cursor.fetchall())
+
+            resolved = []
+            for trace in traces:
+                if trace['hardware_id'] not in users:
+                    continue
+                try:
+                    # Канонический вид uuid: ключи сопоставляются со строками из БД
+                    session_id = str(uuid.UUID(str(trace['session_id'])))
+                except ValueError:
+                    logger.warning(f"⚠️ Request trace с некорректным session_id пропущен: {trace['session_id']}")
+                    continue
+                resolved.append(dict(trace, session_id=session_id))
+            if len(resolved) < len(traces):
+                logger.warning(f"⚠️ Request trace пропущены (нет пользователя/session_id): {len(traces) - len(resolved)}")
+            if not resolved:
+                conn.commit()
+                return 0
+
+            # Сессии: одна строка на session_id, metadata объединяется
+            sessions: Dict[str, List[Any]] = {}
+            for trace in resolved:
+                entry = sessions.setdefault(trace['session_id'], [users[trace['hardware_id']], {}])
+                entry[0] = users[trace['hardware_id']]
+                entry[1].update(trace.get('session_metadata') or {})
+            psycopg2.extras.execute_values(
+                cursor,
+                """
+                INSERT INTO sessions (id, user_id, metadata, status)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE
+                SET user_id = EXCLUDED.user_id,
+                    metadata = sessions.metadata || EXCLUDED.metadata,
+                    status = 'active'
+                """,
+                [(session_id, user_id, json.dumps(metadata)) for session_id, (user_id, metadata) in sessions.items()],
+                template="(%s::uuid, %s::uuid, %s::jsonb, 'active')",
+            )
+
+            # Блокируем сессии как координационный ключ (как в ensure_command)
+            session_ids = sorted(sessions)
+            cursor.execute(
+                "SELECT id FROM sessions WHERE id = ANY(%s::uuid[]) ORDER BY id FOR UPDATE",
+                (session_ids,),
+            )
+
+            # Команды: одна на (session_id, request_key), последний трейс побеждает
+            by_request: Dict[Any, Dict[str, Any]] = {}
+            for trace in resolved:
+                request_key = (trace.get('command_metadata') or {}).get('request_key')
+                if not request_key:
+                    raise Exception("persist_request_traces requires command_metadata.request_key")
+                by_request[(trace['session_id'], request_key)] = trace
+
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (session_id, metadata->>'request_key')
+                       session_id::text, metadata->>'request_key', id::text
+                FROM commands
+                WHERE session_id = ANY(%s::uuid[])
+                  AND metadata->>'request_key' = ANY(%s)
+                ORDER BY session_id, metadata->>'request_key', created_at DESC
+                """,
+                (session_ids, sorted({key[1] for key in by_request})),
+            )
+            command_ids = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+            new_commands = []
+            for key, trace in by_request.items():
+                if key not in command_ids:
+                    command_ids[key] = str(uuid.uuid4())
+                    new_commands.append((
+                        command_ids[key],
+                        trace['session_id'],
+                        trace['prompt'],
+                        trace.get('language', 'en'),
+                        json.dumps(trace.get('command_metadata') or {}),
+                    ))
+            if new_commands:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    "INSERT INTO commands (id, session_id, prompt, language, metadata) VALUES %s",
+                    new_commands,
+                    template="(%s::uuid, %s::uuid, %s, %s, %s::jsonb)",
+                )
+
+            # Ответы LLM: обновляем существующие, вставляем остальные
+            answers = {command_ids[key]: trace for key, trace in by_request.items()}
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (command_id) command_id::text, id::text
+                FROM llm_answers
+                WHERE command_id = ANY(%s::uuid[])
+                ORDER BY command_id, created_at DESC
+                """,
+                (sorted(answers),),
+            )
+            existing_answers = dict(cursor.fetchall())
+
+            updates, inserts = [], []
+            for command_id, trace in answers.items():
+                values = (
+                    trace['prompt'],
+                    trace.get('response') or "",
+                    json.dumps(trace.get('model_info') or {}),
+                    json.dumps(trace.get('performance_metrics') or {}),
+                )
+                if command_id in existing_answers:
+                    updates.append((existing_answers[command_id],) + values)
+                else:
+                    inserts.append((str(uuid.uuid4()), command_id) + values)
+            if updates:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                    UPDATE llm_answers AS a
+                    SET prompt = v.prompt,
+                        response = v.response,
+                        model_info = v.model_info::jsonb,
+                        performance_metrics = v.performance_metrics::jsonb
+                    FROM (VALUES %s) AS v(id, prompt, response, model_info, performance_metrics)
+                    WHERE a.id = v.id::uuid
+                    """,
+                    updates,
+                )
+            if inserts:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                    INSERT INTO llm_answers (id, command_id, prompt, response, model_info, performance_metrics)
+                    VALUES %s
+                    """,
+                    inserts,
+                    template="(%s::uuid, %s::uuid, %s, %s, %s::jsonb, %s::jsonb)",
+                )
+
+            screenshots = [
+                (str(uuid.uuid4()), trace['session_id'], json.dumps(trace['screenshot_metadata']))
+                for trace in resolved
+                if trace.get('screenshot_metadata')
+            ]
+            if screenshots:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    "INSERT INTO screenshots (id, session_id, metadata) VALUES %s",
+                    screenshots,
+                    template="(%s::uuid, %s::uuid, %s::jsonb)",
+                )
+
+            conn.commit()
+            return len(resolved)
+
     async def create_screenshot(self, session_id: str, file_path: Optional[str] = None, file_url: Optional[str] = None,
                                metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """Создание записи о скриншоте"""
@@ -877,10 +1048,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     # Centralization rule: user creation is owned by first-use gate path.
                     # Memory module may only update already-registered users.
@@ -904,11 +1072,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     conn.commit()
                     
                     return bool(result)
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error updating user memory (update-only): {e}")
@@ -920,10 +1085,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor() as cursor:
                     # Выполняем SQL функцию очистки
                     cursor.execute("SELECT cleanup_expired_short_term_memory(%s)", (hours,))
@@ -936,11 +1098,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     
                     logger.info(f"Cleaned up {affected_rows} expired short-term memory records")
                     return affected_rows
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error cleaning up expired short-term memory: {e}")
@@ -952,10 +1111,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                     # Выполняем SQL функцию статистики
                     cursor.execute("SELECT * FROM get_memory_stats()")
@@ -965,11 +1121,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                         return dict(result)
                     else:
                         return {}
-                        
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error getting memory statistics: {e}")
@@ -981,10 +1134,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                     # Выполняем SQL запрос
                     cursor.execute("""
@@ -999,11 +1149,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     
                     results = cursor.fetchall()
                     return [dict(row) for row in results]
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error getting users with active memory: {e}")
@@ -1019,10 +1166,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT 
@@ -1040,11 +1184,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     
                     result = cursor.fetchone()
                     return dict(result) if result else {}
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error getting user statistics: {e}")
@@ -1056,10 +1197,7 @@ class PostgreSQLProvider(UniversalProviderInterface):
             if self.connection_pool is None:
                 raise Exception("Connection pool is not initialized")
             
-            # Получаем соединение из пула
-            conn = self.connection_pool.getconn()
-            
-            try:
+            def query(conn):
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                     cursor.execute("""
                         SELECT 
@@ -1075,11 +1213,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
                     
                     results = cursor.fetchall()
                     return [dict(row) for row in results]
-                    
-            finally:
-                # Возвращаем соединение в пул
-                if self.connection_pool is not None:
-                    self.connection_pool.putconn(conn)
+
+            return await self._run(query)
                 
         except Exception as e:
             logger.error(f"Error getting session commands: {e}")
@@ -1131,7 +1266,8 @@ class PostgreSQLProvider(UniversalProviderInterface):
             "database": self.database,
             "pool_available": bool(self.connection_pool),
             "connection_available": bool(self.connection),
-            "enable_metrics": self.enable_metrics
+            "enable_metrics": self.enable_metrics,
+            "query_executor": self._executor.get_stats() if self._executor is not None else {}
         })
         
         return base_metrics
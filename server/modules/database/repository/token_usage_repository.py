@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
 import logging
-import psycopg2
 from typing import Dict, List, Optional, Any
 from psycopg2.extras import RealDictCursor
 
+from modules.database.core.shared_pool import SharedConnectionPool, get_shared_connection_pool
+
 logger = logging.getLogger(__name__)
 
 class TokenUsageRepository:
@@ -11,13 +12,15 @@ class TokenUsageRepository:
     Repository for managing token usage records in the database.
     """
     
-    def __init__(self, db_url: Optional[str] = None):
+    def __init__(self, db_url: Optional[str] = None, connection_pool: Optional[SharedConnectionPool] = None):
         """
         Initialize the repository.
         
         Args:
             db_url: Database connection URL (optional)
+            connection_pool: Shared connection pool (optional, defaults to the process-wide pool for db_url)
         """
+        self._connection_pool = connection_pool
         import os
         from dotenv import load_dotenv
         
@@ -41,11 +44,26 @@ class TokenUsageRepository:
         if not self.db_url:
             logger.warning("DATABASE_URL or DB credentials not found, TokenUsageRepository will not work")
 
+    def _get_pool(self) -> SharedConnectionPool:
+        if self._connection_pool is None:
+            if not self.db_url:
+                raise ValueError("Database URL is not set")
+            self._connection_pool = get_shared_connection_pool(self.db_url, name="repositories")
+        return self._connection_pool
+
     def _get_connection(self):
-        """Get database connection."""
+        """Get pooled database connection (close() returns it to the pool)."""
+        return self._get_pool().connection(cursor_factory=RealDictCursor)
+
+    async def record_usage_async(self, *args: Any, **kwargs: Any) -> bool:
+        """Async entry point for record_usage (runs on the pool's threads, not the event loop)."""
         if not self.db_url:
-            raise ValueError("Database URL is not set")
-        return psycopg2.connect(self.db_url, cursor_factory=RealDictCursor)
+            return False
+        return await self._get_pool().run(self.record_usage, *args, **kwargs)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool metrics."""
+        return self._connection_pool.get_stats() if self._connection_pool is not None else {}
 
     def record_usage(
         self,
@@ -176,6 +194,10 @@ class TokenUsageRepository:
         except Exception as e:
             logger.error(f"Error getting token usage stats: {e}")
             return {}
+        finally:
+            if 'cur' in locals(): cur.close()
+            if 'conn' in locals(): conn.close()
+
     def get_global_stats(self, period: str = 'daily') -> List[Dict[str, Any]]:
         """
         Get global token usage statistics grouped by user and model.
@@ -0,0 +1,340 @@
+"""
+Согласование кодека и потоковое кодирование аудио для gRPC транспорта
+
+По умолчанию клиент получает raw PCM int16 (48kHz mono ≈ 768 kbps).
+Клиент может запросить Opus (AudioCodec.AUDIO_CODEC_OPUS): PCM режется
+на кадры frame_ms, каждый кадр кодируется в отдельный Opus пакет,
+пакеты склеиваются в AudioChunk.audio_data, а их размеры передаются
+в packet_sizes. Кодирование выполняется в пуле потоков, не в event loop.
+
+Opus — опциональная зависимость (opuslib + системный libopus). Если она
+недоступна, запрос Opus тихо понижается до PCM: клиент видит фактический
+кодек в AudioChunk.codec.
+
+TTS отдаёт PCM фрагментами по streaming_chunk_size (4096 байт ≈ 43 мс при
+48kHz mono), и без склейки каждый фрагмент уходил отдельным сообщением.
+AudioCoalescer набирает PCM до coalesce_ms перед кодированием, так что
+одно сообщение несёт ~coalesce_ms аудио независимо от размера фрагментов.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics_collector import record_decision_metric
+
+try:
+    import opuslib  # type: ignore
+    OPUS_AVAILABLE = True
+except Exception:  # ImportError или отсутствует системный libopus
+    opuslib = None  # type: ignore
+    OPUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+METRIC_METHOD = "audio_codec"
+
+# Значения enum AudioCodec из streaming.proto
+CODEC_PCM_S16LE = 0
+CODEC_OPUS = 1
+
+# Частоты, которые поддерживает Opus
+_OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+_OPUS_FRAME_MS = (10, 20, 40, 60)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 4
+
+
+def get_audio_encoder_executor() -> ThreadPoolExecutor:
+    """Общий пул потоков для кодирования (создаётся лениво)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_executor_workers, thread_name_prefix="audio-encoder")
+    return _executor
+
+
+def configure_audio_encoder_executor(workers: int) -> None:
+    """Размер пула кодирования (до первого использования)"""
+    global _executor_workers
+    _executor_workers = max(1, int(workers))
+
+
+@dataclass
+class EncodedAudio:
+    """Результат кодирования одного PCM фрагмента"""
+    data: bytes
+    codec: int = CODEC_PCM_S16LE
+    packet_sizes: List[int] = field(default_factory=list)
+    frame_duration_ms: int = 0
+
+
+class PcmPassthroughEncoder:
+    """PCM без изменений (кодек по умолчанию)"""
+
+    codec = CODEC_PCM_S16LE
+
+    def __init__(self) -> None:
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_ms = 0.0
+        self.packets = 0
+
+    async def encode(self, pcm: bytes) -> Optional[EncodedAudio]:
+        if not pcm:
+            return None
+        self.bytes_in += len(pcm)
+        self.bytes_out += len(pcm)
+        return EncodedAudio(data=bytes(pcm))
+
+    async def flush(self) -> Optional[EncodedAudio]:
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'codec': 'pcm',
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'packets': self.packets,
+            'cpu_ms': round(self.cpu_ms, 2),
+        }
+
+
+class OpusStreamEncoder:
+    """
+    Потоковый Opus энкодер одного стрима.
+
+    Неполный кадр остаётся в буфере до следующего фрагмента; flush()
+    дополняет его тишиной. Вызовы encode()/flush() одного стрима
+    выполняются последовательно, поэтому порядок пакетов сохраняется.
+    """
+
+    codec = CODEC_OPUS
+
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        channels: int = 1,
+        frame_ms: int = 20,
+        bitrate: int = 24000,
+        executor: Optional[ThreadPoolExecutor] = None,
+        encoder_factory: Optional[Callable[[int, int], Any]] = None,
+    ):
+        """
+        Args:
+            sample_rate: Частота PCM (одна из поддерживаемых Opus)
+            channels: Количество каналов
+            frame_ms: Длительность пакета (10/20/40/60 мс)
+            bitrate: Целевой битрейт, бит/с
+            executor: Пул потоков для кодирования
+            encoder_factory: Фабрика энкодера (sample_rate, channels) -> obj.encode(pcm, frame_size)
+        """
+        if sample_rate not in _OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus does not support sample_rate={sample_rate}")
+        if frame_ms not in _OPUS_FRAME_MS:
+            raise ValueError(f"Opus frame must be one of {_OPUS_FRAME_MS} ms, got {frame_ms}")
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * channels * 2
+        self._executor = executor or get_audio_encoder_executor()
+
+        if encoder_factory is not None:
+            self._encoder = encoder_factory(sample_rate, channels)
+        else:
+            if not OPUS_AVAILABLE:
+                raise RuntimeError("opuslib is not available")
+            self._encoder = opuslib.Encoder(sample_rate, channels, opuslib.APPLICATION_VOIP)
+            self._encoder.bitrate = bitrate
+
+        self._pending = bytearray()
+
+        # Метрики
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.packets = 0
+        self.cpu_ms = 0.0
+
+    def _encode_frames(self, pcm: bytes):
+        """Кодирование целых кадров (выполняется в пуле потоков)"""
+        started = time.thread_time()
+        packets = [
+            self._encoder.encode(pcm[offset:offset + self.frame_bytes], self.frame_samples)
+            for offset in range(0, len(pcm), self.frame_bytes)
+        ]
+        return packets, (time.thread_time() - started) * 1000
+
+    async def _encode(self, pcm: bytes) -> EncodedAudio:
+        loop = asyncio.get_running_loop()
+        packets, cpu_ms = await loop.run_in_executor(self._executor, self._encode_frames, pcm)
+        data = b''.join(packets)
+        self.cpu_ms += cpu_ms
+        self.packets += len(packets)
+        self.bytes_out += len(data)
+        return EncodedAudio(
+            data=data,
+            codec=CODEC_OPUS,
+            packet_sizes=[len(packet) for packet in packets],
+            frame_duration_ms=self.frame_ms,
+        )
+
+    async def encode(self, pcm: bytes) -> Optional[EncodedAudio]:
+        """Кодирует все целые кадры; None если кадр ещё не набран"""
+        if pcm:
+            self.bytes_in += len(pcm)
+            self._pending.extend(pcm)
+        whole = len(self._pending) - len(self._pending) % self.frame_bytes
+        if whole == 0:
+            return None
+        frames = bytes(self._pending[:whole])
+        del self._pending[:whole]
+        return await self._encode(frames)
+
+    async def flush(self) -> Optional[EncodedAudio]:
+        """Докодирует хвост, дополнив его тишиной до целого кадра"""
+        if not self._pending:
+            return None
+        frame = bytes(self._pending) + b'\x00' * (self.frame_bytes - len(self._pending))
+        self._pending.clear()
+        return await self._encode(frame)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'codec': 'opus',
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'packets': self.packets,
+            'cpu_ms': round(self.cpu_ms, 2),
+            'compression_ratio': round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else 0.0,
+        }
+
+
+def _concat_encoded(first: Optional[EncodedAudio], second: Optional[EncodedAudio]) -> Optional[EncodedAudio]:
+    """Склейка двух результатов одного энкодера в одно сообщение"""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return EncodedAudio(
+        data=first.data + second.data,
+        codec=first.codec,
+        packet_sizes=first.packet_sizes + second.packet_sizes,
+        frame_duration_ms=first.frame_duration_ms or second.frame_duration_ms,
+    )
+
+
+class AudioCoalescer:
+    """
+    Склейка PCM фрагментов в сообщения целевой длительности.
+
+    Оборачивает энкодер (PCM или Opus) с тем же интерфейсом encode()/flush().
+    Первый фрагмент стрима уходит сразу, чтобы не задерживать первый звук;
+    дальше PCM копится до target_ms и кодируется одним куском. flush()
+    (граница предложения, конец стрима) отдаёт накопленный хвост.
+    """
+
+    def __init__(self, encoder: Any, sample_rate: int, channels: int, target_ms: int):
+        """
+        Args:
+            encoder: Энкодер PCM/Opus
+            sample_rate: Частота PCM
+            channels: Количество каналов
+            target_ms: Целевая длительность одного сообщения
+        """
+        self._encoder = encoder
+        self.codec = encoder.codec
+        self.target_ms = target_ms
+        # Целое число int16 сэмплов всех каналов
+        self.target_bytes = max(2 * channels, sample_rate * channels * 2 * target_ms // 1000)
+        self._pending = bytearray()
+        self._first_sent = False
+        self.fragments_in = 0
+        self.messages_out = 0
+
+    async def encode(self, pcm: bytes) -> Optional[EncodedAudio]:
+        """Кодирует накопленное, когда набралось target_ms; иначе None"""
+        if pcm:
+            self.fragments_in += 1
+            self._pending.extend(pcm)
+        if self._first_sent and len(self._pending) < self.target_bytes:
+            return None
+        return await self._emit(await self._take())
+
+    async def flush(self) -> Optional[EncodedAudio]:
+        """Отдаёт накопленный хвост (и хвост вложенного энкодера)"""
+        encoded = await self._take() if self._pending else None
+        return await self._emit(_concat_encoded(encoded, await self._encoder.flush()))
+
+    async def _take(self) -> Optional[EncodedAudio]:
+        pcm = bytes(self._pending)
+        self._pending.clear()
+        return await self._encoder.encode(pcm)
+
+    async def _emit(self, encoded: Optional[EncodedAudio]) -> Optional[EncodedAudio]:
+        if encoded is not None:
+            self._first_sent = True
+            self.messages_out += 1
+        return encoded
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self._encoder.get_stats()
+        stats.update({
+            'coalesce_ms': self.target_ms,
+            'fragments_in': self.fragments_in,
+            'messages_out': self.messages_out,
+        })
+        return stats
+
+
+def create_audio_encoder(
+    requested_codec: int,
+    sample_rate: int,
+    channels: int,
+    frame_ms: int = 20,
+    bitrate: int = 24000,
+    coalesce_ms: int = 0,
+):
+    """
+    Согласование кодека: Opus если запрошен и доступен, иначе PCM
+
+    Args:
+        requested_codec: AudioCodec из запроса клиента
+        sample_rate: Частота PCM от TTS
+        channels: Количество каналов
+        frame_ms: Длительность Opus пакета
+        bitrate: Битрейт Opus
+        coalesce_ms: Целевая длительность сообщения (0 — каждый фрагмент отдельно)
+    """
+    encoder = _negotiate_encoder(requested_codec, sample_rate, channels, frame_ms, bitrate)
+    if coalesce_ms > 0:
+        return AudioCoalescer(encoder, sample_rate, channels, coalesce_ms)
+    return encoder
+
+
+def _negotiate_encoder(requested_codec: int, sample_rate: int, channels: int, frame_ms: int, bitrate: int):
+    if requested_codec == CODEC_OPUS:
+        if OPUS_AVAILABLE and sample_rate in _OPUS_SAMPLE_RATES:
+            try:
+                encoder = OpusStreamEncoder(sample_rate, channels, frame_ms=frame_ms, bitrate=bitrate)
+                record_decision_metric(METRIC_METHOD, "opus")
+                return encoder
+            except Exception as e:
+                logger.warning(f"⚠️ Opus encoder init failed, fallback to PCM: {e}")
+        record_decision_metric(METRIC_METHOD, "opus_unavailable")
+        logger.info(
+            "Opus requested but unavailable, falling back to PCM",
+            extra={
+                'scope': 'grpc',
+                'method': 'create_audio_encoder',
+                'decision': 'codec_fallback',
+                'ctx': {'opus_available': OPUS_AVAILABLE, 'sample_rate': sample_rate},
+            }
+        )
+    else:
+        record_decision_metric(METRIC_METHOD, "pcm")
+    return PcmPassthroughEncoder()
@@ -0,0 +1,101 @@
+"""
+Сборка аудио ответов StreamAudio: AudioChunk и заголовок формата
+
+Раньше каждый AudioChunk повторял dtype/sample_rate/channels/codec. Клиент,
+приславший StreamRequest.audio_header_once, получает формат один раз в
+StreamResponse.audio_header перед первым аудио, а AudioChunk несёт только
+audio_data (и packet_sizes для Opus). Остальные клиенты видят прежний формат.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .. import streaming_pb2  # type: ignore
+from .audio_codec import CODEC_PCM_S16LE, EncodedAudio
+
+
+def audio_chunk_message(encoded: EncodedAudio, dtype: str, sample_rate: int, channels: int):
+    """AudioChunk для закодированного фрагмента (dtype='opus' для Opus пакетов)"""
+    return streaming_pb2.AudioChunk(  # type: ignore
+        audio_data=encoded.data,
+        dtype=dtype if encoded.codec == CODEC_PCM_S16LE else 'opus',
+        shape=[],
+        sample_rate=sample_rate,
+        channels=channels,
+        codec=encoded.codec,
+        packet_sizes=encoded.packet_sizes,
+        frame_duration_ms=encoded.frame_duration_ms,
+    )
+
+
+class AudioResponseFramer:
+    """StreamResponse с аудио одного стрима: заголовок один раз, затем только данные"""
+
+    def __init__(
+        self,
+        dtype: str,
+        sample_rate: int,
+        channels: int,
+        header_once: bool = False,
+        target_chunk_ms: int = 0,
+    ):
+        """
+        Args:
+            dtype: Тип PCM данных из конфига
+            sample_rate: Частота дискретизации
+            channels: Количество каналов
+            header_once: Клиент запросил audio_header_once
+            target_chunk_ms: Целевая длительность сообщения (для заголовка)
+        """
+        self.dtype = dtype
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.header_once = header_once
+        self.target_chunk_ms = target_chunk_ms
+        self.header_sent = False
+
+        # Метрики
+        self.messages = 0
+        self.audio_bytes = 0
+
+    def frame(self, encoded: Optional[EncodedAudio]) -> List[Any]:
+        """Ответы для фрагмента: [audio_header?, audio_chunk] или [] если фрагмента нет"""
+        if encoded is None:
+            return []
+        self.messages += 1
+        self.audio_bytes += len(encoded.data)
+        if not self.header_once:
+            return [streaming_pb2.StreamResponse(  # type: ignore
+                audio_chunk=audio_chunk_message(encoded, self.dtype, self.sample_rate, self.channels)
+            )]
+
+        responses = []
+        if not self.header_sent:
+            self.header_sent = True
+            responses.append(streaming_pb2.StreamResponse(  # type: ignore
+                audio_header=streaming_pb2.AudioStreamHeader(  # type: ignore
+                    dtype=self.dtype if encoded.codec == CODEC_PCM_S16LE else 'opus',
+                    sample_rate=self.sample_rate,
+                    channels=self.channels,
+                    codec=encoded.codec,
+                    frame_duration_ms=encoded.frame_duration_ms,
+                    target_chunk_ms=self.target_chunk_ms,
+                )
+            ))
+        responses.append(streaming_pb2.StreamResponse(  # type: ignore
+            audio_chunk=streaming_pb2.AudioChunk(  # type: ignore
+                audio_data=encoded.data,
+                packet_sizes=encoded.packet_sizes,
+            )
+        ))
+        return responses
+
+    def get_stats(self, pcm_bytes: int) -> Dict[str, Any]:
+        """Метрики стрима; pcm_bytes — PCM на входе энкодера (для длительности аудио)"""
+        audio_sec = pcm_bytes / float(self.sample_rate * self.channels * 2) if self.sample_rate else 0.0
+        return {
+            'messages': self.messages,
+            'audio_bytes': self.audio_bytes,
+            'audio_sec': round(audio_sec, 3),
+            'messages_per_audio_sec': round(self.messages / audio_sec, 2) if audio_sec else 0.0,
+            'header_once': self.header_once,
+        }
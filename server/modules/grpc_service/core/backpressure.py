@@ -1,6 +1,17 @@
 """
 Backpressure для gRPC стримов (PR-7)
 Лимиты на одновременно открытые стримы и защита от "молчаливых" клиентов
+
+Учёт выполняется в event loop без блокировок: ни один метод не отдаёт
+управление (await) между чтением и записью состояния, поэтому обновления
+атомарны относительно других корутин. Частота сообщений ограничивается
+token bucket на стрим и на устройство (hardware_id) — O(1) на сообщение
+без списков временных меток.
+
+С разделяемым StateBackend лимит max_concurrent_streams общий для всех
+воркеров (SharedStreamCounter). Стрим сначала регистрируется локально
+(атомарно), затем занимает место в общем лимите; при отказе локальная
+регистрация откатывается.
 """
 
 import asyncio
@@ -8,7 +19,7 @@ import time
 import logging
 import sys
 import os
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from collections import defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -18,9 +29,26 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.unified_config import get_config
+from integrations.core.shared_state import SharedStreamCounter, get_shared_stream_counter
+from utils.metrics_collector import record_decision_metric
 
 logger = logging.getLogger(__name__)
 
+# Причины отказа (префикс error_message, ключ счётчика и метрики)
+REJECT_STREAM_LIMIT = "STREAM_LIMIT_EXCEEDED"
+REJECT_STREAM_NOT_FOUND = "STREAM_NOT_FOUND"
+REJECT_MESSAGE_RATE = "MESSAGE_RATE_EXCEEDED"
+REJECT_DEVICE_RATE = "DEVICE_RATE_EXCEEDED"
+REJECT_AUDIO_RATE = "AUDIO_RATE_EXCEEDED"
+
+REJECT_REASONS = (
+    REJECT_STREAM_LIMIT,
+    REJECT_STREAM_NOT_FOUND,
+    REJECT_MESSAGE_RATE,
+    REJECT_DEVICE_RATE,
+    REJECT_AUDIO_RATE,
+)
+
 
 @dataclass
 class StreamLimits:
@@ -29,6 +57,10 @@ class StreamLimits:
     idle_timeout_seconds: int = 300
     max_message_rate_per_second: int = 10
     grace_period_seconds: int = 30
+    # Аудио считается длительностью, а не сообщениями: секунд аудио за секунду (0 = без лимита)
+    max_audio_sec_per_second: float = 0.0
+    # Суммарно по всем стримам одного hardware_id (0 = без лимита)
+    max_message_rate_per_device: int = 0
     
     @classmethod
     def from_config(cls) -> 'StreamLimits':
@@ -41,7 +73,9 @@ class StreamLimits:
                     max_concurrent_streams=bp_config.max_concurrent_streams,
                     idle_timeout_seconds=bp_config.idle_timeout_seconds,
                     max_message_rate_per_second=bp_config.max_message_rate_per_second,
-                    grace_period_seconds=bp_config.grace_period_seconds
+                    grace_period_seconds=bp_config.grace_period_seconds,
+                    max_audio_sec_per_second=getattr(bp_config, 'max_audio_sec_per_second', 0.0),
+                    max_message_rate_per_device=getattr(bp_config, 'max_message_rate_per_device', 0)
                 )
         except Exception as e:
             logger.warning(f"Не удалось загрузить backpressure конфиг, используем дефолты: {e}")
@@ -50,6 +84,34 @@ class StreamLimits:
         return cls()
 
 
+class TokenBucket:
+    """
+    Token bucket: rate токенов в секунду, ёмкость capacity (допустимый всплеск).
+    
+    Пополнение считается лениво при списании — O(1), без фоновых задач.
+    Запрос дороже ёмкости проходит только из полного ведра (уводя его в минус),
+    иначе крупный фрагмент не прошёл бы никогда.
+    """
+    
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None, now: float = 0.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated_at = now
+    
+    def try_consume(self, cost: float, now: float) -> bool:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+        if self.tokens >= cost or self.tokens >= self.capacity:
+            self.tokens -= cost
+            return True
+        return False
+
+
 @dataclass
 class StreamInfo:
     """Информация о стриме"""
@@ -58,7 +120,12 @@ class StreamInfo:
     start_time: float = field(default_factory=time.time)
     last_message_time: float = field(default_factory=time.time)
     message_count: int = 0
-    message_timestamps: list[float] = field(default_factory=list)
+    message_bucket: Optional[TokenBucket] = None
+    audio_bucket: Optional[TokenBucket] = None
+    audio_bytes: int = 0
+    audio_seconds: float = 0.0
+    # Место в общем лимите воркеров (SharedStreamCounter)
+    shared_slot: bool = False
 
 
 class BackpressureManager:
@@ -68,19 +135,33 @@ class BackpressureManager:
     Обеспечивает:
     - Лимит на одновременно открытые стримы
     - Защиту от "молчаливых" клиентов (idle timeout)
-    - Защиту от чрезмерного количества сообщений (rate limiting)
+    - Защиту от чрезмерного количества сообщений (token bucket на стрим и устройство)
     """
     
-    def __init__(self, limits: Optional[StreamLimits] = None):
+    def __init__(
+        self,
+        limits: Optional[StreamLimits] = None,
+        clock: Callable[[], float] = time.monotonic,
+        shared_streams: Optional[SharedStreamCounter] = None,
+    ):
         """
         Инициализация менеджера backpressure
         
         Args:
             limits: Лимиты для стримов (по умолчанию загружаются из unified_config)
+            clock: Монотонные часы для token bucket (для тестов)
+            shared_streams: Общий лимит стримов воркеров (по умолчанию — из StateBackend, если он разделяемый)
         """
         self.limits = limits or StreamLimits.from_config()
         self.active_streams: Dict[str, StreamInfo] = {}
-        self.lock = asyncio.Lock()
+        # Учёт по устройствам: открытые стримы и общий bucket сообщений
+        self._device_streams: Dict[str, int] = defaultdict(int)
+        self._device_buckets: Dict[str, TokenBucket] = {}
+        self._clock = clock
+        self._shared_streams = shared_streams
+        
+        # Метрики отказов по причинам
+        self.rejections: Dict[str, int] = {reason: 0 for reason in REJECT_REASONS}
         
         # Запускаем фоновую задачу для проверки idle таймаутов
         self._cleanup_task: Optional[asyncio.Task] = None
@@ -94,6 +175,16 @@ class BackpressureManager:
         else:
             self._cleanup_task = None
             logger.debug("Backpressure idle-cleanup disabled (idle_timeout_seconds = 0)")
+        
+        shared_streams = self._get_shared_streams()
+        if shared_streams is not None:
+            await shared_streams.start()
+            logger.info(f"Backpressure: общий лимит стримов воркеров ({self.limits.max_concurrent_streams})")
+    
+    def _get_shared_streams(self) -> Optional[SharedStreamCounter]:
+        if self._shared_streams is None:
+            self._shared_streams = get_shared_stream_counter()
+        return self._shared_streams
     
     async def stop(self):
         """Остановка фоновой задачи"""
@@ -103,6 +194,24 @@ class BackpressureManager:
                 await self._cleanup_task
             except asyncio.CancelledError:
                 pass
+        if self._shared_streams is not None:
+            await self._shared_streams.stop()
+    
+    def _reject(self, reason: str, details: str, method: str = 'StreamAudio', **ctx) -> tuple[bool, Optional[str]]:
+        """Отказ: счётчик и метрика по причине, структурированный лог, error_message вида 'REASON: details'"""
+        self.rejections[reason] += 1
+        record_decision_metric("backpressure", f"reject_{reason.lower()}")
+        error_msg = f"{reason}: {details}"
+        logger.warning(
+            error_msg,
+            extra={
+                'scope': 'grpc',
+                'method': method,
+                'decision': 'stream_rejected' if reason == REJECT_STREAM_LIMIT else 'rate_limit_exceeded',
+                'ctx': {'reason': reason, **ctx}
+            }
+        )
+        return (False, error_msg)
     
     async def acquire_stream(self, stream_id: str, hardware_id: str) -> tuple[bool, Optional[str]]:
         """
@@ -115,53 +224,92 @@ class BackpressureManager:
         Returns:
             (success, error_message)
         """
-        async with self.lock:
-            # ПРОВЕРКА ЛИМИТА: не превышен ли max_concurrent_streams
-            current_active = len(self.active_streams)
-            if current_active >= self.limits.max_concurrent_streams:
-                error_msg = (
-                    f"STREAM_LIMIT_EXCEEDED: Maximum concurrent streams ({self.limits.max_concurrent_streams}) "
-                    f"reached. Current active: {current_active}"
-                )
-                logger.warning(
-                    error_msg,
-                    extra={
-                        'scope': 'grpc',
-                        'method': 'StreamAudio',
-                        'decision': 'stream_rejected',
-                        'ctx': {
-                            'stream_id': stream_id,
-                            'hardware_id': hardware_id,
-                            'active_streams': current_active,
-                            'max_streams': self.limits.max_concurrent_streams
-                        }
-                    }
-                )
-                return (False, error_msg)
-            
-            # Регистрируем стрим
-            stream_info = StreamInfo(
+        # ПРОВЕРКА ЛИМИТА: не превышен ли max_concurrent_streams
+        current_active = len(self.active_streams)
+        if current_active >= self.limits.max_concurrent_streams:
+            return self._reject(
+                REJECT_STREAM_LIMIT,
+                f"Maximum concurrent streams ({self.limits.max_concurrent_streams}) reached. Current active: {current_active}",
                 stream_id=stream_id,
-                hardware_id=hardware_id
+                hardware_id=hardware_id,
+                active_streams=current_active,
+                max_streams=self.limits.max_concurrent_streams,
             )
-            self.active_streams[stream_id] = stream_info
-            
-            logger.info(
-                f"Stream acquired: {stream_id} (active: {len(self.active_streams)})",
-                extra={
-                    'scope': 'grpc',
-                    'method': 'StreamAudio',
-                    'decision': 'stream_acquired',
-                    'ctx': {
-                        'stream_id': stream_id,
-                        'hardware_id': hardware_id,
-                        'active_streams': len(self.active_streams),
-                        'max_streams': self.limits.max_concurrent_streams
-                    }
+        
+        # Регистрируем стрим
+        now = self._clock()
+        stream_info = StreamInfo(stream_id=stream_id, hardware_id=hardware_id)
+        if self.limits.max_message_rate_per_second > 0:
+            stream_info.message_bucket = TokenBucket(self.limits.max_message_rate_per_second, now=now)
+        if self.limits.max_audio_sec_per_second > 0:
+            stream_info.audio_bucket = TokenBucket(self.limits.max_audio_sec_per_second, now=now)
+        previous = self.active_streams.get(stream_id)
+        if previous is not None:
+            # Повторный acquire того же stream_id: старую запись заменяем без двойного учёта устройства
+            self._forget_device_stream(previous.hardware_id)
+        self.active_streams[stream_id] = stream_info
+        self._device_streams[hardware_id] += 1
+        if self.limits.max_message_rate_per_device > 0 and hardware_id not in self._device_buckets:
+            self._device_buckets[hardware_id] = TokenBucket(self.limits.max_message_rate_per_device, now=now)
+        
+        # Общий лимит воркеров: await только после локальной регистрации
+        shared_streams = self._get_shared_streams()
+        if previous is not None and previous.shared_slot:
+            # Повторный acquire того же stream_id: место в общем лимите уже занято
+            stream_info.shared_slot = True
+        elif shared_streams is not None:
+            try:
+                allowed, shared_active = await shared_streams.try_acquire(self.limits.max_concurrent_streams)
+            except BaseException:
+                # Отмена/ошибка во время общего захвата: локальная регистрация не должна остаться
+                self._unregister_stream(stream_id, stream_info)
+                raise
+            if not allowed:
+                self._unregister_stream(stream_id, stream_info)
+                return self._reject(
+                    REJECT_STREAM_LIMIT,
+                    f"Maximum concurrent streams across workers ({self.limits.max_concurrent_streams}) reached. "
+                    f"Current active: {shared_active}",
+                    stream_id=stream_id,
+                    hardware_id=hardware_id,
+                    active_streams=shared_active,
+                    max_streams=self.limits.max_concurrent_streams,
+                    shared=True,
+                )
+            stream_info.shared_slot = True
+        
+        logger.info(
+            f"Stream acquired: {stream_id} (active: {len(self.active_streams)})",
+            extra={
+                'scope': 'grpc',
+                'method': 'StreamAudio',
+                'decision': 'stream_acquired',
+                'ctx': {
+                    'stream_id': stream_id,
+                    'hardware_id': hardware_id,
+                    'active_streams': len(self.active_streams),
+                    'device_streams': self._device_streams[hardware_id],
+                    'max_streams': self.limits.max_concurrent_streams
                 }
-            )
-            
-            return (True, None)
+            }
+        )
+        
+        return (True, None)
+    
+    def _unregister_stream(self, stream_id: str, stream_info: StreamInfo) -> None:
+        """Откат локальной регистрации стрима, не получившего место в общем лимите"""
+        if self.active_streams.get(stream_id) is stream_info:
+            del self.active_streams[stream_id]
+            self._forget_device_stream(stream_info.hardware_id)
+    
+    def _forget_device_stream(self, hardware_id: str) -> None:
+        remaining = self._device_streams.get(hardware_id, 0) - 1
+        if remaining > 0:
+            self._device_streams[hardware_id] = remaining
+        else:
+            # Последний стрим устройства: bucket устройства больше не нужен
+            self._device_streams.pop(hardware_id, None)
+            self._device_buckets.pop(hardware_id, None)
     
     async def release_stream(self, stream_id: str):
         """
@@ -170,38 +318,40 @@ class BackpressureManager:
         Args:
             stream_id: Идентификатор стрима
         """
-        async with self.lock:
-            # Идемпотентность: используем pop с None, чтобы не было ошибки при повторном вызове
-            stream_info = self.active_streams.pop(stream_id, None)
-            if stream_info is None:
-                # Стрим уже был освобожден - это нормально (идемпотентность)
-                logger.debug(
-                    f"Stream already released: {stream_id}",
-                    extra={
-                        'scope': 'grpc',
-                        'method': 'StreamAudio',
-                        'decision': 'stream_already_released',
-                        'ctx': {'stream_id': stream_id}
-                    }
-                )
-                return
-            
-            duration = time.time() - stream_info.start_time
-            
-            logger.info(
-                f"Stream released: {stream_id} (duration: {duration:.2f}s, messages: {stream_info.message_count})",
+        # Идемпотентность: используем pop с None, чтобы не было ошибки при повторном вызове
+        stream_info = self.active_streams.pop(stream_id, None)
+        if stream_info is None:
+            # Стрим уже был освобожден - это нормально (идемпотентность)
+            logger.debug(
+                f"Stream already released: {stream_id}",
                 extra={
                     'scope': 'grpc',
                     'method': 'StreamAudio',
-                    'decision': 'stream_released',
-                    'ctx': {
-                        'stream_id': stream_id,
-                        'duration_seconds': duration,
-                        'message_count': stream_info.message_count,
-                        'active_streams': len(self.active_streams)
-                    }
+                    'decision': 'stream_already_released',
+                    'ctx': {'stream_id': stream_id}
                 }
             )
+            return
+        self._forget_device_stream(stream_info.hardware_id)
+        if stream_info.shared_slot and self._shared_streams is not None:
+            await self._shared_streams.release()
+        
+        duration = time.time() - stream_info.start_time
+        
+        logger.info(
+            f"Stream released: {stream_id} (duration: {duration:.2f}s, messages: {stream_info.message_count})",
+            extra={
+                'scope': 'grpc',
+                'method': 'StreamAudio',
+                'decision': 'stream_released',
+                'ctx': {
+                    'stream_id': stream_id,
+                    'duration_seconds': duration,
+                    'message_count': stream_info.message_count,
+                    'active_streams': len(self.active_streams)
+                }
+            }
+        )
     
     async def check_message_rate(self, stream_id: str) -> tuple[bool, Optional[str]]:
         """
@@ -214,58 +364,84 @@ class BackpressureManager:
             (allowed, error_message)
         
         Note:
-            Если max_message_rate_per_second <= 0, rate limit отключен и всегда возвращается (True, None)
+            Если max_message_rate_per_second <= 0, лимит стрима отключен;
+            если max_message_rate_per_device <= 0 — лимит устройства отключен.
         """
-        async with self.lock:
-            if stream_id not in self.active_streams:
-                return (False, "Stream not found")
-            
-            # ОТКЛЮЧЕНИЕ RATE LIMIT: если max_message_rate_per_second <= 0, лимит отключен
-            if self.limits.max_message_rate_per_second <= 0:
-                stream_info = self.active_streams[stream_id]
-                current_time = time.time()
-                stream_info.last_message_time = current_time
-                stream_info.message_count += 1
-                return (True, None)
-            
-            stream_info = self.active_streams[stream_id]
-            current_time = time.time()
-            
-            # Очищаем старые временные метки (старше 1 секунды)
-            stream_info.message_timestamps = [
-                ts for ts in stream_info.message_timestamps
-                if current_time - ts < 1.0
-            ]
-            
-            # ПРОВЕРКА ЛИМИТА: не превышен ли max_message_rate_per_second
-            if len(stream_info.message_timestamps) >= self.limits.max_message_rate_per_second:
-                error_msg = (
-                    f"MESSAGE_RATE_EXCEEDED: Maximum message rate ({self.limits.max_message_rate_per_second} msg/s) "
-                    f"reached for stream {stream_id}"
-                )
-                logger.warning(
-                    error_msg,
-                    extra={
-                        'scope': 'grpc',
-                        'method': 'StreamAudio',
-                        'decision': 'rate_limit_exceeded',
-                        'ctx': {
-                            'stream_id': stream_id,
-                            'message_rate': len(stream_info.message_timestamps),
-                            'max_rate': self.limits.max_message_rate_per_second
-                        }
-                    }
-                )
-                return (False, error_msg)
-            
-            # Обновляем время последнего сообщения
-            stream_info.last_message_time = current_time
-            stream_info.message_count += 1
-            
-            # Добавляем текущую временную метку
-            stream_info.message_timestamps.append(current_time)
-            
-            return (True, None)
+        stream_info = self.active_streams.get(stream_id)
+        if stream_info is None:
+            return self._reject(REJECT_STREAM_NOT_FOUND, "Stream not found", stream_id=stream_id)
+        
+        now = self._clock()
+        bucket = stream_info.message_bucket
+        if bucket is not None and not bucket.try_consume(1.0, now):
+            return self._reject(
+                REJECT_MESSAGE_RATE,
+                f"Maximum message rate ({self.limits.max_message_rate_per_second} msg/s) reached for stream {stream_id}",
+                stream_id=stream_id,
+                tokens=round(bucket.tokens, 3),
+                max_rate=self.limits.max_message_rate_per_second,
+            )
+        
+        device_bucket = self._device_buckets.get(stream_info.hardware_id)
+        if device_bucket is not None and not device_bucket.try_consume(1.0, now):
+            if bucket is not None:
+                # Сообщение не ушло — возвращаем токен стриму
+                bucket.tokens += 1.0
+            return self._reject(
+                REJECT_DEVICE_RATE,
+                f"Maximum device message rate ({self.limits.max_message_rate_per_device} msg/s) "
+                f"reached for hardware {stream_info.hardware_id}",
+                stream_id=stream_id,
+                hardware_id=stream_info.hardware_id,
+                max_rate=self.limits.max_message_rate_per_device,
+            )
+        
+        # Обновляем время последнего сообщения
+        stream_info.last_message_time = time.time()
+        stream_info.message_count += 1
+        
+        return (True, None)
+    
+    async def check_audio_rate(self, stream_id: str, audio_bytes: int, bytes_per_second: int) -> tuple[bool, Optional[str]]:
+        """
+        Проверка rate limit для аудио по длительности, а не по числу сообщений
+        
+        TTS отдаёт аудио фрагментами произвольного размера; счёт сообщений
+        обрывал ответ посреди предложения при мелких фрагментах. Здесь
+        bucket стрима расходуется секундами аудио.
+        
+        Args:
+            stream_id: Идентификатор стрима
+            audio_bytes: Размер PCM фрагмента
+            bytes_per_second: Байт PCM на секунду аудио (sample_rate × channels × 2)
+        
+        Returns:
+            (allowed, error_message)
+        
+        Note:
+            Если max_audio_sec_per_second <= 0, лимит отключен и всегда возвращается (True, None)
+        """
+        stream_info = self.active_streams.get(stream_id)
+        if stream_info is None:
+            return self._reject(REJECT_STREAM_NOT_FOUND, "Stream not found", stream_id=stream_id)
+        
+        audio_sec = audio_bytes / float(bytes_per_second) if bytes_per_second > 0 else 0.0
+        bucket = stream_info.audio_bucket
+        if bucket is not None and not bucket.try_consume(audio_sec, self._clock()):
+            return self._reject(
+                REJECT_AUDIO_RATE,
+                f"Maximum audio rate ({self.limits.max_audio_sec_per_second} audio-sec/s) reached for stream {stream_id}",
+                stream_id=stream_id,
+                audio_sec=round(audio_sec, 3),
+                tokens=round(bucket.tokens, 3),
+                max_audio_sec_per_second=self.limits.max_audio_sec_per_second,
+            )
+        
+        stream_info.last_message_time = time.time()
+        stream_info.audio_bytes += audio_bytes
+        stream_info.audio_seconds += audio_sec
+        
+        return (True, None)
     
     async def _cleanup_idle_streams(self):
         """Фоновая задача для очистки неактивных стримов (идемпотентно)"""
@@ -274,39 +450,37 @@ class BackpressureManager:
                 await asyncio.sleep(30)  # Проверяем каждые 30 секунд
                 
                 current_time = time.time()
-                idle_streams = []
+                idle_streams = [
+                    (stream_id, stream_info)
+                    for stream_id, stream_info in self.active_streams.items()
+                    if current_time - stream_info.last_message_time > self.limits.idle_timeout_seconds
+                ]
                 
-                async with self.lock:
-                    for stream_id, stream_info in list(self.active_streams.items()):
-                        idle_time = current_time - stream_info.last_message_time
-                        
-                        if idle_time > self.limits.idle_timeout_seconds:
-                            idle_streams.append((stream_id, stream_info))
+                # Удаляем неактивные стримы (идемпотентно: используем pop)
+                for stream_id, stream_info in idle_streams:
+                    # Идемпотентность: проверяем, что стрим еще существует
+                    if self.active_streams.pop(stream_id, None) is None:
+                        continue
+                    self._forget_device_stream(stream_info.hardware_id)
+                    if stream_info.shared_slot and self._shared_streams is not None:
+                        await self._shared_streams.release()
                     
-                    # Удаляем неактивные стримы (идемпотентно: используем pop)
-                    for stream_id, stream_info in idle_streams:
-                        # Идемпотентность: проверяем, что стрим еще существует
-                        if stream_id not in self.active_streams:
-                            continue
-                        
-                        idle_time = current_time - stream_info.last_message_time
-                        self.active_streams.pop(stream_id, None)
-                        
-                        logger.warning(
-                            f"Stream closed due to idle timeout: {stream_id} (idle: {idle_time:.2f}s)",
-                            extra={
-                                'scope': 'grpc',
-                                'method': 'StreamAudio',
-                                'decision': 'stream_idle_timeout',
-                                'ctx': {
-                                    'stream_id': stream_id,
-                                    'hardware_id': stream_info.hardware_id,
-                                    'idle_time_seconds': idle_time,
-                                    'active_streams': len(self.active_streams)
-                                }
+                    idle_time = current_time - stream_info.last_message_time
+                    logger.warning(
+                        f"Stream closed due to idle timeout: {stream_id} (idle: {idle_time:.2f}s)",
+                        extra={
+                            'scope': 'grpc',
+                            'method': 'StreamAudio',
+                            'decision': 'stream_idle_timeout',
+                            'ctx': {
+                                'stream_id': stream_id,
+                                'hardware_id': stream_info.hardware_id,
+                                'idle_time_seconds': idle_time,
+                                'active_streams': len(self.active_streams)
                             }
-                        )
-                
+                        }
+                    )
+            
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -320,9 +494,13 @@ class BackpressureManager:
         """Получение статистики"""
         return {
             'active_streams': len(self.active_streams),
+            'active_devices': len(self._device_streams),
             'max_concurrent_streams': self.limits.max_concurrent_streams,
             'idle_timeout_seconds': self.limits.idle_timeout_seconds,
-            'max_message_rate_per_second': self.limits.max_message_rate_per_second
+            'max_message_rate_per_second': self.limits.max_message_rate_per_second,
+            'max_message_rate_per_device': self.limits.max_message_rate_per_device,
+            'max_audio_sec_per_second': self.limits.max_audio_sec_per_second,
+            'rejections': dict(self.rejections),
         }
 
 
@@ -0,0 +1,100 @@
+"""
+Слияние COLLECT чанков partial STT в один канонический промпт
+
+Клиент присылает чанки в двух семантиках: полный снимок (incoming
+начинается с уже накопленного текста) или дельта (добавляется хвост,
+возможно с перекрытием). Перекрытие дельты раньше искалось перебором
+`existing.endswith(incoming[:i])` для i от min(len) до 1 — O(n²) на чанк.
+
+Здесь перекрытие считается префикс-функцией (KMP) за O(m), m = len(incoming):
+перекрытие не длиннее incoming, поэтому сканируется только хвост
+накопленного текста той же длины, и стоимость чанка не растёт с длиной
+диктовки.
+
+Для коротких окон перебор остаётся: endswith — это memcmp на C, и до
+нескольких тысяч символов он быстрее цикла KMP на Python даже в худшем
+случае (см. scripts/bench_chunk_merge.py). Квадратичный рост отсечён
+порогом _KMP_MIN_WINDOW.
+"""
+
+from typing import List
+
+# Окно перекрытия, начиная с которого используется KMP вместо перебора
+_KMP_MIN_WINDOW = 4096
+
+
+def prefix_function(pattern: str) -> List[int]:
+    """pi[i] — длина наибольшего собственного префикса pattern[:i + 1], совпадающего с его суффиксом"""
+    pi = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        ch = pattern[i]
+        while k and pattern[k] != ch:
+            k = pi[k - 1]
+        if pattern[k] == ch:
+            k += 1
+        pi[i] = k
+    return pi
+
+
+def suffix_prefix_overlap(existing: str, incoming: str) -> int:
+    """
+    Наибольшее k, при котором existing оканчивается на incoming[:k].
+
+    KMP-автомат по incoming прогоняется по последним min(len) символам
+    existing; итоговое состояние и есть искомое перекрытие. O(len(incoming)).
+    """
+    m = min(len(existing), len(incoming))
+    if m == 0:
+        return 0
+    pattern = incoming[:m]
+    pi = prefix_function(pattern)
+    k = 0
+    # Окно длины m: полное совпадение (k == m) возможно только на последнем символе
+    for ch in existing[len(existing) - m:]:
+        while k and pattern[k] != ch:
+            k = pi[k - 1]
+        if pattern[k] == ch:
+            k += 1
+    return k
+
+
+def merge_chunk_text(existing: str, incoming: str) -> str:
+    """Merge collect chunks into one canonical prompt.
+
+    Supports both chunk semantics:
+    - full snapshot chunks (incoming startswith existing);
+    - delta chunks (append with suffix/prefix overlap dedup).
+    """
+    existing = existing or ""
+    incoming = incoming or ""
+
+    if incoming == "":
+        return existing
+    if existing == "":
+        return incoming
+    if incoming == existing:
+        return existing
+
+    # Snapshot growth path: new chunk already contains full previous text.
+    if incoming.startswith(existing):
+        return incoming
+    if existing.startswith(incoming):
+        return existing
+    if incoming in existing:
+        return existing
+    if existing in incoming:
+        return incoming
+
+    # Delta path: append only non-overlapping tail.
+    return existing + incoming[_overlap(existing, incoming):]
+
+
+def _overlap(existing: str, incoming: str) -> int:
+    max_overlap = min(len(existing), len(incoming))
+    if max_overlap >= _KMP_MIN_WINDOW:
+        return suffix_prefix_overlap(existing, incoming)
+    for i in range(max_overlap, 0, -1):
+        if existing.endswith(incoming[:i]):
+            return i
+    return 0
@@ -0,0 +1,301 @@
+"""
+Хранилище COLLECT буфера StreamAudio
+
+Раньше буфер был обычным dict под одним глобальным asyncio.Lock, а записи
+удалялись только на COMMIT: брошенные реплики (вместе со скриншотами —
+мегабайты base64) жили до рестарта процесса.
+
+Хранилище:
+- блокировки шардированы по ключу (hardware_id, session_id) — потоки разных
+  сессий не ждут друг друга
+- запись истекает по TTL простоя (ленивая проверка + фоновая очистка)
+- общий объём ограничен бюджетом байт, при превышении вытесняется
+  давно не обновлявшаяся запись (LRU)
+- на одно устройство не больше max_entries_per_device записей
+- публикует метрики: живые записи, удерживаемые байты, вытеснения по причинам
+"""
+
+import asyncio
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.metrics_collector import record_decision_metric
+
+logger = logging.getLogger(__name__)
+
+CollectKey = Tuple[str, str]
+CollectEntry = Dict[str, Any]
+
+# Накладные расходы записи сверх текста и скриншота (dict, ключи, числа)
+_ENTRY_OVERHEAD_BYTES = 256
+
+EVICT_TTL = "ttl"
+EVICT_BYTES = "bytes"
+EVICT_DEVICE_CAP = "device_cap"
+
+
+class CollectBufferStore:
+    """COLLECT буфер: шардированные блокировки, TTL, бюджет байт с LRU, лимит на устройство"""
+
+    def __init__(
+        self,
+        ttl_sec: float = 60.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries_per_device: int = 4,
+        shards: int = 64,
+        on_evict: Optional[Callable[[CollectEntry, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl_sec: Время жизни записи без обновлений
+            max_bytes: Бюджет байт на все записи (0 — без ограничения)
+            max_entries_per_device: Записей (сессий) на один hardware_id
+            shards: Число шардов блокировок
+            on_evict: Вызывается для вытесненной записи (entry, reason)
+            clock: Источник времени (для тестов)
+        """
+        self.ttl_sec = max(0.0, float(ttl_sec))
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries_per_device = max(1, int(max_entries_per_device))
+        self._on_evict = on_evict
+        self._clock = clock
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(max(1, int(shards)))]
+
+        # Порядок OrderedDict = порядок последнего обновления (голова — самая старая)
+        self._entries: "OrderedDict[CollectKey, CollectEntry]" = OrderedDict()
+        self._sizes: Dict[CollectKey, int] = {}
+        self._touched_at: Dict[CollectKey, float] = {}
+        self._by_device: Dict[str, "OrderedDict[CollectKey, None]"] = {}
+        self._bytes = 0
+
+        self._sweeper: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.created = 0
+        self.consumed = 0
+        self.peak_entries = 0
+        self.peak_bytes = 0
+        self.evictions: Dict[str, int] = {EVICT_TTL: 0, EVICT_BYTES: 0, EVICT_DEVICE_CAP: 0}
+
+    # ------------------------------------------------------------------
+    # Доступ к записям
+    # ------------------------------------------------------------------
+
+    def lock(self, key: CollectKey) -> asyncio.Lock:
+        """Блокировка шарда, которому принадлежит ключ"""
+        shard = zlib.crc32(f"{key[0]}\x00{key[1]}".encode("utf-8")) % len(self._locks)
+        return self._locks[shard]
+
+    def get_or_create(
+        self,
+        key: CollectKey,
+        factory: Callable[[], CollectEntry],
+    ) -> Tuple[CollectEntry, bool]:
+        """
+        Запись по ключу или новая из factory().
+
+        Returns:
+            (entry, created)
+        """
+        self.sweep()
+        entry = self.get(key)
+        if entry is not None:
+            return entry, False
+
+        hardware_id = key[0]
+        device_keys = self._by_device.setdefault(hardware_id, OrderedDict())
+        while len(device_keys) >= self.max_entries_per_device:
+            oldest_key = next(iter(device_keys))
+            self._evict(oldest_key, EVICT_DEVICE_CAP)
+
+        entry = factory()
+        self._entries[key] = entry
+        self._by_device.setdefault(hardware_id, OrderedDict())[key] = None
+        self._sizes[key] = 0
+        self._touched_at[key] = self._clock()
+        self.created += 1
+        self.touch(key)
+        return entry, True
+
+    def get(self, key: CollectKey) -> Optional[CollectEntry]:
+        """Живая запись или None (истёкшая вытесняется)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(key, self._clock()):
+            self._evict(key, EVICT_TTL)
+            return None
+        return entry
+
+    def touch(self, key: CollectKey) -> None:
+        """Запись изменена: пересчёт размера, продление TTL, LRU и бюджет байт"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        size = self._entry_size(entry)
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._touched_at[key] = self._clock()
+        self._entries.move_to_end(key)
+        self._by_device[key[0]].move_to_end(key)
+
+        if self.max_bytes:
+            # Вытесняем самые старые записи; текущую не трогаем, даже если она одна больше бюджета
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_key = next(iter(self._entries))
+                if oldest_key == key:
+                    break
+                self._evict(oldest_key, EVICT_BYTES)
+
+        self.peak_entries = max(self.peak_entries, len(self._entries))
+        self.peak_bytes = max(self.peak_bytes, self._bytes)
+
+    def pop(self, key: CollectKey) -> Optional[CollectEntry]:
+        """Забрать запись (COMMIT); истёкшая не возвращается"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        self._remove(key)
+        self.consumed += 1
+        return entry
+
+    def sweep(self) -> int:
+        """Вытеснить истёкшие записи; голова LRU — самые старые, поэтому O(истёкших)"""
+        if not self.ttl_sec:
+            return 0
+        now = self._clock()
+        expired = 0
+        while self._entries:
+            oldest_key = next(iter(self._entries))
+            if not self._expired(oldest_key, now):
+                break
+            self._evict(oldest_key, EVICT_TTL)
+            expired += 1
+        return expired
+
+    def clear(self) -> List[CollectEntry]:
+        """Удалить все записи; возвращает удалённые"""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        self._sizes.clear()
+        self._touched_at.clear()
+        self._by_device.clear()
+        self._bytes = 0
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: CollectKey) -> CollectEntry:
+        return self._entries[key]
+
+    def values(self) -> Iterator[CollectEntry]:
+        return iter(list(self._entries.values()))
+
+    # ------------------------------------------------------------------
+    # Фоновая очистка
+    # ------------------------------------------------------------------
+
+    def start(self, interval_sec: Optional[float] = None, stats_interval_sec: float = 60.0) -> None:
+        """Запуск фоновой очистки истёкших записей (и периодического лога метрик)"""
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        interval = interval_sec or max(1.0, self.ttl_sec / 2)
+        self._sweeper = asyncio.create_task(self._sweep_loop(interval, stats_interval_sec))
+
+    async def stop(self) -> None:
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+
+    async def _sweep_loop(self, interval_sec: float, stats_interval_sec: float) -> None:
+        last_stats = self._clock()
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                self.sweep()
+                now = self._clock()
+                if now - last_stats >= stats_interval_sec:
+                    last_stats = now
+                    logger.info("Collect buffer stats", extra={
+                        'scope': 'grpc',
+                        'method': 'CollectBufferStore',
+                        'decision': 'collect_buffer',
+                        'ctx': self.get_stats(),
+                    })
+            except Exception as e:
+                logger.warning(f"⚠️ CollectBufferStore: ошибка фоновой очистки: {e}")
+
+    # ------------------------------------------------------------------
+    # Внутреннее
+    # ------------------------------------------------------------------
+
+    def _expired(self, key: CollectKey, now: float) -> bool:
+        return bool(self.ttl_sec) and now - self._touched_at.get(key, now) > self.ttl_sec
+
+    def _remove(self, key: CollectKey) -> Optional[CollectEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= self._sizes.pop(key, 0)
+        self._touched_at.pop(key, None)
+        device_keys = self._by_device.get(key[0])
+        if device_keys is not None:
+            device_keys.pop(key, None)
+            if not device_keys:
+                self._by_device.pop(key[0], None)
+        return entry
+
+    def _evict(self, key: CollectKey, reason: str) -> None:
+        entry = self._remove(key)
+        if entry is None:
+            return
+        self.evictions[reason] += 1
+        record_decision_metric("collect_buffer", f"evict_{reason}")
+        logger.debug(
+            "COLLECT buffer evict: reason=%s hardware=%s session=%s",
+            reason,
+            key[0],
+            key[1],
+        )
+        if self._on_evict is not None:
+            try:
+                self._on_evict(entry, reason)
+            except Exception as e:
+                logger.warning(f"⚠️ CollectBufferStore: ошибка on_evict: {e}")
+
+    @staticmethod
+    def _entry_size(entry: CollectEntry) -> int:
+        size = _ENTRY_OVERHEAD_BYTES + len(entry.get("chunk_text") or "")
+        screenshot = entry.get("screenshot")
+        if screenshot:
+            size += len(screenshot)
+        return size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики буфера: живые записи, удерживаемые байты, вытеснения"""
+        return {
+            'entries': len(self._entries),
+            'devices': len(self._by_device),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'peak_entries': self.peak_entries,
+            'peak_bytes': self.peak_bytes,
+            'created': self.created,
+            'consumed': self.consumed,
+            'evicted_ttl': self.evictions[EVICT_TTL],
+            'evicted_bytes': self.evictions[EVICT_BYTES],
+            'evicted_device_cap': self.evictions[EVICT_DEVICE_CAP],
+        }
@@ -15,7 +15,8 @@ import time
 import sys
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional, AsyncGenerator
+from pathlib import Path
+from typing import Dict, Any, Optional, AsyncGenerator, AsyncIterator, Set
 
 from config.unified_config import get_config
 
@@ -28,8 +29,20 @@ from .. import streaming_pb2_grpc  # type: ignore
 
 # Импорт новых модулей
 from .grpc_service_manager import GrpcServiceManager
+from .welcome_audio_store import WelcomeAudioStore, WelcomeVariant
+from .collect_buffer_store import CollectBufferStore
+from .chunk_text_merge import merge_chunk_text
+from .audio_framing import AudioResponseFramer, audio_chunk_message
+from .audio_codec import (
+    CODEC_PCM_S16LE,
+    EncodedAudio,
+    configure_audio_encoder_executor,
+    create_audio_encoder,
+)
 
+from integrations.core.cancellation import get_cancellation_registry
 from monitoring import record_request, set_active_connections, get_metrics, get_status
+from utils.metrics_collector import record_metric
 
 # Структурированное логирование (PR-4)
 from utils.logging_formatter import (
@@ -79,12 +92,121 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         # Флаг инициализации
         self.is_initialized = False
         # Collect buffer: единый owner-path для phase=COLLECT.
-        # Key: (hardware_id, session_id)
-        self._collect_buffer: dict[tuple[str, str], dict[str, Any]] = {}
-        self._collect_lock = asyncio.Lock()
+        # Key: (hardware_id, session_id); TTL, бюджет байт и лимит на устройство
+        grpc_config = get_config().grpc
+        self._collect_buffer = CollectBufferStore(
+            ttl_sec=grpc_config.collect_buffer_ttl_sec,
+            max_bytes=grpc_config.collect_buffer_max_bytes,
+            max_entries_per_device=grpc_config.collect_buffer_max_per_device,
+            shards=grpc_config.collect_buffer_shards,
+            on_evict=lambda entry, reason: self._discard_prewarm(entry),
+        )
+        # COLLECT pre-warm: первый COLLECT сессии прогревает то, что понадобится COMMIT
+        workflow_config = get_config().workflow
+        self._prewarm_enabled = bool(workflow_config.collect_prewarm_enabled)
+        self._prewarm_ttl_sec = float(workflow_config.collect_prewarm_ttl_sec)
+        self._prewarm_stats: Dict[str, int] = {
+            'started': 0,
+            'used': 0,
+            'pending_at_commit': 0,
+            'expired': 0,
+        }
+        # Предрасчитанное приветствие (рендер при старте, отдача из mmap)
+        self._welcome_store = self._create_welcome_store()
+        configure_audio_encoder_executor(get_config().audio.audio_encoder_workers)
 
         logger.info("✅ Новый gRPC сервер создан")
 
+    def _create_welcome_store(self) -> WelcomeAudioStore:
+        audio_config = get_config().audio
+        storage_dir = audio_config.welcome_audio_dir or str(
+            Path(__file__).resolve().parents[3] / 'cache' / 'welcome_audio'
+        )
+        return WelcomeAudioStore(
+            render=self._render_welcome,
+            storage_dir=storage_dir,
+            sample_rate=audio_config.sample_rate,
+            channels=audio_config.channels,
+            bytes_per_sample=max(1, audio_config.bits_per_sample // 8),
+            fingerprint_provider=self._welcome_voice_fingerprint,
+            variants=self._welcome_variants(),
+        )
+
+    @staticmethod
+    def _welcome_variants() -> list[WelcomeVariant]:
+        """Дефолтное приветствие + настроенные варианты по языку/голосу"""
+        audio_config = get_config().audio
+        variants = [WelcomeVariant(text=audio_config.welcome_text)]
+        for item in audio_config.welcome_variants or []:
+            if isinstance(item, dict) and item.get('text'):
+                variants.append(WelcomeVariant(
+                    text=item['text'],
+                    voice=item.get('voice') or None,
+                    language=item.get('language') or None,
+                ))
+        return variants
+
+    def _welcome_voice_fingerprint(self) -> str:
+        audio_module = self.grpc_service_manager._get_module('audio_generation')
+        get_fingerprint = getattr(audio_module, 'get_voice_fingerprint', None)
+        return get_fingerprint() if callable(get_fingerprint) else ""
+
+    @staticmethod
+    def _create_stream_encoder(request: Any, sample_rate: int, channels: int, coalesce_ms: int = 0):
+        """Энкодер по запрошенному клиентом кодеку (PCM по умолчанию)"""
+        audio_config = get_config().audio
+        return create_audio_encoder(
+            int(getattr(request, 'audio_codec', CODEC_PCM_S16LE)),
+            sample_rate,
+            channels,
+            frame_ms=audio_config.opus_frame_ms,
+            bitrate=audio_config.opus_bitrate,
+            coalesce_ms=coalesce_ms,
+        )
+
+    @staticmethod
+    def _audio_chunk_message(encoded: EncodedAudio, dtype: str, sample_rate: int, channels: int):
+        """AudioChunk для закодированного фрагмента (dtype='opus' для Opus пакетов)"""
+        return audio_chunk_message(encoded, dtype, sample_rate, channels)
+
+    @staticmethod
+    def _extract_audio_chunk(result: Any) -> Optional[bytes]:
+        # Может быть {"audio": bytes, "type": "audio_chunk"} или bytes
+        if isinstance(result, dict):
+            return result.get("audio") or result.get("audio_chunk")
+        if isinstance(result, bytes):
+            return result
+        return None
+
+    async def _render_welcome(
+        self,
+        text: str,
+        voice: Optional[str],
+        cacheable: Optional[bool] = None
+    ) -> AsyncIterator[bytes]:
+        """Синтез приветствия через audio_generation модуль (cacheable=False — мимо кэша TTS)"""
+        audio_module = self.grpc_service_manager._get_module('audio_generation')
+        if not audio_module:
+            raise Exception("Audio generation module not available")
+
+        request: Dict[str, Any] = {"text": text}
+        if voice:
+            request["voice"] = voice
+        if cacheable is not None:
+            request["cache"] = cacheable
+        # audio_module.process - async функция, возвращает AsyncIterator[Dict[str, Any]]
+        process_result = await audio_module.process(request)
+        if hasattr(process_result, '__aiter__'):
+            async for result in process_result:
+                audio_chunk = self._extract_audio_chunk(result)
+                if audio_chunk:
+                    yield audio_chunk
+        else:
+            logger.warning("⚠️ GenerateWelcomeAudio: process returned non-iterator, treating as single result")
+            audio_chunk = self._extract_audio_chunk(process_result)
+            if audio_chunk:
+                yield audio_chunk
+
     @staticmethod
     def _phase_name(phase_value: int) -> str:
         if phase_value == streaming_pb2.REQUEST_PHASE_COLLECT:
@@ -95,40 +217,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
 
     @staticmethod
     def _merge_chunk_text(existing: str, incoming: str) -> str:
-        """Merge collect chunks into one canonical prompt.
-
-        Supports both chunk semantics:
-        - full snapshot chunks (incoming startswith existing);
-        - delta chunks (append with suffix/prefix overlap dedup).
-        """
-        existing = existing or ""
-        incoming = incoming or ""
-
-        if incoming == "":
-            return existing
-        if existing == "":
-            return incoming
-        if incoming == existing:
-            return existing
-
-        # Snapshot growth path: new chunk already contains full previous text.
-        if incoming.startswith(existing):
-            return incoming
-        if existing.startswith(incoming):
-            return existing
-        if incoming in existing:
-            return existing
-        if existing in incoming:
-            return incoming
-
-        # Delta path: append only non-overlapping tail.
-        max_overlap = min(len(existing), len(incoming))
-        overlap = 0
-        for i in range(max_overlap, 0, -1):
-            if existing.endswith(incoming[:i]):
-                overlap = i
-                break
-        return existing + incoming[overlap:]
+        """Merge collect chunks into one canonical prompt (snapshot or delta semantics)."""
+        return merge_chunk_text(existing, incoming)
 
     async def _handle_collect_phase(
         self,
@@ -147,10 +237,10 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         incoming_width = request.screen_width if request.HasField("screen_width") else None
         incoming_height = request.screen_height if request.HasField("screen_height") else None
 
-        async with self._collect_lock:
-            entry = self._collect_buffer.setdefault(
+        async with self._collect_buffer.lock(key):
+            entry, is_first_collect = self._collect_buffer.get_or_create(
                 key,
-                {
+                lambda: {
                     "chunk_seq": -1,
                     "chunk_text": "",
                     "chunk_count": 0,
@@ -185,6 +275,10 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 if incoming_height is not None:
                     entry["screen_height"] = incoming_height
                 entry["updated_at"] = now
+                self._collect_buffer.touch(key)
+
+            if is_first_collect:
+                self._start_prewarm(key, entry)
 
         log_decision(
             logger,
@@ -200,17 +294,95 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         )
         return streaming_pb2.StreamResponse(end_message="COLLECT_ACCEPTED")  # type: ignore
 
+    def _start_prewarm(self, key: tuple[str, str], entry: Dict[str, Any]) -> None:
+        """Фоновый прогрев COMMIT; результат живёт в collect entry до TTL (вызывается под блокировкой ключа)"""
+        workflow = self.grpc_service_manager.streaming_workflow
+        if not self._prewarm_enabled or workflow is None or not hasattr(workflow, 'prewarm'):
+            return
+        hardware_id, session_id = key
+        warmup = workflow.prewarm(hardware_id)
+        if not asyncio.iscoroutine(warmup):
+            return
+        task = asyncio.create_task(warmup)
+        # Фоновая ошибка не должна всплывать как "Task exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        entry["prewarm_task"] = task
+        entry["prewarm_expires_at"] = time.time() + self._prewarm_ttl_sec
+        entry["prewarm_expiry"] = asyncio.get_running_loop().call_later(
+            self._prewarm_ttl_sec, self._expire_prewarm, key, task
+        )
+        self._prewarm_stats['started'] += 1
+        logger.debug("COLLECT prewarm started: session=%s hardware=%s", session_id, hardware_id)
+
+    def _expire_prewarm(self, key: tuple[str, str], task: asyncio.Task) -> None:
+        """TTL прогрева истёк до COMMIT: результат отбрасывается"""
+        entry = self._collect_buffer.get(key)
+        if entry is None or entry.get("prewarm_task") is not task:
+            return
+        self._discard_prewarm(entry)
+        self._prewarm_stats['expired'] += 1
+
+    @staticmethod
+    def _discard_prewarm(entry: Dict[str, Any]) -> None:
+        task = entry.pop("prewarm_task", None)
+        if task is not None and not task.done():
+            task.cancel()
+        expiry = entry.pop("prewarm_expiry", None)
+        if expiry is not None:
+            expiry.cancel()
+        entry.pop("prewarm_expires_at", None)
+
+    def _take_prewarm(self, collect_entry: Optional[Dict[str, Any]]) -> tuple[Optional[Dict[str, Any]], str]:
+        """
+        Результат прогрева для COMMIT.
+
+        Returns:
+            (результат или None, состояние: prewarmed | pending | cold)
+        """
+        if not collect_entry:
+            return None, "cold"
+        task = collect_entry.get("prewarm_task")
+        expires_at = collect_entry.get("prewarm_expires_at") or 0.0
+        expiry = collect_entry.pop("prewarm_expiry", None)
+        if expiry is not None:
+            expiry.cancel()
+        if task is None or time.time() > expires_at:
+            return None, "cold"
+        if not task.done():
+            # Прогрев не отменяется: его загрузки делят single-flight с запросами COMMIT
+            self._prewarm_stats['pending_at_commit'] += 1
+            return None, "pending"
+        if task.cancelled() or task.exception() is not None:
+            return None, "cold"
+        self._prewarm_stats['used'] += 1
+        return task.result(), "prewarmed"
+
+    def get_prewarm_stats(self) -> Dict[str, Any]:
+        """Статистика COLLECT pre-warm"""
+        stats: Dict[str, Any] = dict(self._prewarm_stats)
+        stats['enabled'] = self._prewarm_enabled
+        stats['ttl_sec'] = self._prewarm_ttl_sec
+        return stats
+
+    @staticmethod
+    def _record_commit_to_first_audio(commit_started: float, prewarm_state: str) -> float:
+        """Метрика commit → первый аудио-чанк, раздельно для прогретых и холодных COMMIT"""
+        elapsed_ms = (time.time() - commit_started) * 1000
+        record_metric(f"commit_to_first_audio_{'prewarmed' if prewarm_state == 'prewarmed' else 'cold'}", elapsed_ms)
+        return elapsed_ms
+
     async def _consume_collect_for_commit(
         self,
         request: streaming_pb2.StreamRequest,
         *,
         hardware_id: str,
         session_id: str,
-    ) -> tuple[str, str, Optional[int], Optional[int]]:
+    ) -> tuple[str, str, Optional[int], Optional[int], Optional[Dict[str, Any]], str]:
         """COMMIT owner-path: atomically consume collect buffer and merge payload."""
         key = (hardware_id, session_id)
-        async with self._collect_lock:
-            collect_entry = self._collect_buffer.pop(key, None)
+        async with self._collect_buffer.lock(key):
+            collect_entry = self._collect_buffer.pop(key)
+        prewarm, prewarm_state = self._take_prewarm(collect_entry)
 
         prompt = request.prompt or ""
         screenshot = request.screenshot if request.HasField("screenshot") else ""
@@ -235,16 +407,17 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 screen_height = collect_entry.get("screen_height")
 
         logger.info(
-            "COMMIT merge: session=%s hardware=%s collect_chunks=%s collect_text_len=%s commit_prompt_len=%s final_prompt_len=%s",
+            "COMMIT merge: session=%s hardware=%s collect_chunks=%s collect_text_len=%s commit_prompt_len=%s final_prompt_len=%s prewarm=%s",
             session_id,
             hardware_id,
             collect_chunk_count,
             collect_text_len,
             commit_prompt_len,
             len(prompt),
+            prewarm_state,
         )
 
-        return prompt, screenshot, screen_width, screen_height
+        return prompt, screenshot, screen_width, screen_height, prewarm, prewarm_state
     
     async def initialize(self):
         """Инициализация всех модулей"""
@@ -259,6 +432,11 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             config = {}  # Конфигурация будет получена из unified_config внутри менеджера
             await self.grpc_service_manager.initialize(config)
 
+            # Приветствие рендерится в фоне и не задерживает старт
+            self._welcome_store.schedule_prerender(self._welcome_variants())
+            # Фоновая очистка брошенных COLLECT реплик
+            self._collect_buffer.start()
+
             self.is_initialized = True
             logger.info("🎉 Новый gRPC сервер полностью инициализирован")
             return True
@@ -272,12 +450,15 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         try:
             logger.info("🧹 Очистка ресурсов нового сервера...")
             
+            await self._welcome_store.close()
+
             if self.is_initialized:
                 # Очищаем gRPC Service Manager
                 await self.grpc_service_manager.cleanup()
                 logger.info("✅ gRPC Service Manager очищен")
-            async with self._collect_lock:
-                self._collect_buffer.clear()
+            await self._collect_buffer.stop()
+            for entry in self._collect_buffer.clear():
+                self._discard_prewarm(entry)
             
             self.is_initialized = False
             logger.info("✅ Новый сервер полностью очищен")
@@ -351,7 +532,136 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             record_request(time.time() - start_time, is_error=True)
             return
 
-        commit_prompt, commit_screenshot, commit_screen_width, commit_screen_height = (
+        async for response in self._stream_commit(
+            request,
+            context,
+            hardware_id=hardware_id,
+            session_id=session_id,
+            phase_name=phase_name,
+            start_time=start_time,
+        ):
+            yield response
+
+    async def Converse(
+        self,
+        request_iterator: AsyncIterator[streaming_pb2.StreamRequest],  # type: ignore
+        context,
+    ) -> AsyncGenerator[streaming_pb2.StreamResponse, None]:  # type: ignore
+        """
+        Bidi-стрим реплики: COLLECT чанки и COMMIT в одном вызове.
+
+        Вместо отдельного вызова StreamAudio на каждый partial STT — один
+        HTTP/2 стрим. COLLECT идёт тем же owner-path (collect buffer, merge,
+        prewarm), но без подтверждения; COMMIT стримит ответ через общий
+        _stream_commit. hardware_id/session_id достаточно передать в первом
+        сообщении реплики; после end_message вызов может нести следующую
+        реплику (с новым session_id). Ошибка завершает вызов.
+        """
+        hardware_id = ""
+        session_id = ""
+        # Реплики с COLLECT без COMMIT: их буферы освобождаются, не дожидаясь TTL
+        pending_keys: Set[tuple[str, str]] = set()
+        utterances = 0
+        try:
+            async for request in request_iterator:
+                start_time = time.time()
+                hardware_id = request.hardware_id or hardware_id
+                session_id = request.session_id or session_id
+
+                error_msg = self._identifier_error(hardware_id, session_id)
+                if error_msg is None:
+                    phase = int(getattr(request, "phase", streaming_pb2.REQUEST_PHASE_UNSPECIFIED))
+                    phase_name = self._phase_name(phase)
+                    if phase not in (
+                        streaming_pb2.REQUEST_PHASE_UNSPECIFIED,
+                        streaming_pb2.REQUEST_PHASE_COLLECT,
+                        streaming_pb2.REQUEST_PHASE_COMMIT,
+                    ):
+                        error_msg = f"unsupported request phase: {phase_name}"
+                if error_msg is not None:
+                    log_rpc_error(
+                        logger,
+                        method="Converse",
+                        error_code="INVALID_ARGUMENT",
+                        error_message=error_msg,
+                        ctx={"session_id": session_id, "hardware_id": hardware_id, "utterances": utterances},
+                    )
+                    yield streaming_pb2.StreamResponse(error_message=error_msg)  # type: ignore
+                    return
+
+                key = (hardware_id, session_id)
+                # Новая реплика начата без COMMIT предыдущей: прежняя брошена
+                for abandoned in [pending for pending in pending_keys if pending != key]:
+                    pending_keys.discard(abandoned)
+                    await self._drop_collect(abandoned)
+
+                if phase == streaming_pb2.REQUEST_PHASE_COLLECT:
+                    await self._handle_collect_phase(request, hardware_id=hardware_id, session_id=session_id)
+                    pending_keys.add(key)
+                    continue
+
+                pending_keys.discard(key)
+                failed = False
+                async for response in self._stream_commit(
+                    request,
+                    context,
+                    hardware_id=hardware_id,
+                    session_id=session_id,
+                    phase_name=phase_name,
+                    start_time=start_time,
+                ):
+                    failed = failed or response.WhichOneof("content") == "error_message"
+                    yield response
+                if failed:
+                    return
+                utterances += 1
+                # Следующая реплика обязана прийти со своим session_id
+                session_id = ""
+        finally:
+            abandoned_count = len(pending_keys)
+            # Вызов закрыт без COMMIT: реплика брошена, буфер не ждёт TTL
+            for pending in pending_keys:
+                await self._drop_collect(pending)
+            log_decision(
+                logger,
+                decision="complete",
+                method="Converse",
+                ctx={"hardware_id": hardware_id, "utterances": utterances, "abandoned": abandoned_count > 0},
+            )
+
+    @staticmethod
+    def _identifier_error(hardware_id: str, session_id: str) -> Optional[str]:
+        if not hardware_id or hardware_id.strip() == "" or hardware_id.lower() == "unknown":
+            return "hardware_id is required and must be valid (not empty or 'unknown')"
+        if not _is_valid_session_id(session_id):
+            return "session_id is required and must be provided by client"
+        return None
+
+    async def _drop_collect(self, key: tuple[str, str]) -> None:
+        async with self._collect_buffer.lock(key):
+            entry = self._collect_buffer.pop(key)
+        if entry is not None:
+            self._discard_prewarm(entry)
+
+    async def _stream_commit(
+        self,
+        request: streaming_pb2.StreamRequest,
+        context,
+        *,
+        hardware_id: str,
+        session_id: str,
+        phase_name: str,
+        start_time: float,
+    ) -> AsyncGenerator[streaming_pb2.StreamResponse, None]:  # type: ignore
+        """COMMIT: workflow → text/audio/action ответы (общий путь StreamAudio и Converse)"""
+        (
+            commit_prompt,
+            commit_screenshot,
+            commit_screen_width,
+            commit_screen_height,
+            prewarm,
+            prewarm_state,
+        ) = (
             await self._consume_collect_for_commit(
                 request,
                 hardware_id=hardware_id,
@@ -365,6 +675,17 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         sample_rate = audio_config.sample_rate if audio_config else 48000
         channels = audio_config.channels if audio_config else 1
         dtype = audio_config.format if audio_config else 'int16'  # Используем dtype из конфига
+        # Кодек согласуется по запросу клиента; PCM по умолчанию.
+        # TTS фрагменты склеиваются в сообщения по audio_coalesce_ms
+        coalesce_ms = audio_config.audio_coalesce_ms if audio_config else 0
+        encoder = self._create_stream_encoder(request, sample_rate, channels, coalesce_ms=coalesce_ms)
+        audio_framer = AudioResponseFramer(
+            dtype,
+            sample_rate,
+            channels,
+            header_once=bool(getattr(request, 'audio_header_once', False)),
+            target_chunk_ms=coalesce_ms,
+        )
         
         logger.info(
             "📨 Получен StreamRequest: session=%s, hardware_id=%s, phase=%s",
@@ -381,6 +702,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         # КРИТИЧНО: Backpressure guard теперь централизован в GrpcServiceIntegration
         # Удалены дублирующие проверки acquire_stream/check_message_rate/release_stream
         
+        # Токен отмены: InterruptSession отменяет workflow стрима немедленно, не дожидаясь следующего элемента
+        cancel_token = get_cancellation_registry().open(hardware_id, session_id)
         try:
             # Увеличиваем счетчик активных соединений
             current_connections = get_metrics().get('active_connections', 0)
@@ -429,7 +752,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 'screen_width': commit_screen_width,
                 'screen_height': commit_screen_height,
                 'session_id': session_id,
-                'interrupt_flag': False  # В новом protobuf нет interrupt_flag в StreamRequest
+                'interrupt_flag': False,  # В новом protobuf нет interrupt_flag в StreamRequest
+                'prewarm': prewarm,
             }
             logger.info(
                 "🔄 Request data подготовлен: phase=%s text='%s...', screenshot_exists=%s",
@@ -442,8 +766,9 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             sent_any = False
             terminated_early = False  # Флаг раннего завершения (rate-limit после частичных данных)
             metrics_is_error: Optional[bool] = None
+            first_audio_ms: Optional[float] = None
             logger.info(f"🔄 Начинаем потоковую обработку для {session_id}")
-            async for item in self.grpc_service_manager.process(request_data):
+            async for item in cancel_token.guard(self.grpc_service_manager.process(request_data)):
                 logger.info(f"🔄 Получен item от grpc_service_manager: {list(item.keys())}")
                 
                 # КРИТИЧНО: Проверка ошибки на верхнем уровне - до обработки любых данных
@@ -547,6 +872,14 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 # Текст
                 txt = item.get('text_response')
                 if txt:
+                    # Хвост аудио предыдущего предложения уходит до текста следующего
+                    encoded = await encoder.flush()
+                    if encoded:
+                        for response in audio_framer.frame(encoded):
+                            yield response
+                        cancel_token.note_audio()
+                        if first_audio_ms is None:
+                            first_audio_ms = self._record_commit_to_first_audio(start_time, prewarm_state)
                     logger.info(f"→ StreamAudio: sending text_chunk len={len(txt)} for session={session_id}")
                     yield streaming_pb2.StreamResponse(text_chunk=txt)  # type: ignore
                     sent_any = True
@@ -555,29 +888,25 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 if isinstance(ch, (bytes, bytearray)) and len(ch) > 0:
                     logger.info(f"→ StreamAudio: sending audio_chunk bytes={len(ch)} for session={session_id}")
                     # Используем dtype из конфига (audio.format) с sample_rate и channels
-                    yield streaming_pb2.StreamResponse(  # type: ignore
-                        audio_chunk=streaming_pb2.AudioChunk(  # type: ignore
-                            audio_data=ch,
-                            dtype=dtype,
-                            shape=[],
-                            sample_rate=sample_rate,
-                            channels=channels
-                        )
-                    )
+                    encoded = await encoder.encode(ch)
+                    if encoded:
+                        for response in audio_framer.frame(encoded):
+                            yield response
+                        cancel_token.note_audio()
+                        if first_audio_ms is None:
+                            first_audio_ms = self._record_commit_to_first_audio(start_time, prewarm_state)
                     sent_any = True
                 # Список аудио-чанков (на случай, если интеграция вернёт массив)
                 for idx, chunk_data in enumerate(item.get('audio_chunks') or []):
                     if chunk_data:
                         logger.info(f"→ StreamAudio: sending audio_chunk[{idx}] bytes={len(chunk_data)} for session={session_id}")
-                        yield streaming_pb2.StreamResponse(  # type: ignore
-                            audio_chunk=streaming_pb2.AudioChunk(  # type: ignore
-                                audio_data=chunk_data,
-                                dtype=dtype,
-                                shape=[],
-                                sample_rate=sample_rate,
-                                channels=channels
-                            )
-                        )
+                        encoded = await encoder.encode(chunk_data)
+                        if encoded:
+                            for response in audio_framer.frame(encoded):
+                                yield response
+                            cancel_token.note_audio()
+                            if first_audio_ms is None:
+                                first_audio_ms = self._record_commit_to_first_audio(start_time, prewarm_state)
                         sent_any = True
                 
                 # Browser progress (browser-use automation)
@@ -701,9 +1030,20 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                     except Exception as mcp_error:
                         logger.warning(f"⚠️ Ошибка создания ActionMessage: {mcp_error}")
             
+            if cancel_token.cancelled:
+                # InterruptSession: workflow отменён, хвост аудио и end_message не отправляем
+                terminated_early = True
+
             # Завершение стрима
             # КРИТИЧНО: Не отправляем end_message при раннем завершении (terminated_early)
             if not terminated_early:
+                encoded = await encoder.flush()
+                if encoded:
+                    for response in audio_framer.frame(encoded):
+                        yield response
+                    cancel_token.note_audio()
+                    if first_audio_ms is None:
+                        first_audio_ms = self._record_commit_to_first_audio(start_time, prewarm_state)
                 # Структурированное логирование успешного завершения (PR-4)
                 dur_ms = (time.time() - start_time) * 1000
                 log_decision(
@@ -711,7 +1051,13 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                     decision="complete",
                     method="StreamAudio",
                     dur_ms=dur_ms,
-                    ctx={"session_id": session_id, "hardware_id": hardware_id, "sent_any": sent_any}
+                    ctx={
+                        "session_id": session_id,
+                        "hardware_id": hardware_id,
+                        "sent_any": sent_any,
+                        "audio_codec": encoder.get_stats(),
+                        "audio_framing": audio_framer.get_stats(encoder.get_stats().get('bytes_in', 0)),
+                    }
                 )
                 yield streaming_pb2.StreamResponse(end_message="Обработка завершена")  # type: ignore
                 metrics_is_error = False
@@ -727,10 +1073,11 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                         "session_id": session_id,
                         "hardware_id": hardware_id,
                         "sent_any": sent_any,
-                        "reason": "rate_limit_after_partial_data"
+                        "reason": "interrupted" if cancel_token.cancelled else "rate_limit_after_partial_data"
                     }
                 )
-                metrics_is_error = True
+                # Прерывание пользователем — не ошибка
+                metrics_is_error = not cancel_token.cancelled
         except grpc.RpcError as e:
             # Структурированное логирование gRPC ошибки (PR-4)
             dur_ms = (time.time() - start_time) * 1000
@@ -775,6 +1122,7 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             )
             yield response
         finally:
+            get_cancellation_registry().close(cancel_token)
             # КРИТИЧНО: Backpressure release_stream теперь централизован в GrpcServiceIntegration
             # Удалена дублирующая проверка release_stream
             
@@ -790,6 +1138,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
     async def InterruptSession(self, request: streaming_pb2.InterruptRequest, context) -> streaming_pb2.InterruptResponse:  # type: ignore
         """Обработка InterruptRequest через Interrupt Manager"""
         start_time = time.time()
+        # Момент приёма прерывания: от него считается interrupt → silence
+        received_at = time.monotonic()
         
         # КРИТИЧНО: hardware_id обязателен и валиден (не "unknown")
         hardware_id = request.hardware_id
@@ -832,7 +1182,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
 
             # Используем Interrupt Workflow для обработки прерывания
             interrupt_result = await interrupt_workflow.interrupt_session(
-                hardware_id=hardware_id
+                hardware_id=hardware_id,
+                received_at=received_at,
             )
             
             dur_ms = (time.time() - start_time) * 1000
@@ -916,7 +1267,8 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         """
         start_time = time.time()
         session_id = request.session_id or "welcome"
-        text = request.text or "Hi! Nexy is here. How can I help you?"
+        voice = request.voice or None
+        language = request.language or None
         
         # Получаем конфигурацию аудио для заполнения sample_rate, channels и dtype
         unified_config = get_config()
@@ -924,6 +1276,13 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         sample_rate = audio_config.sample_rate if audio_config else 48000
         channels = audio_config.channels if audio_config else 1
         dtype = audio_config.format if audio_config else 'int16'  # Используем dtype из конфига
+        chunk_size = audio_config.streaming_chunk_size if audio_config else 4096
+        
+        # Кэшируется только настроенный вариант; произвольный текст/голос рендерится без сохранения
+        variant = self._welcome_store.resolve(request.text, voice, language)
+        text = variant.text if variant else (request.text or (
+            audio_config.welcome_text if audio_config else "Hi! Nexy is here. How can I help you?"
+        ))
         
         # Структурированное логирование начала обработки (PR-4)
         log_decision(
@@ -934,76 +1293,43 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
         )
         
         try:
-            # Получаем audio_generation модуль через менеджер
-            audio_module = self.grpc_service_manager._get_module('audio_generation')
-            if not audio_module:
-                raise Exception("Audio generation module not available")
+            logger.info(f"🎵 GenerateWelcomeAudio: serving audio for text: '{text[:80]}...'")
             
-            logger.info(f"🎵 GenerateWelcomeAudio: generating audio for text: '{text[:80]}...'")
+            # Предрасчитанное аудио (mmap); одновременные промахи объединяются
+            if variant is not None:
+                welcome = await self._welcome_store.get(variant.text, variant.voice, variant.language)
+            else:
+                welcome = await self._welcome_store.render_uncached(text, voice)
             
             # Отправляем метаданные в начале стрима (PR-4: убрать неопределенность формата)
-            # Это позволяет клиенту знать формат аудио до получения первого chunk
+            # Это позволяет клиенту знать формат и длительность аудио до получения первого chunk
             yield streaming_pb2.WelcomeResponse(  # type: ignore
                 metadata=streaming_pb2.WelcomeMetadata(  # type: ignore
                     method="edge_tts",  # Метод генерации
-                    duration_sec=0.0,  # Будет обновлено после генерации, если доступно
+                    duration_sec=round(welcome.duration_sec, 3),
                     sample_rate=sample_rate,
                     channels=channels,
                     dtype=dtype  # Тип данных для устранения неопределенности
                 )
             )
             
-            # Генерируем аудио через модуль
-            # audio_module.process - это async функция, возвращает AsyncIterator[Dict[str, Any]]
-            # Нужно await, чтобы получить AsyncIterator
-            process_result = await audio_module.process({"text": text})
-            
-            # Инициализируем счетчик chunks
+            encoder = self._create_stream_encoder(request, sample_rate, channels)
             chunk_count = 0
-            
-            # Проверяем, является ли результат AsyncIterator
-            if hasattr(process_result, '__aiter__'):
-                async for result in process_result:
-                    # Извлекаем audio chunk из результата
-                    audio_chunk = None
-                    if isinstance(result, dict):
-                        # Может быть {"audio": bytes, "type": "audio_chunk"}
-                        audio_chunk = result.get("audio") or result.get("audio_chunk")
-                    elif isinstance(result, bytes):
-                        audio_chunk = result
-                    
-                    if audio_chunk and len(audio_chunk) > 0:
-                        chunk_count += 1
-                        logger.info(f"🎵 GenerateWelcomeAudio: sending audio_chunk #{chunk_count} bytes={len(audio_chunk)}")
-                        
-                        # Формируем WelcomeResponse с audio_chunk (PCM формат с sample_rate, channels и dtype из конфига)
-                        yield streaming_pb2.WelcomeResponse(  # type: ignore
-                            audio_chunk=streaming_pb2.AudioChunk(  # type: ignore
-                                audio_data=audio_chunk,
-                                dtype=dtype,
-                                shape=[],
-                                sample_rate=sample_rate,
-                                channels=channels
-                            )
-                        )
-            else:
-                # Если результат не AsyncIterator, обрабатываем как единичный результат
-                logger.warning("⚠️ GenerateWelcomeAudio: process returned non-iterator, treating as single result")
-                chunk_count = 0
-                audio_chunk = None
-                if isinstance(process_result, dict):
-                    audio_chunk = process_result.get("audio") or process_result.get("audio_chunk")
-                    if audio_chunk and len(audio_chunk) > 0:
-                        chunk_count = 1
-                        yield streaming_pb2.WelcomeResponse(  # type: ignore
-                            audio_chunk=streaming_pb2.AudioChunk(  # type: ignore
-                                audio_data=audio_chunk,
-                                dtype=dtype,
-                                shape=[],
-                                sample_rate=sample_rate,
-                                channels=channels
-                            )
-                        )
+            for audio_chunk in welcome.iter_chunks(chunk_size):
+                encoded = await encoder.encode(audio_chunk)
+                if not encoded:
+                    continue
+                chunk_count += 1
+                # Формируем WelcomeResponse с audio_chunk (PCM или Opus, sample_rate/channels из конфига)
+                yield streaming_pb2.WelcomeResponse(  # type: ignore
+                    audio_chunk=self._audio_chunk_message(encoded, dtype, sample_rate, channels)
+                )
+            encoded = await encoder.flush()
+            if encoded:
+                chunk_count += 1
+                yield streaming_pb2.WelcomeResponse(  # type: ignore
+                    audio_chunk=self._audio_chunk_message(encoded, dtype, sample_rate, channels)
+                )
             
             # Завершение стрима
             dur_ms = (time.time() - start_time) * 1000
@@ -1012,7 +1338,11 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
                 decision="complete",
                 method="GenerateWelcomeAudio",
                 dur_ms=dur_ms,
-                ctx={"session_id": session_id, "chunks_sent": chunk_count}
+                ctx={
+                    "session_id": session_id,
+                    "chunks_sent": chunk_count,
+                    "duration_sec": round(welcome.duration_sec, 3),
+                }
             )
             
             yield streaming_pb2.WelcomeResponse(end_message="Welcome audio generation completed")  # type: ignore
@@ -1056,7 +1386,7 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
             from integrations.core.token_usage_tracker import TokenUsageTracker
             token_tracker = TokenUsageTracker()
             
-            token_tracker.record_usage(
+            await token_tracker.record_usage_async(
                 hardware_id=hardware_id,
                 source=source,
                 input_tokens=request.input_tokens,
@@ -1076,14 +1406,21 @@ class NewStreamingServicer(streaming_pb2_grpc.StreamingServiceServicer):
 async def run_server(
     host: Optional[str] = None,
     port: Optional[int] = None,
-    max_workers: Optional[int] = None
+    max_workers: Optional[int] = None,
+    reuse_port: bool = False
 ):
-    """Запуск оптимизированного gRPC сервера для 100 пользователей"""
+    """
+    Запуск оптимизированного gRPC сервера для 100 пользователей
+
+    reuse_port=True — процесс-воркер супервизора: порт слушают несколько
+    процессов (SO_REUSEPORT), ядро распределяет соединения между ними.
+    """
     unified_config = get_config()
     cfg = unified_config.grpc if hasattr(unified_config, 'grpc') else None
     resolved_host = host or (cfg.host if cfg else '0.0.0.0')
     resolved_port = port or (cfg.port if cfg else 50051)
     resolved_workers = max_workers or (cfg.max_workers if cfg else 100)
+    drain_grace_sec = cfg.drain_grace_sec if cfg else 5.0
     
     logger.info(
         f"🚀 Запуск оптимизированного gRPC сервера на {resolved_host}:{resolved_port} "
@@ -1114,6 +1451,9 @@ async def run_server(
         
         # Таймауты
         ('grpc.client_idle_timeout_ms', 300000),  # 5 минут
+
+        # Несколько процессов на одном порту (воркеры супервизора)
+        ('grpc.so_reuseport', 1 if reuse_port else 0),
     ]
     
     # Добавляем интерсептор для единой обработки ошибок и логирования (PR-7)
@@ -1165,12 +1505,11 @@ async def run_server(
     except Exception as e:
         logger.error(f"💥 Ошибка запуска сервера: {e}")
     finally:
-        # Очищаем ресурсы
+        # Graceful shutdown: сначала перестаём принимать вызовы и даём открытым
+        # стримам завершиться, затем освобождаем ресурсы сервиса
         logger.info("🧹 Остановка сервера...")
+        await server.stop(grace=drain_grace_sec)
         await servicer.cleanup()
-        
-        # Graceful shutdown
-        await server.stop(grace=5.0)
         logger.info("✅ Оптимизированный сервер остановлен")
 
 async def main():
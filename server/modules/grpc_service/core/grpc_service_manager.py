@@ -166,6 +166,13 @@ class GrpcServiceManager(UniversalModuleInterface):
                     ):
                         subscription_module.set_database_manager(database_module.get_manager())
                         logger.info("✅ DatabaseManager wired to SubscriptionModule")
+                    if subscription_module is not None and getattr(subscription_module, 'db_url', None):
+                        from modules.database.core.shared_pool import get_shared_connection_pool
+
+                        subscription_module.set_connection_pool(
+                            get_shared_connection_pool(subscription_module.db_url, name="repositories")
+                        )
+                        logger.info("✅ Shared connection pool wired to SubscriptionModule")
         except Exception as e:
             logger.error(f"❌ Error wiring DatabaseManager to SubscriptionModule: {e}")
         
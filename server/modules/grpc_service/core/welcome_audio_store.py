@@ -0,0 +1,386 @@
+"""
+Предрасчитанное приветственное аудио для GenerateWelcomeAudio
+
+Приветствие одинаково для всех запусков клиента, поэтому синтезируется
+один раз (при старте сервера или после смены настроек голоса), сохраняется
+PCM файлом и отдаётся из memory-mapped буфера. Одновременные промахи
+по одному и тому же тексту объединяются (single-flight): рендер идёт в
+отдельной задаче, отмена одного запроса не прерывает остальных.
+
+Кэшируются только настроенные варианты (welcome_text и welcome_variants):
+произвольный текст или голос из запроса рендерится без сохранения
+(render_uncached, в том числе мимо кэша TTS), иначе клиент мог бы
+неограниченно растить память и диск.
+
+Файлы лежат в поддиректории отпечатка настроек голоса: воркеры с общей
+директорией при смене голоса удаляют только файлы прежних настроек.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# Рендер: (text, voice, cacheable) -> PCM чанки; cacheable=False — мимо кэша TTS
+WelcomeRenderer = Callable[[str, Optional[str], Optional[bool]], AsyncIterator[bytes]]
+
+_FILE_SUFFIX = ".pcm"
+
+
+@dataclass
+class WelcomeAudio:
+    """Готовое приветствие: PCM в mmap (или в памяти) + формат"""
+    key: str
+    buffer: Union[mmap.mmap, bytes]
+    sample_rate: int
+    channels: int
+    bytes_per_sample: int
+
+    @property
+    def size(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def duration_sec(self) -> float:
+        bytes_per_second = self.sample_rate * self.channels * self.bytes_per_sample
+        return self.size / bytes_per_second if bytes_per_second else 0.0
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        """Нарезка на чанки (выравнены по сэмплу)"""
+        frame = max(1, self.channels * self.bytes_per_sample)
+        chunk_size = max(frame, chunk_size - chunk_size % frame)
+        for offset in range(0, self.size, chunk_size):
+            yield self.buffer[offset:offset + chunk_size]
+
+
+@dataclass
+class WelcomeVariant:
+    """Вариант приветствия для предрасчёта (язык/голос)"""
+    text: str
+    voice: Optional[str] = None
+    language: Optional[str] = None
+
+
+class WelcomeAudioStore:
+    """
+    Хранилище предрасчитанных приветствий.
+
+    Ключ — текст, голос, язык, формат и отпечаток настроек голоса
+    аудио модуля: смена настроек делает старые файлы недостижимыми,
+    они удаляются, а настроенные варианты перерендериваются в фоне.
+    """
+
+    def __init__(
+        self,
+        render: WelcomeRenderer,
+        storage_dir: Optional[Union[str, Path]],
+        sample_rate: int = 48000,
+        channels: int = 1,
+        bytes_per_sample: int = 2,
+        fingerprint_provider: Optional[Callable[[], str]] = None,
+        variants: Optional[Iterable[WelcomeVariant]] = None,
+    ):
+        """
+        Args:
+            render: Синтез PCM по (text, voice)
+            storage_dir: Директория PCM файлов (None — только память)
+            sample_rate: Частота дискретизации PCM
+            channels: Количество каналов PCM
+            bytes_per_sample: Байт на сэмпл (int16 = 2)
+            fingerprint_provider: Отпечаток текущих настроек голоса
+            variants: Настроенные варианты (первый — приветствие по умолчанию)
+        """
+        self._render = render
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bytes_per_sample = bytes_per_sample
+        self._fingerprint_provider = fingerprint_provider
+
+        self._entries: Dict[str, WelcomeAudio] = {}
+        self._inflight: Dict[str, "asyncio.Task[WelcomeAudio]"] = {}
+        self._fingerprint: Optional[str] = None
+        self._variants: List[WelcomeVariant] = list(variants or [])
+        self._prerender_task: Optional[asyncio.Task] = None
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+
+        # Метрики
+        self.hits = 0
+        self.disk_loads = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.uncached_renders = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Ключи и отпечаток настроек
+    # ------------------------------------------------------------------
+
+    def _current_fingerprint(self) -> str:
+        if self._fingerprint_provider is None:
+            return ""
+        try:
+            return str(self._fingerprint_provider() or "")
+        except Exception as e:
+            logger.warning(f"⚠️ WelcomeAudioStore: отпечаток настроек голоса недоступен: {e}")
+            return self._fingerprint or ""
+
+    def _make_key(self, text: str, voice: Optional[str], language: Optional[str], fingerprint: str) -> str:
+        raw = '\x1f'.join([
+            text.strip(), voice or "", language or "", fingerprint,
+            str(self.sample_rate), str(self.channels), str(self.bytes_per_sample),
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _check_fingerprint(self) -> str:
+        """Смена настроек голоса → инвалидация и фоновый перерендер вариантов"""
+        fingerprint = self._current_fingerprint()
+        if self._fingerprint is not None and fingerprint != self._fingerprint:
+            logger.info("🔄 WelcomeAudioStore: настройки голоса изменились, перерендер приветствий")
+            self.invalidate(fingerprint)
+            self._fingerprint = fingerprint
+            if self._variants:
+                self.schedule_prerender(self._variants)
+        self._fingerprint = fingerprint
+        return fingerprint
+
+    # ------------------------------------------------------------------
+    # Получение
+    # ------------------------------------------------------------------
+
+    def resolve(self, text: Optional[str], voice: Optional[str], language: Optional[str]) -> Optional[WelcomeVariant]:
+        """
+        Настроенный вариант для запроса или None (отдаётся render_uncached).
+
+        Без текста: вариант по языку/голосу, иначе — приветствие по
+        умолчанию (язык без своего варианта не вызывает рендер). Текст
+        запроса кэшируется, только если совпадает с настроенным вариантом.
+        """
+        text = (text or "").strip()
+        if text:
+            for variant in self._variants:
+                if variant.text.strip() == text and (not voice or variant.voice == voice):
+                    return variant
+            return None
+        variant = self.find_variant(language, voice)
+        if variant is not None:
+            return variant
+        if voice or not self._variants:
+            return None
+        return self._variants[0]
+
+    async def get(self, text: str, voice: Optional[str] = None, language: Optional[str] = None) -> WelcomeAudio:
+        """Готовое приветствие настроенного варианта; при промахе — рендер (single-flight)"""
+        fingerprint = self._check_fingerprint()
+        key = self._make_key(text, voice, language, fingerprint)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # Рендер в отдельной задаче: отмена инициатора не роняет объединённые запросы
+            task = asyncio.create_task(self._load_entry(key, text, voice, fingerprint))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+            # Ошибку получат ожидающие; подавляем "exception was never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _load_entry(self, key: str, text: str, voice: Optional[str], fingerprint: str) -> WelcomeAudio:
+        entry = await self._load_or_render(key, text, voice, fingerprint)
+        # Настройки могли смениться во время рендера — такой результат не кэшируем
+        if fingerprint == self._fingerprint:
+            self._entries[key] = entry
+        return entry
+
+    async def render_uncached(self, text: str, voice: Optional[str] = None) -> WelcomeAudio:
+        """Рендер произвольного текста/голоса без сохранения в памяти и на диске"""
+        pcm = await self._render_pcm(text, voice, cacheable=False)
+        self.uncached_renders += 1
+        return self._entry("", pcm)
+
+    async def _render_pcm(self, text: str, voice: Optional[str], cacheable: Optional[bool] = None) -> bytes:
+        parts = [chunk async for chunk in self._render(text, voice, cacheable) if chunk]
+        pcm = b''.join(parts)
+        if not pcm:
+            raise Exception("Welcome audio rendering returned no data")
+        return pcm
+
+    async def _load_or_render(self, key: str, text: str, voice: Optional[str], fingerprint: str) -> WelcomeAudio:
+        path = self._path(key, fingerprint) if self.storage_dir is not None else None
+        if path is not None:
+            buffer = await asyncio.to_thread(self._map_file, path)
+            if buffer is not None:
+                self.disk_loads += 1
+                return self._entry(key, buffer)
+
+        pcm = await self._render_pcm(text, voice)
+        self.renders += 1
+
+        if path is not None:
+            try:
+                await asyncio.to_thread(self._write_file, path, pcm)
+                buffer = await asyncio.to_thread(self._map_file, path)
+                if buffer is not None:
+                    return self._entry(key, buffer)
+            except OSError as e:
+                logger.warning(f"⚠️ WelcomeAudioStore: не удалось сохранить PCM на диск: {e}")
+        return self._entry(key, pcm)
+
+    def _entry(self, key: str, buffer: Union[mmap.mmap, bytes]) -> WelcomeAudio:
+        return WelcomeAudio(
+            key=key,
+            buffer=buffer,
+            sample_rate=self.sample_rate,
+            channels=self.channels,
+            bytes_per_sample=self.bytes_per_sample,
+        )
+
+    # ------------------------------------------------------------------
+    # Файлы
+    # ------------------------------------------------------------------
+
+    def _fingerprint_dir(self, fingerprint: str) -> Path:
+        assert self.storage_dir is not None
+        return self.storage_dir / hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+    def _path(self, key: str, fingerprint: str) -> Path:
+        return self._fingerprint_dir(fingerprint) / f"{key}{_FILE_SUFFIX}"
+
+    @staticmethod
+    def _map_file(path: Path) -> Optional[mmap.mmap]:
+        try:
+            with open(path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_file(path: Path, pcm: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(pcm)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Предрасчёт и инвалидация
+    # ------------------------------------------------------------------
+
+    async def prerender(self, variants: Iterable[WelcomeVariant]) -> int:
+        """
+        Рендер настроенных вариантов (при старте или после смены голоса)
+
+        Returns:
+            Количество готовых вариантов
+        """
+        self._variants = list(variants)
+        ready = 0
+        for variant in self._variants:
+            try:
+                await self.get(variant.text, variant.voice, variant.language)
+                ready += 1
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ WelcomeAudioStore: не удалось предрасчитать приветствие "
+                    f"(voice={variant.voice}, language={variant.language}): {e}"
+                )
+        logger.info(f"✅ WelcomeAudioStore: предрасчитано приветствий {ready}/{len(self._variants)}")
+        return ready
+
+    def schedule_prerender(self, variants: Iterable[WelcomeVariant]) -> None:
+        """Фоновый предрасчёт без блокировки старта сервера"""
+        variants = list(variants)
+        if self._prerender_task is not None and not self._prerender_task.done():
+            self._prerender_task.cancel()
+        self._prerender_task = asyncio.create_task(self.prerender(variants))
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> Optional[asyncio.Task]:
+        """
+        Сброс готовых приветствий и удаление PCM файлов прежних настроек
+
+        Файлы удаляются в потоке; поддиректория fingerprint (новые
+        настройки, в неё уже могут писать другие воркеры) сохраняется.
+
+        Returns:
+            Задача удаления файлов (None — без диска или вне event loop)
+        """
+        self._entries.clear()
+        self.invalidations += 1
+        if self.storage_dir is None:
+            return None
+        keep = self._fingerprint_dir(fingerprint) if fingerprint is not None else None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._unlink_stale_files(keep)
+            return None
+        task = asyncio.create_task(asyncio.to_thread(self._unlink_stale_files, keep))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+        return task
+
+    def _unlink_stale_files(self, keep: Optional[Path]) -> None:
+        assert self.storage_dir is not None
+        if not self.storage_dir.is_dir():
+            return
+        # Файлы прежнего плоского формата и поддиректории других отпечатков
+        for path in self.storage_dir.glob(f"*/*{_FILE_SUFFIX}"):
+            if path.parent == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        for path in self.storage_dir.glob(f"*{_FILE_SUFFIX}"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    async def close(self) -> None:
+        """Остановка фонового предрасчёта и рендеров, освобождение mmap"""
+        tasks = list(self._inflight.values())
+        if self._prerender_task is not None and not self._prerender_task.done():
+            tasks.append(self._prerender_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Удаление файлов прежних настроек дожидаемся, а не отменяем
+        await asyncio.gather(*list(self._cleanup_tasks), return_exceptions=True)
+        self._inflight.clear()
+        self._entries.clear()
+
+    def find_variant(self, language: Optional[str], voice: Optional[str]) -> Optional[WelcomeVariant]:
+        """Настроенный вариант для языка/голоса запроса"""
+        for variant in self._variants:
+            if language and variant.language == language and (not voice or variant.voice == voice):
+                return variant
+        for variant in self._variants:
+            if voice and variant.voice == voice:
+                return variant
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика хранилища"""
+        return {
+            'entries': len(self._entries),
+            'bytes': sum(entry.size for entry in self._entries.values()),
+            'hits': self.hits,
+            'disk_loads': self.disk_loads,
+            'renders': self.renders,
+            'coalesced': self.coalesced,
+            'uncached_renders': self.uncached_renders,
+            'invalidations': self.invalidations,
+        }
@@ -2,7 +2,7 @@
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # NO CHECKED-IN PROTOBUF GENCODE
 # source: streaming.proto
-# Protobuf Python Version: 6.31.1
+# Protobuf Python Version: 7.35.1
 """Generated protocol buffer code."""
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import descriptor_pool as _descriptor_pool
@@ -11,8 +11,8 @@ from google.protobuf import symbol_database as _symbol_database
 from google.protobuf.internal import builder as _builder
 _runtime_version.ValidateProtobufRuntimeVersion(
     _runtime_version.Domain.PUBLIC,
-    6,
-    31,
+    7,
+    35,
     1,
     '',
     'streaming.proto'
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0fstreaming.proto\x12\tstreaming\"\x83\x01\n\x0cUsageRequest\x12\x13\n\x0bhardware_id\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x0e\n\x06source\x18\x03 \x01(\t\x12\x14\n\x0cinput_tokens\x18\x04 \x01(\x05\x12\x15\n\routput_tokens\x18\x05 \x01(\x05\x12\r\n\x05model\x18\x06 \x01(\t\"1\n\rUsageResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\xad\x02\n\rStreamRequest\x12\x0e\n\x06prompt\x18\x01 \x01(\t\x12\x17\n\nscreenshot\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x19\n\x0cscreen_width\x18\x03 \x01(\x05H\x01\x88\x01\x01\x12\x1a\n\rscreen_height\x18\x04 \x01(\x05H\x02\x88\x01\x01\x12\x13\n\x0bhardware_id\x18\x05 \x01(\t\x12\x12\n\nsession_id\x18\x06 \x01(\t\x12&\n\x05phase\x18\x07 \x01(\x0e\x32\x17.streaming.RequestPhase\x12\x11\n\tchunk_seq\x18\x08 \x01(\x05\x12\x17\n\nchunk_text\x18\t \x01(\tH\x03\x88\x01\x01\x42\r\n\x0b_screenshotB\x0f\n\r_screen_widthB\x10\n\x0e_screen_heightB\r\n\x0b_chunk_text\"\x82\x02\n\x0eStreamResponse\x12\x14\n\ntext_chunk\x18\x01 \x01(\tH\x00\x12,\n\x0b\x61udio_chunk\x18\x02 \x01(\x0b\x32\x15.streaming.AudioChunkH\x00\x12\x15\n\x0b\x65nd_message\x18\x03 \x01(\tH\x00\x12\x17\n\rerror_message\x18\x04 \x01(\tH\x00\x12\x32\n\x0e\x61\x63tion_message\x18\x05 \x01(\x0b\x32\x18.streaming.ActionMessageH\x00\x12=\n\x10\x62rowser_progress\x18\x06 \x01(\x0b\x32!.streaming.BrowserProgressMessageH\x00\x42\t\n\x07\x63ontent\"e\n\nAudioChunk\x12\x12\n\naudio_data\x18\x01 \x01(\x0c\x12\r\n\x05\x64type\x18\x02 \x01(\t\x12\r\n\x05shape\x18\x03 \x03(\x05\x12\x13\n\x0bsample_rate\x18\x04 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x05 \x01(\x05\"\'\n\x10InterruptRequest\x12\x13\n\x0bhardware_id\x18\x01 \x01(\t\"S\n\x11InterruptResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x1c\n\x14interrupted_sessions\x18\x02 \x03(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\"S\n\x0eWelcomeRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\r\n\x05voice\x18\x03 \x01(\t\x12\x10\n\x08language\x18\x04 \x01(\t\"m\n\x0fWelcomeMetadata\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x14\n\x0c\x64uration_sec\x18\x02 \x01(\x01\x12\x13\n\x0bsample_rate\x18\x03 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x04 \x01(\x05\x12\r\n\x05\x64type\x18\x05 \x01(\t\"\xaa\x01\n\x0fWelcomeResponse\x12,\n\x0b\x61udio_chunk\x18\x01 \x01(\x0b\x32\x15.streaming.AudioChunkH\x00\x12.\n\x08metadata\x18\x02 \x01(\x0b\x32\x1a.streaming.WelcomeMetadataH\x00\x12\x15\n\x0b\x65nd_message\x18\x03 \x01(\tH\x00\x12\x17\n\rerror_message\x18\x04 \x01(\tH\x00\x42\t\n\x07\x63ontent\"`\n\rActionMessage\x12\x13\n\x0b\x61\x63tion_json\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x17\n\nfeature_id\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\r\n\x0b_feature_id\"\xd8\x02\n\x16\x42rowserProgressMessage\x12)\n\x04type\x18\x01 \x01(\x0e\x32\x1b.streaming.BrowserEventType\x12\x0f\n\x07task_id\x18\x02 \x01(\t\x12\x18\n\x0bstep_number\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x18\n\x0b\x64\x65scription\x18\x04 \x01(\tH\x01\x88\x01\x01\x12\x10\n\x03url\x18\x05 \x01(\tH\x02\x88\x01\x01\x12\x13\n\x06\x61\x63tion\x18\x06 \x01(\tH\x03\x88\x01\x01\x12\x11\n\ttimestamp\x18\x07 \x01(\t\x12\x12\n\x05\x65rror\x18\x08 \x01(\tH\x04\x88\x01\x01\x12\x37\n\x07\x64\x65tails\x18\t \x01(\x0b\x32!.streaming.BrowserProgressDetailsH\x05\x88\x01\x01\x42\x0e\n\x0c_step_numberB\x0e\n\x0c_descriptionB\x06\n\x04_urlB\t\n\x07_actionB\x08\n\x06_errorB\n\n\x08_details\"\xc9\x01\n\x16\x42rowserProgressDetails\x12\x19\n\x0c\x64uration_sec\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x0f\n\x07\x61\x63tions\x18\x02 \x03(\t\x12\x41\n\x08metadata\x18\x03 \x03(\x0b\x32/.streaming.BrowserProgressDetails.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x42\x0f\n\r_duration_sec*b\n\x0cRequestPhase\x12\x1d\n\x19REQUEST_PHASE_UNSPECIFIED\x10\x00\x12\x19\n\x15REQUEST_PHASE_COLLECT\x10\x01\x12\x18\n\x14REQUEST_PHASE_COMMIT\x10\x02*\xd0\x01\n\x10\x42rowserEventType\x12\x18\n\x14\x42ROWSER_TASK_STARTED\x10\x00\x12\x18\n\x14\x42ROWSER_STEP_STARTED\x10\x01\x12\x1a\n\x16\x42ROWSER_STEP_COMPLETED\x10\x02\x12\x1b\n\x17\x42ROWSER_ACTION_EXECUTED\x10\x03\x12\x1a\n\x16\x42ROWSER_TASK_COMPLETED\x10\x04\x12\x17\n\x13\x42ROWSER_TASK_FAILED\x10\x05\x12\x1a\n\x16\x42ROWSER_TASK_CANCELLED\x10\x06\x32\xba\x02\n\x10StreamingService\x12\x44\n\x0bStreamAudio\x12\x18.streaming.StreamRequest\x1a\x19.streaming.StreamResponse0\x01\x12M\n\x10InterruptSession\x12\x1b.streaming.InterruptRequest\x1a\x1c.streaming.InterruptResponse\x12O\n\x14GenerateWelcomeAudio\x12\x19.streaming.WelcomeRequest\x1a\x1a.streaming.WelcomeResponse0\x01\x12@\n\x0bReportUsage\x12\x17.streaming.UsageRequest\x1a\x18.streaming.UsageResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0fstreaming.proto\x12\tstreaming\"\x83\x01\n\x0cUsageRequest\x12\x13\n\x0bhardware_id\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x0e\n\x06source\x18\x03 \x01(\t\x12\x14\n\x0cinput_tokens\x18\x04 \x01(\x05\x12\x15\n\routput_tokens\x18\x05 \x01(\x05\x12\r\n\x05model\x18\x06 \x01(\t\"1\n\rUsageResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\xf4\x02\n\rStreamRequest\x12\x0e\n\x06prompt\x18\x01 \x01(\t\x12\x17\n\nscreenshot\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x19\n\x0cscreen_width\x18\x03 \x01(\x05H\x01\x88\x01\x01\x12\x1a\n\rscreen_height\x18\x04 \x01(\x05H\x02\x88\x01\x01\x12\x13\n\x0bhardware_id\x18\x05 \x01(\t\x12\x12\n\nsession_id\x18\x06 \x01(\t\x12&\n\x05phase\x18\x07 \x01(\x0e\x32\x17.streaming.RequestPhase\x12\x11\n\tchunk_seq\x18\x08 \x01(\x05\x12\x17\n\nchunk_text\x18\t \x01(\tH\x03\x88\x01\x01\x12*\n\x0b\x61udio_codec\x18\n \x01(\x0e\x32\x15.streaming.AudioCodec\x12\x19\n\x11\x61udio_header_once\x18\x0b \x01(\x08\x42\r\n\x0b_screenshotB\x0f\n\r_screen_widthB\x10\n\x0e_screen_heightB\r\n\x0b_chunk_text\"\xb8\x02\n\x0eStreamResponse\x12\x14\n\ntext_chunk\x18\x01 \x01(\tH\x00\x12,\n\x0b\x61udio_chunk\x18\x02 \x01(\x0b\x32\x15.streaming.AudioChunkH\x00\x12\x15\n\x0b\x65nd_message\x18\x03 \x01(\tH\x00\x12\x17\n\rerror_message\x18\x04 \x01(\tH\x00\x12\x32\n\x0e\x61\x63tion_message\x18\x05 \x01(\x0b\x32\x18.streaming.ActionMessageH\x00\x12=\n\x10\x62rowser_progress\x18\x06 \x01(\x0b\x32!.streaming.BrowserProgressMessageH\x00\x12\x34\n\x0c\x61udio_header\x18\x07 \x01(\x0b\x32\x1c.streaming.AudioStreamHeaderH\x00\x42\t\n\x07\x63ontent\"\xa3\x01\n\x11\x41udioStreamHeader\x12\r\n\x05\x64type\x18\x01 \x01(\t\x12\x13\n\x0bsample_rate\x18\x02 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x03 \x01(\x05\x12$\n\x05\x63odec\x18\x04 \x01(\x0e\x32\x15.streaming.AudioCodec\x12\x19\n\x11\x66rame_duration_ms\x18\x05 \x01(\x05\x12\x17\n\x0ftarget_chunk_ms\x18\x06 \x01(\x05\"\xbc\x01\n\nAudioChunk\x12\x12\n\naudio_data\x18\x01 \x01(\x0c\x12\r\n\x05\x64type\x18\x02 \x01(\t\x12\r\n\x05shape\x18\x03 \x03(\x05\x12\x13\n\x0bsample_rate\x18\x04 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x05 \x01(\x05\x12$\n\x05\x63odec\x18\x06 \x01(\x0e\x32\x15.streaming.AudioCodec\x12\x14\n\x0cpacket_sizes\x18\x07 \x03(\r\x12\x19\n\x11\x66rame_duration_ms\x18\x08 \x01(\x05\"\'\n\x10InterruptRequest\x12\x13\n\x0bhardware_id\x18\x01 \x01(\t\"S\n\x11InterruptResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x1c\n\x14interrupted_sessions\x18\x02 \x03(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\"\x7f\n\x0eWelcomeRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\r\n\x05voice\x18\x03 \x01(\t\x12\x10\n\x08language\x18\x04 \x01(\t\x12*\n\x0b\x61udio_codec\x18\x05 \x01(\x0e\x32\x15.streaming.AudioCodec\"m\n\x0fWelcomeMetadata\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x14\n\x0c\x64uration_sec\x18\x02 \x01(\x01\x12\x13\n\x0bsample_rate\x18\x03 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x04 \x01(\x05\x12\r\n\x05\x64type\x18\x05 \x01(\t\"\xaa\x01\n\x0fWelcomeResponse\x12,\n\x0b\x61udio_chunk\x18\x01 \x01(\x0b\x32\x15.streaming.AudioChunkH\x00\x12.\n\x08metadata\x18\x02 \x01(\x0b\x32\x1a.streaming.WelcomeMetadataH\x00\x12\x15\n\x0b\x65nd_message\x18\x03 \x01(\tH\x00\x12\x17\n\rerror_message\x18\x04 \x01(\tH\x00\x42\t\n\x07\x63ontent\"`\n\rActionMessage\x12\x13\n\x0b\x61\x63tion_json\x18\x01 \x01(\t\x12\x12\n\nsession_id\x18\x02 \x01(\t\x12\x17\n\nfeature_id\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\r\n\x0b_feature_id\"\xd8\x02\n\x16\x42rowserProgressMessage\x12)\n\x04type\x18\x01 \x01(\x0e\x32\x1b.streaming.BrowserEventType\x12\x0f\n\x07task_id\x18\x02 \x01(\t\x12\x18\n\x0bstep_number\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x18\n\x0b\x64\x65scription\x18\x04 \x01(\tH\x01\x88\x01\x01\x12\x10\n\x03url\x18\x05 \x01(\tH\x02\x88\x01\x01\x12\x13\n\x06\x61\x63tion\x18\x06 \x01(\tH\x03\x88\x01\x01\x12\x11\n\ttimestamp\x18\x07 \x01(\t\x12\x12\n\x05\x65rror\x18\x08 \x01(\tH\x04\x88\x01\x01\x12\x37\n\x07\x64\x65tails\x18\t \x01(\x0b\x32!.streaming.BrowserProgressDetailsH\x05\x88\x01\x01\x42\x0e\n\x0c_step_numberB\x0e\n\x0c_descriptionB\x06\n\x04_urlB\t\n\x07_actionB\x08\n\x06_errorB\n\n\x08_details\"\xc9\x01\n\x16\x42rowserProgressDetails\x12\x19\n\x0c\x64uration_sec\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x0f\n\x07\x61\x63tions\x18\x02 \x03(\t\x12\x41\n\x08metadata\x18\x03 \x03(\x0b\x32/.streaming.BrowserProgressDetails.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x42\x0f\n\r_duration_sec*=\n\nAudioCodec\x12\x19\n\x15\x41UDIO_CODEC_PCM_S16LE\x10\x00\x12\x14\n\x10\x41UDIO_CODEC_OPUS\x10\x01*b\n\x0cRequestPhase\x12\x1d\n\x19REQUEST_PHASE_UNSPECIFIED\x10\x00\x12\x19\n\x15REQUEST_PHASE_COLLECT\x10\x01\x12\x18\n\x14REQUEST_PHASE_COMMIT\x10\x02*\xd0\x01\n\x10\x42rowserEventType\x12\x18\n\x14\x42ROWSER_TASK_STARTED\x10\x00\x12\x18\n\x14\x42ROWSER_STEP_STARTED\x10\x01\x12\x1a\n\x16\x42ROWSER_STEP_COMPLETED\x10\x02\x12\x1b\n\x17\x42ROWSER_ACTION_EXECUTED\x10\x03\x12\x1a\n\x16\x42ROWSER_TASK_COMPLETED\x10\x04\x12\x17\n\x13\x42ROWSER_TASK_FAILED\x10\x05\x12\x1a\n\x16\x42ROWSER_TASK_CANCELLED\x10\x06\x32\xff\x02\n\x10StreamingService\x12\x44\n\x0bStreamAudio\x12\x18.streaming.StreamRequest\x1a\x19.streaming.StreamResponse0\x01\x12M\n\x10InterruptSession\x12\x1b.streaming.InterruptRequest\x1a\x1c.streaming.InterruptResponse\x12O\n\x14GenerateWelcomeAudio\x12\x19.streaming.WelcomeRequest\x1a\x1a.streaming.WelcomeResponse0\x01\x12@\n\x0bReportUsage\x12\x17.streaming.UsageRequest\x1a\x18.streaming.UsageResponse\x12\x43\n\x08\x43onverse\x12\x18.streaming.StreamRequest\x1a\x19.streaming.StreamResponse(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,38 +33,42 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._loaded_options = None
   _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._serialized_options = b'8\001'
-  _globals['_REQUESTPHASE']._serialized_start=2027
-  _globals['_REQUESTPHASE']._serialized_end=2125
-  _globals['_BROWSEREVENTTYPE']._serialized_start=2128
-  _globals['_BROWSEREVENTTYPE']._serialized_end=2336
+  _globals['_AUDIOCODEC']._serialized_start=2450
+  _globals['_AUDIOCODEC']._serialized_end=2511
+  _globals['_REQUESTPHASE']._serialized_start=2513
+  _globals['_REQUESTPHASE']._serialized_end=2611
+  _globals['_BROWSEREVENTTYPE']._serialized_start=2614
+  _globals['_BROWSEREVENTTYPE']._serialized_end=2822
   _globals['_USAGEREQUEST']._serialized_start=31
   _globals['_USAGEREQUEST']._serialized_end=162
   _globals['_USAGERESPONSE']._serialized_start=164
   _globals['_USAGERESPONSE']._serialized_end=213
   _globals['_STREAMREQUEST']._serialized_start=216
-  _globals['_STREAMREQUEST']._serialized_end=517
-  _globals['_STREAMRESPONSE']._serialized_start=520
-  _globals['_STREAMRESPONSE']._serialized_end=778
-  _globals['_AUDIOCHUNK']._serialized_start=780
-  _globals['_AUDIOCHUNK']._serialized_end=881
-  _globals['_INTERRUPTREQUEST']._serialized_start=883
-  _globals['_INTERRUPTREQUEST']._serialized_end=922
-  _globals['_INTERRUPTRESPONSE']._serialized_start=924
-  _globals['_INTERRUPTRESPONSE']._serialized_end=1007
-  _globals['_WELCOMEREQUEST']._serialized_start=1009
-  _globals['_WELCOMEREQUEST']._serialized_end=1092
-  _globals['_WELCOMEMETADATA']._serialized_start=1094
-  _globals['_WELCOMEMETADATA']._serialized_end=1203
-  _globals['_WELCOMERESPONSE']._serialized_start=1206
-  _globals['_WELCOMERESPONSE']._serialized_end=1376
-  _globals['_ACTIONMESSAGE']._serialized_start=1378
-  _globals['_ACTIONMESSAGE']._serialized_end=1474
-  _globals['_BROWSERPROGRESSMESSAGE']._serialized_start=1477
-  _globals['_BROWSERPROGRESSMESSAGE']._serialized_end=1821
-  _globals['_BROWSERPROGRESSDETAILS']._serialized_start=1824
-  _globals['_BROWSERPROGRESSDETAILS']._serialized_end=2025
-  _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._serialized_start=1961
-  _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._serialized_end=2008
-  _globals['_STREAMINGSERVICE']._serialized_start=2339
-  _globals['_STREAMINGSERVICE']._serialized_end=2653
+  _globals['_STREAMREQUEST']._serialized_end=588
+  _globals['_STREAMRESPONSE']._serialized_start=591
+  _globals['_STREAMRESPONSE']._serialized_end=903
+  _globals['_AUDIOSTREAMHEADER']._serialized_start=906
+  _globals['_AUDIOSTREAMHEADER']._serialized_end=1069
+  _globals['_AUDIOCHUNK']._serialized_start=1072
+  _globals['_AUDIOCHUNK']._serialized_end=1260
+  _globals['_INTERRUPTREQUEST']._serialized_start=1262
+  _globals['_INTERRUPTREQUEST']._serialized_end=1301
+  _globals['_INTERRUPTRESPONSE']._serialized_start=1303
+  _globals['_INTERRUPTRESPONSE']._serialized_end=1386
+  _globals['_WELCOMEREQUEST']._serialized_start=1388
+  _globals['_WELCOMEREQUEST']._serialized_end=1515
+  _globals['_WELCOMEMETADATA']._serialized_start=1517
+  _globals['_WELCOMEMETADATA']._serialized_end=1626
+  _globals['_WELCOMERESPONSE']._serialized_start=1629
+  _globals['_WELCOMERESPONSE']._serialized_end=1799
+  _globals['_ACTIONMESSAGE']._serialized_start=1801
+  _globals['_ACTIONMESSAGE']._serialized_end=1897
+  _globals['_BROWSERPROGRESSMESSAGE']._serialized_start=1900
+  _globals['_BROWSERPROGRESSMESSAGE']._serialized_end=2244
+  _globals['_BROWSERPROGRESSDETAILS']._serialized_start=2247
+  _globals['_BROWSERPROGRESSDETAILS']._serialized_end=2448
+  _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._serialized_start=2384
+  _globals['_BROWSERPROGRESSDETAILS_METADATAENTRY']._serialized_end=2431
+  _globals['_STREAMINGSERVICE']._serialized_start=2825
+  _globals['_STREAMINGSERVICE']._serialized_end=3208
 # @@protoc_insertion_point(module_scope)
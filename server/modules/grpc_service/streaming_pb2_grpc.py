@@ -55,6 +55,11 @@ class StreamingServiceStub(object):
                 request_serializer=streaming__pb2.UsageRequest.SerializeToString,
                 response_deserializer=streaming__pb2.UsageResponse.FromString,
                 _registered_method=True)
+        self.Converse = channel.stream_stream(
+                '/streaming.StreamingService/Converse',
+                request_serializer=streaming__pb2.StreamRequest.SerializeToString,
+                response_deserializer=streaming__pb2.StreamResponse.FromString,
+                _registered_method=True)
 
 
 class StreamingServiceServicer(object):
@@ -89,6 +94,16 @@ class StreamingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Converse(self, request_iterator, context):
+        """Двунаправленный стрим реплики: клиент шлёт partial STT (phase=COLLECT)
+        и финальный COMMIT в одном вызове, ответ (text/audio/action) идёт
+        в том же вызове. COLLECT не подтверждается; после end_message вызов
+        может нести следующую реплику. StreamAudio остаётся для совместимости.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_StreamingServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -112,6 +127,11 @@ def add_StreamingServiceServicer_to_server(servicer, server):
                     request_deserializer=streaming__pb2.UsageRequest.FromString,
                     response_serializer=streaming__pb2.UsageResponse.SerializeToString,
             ),
+            'Converse': grpc.stream_stream_rpc_method_handler(
+                    servicer.Converse,
+                    request_deserializer=streaming__pb2.StreamRequest.FromString,
+                    response_serializer=streaming__pb2.StreamResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'streaming.StreamingService', rpc_method_handlers)
@@ -231,3 +251,30 @@ class StreamingService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Converse(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/streaming.StreamingService/Converse',
+            streaming__pb2.StreamRequest.SerializeToString,
+            streaming__pb2.StreamResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
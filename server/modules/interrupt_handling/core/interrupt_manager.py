@@ -235,53 +235,30 @@ class InterruptManager(UniversalModuleInterface):
             raise
     
     async def _interrupt_all_modules(self, hardware_id: str) -> list:
-        """Прерывание всех зарегистрированных модулей"""
+        """Прерывание всех зарегистрированных модулей (модули и callback функции — параллельно)"""
         interrupted_modules = []
         
         try:
-            for module_name, module_instance in self.registered_modules.items():
-                try:
-                    if not self.config.is_module_interrupt_enabled(module_name):
-                        logger.debug(f"Interrupt disabled for module: {module_name}")
-                        continue
-                    
-                    # Получаем методы прерывания для модуля
-                    interrupt_methods = self.config.get_module_interrupt_methods(module_name)
-                    module_timeout = self.config.get_module_timeout(module_name)
-                    
-                    # Вызываем методы прерывания
-                    for method_name in interrupt_methods:
-                        if hasattr(module_instance, method_name):
-                            method = getattr(module_instance, method_name)
-                            
-                            # Вызываем метод с таймаутом
-                            try:
-                                if asyncio.iscoroutinefunction(method):
-                                    await asyncio.wait_for(method(), timeout=module_timeout)
-                                else:
-                                    method()
-                                
-                                logger.warning(f"🚨 Module {module_name}.{method_name} interrupted for {hardware_id}")
-                                
-                            except asyncio.TimeoutError:
-                                logger.error(f"Timeout interrupting {module_name}.{method_name}")
-                            except Exception as e:
-                                logger.error(f"Error interrupting {module_name}.{method_name}: {e}")
-                    
+            module_names = [
+                module_name for module_name in self.registered_modules
+                if self.config.is_module_interrupt_enabled(module_name)
+            ]
+            for module_name in self.registered_modules:
+                if module_name not in module_names:
+                    logger.debug(f"Interrupt disabled for module: {module_name}")
+            
+            # Медленный модуль не задерживает остальные: общее время = самый медленный, а не сумма
+            results = await asyncio.gather(
+                *(self._interrupt_module(module_name, self.registered_modules[module_name], hardware_id)
+                  for module_name in module_names),
+                *(self._run_interrupt_callback(callback, hardware_id) for callback in list(self.interrupt_callbacks)),
+                return_exceptions=True
+            )
+            for module_name, result in zip(module_names, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Error interrupting module {module_name}: {result}")
+                else:
                     interrupted_modules.append(module_name)
-                    
-                except Exception as e:
-                    logger.error(f"Error interrupting module {module_name}: {e}")
-            
-            # Вызываем callback функции
-            for callback in self.interrupt_callbacks:
-                try:
-                    if asyncio.iscoroutinefunction(callback):
-                        await callback(hardware_id)
-                    else:
-                        callback(hardware_id)
-                except Exception as e:
-                    logger.error(f"Error in interrupt callback: {e}")
             
             logger.info(f"Interrupted {len(interrupted_modules)} modules for {hardware_id}")
             
@@ -290,6 +267,40 @@ class InterruptManager(UniversalModuleInterface):
         
         return interrupted_modules
     
+    async def _interrupt_module(self, module_name: str, module_instance: Any, hardware_id: str) -> None:
+        """Методы прерывания одного модуля — по порядку из конфигурации"""
+        # Получаем методы прерывания для модуля
+        interrupt_methods = self.config.get_module_interrupt_methods(module_name)
+        module_timeout = self.config.get_module_timeout(module_name)
+        
+        # Вызываем методы прерывания
+        for method_name in interrupt_methods:
+            if hasattr(module_instance, method_name):
+                method = getattr(module_instance, method_name)
+                
+                # Вызываем метод с таймаутом
+                try:
+                    if asyncio.iscoroutinefunction(method):
+                        await asyncio.wait_for(method(), timeout=module_timeout)
+                    else:
+                        method()
+                    
+                    logger.warning(f"🚨 Module {module_name}.{method_name} interrupted for {hardware_id}")
+                    
+                except asyncio.TimeoutError:
+                    logger.error(f"Timeout interrupting {module_name}.{method_name}")
+                except Exception as e:
+                    logger.error(f"Error interrupting {module_name}.{method_name}: {e}")
+    
+    async def _run_interrupt_callback(self, callback: Callable, hardware_id: str) -> None:
+        try:
+            if asyncio.iscoroutinefunction(callback):
+                await callback(hardware_id)
+            else:
+                callback(hardware_id)
+        except Exception as e:
+            logger.error(f"Error in interrupt callback: {e}")
+    
     # Методы register_session и unregister_session оставлены для обратной совместимости,
     # но используют SessionRegistry, который уже обновляется через SessionTracker.
     # Фактически они становятся no-op или логгирующими заглушками, так как регистрация
@@ -105,11 +105,13 @@ class MemoryManagementAdapter(UniversalModuleInterface):
         
         Args:
             request: Запрос на работу с памятью
-                - action: str - действие (get_memory, get_context, update_memory, update_background, analyze)
+                - action: str - действие (get_memory, get_context, update_memory, update_background, note_turn, analyze)
                 - session_id: str - идентификатор сессии (для совместимости)
                 - hardware_id: str - идентификатор устройства
                 - prompt: str (опционально) - промпт
                 - response: str (опционально) - ответ
+                - turns: list (опционально, update_background) - пачка реплик
+                  [{"prompt", "response"}] для одного анализа
         
         Returns:
             Результат обработки
@@ -150,10 +152,15 @@ class MemoryManagementAdapter(UniversalModuleInterface):
                 response = request.get("response", "") or request.get("processed_text", "")
                 if not hardware_id:
                     raise ValueError("hardware_id обязателен для update_background")
-                updated = await self._manager.update_memory_background(hardware_id, prompt, response)
+                turns = request.get("turns")
+                if turns:
+                    updated = await self._manager.update_memory_batch(hardware_id, turns)
+                else:
+                    updated = await self._manager.update_memory_background(hardware_id, prompt, response)
                 if updated:
                     result = {
                         "success": True,
+                        "changed": updated.get("changed", True),
                         "memory": {
                             "recent_context": updated.get("short", ""),
                             "long_term_context": updated.get("long", ""),
@@ -161,6 +168,14 @@ class MemoryManagementAdapter(UniversalModuleInterface):
                     }
                 else:
                     result = {"success": False}
+            elif action == "note_turn":
+                # Short-term summary сразу после реплики; LLM анализ — пачкой через update_background
+                if not hardware_id:
+                    raise ValueError("hardware_id обязателен для note_turn")
+                prompt = request.get("prompt", "") or request.get("text", "")
+                response = request.get("response", "") or request.get("processed_text", "")
+                recent_context = await self._manager.note_turn(hardware_id, prompt, response)
+                result = {"success": bool(recent_context), "recent_context": recent_context}
             elif action == "update_memory":
                 # Обновляем память через update_memory_background
                 if not session_id:
@@ -12,7 +12,7 @@ import asyncio
 import logging
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..config import MemoryConfig
 from ..providers.memory_analyzer import MemoryAnalyzer
@@ -43,6 +43,7 @@ class MemoryManager:
         self._ephemeral_memory: Dict[str, Dict[str, Any]] = {}
         self._ephemeral_memory_lock = asyncio.Lock()
         self._ephemeral_memory_ttl = timedelta(hours=2)
+        self._recent_summary_turns = 3
         
     async def initialize(self):
         """Инициализация MemoryManager"""
@@ -118,8 +119,13 @@ class MemoryManager:
             eph_short = (ephemeral or {}).get("short", "")
             eph_long = (ephemeral or {}).get("long", "")
 
-            short_value = db_short or eph_short
-            long_value = db_long or eph_long
+            if ephemeral and not ephemeral["persisted"]:
+                # Ещё не записанная память (реплики до анализа пачки, ошибка записи) новее БД
+                short_value = eph_short or db_short
+                long_value = eph_long or db_long
+            else:
+                short_value = db_short or eph_short
+                long_value = db_long or eph_long
 
             if short_value or long_value:
                 return {
@@ -186,6 +192,32 @@ class MemoryManager:
             logger.error(f"❌ Error analyzing conversation: {e}")
             return "", ""
 
+    async def analyze_turns(self, turns: List[Dict[str, str]], hardware_id: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Анализирует пачку реплик одним вызовом.
+
+        Реплики нумеруются ([1], [2], ...) в блоках USER INPUT / AI RESPONSE
+        того же промпта; одна реплика передаётся без изменений.
+        """
+        if len(turns) == 1:
+            return await self.analyze_conversation(turns[0].get("prompt", ""), turns[0].get("response", ""), hardware_id=hardware_id)
+
+        if not self.memory_analyzer:
+            # Эвристика ищет по одному факту на паттерн — применяем к каждой реплике
+            shorts: List[str] = []
+            longs: List[str] = []
+            for turn in turns:
+                short_memory, long_memory = self._extract_memory_heuristic(turn.get("prompt", ""), turn.get("response", ""))
+                if short_memory and short_memory not in shorts:
+                    shorts.append(short_memory)
+                if long_memory and long_memory not in longs:
+                    longs.append(long_memory)
+            return "; ".join(shorts), "; ".join(longs)
+
+        prompt = "\n".join(f"[{index}] {turn.get('prompt', '')}" for index, turn in enumerate(turns, 1))
+        response = "\n".join(f"[{index}] {turn.get('response', '')}" for index, turn in enumerate(turns, 1))
+        return await self.analyze_conversation(prompt, response, hardware_id=hardware_id)
+
     def _extract_memory_heuristic(self, prompt: str, response: str) -> Tuple[str, str]:
         """
         Lightweight fallback extraction when Gemini analyzer is unavailable.
@@ -273,7 +305,7 @@ class MemoryManager:
             logger.warning(f"⚠️ Heuristic memory extraction failed: {e}")
             return "", ""
     
-    async def update_memory_background(self, hardware_id: str, prompt: str, response: str) -> Optional[Dict[str, str]]:
+    async def update_memory_background(self, hardware_id: str, prompt: str, response: str) -> Optional[Dict[str, Any]]:
         """
         Фоновое обновление памяти пользователя.
         
@@ -284,23 +316,38 @@ class MemoryManager:
             
         Этот метод заменяет _update_memory_background() из text_processor.py
         """
+        return await self.update_memory_batch(hardware_id, [{"prompt": prompt, "response": response}])
+
+    async def update_memory_batch(self, hardware_id: str, turns: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """
+        Обновление памяти по пачке реплик: один анализ, запись только при изменении.
+        
+        Args:
+            hardware_id: Аппаратный ID пользователя
+            turns: Реплики в порядке диалога: [{"prompt": ..., "response": ...}]
+            
+        Returns:
+            {"short", "long", "changed"} или None, если запоминать нечего
+        """
         try:
-            logger.debug(f"🔄 Starting background memory update for {hardware_id}")
+            logger.debug(f"🔄 Starting background memory update for {hardware_id} ({len(turns)} turns)")
             
             # Анализируем разговор для извлечения памяти
-            short_memory, long_memory = await self.analyze_conversation(prompt, response, hardware_id=hardware_id)
+            short_memory, long_memory = await self.analyze_turns(turns, hardware_id=hardware_id)
 
             # Стандартизуем short-term память как компактный chat-summary.
-            short_memory = self._build_recent_chat_summary(
-                prompt=prompt,
-                response=response,
-                analyzer_short_memory=short_memory,
-            )
+            # Реплики, отмеченные после сбора пачки (note_turn), тоже входят: запись не откатывает summary назад
+            summary_turns = await self._get_recent_turns(hardware_id) or turns
+            short_memory = self._build_recent_chat_summary_for_turns(summary_turns, analyzer_short_memory=short_memory)
 
             if not short_memory and not long_memory:
                 logger.debug(f"🧠 No information found for {hardware_id} to remember")
                 return None
 
+            if await self._memory_unchanged(hardware_id, short_memory, long_memory):
+                logger.debug(f"🧠 Memory for {hardware_id} unchanged, DB write skipped")
+                return {"short": short_memory, "long": long_memory, "changed": False}
+
             if self.db_manager:
                 success = await self.db_manager.update_user_memory(
                     hardware_id,
@@ -308,24 +355,67 @@ class MemoryManager:
                     long_memory
                 )
                 if success:
-                    await self._store_ephemeral_memory(hardware_id, short_memory, long_memory)
+                    await self._store_ephemeral_memory(hardware_id, short_memory, long_memory, persisted=True)
                     logger.info(
                         f"✅ Memory for {hardware_id} updated: short-term ({len(short_memory)} chars), long-term ({len(long_memory)} chars)"
                     )
-                    return {"short": short_memory, "long": long_memory}
+                    return {"short": short_memory, "long": long_memory, "changed": True}
 
                 logger.warning(f"⚠️ Could not update memory for {hardware_id}")
             else:
                 logger.warning("⚠️ DatabaseManager is not set in MemoryManager; using ephemeral short-term memory fallback")
 
-            await self._store_ephemeral_memory(hardware_id, short_memory, long_memory)
-            return {"short": short_memory, "long": long_memory}
+            # Без записи в БД копия остаётся только fallback для чтения, а не "последней записанной"
+            await self._store_ephemeral_memory(hardware_id, short_memory, long_memory, persisted=self.db_manager is None)
+            return {"short": short_memory, "long": long_memory, "changed": True}
                 
         except Exception as e:
             logger.error(f"❌ Error in background memory update for {hardware_id}: {e}")
             # НЕ поднимаем исключение - это фоновая задача
             return None
 
+    async def note_turn(self, hardware_id: str, prompt: str, response: str) -> str:
+        """
+        Short-term chat-summary сразу после реплики (эвристика, без LLM и записи в БД).
+
+        LLM анализ и запись идут пачкой (MemoryConsolidator); до неё summary
+        живёт в ephemeral памяти и имеет приоритет над устаревшей копией из БД.
+        """
+        if not hardware_id:
+            return ""
+        async with self._ephemeral_memory_lock:
+            self._cleanup_expired_ephemeral_locked()
+            entry = self._ephemeral_memory.get(hardware_id) or {}
+            recent_turns = list(entry.get("recent_turns") or []) + [{"prompt": prompt, "response": response}]
+            recent_turns = recent_turns[-self._recent_summary_turns:]
+            short_memory = self._build_recent_chat_summary_for_turns(recent_turns, max_turns=self._recent_summary_turns)
+            self._ephemeral_memory[hardware_id] = {
+                "short": short_memory,
+                "long": entry.get("long", "") or "",
+                "recent_turns": recent_turns,
+                "persisted": False,
+                "updated_at": datetime.now(timezone.utc),
+            }
+        return short_memory
+
+    async def _memory_unchanged(self, hardware_id: str, short_memory: str, long_memory: str) -> bool:
+        """Совпадает ли новая память с последней записанной (ephemeral копия после записи, иначе БД)"""
+        current = await self._get_ephemeral_memory(hardware_id)
+        if self.db_manager and not (current or {}).get("persisted"):
+            # Копия не записана (ошибка БД или note_turn) — сравниваем с тем, что реально в БД
+            current = None
+            try:
+                current = await asyncio.wait_for(
+                    self.db_manager.get_user_memory(hardware_id),
+                    timeout=self.config.memory_timeout
+                )
+            except Exception:
+                # Не смогли сравнить — записываем
+                return False
+        if not current:
+            return False
+        return (current.get("short") or "") == short_memory and (current.get("long") or "") == long_memory
+
     def _build_recent_chat_summary(
         self,
         prompt: str,
@@ -336,20 +426,34 @@ class MemoryManager:
         Builds a compact chat-style memory snippet.
         Stores only essential dialogue summary, not raw full text.
         """
-        user_summary = self._sanitize_memory_text(prompt, max_chars=140)
-        assistant_summary = self._sanitize_memory_text(response, max_chars=140)
-        analyzer_note = self._sanitize_memory_text(analyzer_short_memory, max_chars=120)
-
-        if not user_summary and not assistant_summary and not analyzer_note:
-            return ""
+        return self._build_recent_chat_summary_for_turns(
+            [{"prompt": prompt, "response": response}],
+            analyzer_short_memory=analyzer_short_memory,
+        )
 
+    def _build_recent_chat_summary_for_turns(
+        self,
+        turns: List[Dict[str, str]],
+        analyzer_short_memory: str = "",
+        max_turns: int = 3,
+    ) -> str:
+        """Chat-summary по последним max_turns репликам пачки"""
         lines = ["Recent chat summary:"]
-        if user_summary:
-            lines.append(f"- User: {user_summary}")
-        if assistant_summary:
-            lines.append(f"- Assistant: {assistant_summary}")
-        if analyzer_note and analyzer_note.lower() not in (user_summary or "").lower():
+        user_summaries = []
+        for turn in turns[-max_turns:]:
+            user_summary = self._sanitize_memory_text(turn.get("prompt", ""), max_chars=140)
+            assistant_summary = self._sanitize_memory_text(turn.get("response", ""), max_chars=140)
+            if user_summary:
+                lines.append(f"- User: {user_summary}")
+                user_summaries.append(user_summary.lower())
+            if assistant_summary:
+                lines.append(f"- Assistant: {assistant_summary}")
+        analyzer_note = self._sanitize_memory_text(analyzer_short_memory, max_chars=120)
+        if analyzer_note and not any(analyzer_note.lower() in summary for summary in user_summaries):
             lines.append(f"- Context: {analyzer_note}")
+
+        if len(lines) == 1:
+            return ""
         return "\n".join(lines)
 
     @staticmethod
@@ -372,18 +476,27 @@ class MemoryManager:
             return compact[: max_chars - 3].rstrip() + "..."
         return compact
 
-    async def _store_ephemeral_memory(self, hardware_id: str, short_memory: str, long_memory: str) -> None:
+    async def _store_ephemeral_memory(
+        self,
+        hardware_id: str,
+        short_memory: str,
+        long_memory: str,
+        persisted: bool = False,
+    ) -> None:
         if not hardware_id:
             return
         async with self._ephemeral_memory_lock:
             self._cleanup_expired_ephemeral_locked()
+            previous = self._ephemeral_memory.get(hardware_id) or {}
             self._ephemeral_memory[hardware_id] = {
                 "short": short_memory or "",
                 "long": long_memory or "",
+                "recent_turns": previous.get("recent_turns") or [],
+                "persisted": persisted,
                 "updated_at": datetime.now(timezone.utc),
             }
 
-    async def _get_ephemeral_memory(self, hardware_id: str) -> Optional[Dict[str, str]]:
+    async def _get_ephemeral_memory(self, hardware_id: str) -> Optional[Dict[str, Any]]:
         if not hardware_id:
             return None
         async with self._ephemeral_memory_lock:
@@ -394,8 +507,14 @@ class MemoryManager:
             return {
                 "short": entry.get("short", "") or "",
                 "long": entry.get("long", "") or "",
+                "persisted": bool(entry.get("persisted")),
             }
 
+    async def _get_recent_turns(self, hardware_id: str) -> List[Dict[str, str]]:
+        async with self._ephemeral_memory_lock:
+            entry = self._ephemeral_memory.get(hardware_id) or {}
+            return list(entry.get("recent_turns") or [])
+
     def _cleanup_expired_ephemeral_locked(self) -> None:
         now = datetime.now(timezone.utc)
         expired = []
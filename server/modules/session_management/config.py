@@ -81,6 +81,7 @@ class SessionManagementConfig:
             'session_cleanup_interval': self.session_cleanup_interval,
             'max_concurrent_sessions': self.max_concurrent_sessions,
             'session_heartbeat_interval': self.session_heartbeat_interval,
+            'interrupt_cleanup_delay': self.interrupt_cleanup_delay,
             'tracking_enabled': self.tracking_enabled,
             'track_user_agents': self.track_user_agents,
             'track_ip_addresses': self.track_ip_addresses,
@@ -1,11 +1,21 @@
 """
 Session Registry - Централизованное хранилище активных сессий
+
+Сессии индексируются по hardware_id: прерывание и поиск сессий устройства
+стоят O(k), k — сессий устройства, а не O(n) по всем сессиям.
+
+Устаревание — ленивые кучи по last_activity и по времени прерывания:
+expire_stale() снимает только истёкшие записи (O(log n) на запись).
+update_last_activity кучу не трогает: запись с устаревшим временем при
+извлечении переставляется на актуальное last_activity.
 """
 
+import heapq
 import logging
+import sys
 import time
 import threading
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List, Set, Tuple
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
@@ -28,11 +38,19 @@ class SessionRegistry:
     """
     Централизованный реестр сессий.
     Обеспечивает thread-safe доступ к данным сессий для всех компонентов.
-    Использует threading.RLock для поддержки синхронных методов (get_status).
+    Использует threading.RLock для поддержки синхронных методов (get_status);
+    все операции под блокировкой O(1)/O(k), поэтому она не блокирует event loop.
     """
     
     _instance = None
     
+    # Значения по умолчанию; SessionTracker переопределяет их из конфигурации
+    DEFAULT_SESSION_TTL = 3600.0
+    DEFAULT_INTERRUPTED_TTL = 10.0
+    
+    # Перестройка кучи, когда устаревших записей больше живых
+    _HEAP_COMPACT_MIN = 1024
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SessionRegistry, cls).__new__(cls)
@@ -45,32 +63,69 @@ class SessionRegistry:
             
         self._lock = threading.RLock()
         self._active_sessions: Dict[str, SessionData] = {}
-        self._interrupted_sessions: Set[str] = set()
+        # Вторичный индекс: hardware_id -> session_id
+        self._hardware_sessions: Dict[str, Set[str]] = {}
+        # session_id -> время прерывания
+        self._interrupted_sessions: Dict[str, float] = {}
         self._inflight_sessions: Set[str] = set()
         self._inflight_hardware_sessions: Dict[str, Set[str]] = {}
+        
+        # Кучи устаревания: (время, session_id)
+        self._activity_heap: List[Tuple[float, str]] = []
+        self._interrupted_heap: List[Tuple[float, str]] = []
+        self.session_ttl = self.DEFAULT_SESSION_TTL
+        self.interrupted_ttl = self.DEFAULT_INTERRUPTED_TTL
+        
+        # Учёт памяти: оценка размера каждой сессии на момент регистрации
+        self._session_bytes: Dict[str, int] = {}
+        self._sessions_bytes_total = 0
+        self.expired_total = 0
         self.initialized = True
         
         logger.info("SessionRegistry initialized")
     
+    def configure_expiry(self, session_ttl: Optional[float] = None, interrupted_ttl: Optional[float] = None) -> None:
+        """
+        Настройка устаревания
+        
+        Args:
+            session_ttl: Простой сессии (сек), после которого она удаляется
+            interrupted_ttl: Сколько прерванная сессия хранится после прерывания (сек)
+        """
+        with self._lock:
+            if session_ttl is not None:
+                self.session_ttl = float(session_ttl)
+            if interrupted_ttl is not None:
+                self.interrupted_ttl = float(interrupted_ttl)
+    
     def register_session(self, session_data: SessionData) -> bool:
         """Регистрация новой сессии"""
         with self._lock:
             if session_data.session_id in self._active_sessions:
                 logger.warning(f"Session {session_data.session_id} already exists")
                 return False
-                
-            self._active_sessions[session_data.session_id] = session_data
-            logger.debug(f"Session registered: {session_data.session_id[:8]}...")
+            
+            # Регистрация снимает истёкшие записи: реестр не растёт без фоновой очистки
+            self._expire_locked(time.time())
+            
+            session_id = session_data.session_id
+            self._active_sessions[session_id] = session_data
+            self._hardware_sessions.setdefault(session_data.hardware_id, set()).add(session_id)
+            heapq.heappush(self._activity_heap, (session_data.last_activity, session_id))
+            size = self._estimate_session_bytes(session_data)
+            self._session_bytes[session_id] = size
+            self._sessions_bytes_total += size
+            logger.debug(f"Session registered: {session_id[:8]}...")
             return True
     
     def unregister_session(self, session_id: str) -> Optional[SessionData]:
         """Удаление сессии"""
         with self._lock:
-            if session_id in self._active_sessions:
-                session = self._active_sessions.pop(session_id)
+            session = self._remove_locked(session_id)
+            if session is not None:
+                self._compact_heaps_locked()
                 logger.debug(f"Session unregistered: {session_id[:8]}...")
-                return session
-            return None
+            return session
             
     def get_session(self, session_id: str) -> Optional[SessionData]:
         """Получение сессии по ID"""
@@ -81,8 +136,8 @@ class SessionRegistry:
         """Получение всех сессий для hardware_id"""
         with self._lock:
             return [
-                s for s in self._active_sessions.values() 
-                if s.hardware_id == hardware_id
+                self._active_sessions[session_id]
+                for session_id in self._hardware_sessions.get(hardware_id, ())
             ]
             
     def update_last_activity(self, session_id: str) -> bool:
@@ -101,7 +156,10 @@ class SessionRegistry:
                 session.interrupt_flag = True
                 session.interrupt_reason = reason
                 session.status = "interrupted"
-                self._interrupted_sessions.add(session_id)
+                if session_id not in self._interrupted_sessions:
+                    interrupted_at = time.time()
+                    self._interrupted_sessions[session_id] = interrupted_at
+                    heapq.heappush(self._interrupted_heap, (interrupted_at, session_id))
                 logger.info(f"Session {session_id[:8]} interrupted. Reason: {reason}")
                 return True
             return False
@@ -111,6 +169,83 @@ class SessionRegistry:
         with self._lock:
             return list(self._active_sessions.values())
 
+    def expire_stale(self, now: Optional[float] = None) -> List[SessionData]:
+        """
+        Удаляет сессии без активности дольше session_ttl и прерванные
+        дольше interrupted_ttl назад.
+        
+        Returns:
+            Удалённые сессии (со статусом "expired")
+        """
+        with self._lock:
+            return self._expire_locked(time.time() if now is None else now)
+
+    def _expire_locked(self, now: float) -> List[SessionData]:
+        expired: List[SessionData] = []
+        
+        activity_deadline = now - self.session_ttl
+        heap = self._activity_heap
+        while heap and heap[0][0] <= activity_deadline:
+            _, session_id = heapq.heappop(heap)
+            session = self._active_sessions.get(session_id)
+            if session is None:
+                continue
+            if session.last_activity > activity_deadline:
+                # Сессия активна: запись переставляется на актуальное время
+                heapq.heappush(heap, (session.last_activity, session_id))
+                continue
+            expired.append(self._remove_locked(session_id))
+        
+        interrupted_deadline = now - self.interrupted_ttl
+        heap = self._interrupted_heap
+        while heap and heap[0][0] <= interrupted_deadline:
+            interrupted_at, session_id = heapq.heappop(heap)
+            if self._interrupted_sessions.get(session_id) != interrupted_at:
+                continue
+            # Прерванная сессия не переиспользуется (create_or_update_session ищет active)
+            expired.append(self._remove_locked(session_id))
+        
+        for session in expired:
+            session.status = "expired"
+        if expired:
+            self.expired_total += len(expired)
+            logger.debug(f"SessionRegistry: expired {len(expired)} sessions")
+        return expired
+
+    def _remove_locked(self, session_id: str) -> Optional[SessionData]:
+        session = self._active_sessions.pop(session_id, None)
+        if session is None:
+            return None
+        
+        hardware_sessions = self._hardware_sessions.get(session.hardware_id)
+        if hardware_sessions is not None:
+            hardware_sessions.discard(session_id)
+            if not hardware_sessions:
+                del self._hardware_sessions[session.hardware_id]
+        self._interrupted_sessions.pop(session_id, None)
+        self._sessions_bytes_total -= self._session_bytes.pop(session_id, 0)
+        return session
+
+    def _compact_heaps_locked(self) -> None:
+        """Записи удалённых сессий в кучах устаревают лениво; перестраиваем при перекосе"""
+        if len(self._activity_heap) > self._HEAP_COMPACT_MIN + 2 * len(self._active_sessions):
+            self._activity_heap = [(s.last_activity, sid) for sid, s in self._active_sessions.items()]
+            heapq.heapify(self._activity_heap)
+        if len(self._interrupted_heap) > self._HEAP_COMPACT_MIN + 2 * len(self._interrupted_sessions):
+            self._interrupted_heap = [(at, sid) for sid, at in self._interrupted_sessions.items()]
+            heapq.heapify(self._interrupted_heap)
+
+    @staticmethod
+    def _estimate_session_bytes(session: SessionData) -> int:
+        """Оценка памяти сессии (объект, его поля и контекст, без вложенных значений)"""
+        size = sys.getsizeof(session) + sys.getsizeof(session.__dict__)
+        size += sys.getsizeof(session.session_id) + sys.getsizeof(session.hardware_id)
+        size += sys.getsizeof(session.context)
+        for value in (session.user_agent, session.ip_address, session.interrupt_reason):
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
     def try_acquire_inflight(
         self,
         session_id: str,
@@ -129,7 +264,8 @@ class SessionRegistry:
                     "active_sessions": [session_id]
                 }
 
-            active_sessions = list(self._inflight_hardware_sessions.get(hardware_id, set()))
+            hardware_inflight = self._inflight_hardware_sessions.get(hardware_id)
+            active_sessions = list(hardware_inflight) if hardware_inflight else []
             if prevent_concurrent_hardware and active_sessions:
                 return {
                     "ok": False,
@@ -138,9 +274,9 @@ class SessionRegistry:
                 }
 
             self._inflight_sessions.add(session_id)
-            if hardware_id not in self._inflight_hardware_sessions:
-                self._inflight_hardware_sessions[hardware_id] = set()
-            self._inflight_hardware_sessions[hardware_id].add(session_id)
+            if hardware_inflight is None:
+                hardware_inflight = self._inflight_hardware_sessions[hardware_id] = set()
+            hardware_inflight.add(session_id)
 
             return {"ok": True, "active_sessions": active_sessions}
 
@@ -170,11 +306,51 @@ class SessionRegistry:
         with self._lock:
             return list(self._inflight_sessions)
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Размеры структур и оценка занимаемой памяти"""
+        with self._lock:
+            index_bytes = sum(
+                sys.getsizeof(container)
+                for container in (
+                    self._active_sessions,
+                    self._hardware_sessions,
+                    self._interrupted_sessions,
+                    self._inflight_sessions,
+                    self._inflight_hardware_sessions,
+                    self._activity_heap,
+                    self._interrupted_heap,
+                    self._session_bytes,
+                )
+            )
+            # Множества индекса по hardware_id и записи куч (кортеж на запись)
+            index_bytes += sum(sys.getsizeof(ids) for ids in self._hardware_sessions.values())
+            tuple_bytes = sys.getsizeof((0.0, ""))
+            index_bytes += tuple_bytes * (len(self._activity_heap) + len(self._interrupted_heap))
+            return {
+                'active_sessions': len(self._active_sessions),
+                'hardware_ids': len(self._hardware_sessions),
+                'interrupted_sessions': len(self._interrupted_sessions),
+                'inflight_sessions': len(self._inflight_sessions),
+                'activity_heap_size': len(self._activity_heap),
+                'interrupted_heap_size': len(self._interrupted_heap),
+                'expired_total': self.expired_total,
+                'session_ttl': self.session_ttl,
+                'interrupted_ttl': self.interrupted_ttl,
+                'sessions_bytes': self._sessions_bytes_total,
+                'index_bytes': index_bytes,
+                'approx_bytes': self._sessions_bytes_total + index_bytes,
+            }
+
     def clear(self):
         """Очистка всех сессий"""
         with self._lock:
             self._active_sessions.clear()
+            self._hardware_sessions.clear()
             self._interrupted_sessions.clear()
             self._inflight_sessions.clear()
             self._inflight_hardware_sessions.clear()
+            self._activity_heap.clear()
+            self._interrupted_heap.clear()
+            self._session_bytes.clear()
+            self._sessions_bytes_total = 0
             logger.info("SessionRegistry cleared")
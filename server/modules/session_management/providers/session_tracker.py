@@ -57,6 +57,10 @@ class SessionTracker(UniversalProviderInterface):
         
         # Реестр сессий
         self.registry = SessionRegistry()
+        self.registry.configure_expiry(
+            session_ttl=self.session_timeout,
+            interrupted_ttl=config.get('interrupt_cleanup_delay', SessionRegistry.DEFAULT_INTERRUPTED_TTL)
+        )
         self.session_history: list = []
         
         # Фоновые задачи
@@ -361,21 +365,12 @@ class SessionTracker(UniversalProviderInterface):
     async def _cleanup_expired_sessions(self):
         """Очистка устаревших сессий"""
         try:
-            current_time = time.time()
-            all_sessions = self.registry.get_all_sessions()
-            expired_sessions = []
+            # Реестр снимает только истёкшие записи своих куч, без обхода всех сессий
+            expired_sessions = self.registry.expire_stale()
             
-            for session in all_sessions:
-                if current_time - session.last_activity > self.session_timeout:
-                    expired_sessions.append(session.session_id)
-            
-            # Удаляем устаревшие сессии
-            for session_id in expired_sessions:
-                session = self.registry.unregister_session(session_id)
-                if session:
-                    session.status = "expired"
-                    self.session_history.append(session)
-                    logger.debug(f"Session expired and archived: {session_id[:8]}...")
+            for session in expired_sessions:
+                self.session_history.append(session)
+                logger.debug(f"Session expired and archived: {session.session_id[:8]}...")
             
             # Ограничиваем историю сессий
             if len(self.session_history) > self.max_session_history:
@@ -0,0 +1,281 @@
+"""
+DecisionCache - кэш решений can_process
+
+Ограниченный LRU кэш по hardware_id:
+- fresh (age < ttl): отдаём сразу
+- stale (ttl <= age < ttl + stale_ttl): отдаём старое решение и
+  обновляем его в фоне (stale-while-revalidate)
+- miss: single-flight — конкурентные промахи по одному hardware_id
+  ждут один и тот же загрузчик вместо N одновременных запросов в БД
+
+Глобальная инвалидация — через эпоху (bump_epoch), без очистки словаря.
+С jitter записи прошлой эпохи истекают не одновременно, а каждая в свой
+момент внутри окна jitter (детерминированно по ключу) — без лавины
+запросов в БД сразу после сброса.
+Результат загрузки, начатой до инвалидации, в кэш не кладётся: инвалидация
+ключа снимает только его загрузку, остальные ключи не затрагиваются.
+
+Загрузчик исполняется в отдельной задаче, все ожидающие (включая
+инициатора) ждут её через shield: отмена одного запроса не отменяет
+загрузку и не роняет остальных ожидающих.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    epoch: int
+
+
+@dataclass
+class _Flight:
+    """Загрузка ключа в процессе"""
+    generation: int
+    epoch: int
+    task: Optional[asyncio.Task] = None
+    # Ключ инвалидирован во время загрузки: результат не кэшируется
+    invalidated: bool = False
+
+
+class DecisionCache:
+    """Ограниченный single-flight кэш с stale-while-revalidate"""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 30.0,
+        stale_ttl_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries: Максимум записей (LRU вытеснение)
+            ttl_seconds: Время жизни свежей записи
+            stale_ttl_seconds: Сколько после ttl запись отдаётся с фоновым обновлением
+            clock: Источник времени (для тестов)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = max(0.0, stale_ttl_seconds)
+        self._clock = clock
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._epoch_bumped_at = 0.0
+        self._epoch_jitter = 0.0
+        # Счётчик глобальных инвалидаций: загрузка, пережившая clear/bump_epoch, не кэшируется
+        self._generation = 0
+        self._inflight: Dict[str, _Flight] = {}
+        # Сильные ссылки на задачи загрузки (снятая инвалидацией загрузка без ожидающих)
+        self._flight_tasks: Set[asyncio.Task] = set()
+
+        # Метрики
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Синхронный доступ
+    # ------------------------------------------------------------------
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(значение, FRESH|STALE) или (None, None) при промахе"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            now = self._clock()
+            age = now - entry.stored_at
+            if (
+                (entry.epoch != self._epoch and not self._within_epoch_jitter(key, entry, now))
+                or age >= self.ttl_seconds + self.stale_ttl_seconds
+            ):
+                del self._entries[key]
+                return None, None
+            self._entries.move_to_end(key)
+            return entry.value, (FRESH if age < self.ttl_seconds else STALE)
+
+    def _within_epoch_jitter(self, key: str, entry: _Entry, now: float) -> bool:
+        """Запись прошлой эпохи живёт до своей отсечки в окне jitter"""
+        if entry.epoch != self._epoch - 1 or self._epoch_jitter <= 0:
+            return False
+        spread = zlib.crc32(key.encode("utf-8")) / 0x100000000
+        return now < self._epoch_bumped_at + self._epoch_jitter * spread
+
+    def get(self, key: str) -> Optional[Any]:
+        """Только свежее значение"""
+        value, state = self.lookup(key)
+        return value if state == FRESH else None
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._store(key, value, self._epoch)
+
+    def _store(self, key: str, value: Any, epoch: int) -> None:
+        self._entries[key] = _Entry(value=value, stored_at=self._clock(), epoch=epoch)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._drop_inflight(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._drop_inflight()
+
+    def _drop_inflight(self, key: Optional[str] = None) -> None:
+        """Новые запросы не присоединяются к загрузке, начатой до инвалидации"""
+        if key is None:
+            flights = list(self._inflight.values())
+            self._inflight.clear()
+        else:
+            flights = [self._inflight.pop(key, None)]
+        for flight in flights:
+            if flight is not None:
+                flight.invalidated = True
+
+    def bump_epoch(self, jitter_seconds: float = 0.0) -> int:
+        """
+        Глобальная инвалидация: записи прошлой эпохи отбрасываются при чтении.
+
+        Args:
+            jitter_seconds: Окно, в котором записи прошлой эпохи истекают вразброс
+        """
+        with self._lock:
+            self._generation += 1
+            self._epoch += 1
+            self._epoch_bumped_at = self._clock()
+            self._epoch_jitter = max(0.0, jitter_seconds)
+            self._drop_inflight()
+            return self._epoch
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Async: single-flight + stale-while-revalidate
+    # ------------------------------------------------------------------
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        refresh_loader: Optional[Callable[[], Awaitable[Any]]] = None,
+        on_loaded: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Значение из кэша или результат loader().
+
+        Конкурентные промахи по одному ключу ждут один вызов loader.
+        refresh_loader (по умолчанию loader) используется для фонового
+        обновления stale записи. on_loaded(value) вызывается отдельно для
+        каждого ожидавшего загрузку (не для попаданий) и возвращает его ответ;
+        в кэше остаётся результат loader.
+        """
+        value, state = self.lookup(key)
+        if state == FRESH:
+            self.hits += 1
+            return value
+        if state == STALE:
+            self.stale_hits += 1
+            self._refresh_in_background(key, refresh_loader or loader)
+            return value
+
+        self.misses += 1
+        value = await self._load(key, loader)
+        return on_loaded(value) if on_loaded is not None else value
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            flight = self._start_flight(key, loader)
+        assert flight.task is not None
+        return await asyncio.shield(flight.task)
+
+    def _start_flight(self, key: str, loader: Callable[[], Awaitable[Any]]) -> _Flight:
+        with self._lock:
+            flight = _Flight(generation=self._generation, epoch=self._epoch)
+        flight.task = asyncio.create_task(self._run_flight(key, flight, loader))
+        # Исключение без ожидающих не должно логироваться как "never retrieved"
+        flight.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._flight_tasks.add(flight.task)
+        flight.task.add_done_callback(self._flight_tasks.discard)
+        self._inflight[key] = flight
+        return flight
+
+    async def _run_flight(self, key: str, flight: _Flight, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        finally:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        with self._lock:
+            if not flight.invalidated and flight.generation == self._generation:
+                self._store(key, value, flight.epoch)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        flight = self._start_flight(key, loader)
+        assert flight.task is not None
+        flight.task.add_done_callback(lambda t: self._log_refresh_error(key, t))
+
+    @staticmethod
+    def _log_refresh_error(key: str, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"[F-2025-017] Decision refresh failed for {key[:8]}...: {task.exception()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'epoch': self._epoch,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
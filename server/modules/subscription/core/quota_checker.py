@@ -196,6 +196,10 @@ class QuotaChecker:
         Инкрементирует счетчики использования для пользователя.
         Вызывается после успешной обработки запроса.
         """
+        return await self.repository.run_async(self._increment_usage_sync, hardware_id)
+
+    def _increment_usage_sync(self, hardware_id: str) -> Dict:
+        """Синхронная часть increment_usage (выполняется в потоке пула)"""
         subscription = self.repository.get_subscription(hardware_id)
         
         # Если подписки нет - создаем её (первое использование)
@@ -225,8 +229,7 @@ class QuotaChecker:
         # Для всех остальных статусов (limited_free_trial, canceled, unpaid, none, etc.)
         # Инкрементируем счетчики
         current_date = date.today()
-        # [FIX] Используем async/sync правильно. Репозиторий - синхронный (sqlite), но вызывается в thread executor или async wrapper?
-        # В данном коде репозиторий синхронный.
+        # Репозиторий синхронный: increment_usage вызывает этот метод через repository.run_async
         success = self.repository.increment_usage(
             hardware_id,
             current_date,
@@ -240,27 +243,21 @@ class QuotaChecker:
             logger.error(f"[QuotaChecker] Failed to increment usage for {hardware_id[:8]}...")
             return {'success': False, 'message': 'Failed to increment usage'}
 
+    def _reset_counter(self, counter: str, reset_date: date) -> int:
+        return self.repository.reset_usage_counters(
+            counter,
+            reset_date,
+            limited_statuses=self._limited_statuses_for_usage_tracking(),
+            chunk_size=self.config.quota_reset_chunk_size,
+        )
+
     def reset_daily_counters(self) -> Dict:
         """
         Сбрасывает ежедневные счетчики использования для всех пользователей,
-        у которых usage_last_reset_date не равен сегодняшней дате.
+        у которых usage_last_reset_date раньше сегодняшней даты.
         """
         today = date.today()
-        subscriptions_to_reset = self.repository.get_subscriptions_for_daily_reset(
-            today,
-            limited_statuses=self._limited_statuses_for_usage_tracking()
-        )
-        
-        reset_count = 0
-        for sub in subscriptions_to_reset:
-            # Проверяем, что сброс действительно нужен (может быть уже сброшен weekly/monthly)
-            if sub['usage_last_reset_date'] < today:
-                self.repository.update_subscription(
-                    sub['hardware_id'],
-                    usage_daily_count=0,
-                    usage_last_reset_date=today # Обновляем дату сброса
-                )
-                reset_count += 1
+        reset_count = self._reset_counter('usage_daily_count', today)
         
         logger.info(f"[QuotaChecker] Reset daily counters: {reset_count} subscriptions")
         return {'success': True, 'reset_count': reset_count, 'reset_date': today.isoformat()}
@@ -268,25 +265,11 @@ class QuotaChecker:
     def reset_weekly_counters(self) -> Dict:
         """
         Сбрасывает еженедельные счетчики использования для всех пользователей,
-        у которых usage_last_reset_date не равен началу текущей недели.
+        у которых usage_last_reset_date раньше начала текущей недели.
         """
         today = date.today()
         week_start = today - timedelta(days=today.weekday()) # Понедельник
-        
-        subscriptions_to_reset = self.repository.get_subscriptions_for_weekly_reset(
-            week_start,
-            limited_statuses=self._limited_statuses_for_usage_tracking()
-        )
-        
-        reset_count = 0
-        for sub in subscriptions_to_reset:
-            if sub['usage_last_reset_date'] < week_start:
-                self.repository.update_subscription(
-                    sub['hardware_id'],
-                    usage_weekly_count=0,
-                    usage_last_reset_date=week_start # Обновляем дату сброса
-                )
-                reset_count += 1
+        reset_count = self._reset_counter('usage_weekly_count', week_start)
         
         logger.info(f"[QuotaChecker] Reset weekly counters: {reset_count} subscriptions")
         return {'success': True, 'reset_count': reset_count, 'reset_date': week_start.isoformat()}
@@ -294,25 +277,11 @@ class QuotaChecker:
     def reset_monthly_counters(self) -> Dict:
         """
         Сбрасывает ежемесячные счетчики использования для всех пользователей,
-        у которых usage_last_reset_date не равен началу текущего месяца.
+        у которых usage_last_reset_date раньше начала текущего месяца.
         """
         today = date.today()
         month_start = date(today.year, today.month, 1)
-        
-        subscriptions_to_reset = self.repository.get_subscriptions_for_monthly_reset(
-            month_start,
-            limited_statuses=self._limited_statuses_for_usage_tracking()
-        )
-        
-        reset_count = 0
-        for sub in subscriptions_to_reset:
-            if sub['usage_last_reset_date'] < month_start:
-                self.repository.update_subscription(
-                    sub['hardware_id'],
-                    usage_monthly_count=0,
-                    usage_last_reset_date=month_start # Обновляем дату сброса
-                )
-                reset_count += 1
+        reset_count = self._reset_counter('usage_monthly_count', month_start)
         
         logger.info(f"[QuotaChecker] Reset monthly counters: {reset_count} subscriptions")
         return {'success': True, 'reset_count': reset_count, 'reset_date': month_start.isoformat()}
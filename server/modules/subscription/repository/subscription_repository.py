@@ -3,9 +3,10 @@
 Repository для работы с подписками в БД
 MVP 2: База данных
 """
+import asyncio
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -19,7 +20,14 @@ class SubscriptionRepository:
     """Repository для работы с подписками"""
     GRANDFATHER_BOOTSTRAP_EVENT_ID = "system.grandfather_bootstrap.v1"
     
-    def __init__(self, db_url: Optional[str] = None):
+    def __init__(self, db_url: Optional[str] = None, connection_pool: Optional[Any] = None):
+        """
+        Args:
+            db_url: Строка подключения
+            connection_pool: Общий пул соединений (SharedConnectionPool database модуля);
+                без него каждая операция открывает отдельное соединение
+        """
+        self._connection_pool = connection_pool
         self.db_url = db_url or os.getenv('DATABASE_URL')
         if not self.db_url:
             # Fallback: construct from components
@@ -33,9 +41,25 @@ class SubscriptionRepository:
         if not self.db_url:
             raise ValueError("DATABASE_URL not found and could not be constructed")
     
+    def set_connection_pool(self, connection_pool: Optional[Any]) -> None:
+        """Внедрение общего пула соединений (wiring через GrpcServiceManager)"""
+        self._connection_pool = connection_pool
+
     def _get_connection(self):
-        """Получить соединение с БД"""
+        """Получить соединение с БД (close() возвращает его в пул)"""
+        if self._connection_pool is not None:
+            return self._connection_pool.connection()
         return psycopg2.connect(self.db_url)
+
+    async def run_async(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Синхронная работа с репозиторием вне event loop (в потоках пула)"""
+        if self._connection_pool is not None:
+            return await self._connection_pool.run(fn, *args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Метрики пула соединений (пусто без пула)"""
+        return self._connection_pool.get_stats() if self._connection_pool is not None else {}
     
     def get_subscription(self, hardware_id: str) -> Optional[Dict]:
         """Получить подписку по hardware_id"""
@@ -70,11 +94,16 @@ class SubscriptionRepository:
                     (hardware_id, status, paid_trial_end_at, email)
                 )
                 row = cur.fetchone()
+                if row is None:
+                    # Если конфликт, получаем существующую запись на том же соединении:
+                    # повторный захват из ограниченного пула мог бы ждать сам себя
+                    cur.execute(
+                        """SELECT * FROM subscriptions WHERE hardware_id = %s""",
+                        (hardware_id,)
+                    )
+                    row = cur.fetchone()
                 conn.commit()
-                if row:
-                    return dict(row)
-                # Если конфликт, получаем существующую запись
-                return self.get_subscription(hardware_id)
+                return dict(row) if row else None
         finally:
             conn.close()
     
@@ -677,6 +706,69 @@ class SubscriptionRepository:
         finally:
             conn.close()
     
+    # Счётчики, которые сбрасывает QuotaChecker
+    _USAGE_COUNTERS = ('usage_daily_count', 'usage_weekly_count', 'usage_monthly_count')
+
+    def reset_usage_counters(
+        self,
+        counter: str,
+        reset_date,
+        limited_statuses: Optional[List[str]] = None,
+        chunk_size: int = 5000,
+    ) -> int:
+        """
+        Set-based сброс счётчика использования
+
+        Один UPDATE на чанк (вместо update_subscription на каждую строку),
+        каждый чанк — отдельная короткая транзакция, чтобы не держать
+        блокировки на всей таблице.
+
+        Args:
+            counter: usage_daily_count | usage_weekly_count | usage_monthly_count
+            reset_date: Дата сброса; сбрасываются строки с usage_last_reset_date < reset_date
+            limited_statuses: Статусы, для которых применяются квоты.
+                По умолчанию: ['limited_free_trial'].
+            chunk_size: Строк на один UPDATE
+
+        Returns:
+            Количество сброшенных подписок
+        """
+        if counter not in self._USAGE_COUNTERS:
+            raise ValueError(f"Unknown usage counter: {counter}")
+        statuses = limited_statuses or ['limited_free_trial']
+        chunk_size = max(1, int(chunk_size))
+
+        total = 0
+        conn = self._get_connection()
+        try:
+            while True:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""WITH batch AS (
+                               SELECT hardware_id FROM subscriptions
+                               WHERE status = ANY(%s)
+                                 AND (usage_last_reset_date IS NULL OR usage_last_reset_date < %s)
+                               LIMIT %s
+                           )
+                           UPDATE subscriptions s
+                           SET {counter} = 0,
+                               usage_last_reset_date = %s,
+                               updated_at = CURRENT_TIMESTAMP
+                           FROM batch
+                           WHERE s.hardware_id = batch.hardware_id""",
+                        (statuses, reset_date, chunk_size, reset_date)
+                    )
+                    affected = cur.rowcount
+                conn.commit()
+                total += affected
+                if affected < chunk_size:
+                    return total
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
     def get_subscriptions_for_daily_reset(self, today, limited_statuses: Optional[List[str]] = None) -> List[Dict]:
         """
         Получить подписки для ежедневного сброса квот
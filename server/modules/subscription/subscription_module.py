@@ -10,12 +10,17 @@ Feature ID: F-2025-017-stripe-payment
 import logging
 import os
 import threading
+import time
 import asyncio
+from collections import deque
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from config.unified_config import get_config
+from integrations.core.state_backend import get_state_backend
+from utils.metrics_collector import percentile, record_metric
+from .core.decision_cache import DecisionCache
 from .core.subscription_types import (
     AccessTier,
     PAID_STATUSES,
@@ -58,9 +63,17 @@ class SubscriptionModule:
         self._scheduler: Optional[Any] = None
         self._stripe_service: Optional[Any] = None
         self._initialized = False
-        self._cache = {}  # Simple TTL cache
-        self._cache_lock = threading.Lock()  # Защита кэша
-        self._cache_ttl = self.config.cache_ttl_seconds
+        # Ограниченный single-flight кэш решений (stale-while-revalidate)
+        self._cache = DecisionCache(
+            max_entries=getattr(self.config, 'cache_max_entries', 10000),
+            ttl_seconds=self.config.cache_ttl_seconds,
+            stale_ttl_seconds=getattr(self.config, 'cache_stale_ttl_seconds', 0),
+        )
+        self._epoch_jitter_seconds = getattr(self.config, 'cache_epoch_jitter_seconds', 0)
+        # hardware_id, для которых user anchor уже записан в этом процессе
+        self._known_users: set[str] = set()
+        self._known_users_max = getattr(self.config, 'known_users_max', 100000)
+        self._gate_latency_ms: deque = deque(maxlen=1024)
         # In-flight guard: prevents concurrent can_process from overshooting quotas.
         # Entries auto-expire to avoid stuck reservations if increment_usage is not called.
         self._pending_usage: Dict[str, list[float]] = {}
@@ -81,6 +94,29 @@ class SubscriptionModule:
         """
         self._database_manager = database_manager
 
+    def set_connection_pool(self, connection_pool: Optional[Any]) -> None:
+        """
+        Inject the shared connection pool owned by the database module.
+        Repository operations stop opening a new connection per call.
+        """
+        if self._repository is not None and hasattr(self._repository, 'set_connection_pool'):
+            self._repository.set_connection_pool(connection_pool)
+
+    @property
+    def db_url(self) -> Optional[str]:
+        """Connection string of the subscription repository (for pool wiring)."""
+        return getattr(self._repository, 'db_url', None)
+
+    async def _run_db(self, fn, *args, **kwargs):
+        """
+        Run synchronous repository work off the event loop.
+        Uses the repository pool threads when available.
+        """
+        run_async = getattr(self._repository, 'run_async', None)
+        if run_async is not None:
+            return await run_async(fn, *args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
     @staticmethod
     def _is_real_hardware_id(hardware_id: str) -> bool:
         """
@@ -131,6 +167,16 @@ class SubscriptionModule:
             )
             return False
 
+    async def _ensure_known_user(self, hardware_id: str) -> None:
+        """User anchor пишется один раз на устройство за время жизни процесса"""
+        if hardware_id in self._known_users:
+            return
+        if await self._ensure_user_anchor(hardware_id):
+            if len(self._known_users) >= self._known_users_max:
+                # Anchor идемпотентен: после сброса устройства просто проверятся заново
+                self._known_users.clear()
+            self._known_users.add(hardware_id)
+
     def _current_stripe_mode(self) -> str:
         mode = str(getattr(self.config, "stripe_mode", "test")).strip().lower()
         return mode if mode in {"test", "live"} else "test"
@@ -327,6 +373,11 @@ class SubscriptionModule:
                 
             self._stripe_service = StripeService(api_key=self.config.stripe_secret_key)
             
+            # Несколько воркеров: инвалидации кэша решений приходят от других процессов
+            state_backend = get_state_backend()
+            if state_backend.shared:
+                await state_backend.on_broadcast("subscription_cache", self._on_remote_invalidation)
+            
             self._initialized = True
             logger.info("[F-2025-017] Subscription module initialized")
             return True
@@ -379,7 +430,7 @@ class SubscriptionModule:
                 )
                 try:
                     self._repository.update_subscription(hardware_id, stripe_customer_id=None)
-                    self.invalidate_all_cache()
+                    self.invalidate_hardware_ids([hardware_id])
                 except Exception as recover_err:
                     logger.error(
                         f"[F-2025-017] Failed to clear stale stripe_customer_id for {hardware_id}: {recover_err}"
@@ -495,7 +546,7 @@ class SubscriptionModule:
                 last_checkout_session_id=result.get("session_id"),
                 last_checkout_created_at=now_utc,
             )
-            self.invalidate_all_cache()
+            self.invalidate_hardware_ids([hardware_id])
             result["stripe_mode"] = self._current_stripe_mode()
             return result
             
@@ -657,7 +708,7 @@ class SubscriptionModule:
                     )
                 if not updated:
                     return {"ok": False, "reason": "subscription_update_failed"}
-                self.invalidate_all_cache()
+                self.invalidate_hardware_ids([hardware_id])
                 return {
                     "ok": True,
                     "hardware_id": hardware_id,
@@ -852,77 +903,18 @@ class SubscriptionModule:
                 message='Quota checker not initialized'
             )
         
+        started = time.perf_counter()
         try:
             # Persist user identity early (best-effort) to avoid losing first-use registration.
-            await self._ensure_user_anchor(hardware_id)
+            await self._ensure_known_user(hardware_id)
 
-            # Проверяем cache
-            cached = self._get_cached(hardware_id)
-            if cached is not None:
-                return cached
-            
-            # Проверяем квоты
-            quota_result = self._quota_checker.check_quota(hardware_id)
-            # Persist new users early so hardware_id survives interrupted requests.
-            if quota_result.get("reason") == "new_user":
-                if self._ensure_subscription_anchor(hardware_id):
-                    quota_result = self._quota_checker.check_quota(hardware_id)
-
-            # In-flight guard (avoid concurrent requests overshooting limits)
-            pending_count = self._prune_pending(hardware_id, now_ts=datetime.now().timestamp())
-            if quota_result.get('allowed', False):
-                limits = quota_result.get('limits') or {}
-                daily = limits.get('daily') or {}
-                weekly = limits.get('weekly') or {}
-                monthly = limits.get('monthly') or {}
-                # Only enforce if limits present (limited tier)
-                if limits and pending_count > 0:
-                    daily_used = int(daily.get('used', 0)) + pending_count
-                    weekly_used = int(weekly.get('used', 0)) + pending_count
-                    monthly_used = int(monthly.get('used', 0)) + pending_count
-                    if daily and daily_used >= int(daily.get('limit', 0)):
-                        quota_result = {
-                            'allowed': False,
-                            'reason': 'daily_limit_exceeded',
-                            'status': quota_result.get('status'),
-                            'message': 'Daily limit exceeded (in-flight)',
-                            'limits': limits,
-                        }
-                    elif weekly and weekly_used >= int(weekly.get('limit', 0)):
-                        quota_result = {
-                            'allowed': False,
-                            'reason': 'weekly_limit_exceeded',
-                            'status': quota_result.get('status'),
-                            'message': 'Weekly limit exceeded (in-flight)',
-                            'limits': limits,
-                        }
-                    elif monthly and monthly_used >= int(monthly.get('limit', 0)):
-                        quota_result = {
-                            'allowed': False,
-                            'reason': 'monthly_limit_exceeded',
-                            'status': quota_result.get('status'),
-                            'message': 'Monthly limit exceeded (in-flight)',
-                            'limits': limits,
-                        }
-            
-            result = CanProcessResult(
-                allowed=quota_result.get('allowed', False),
-                reason=quota_result.get('reason', 'unknown'),
-                status=quota_result.get('status'),
-                message=quota_result.get('message'),
-                subscription_context=self._build_context(quota_result)
+            # Кэш решений: конкурентные промахи по одному hardware_id делят один запрос в БД,
+            # in-flight guard и pending слот — у каждого запроса свои
+            return await self._cache.get_or_load(
+                hardware_id,
+                lambda: self._load_decision(hardware_id),
+                on_loaded=lambda result: self._reserve_pending(hardware_id, result),
             )
-
-            # Reserve a pending slot for allowed requests (limited tiers)
-            if result.allowed:
-                self._add_pending(hardware_id, datetime.now().timestamp())
-            
-            # Кэшируем результат (и allowed, и denied)
-            # Внимание: инваладация происходит через Webhooks (оплата) 
-            # и Scheduler (сброс квот), поэтому безопасно кэшировать всё.
-            self._set_cached(hardware_id, result)
-            
-            return result
             
         except Exception as e:
             logger.error(f"[F-2025-017] Error checking subscription for {hardware_id[:8]}...: {e}")
@@ -932,6 +924,101 @@ class SubscriptionModule:
                 reason='error_failopen',
                 message=str(e)
             )
+        finally:
+            self._record_gate_latency((time.perf_counter() - started) * 1000)
+
+    async def prewarm(self, hardware_id: str) -> bool:
+        """
+        Прогрев gate до COMMIT (фаза COLLECT): user anchor + решение в кэше.
+
+        Pending слот не резервируется — запрос может так и не прийти.
+
+        Returns:
+            True если решение загружено в кэш
+        """
+        if not self.config.is_active() or not self._initialized or self._quota_checker is None:
+            return False
+        try:
+            await self._ensure_known_user(hardware_id)
+            await self._cache.get_or_load(hardware_id, lambda: self._load_decision(hardware_id))
+            return True
+        except Exception as e:
+            logger.warning(f"[F-2025-017] Gate prewarm failed for {hardware_id[:8]}...: {e}")
+            return False
+
+    async def _load_decision(self, hardware_id: str) -> CanProcessResult:
+        """
+        Решение can_process из БД (вызывается кэшем при промахе или фоновом обновлении).
+
+        Одно на всех ожидающих загрузку: in-flight guard и pending слот
+        применяются к каждому запросу отдельно в _reserve_pending.
+        """
+        # Проверяем квоты
+        quota_result = await self._run_db(self._quota_checker.check_quota, hardware_id)
+        # Persist new users early so hardware_id survives interrupted requests.
+        if quota_result.get("reason") == "new_user":
+            if await self._run_db(self._ensure_subscription_anchor, hardware_id):
+                quota_result = await self._run_db(self._quota_checker.check_quota, hardware_id)
+
+        # Результат кэшируется в DecisionCache (и allowed, и denied)
+        # Внимание: инваладация происходит через Webhooks (оплата) 
+        # и Scheduler (сброс квот), поэтому безопасно кэшировать всё.
+        return self._result_from_quota(quota_result)
+
+    def _result_from_quota(self, quota_result: Dict[str, Any]) -> CanProcessResult:
+        return CanProcessResult(
+            allowed=quota_result.get('allowed', False),
+            reason=quota_result.get('reason', 'unknown'),
+            status=quota_result.get('status'),
+            message=quota_result.get('message'),
+            subscription_context=self._build_context(quota_result)
+        )
+
+    def _reserve_pending(self, hardware_id: str, result: CanProcessResult) -> CanProcessResult:
+        """In-flight guard и pending слот для одного запроса, дождавшегося загрузки решения"""
+        if not result.allowed:
+            return result
+
+        # In-flight guard (avoid concurrent requests overshooting limits)
+        pending_count = self._prune_pending(hardware_id, now_ts=datetime.now().timestamp())
+        limits = (result.subscription_context or {}).get('limits') or {}
+        daily = limits.get('daily') or {}
+        weekly = limits.get('weekly') or {}
+        monthly = limits.get('monthly') or {}
+        # Only enforce if limits present (limited tier)
+        if limits and pending_count > 0:
+            exceeded = None
+            if daily and int(daily.get('used', 0)) + pending_count >= int(daily.get('limit', 0)):
+                exceeded = ('daily_limit_exceeded', 'Daily limit exceeded (in-flight)')
+            elif weekly and int(weekly.get('used', 0)) + pending_count >= int(weekly.get('limit', 0)):
+                exceeded = ('weekly_limit_exceeded', 'Weekly limit exceeded (in-flight)')
+            elif monthly and int(monthly.get('used', 0)) + pending_count >= int(monthly.get('limit', 0)):
+                exceeded = ('monthly_limit_exceeded', 'Monthly limit exceeded (in-flight)')
+            if exceeded is not None:
+                return self._result_from_quota({
+                    'allowed': False,
+                    'reason': exceeded[0],
+                    'status': result.status,
+                    'message': exceeded[1],
+                    'limits': limits,
+                })
+
+        # Reserve a pending slot for allowed requests (limited tiers)
+        self._add_pending(hardware_id, datetime.now().timestamp())
+        return result
+
+    def _record_gate_latency(self, duration_ms: float) -> None:
+        self._gate_latency_ms.append(duration_ms)
+        record_metric("subscription_gate", duration_ms)
+
+    def get_gate_stats(self) -> Dict[str, Any]:
+        """Накладные расходы gate can_process (p50/p99) и статистика кэша решений"""
+        return {
+            'gate_p50_ms': round(percentile(self._gate_latency_ms, 0.5), 3),
+            'gate_p99_ms': round(percentile(self._gate_latency_ms, 0.99), 3),
+            'known_users': len(self._known_users),
+            'decision_cache': self._cache.get_stats(),
+        }
     
     async def increment_usage(self, hardware_id: str) -> bool:
         """
@@ -1118,37 +1205,75 @@ class SubscriptionModule:
         }
     
     def _get_cached(self, hardware_id: str) -> Optional[CanProcessResult]:
-        """Получить результат из кэша"""
-        with self._cache_lock:
-            entry = self._cache.get(hardware_id)
-            if entry:
-                if (datetime.now() - entry['time']).seconds < self._cache_ttl:
-                    return entry['result']
-                else:
-                    del self._cache[hardware_id]
-            return None
+        """Получить свежий результат из кэша"""
+        return self._cache.get(hardware_id)
     
     def _set_cached(self, hardware_id: str, result: CanProcessResult) -> None:
         """Сохранить результат в кэш"""
-        with self._cache_lock:
-            self._cache[hardware_id] = {
-                'result': result,
-                'time': datetime.now()
-            }
+        self._cache.set(hardware_id, result)
     
     def _invalidate_cache(self, hardware_id: str) -> None:
         """Инвалидировать кэш для пользователя"""
-        with self._cache_lock:
-            if hardware_id in self._cache:
-                del self._cache[hardware_id]
+        self._cache.invalidate(hardware_id)
+        get_state_backend().broadcast_soon("subscription_cache", {"op": "hardware_ids", "hardware_ids": [hardware_id]})
     
-    def invalidate_all_cache(self) -> None:
-        """Инвалидировать весь кэш (после webhook)"""
-        with self._cache_lock:
-            self._cache.clear()
+    def invalidate_hardware_ids(self, hardware_ids, broadcast: bool = True) -> int:
+        """
+        Точечная инвалидация для затронутых устройств (webhook, checkout, portal).
+
+        Args:
+            hardware_ids: Затронутые устройства
+            broadcast: Разослать инвалидацию другим воркерам
+
+        Returns:
+            Количество инвалидированных hardware_id
+        """
+        keys = {hardware_id for hardware_id in hardware_ids if hardware_id}
+        if broadcast and keys:
+            get_state_backend().broadcast_soon("subscription_cache", {"op": "hardware_ids", "hardware_ids": sorted(keys)})
+        for hardware_id in keys:
+            self._cache.invalidate(hardware_id)
+        with self._status_sync_lock:
+            for hardware_id in keys:
+                self._status_sync_last_run.pop(hardware_id, None)
+        if keys:
+            logger.debug(f"[F-2025-017] Cache invalidated for {len(keys)} hardware_id(s)")
+        return len(keys)
+
+    def invalidate_all_cache(self, broadcast: bool = True) -> None:
+        """Инвалидировать весь кэш (ручной сброс; webhook использует invalidate_hardware_ids)"""
+        if broadcast:
+            get_state_backend().broadcast_soon("subscription_cache", {"op": "all"})
+        self._cache.clear()
         with self._status_sync_lock:
             self._status_sync_last_run.clear()
         logger.debug("[F-2025-017] Cache invalidated")
+
+    def bump_cache_epoch(self, jitter_seconds: Optional[float] = None, broadcast: bool = True) -> int:
+        """
+        Глобальная инвалидация без очистки словаря
+
+        Записи прошлой эпохи отбрасываются лениво при следующем чтении,
+        вразброс в окне jitter (по умолчанию cache_epoch_jitter_seconds).
+        Используется после атомарного сброса квот.
+        """
+        if jitter_seconds is None:
+            jitter_seconds = self._epoch_jitter_seconds
+        if broadcast:
+            get_state_backend().broadcast_soon("subscription_cache", {"op": "epoch", "jitter_seconds": jitter_seconds})
+        epoch = self._cache.bump_epoch(jitter_seconds=jitter_seconds)
+        logger.debug(f"[F-2025-017] Cache epoch bumped to {epoch}")
+        return epoch
+    
+    def _on_remote_invalidation(self, payload: Dict[str, Any]) -> None:
+        """Инвалидация кэша, выполненная другим воркером (webhook, сброс квот)"""
+        op = payload.get("op")
+        if op == "hardware_ids":
+            self.invalidate_hardware_ids(payload.get("hardware_ids") or [], broadcast=False)
+        elif op == "all":
+            self.invalidate_all_cache(broadcast=False)
+        elif op == "epoch":
+            self.bump_cache_epoch(jitter_seconds=payload.get("jitter_seconds"), broadcast=False)
     
     async def _run_trial_check(self) -> None:
         """Периодическая проверка истекших trial"""
@@ -1179,8 +1304,8 @@ class SubscriptionModule:
         try:
             if self._quota_checker is None:
                 return
-            result = self._quota_checker.reset_daily_counters()
-            self.invalidate_all_cache()
+            result = await self._run_db(self._quota_checker.reset_daily_counters)
+            self.bump_cache_epoch()
             logger.info(f"[F-2025-017] Daily quota reset completed: {result}")
         except Exception as e:
             logger.error(f"[F-2025-017] Daily quota reset failed: {e}")
@@ -1190,8 +1315,8 @@ class SubscriptionModule:
         try:
             if self._quota_checker is None:
                 return
-            result = self._quota_checker.reset_weekly_counters()
-            self.invalidate_all_cache()
+            result = await self._run_db(self._quota_checker.reset_weekly_counters)
+            self.bump_cache_epoch()
             logger.info(f"[F-2025-017] Weekly quota reset completed: {result}")
         except Exception as e:
             logger.error(f"[F-2025-017] Weekly quota reset failed: {e}")
@@ -1201,8 +1326,8 @@ class SubscriptionModule:
         try:
             if self._quota_checker is None:
                 return
-            result = self._quota_checker.reset_monthly_counters()
-            self.invalidate_all_cache()
+            result = await self._run_db(self._quota_checker.reset_monthly_counters)
+            self.bump_cache_epoch()
             logger.info(f"[F-2025-017] Monthly quota reset completed: {result}")
         except Exception as e:
             logger.error(f"[F-2025-017] Monthly quota reset failed: {e}")
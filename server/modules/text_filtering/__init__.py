@@ -5,8 +5,9 @@ Text Filtering Module
 """
 
 from .core.text_filter_manager import TextFilterManager
+from .core.incremental_sentence_segmenter import IncrementalSentenceSegmenter
 
-__all__ = ['TextFilterManager']
+__all__ = ['TextFilterManager', 'IncrementalSentenceSegmenter']
 
 
 
@@ -3,8 +3,9 @@ Core components для Text Filtering Module
 """
 
 from .text_filter_manager import TextFilterManager
+from .incremental_sentence_segmenter import IncrementalSentenceSegmenter
 
-__all__ = ['TextFilterManager']
+__all__ = ['TextFilterManager', 'IncrementalSentenceSegmenter']
 
 
 
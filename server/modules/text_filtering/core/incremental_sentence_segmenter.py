@@ -0,0 +1,195 @@
+"""
+Инкрементальный сегментатор предложений для потокового TTS
+
+Повторяет семантику SentenceProcessingProvider._split_complete_sentences
+(защита файлов "main.py", версий "1.2.3", десятичных "3.14159", IP-адресов),
+но не перепроверяет весь буфер на каждом чанке LLM: каждый символ
+просматривается амортизированно O(1) раз.
+"""
+
+import re
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_TERMINATORS = frozenset('.!?')
+# Серии знаков, которые провайдер считает концом предложения в середине текста
+# (проверка `part in '.!?'`); любая серия в самом конце текста — тоже граница
+_BOUNDARY_RUNS = frozenset({'.', '!', '?', '.!', '!?', '.!?'})
+_WHITESPACE_RE = re.compile(r'\s+')
+# \w{1,4}\b: расширения файлов/короткие хвосты после точки
+_MAX_PROTECTED_SUFFIX = 4
+
+
+def _is_word(ch: str) -> bool:
+    """Эквивалент \\w для str-паттернов re"""
+    return ch.isalnum() or ch == '_'
+
+
+class IncrementalSentenceSegmenter:
+    """
+    Потоковый сегментатор: принимает только новые символы и возвращает
+    завершённые предложения.
+
+    Решения о границах совпадают с повторным вызовом
+    SentenceProcessingProvider.split_sentences на буфере
+    "остаток + joiner + чанк" (именно так работал streaming workflow).
+    Незавершённый хвост пересматривается только с последнего пробела:
+    все правила защиты точки локальны и не пересекают пробел.
+
+    Использование:
+        segmenter = IncrementalSentenceSegmenter()
+
+        for chunk in llm_stream:
+            for sentence in segmenter.feed(chunk):
+                await tts(sentence)
+
+        tail = segmenter.remainder
+    """
+
+    def __init__(self, joiner: str = " "):
+        """
+        Args:
+            joiner: Разделитель между чанками (как sentence_joiner в workflow)
+        """
+        self.joiner = joiner
+        self._buffer: str = ""
+        # Позиция, с которой решения ещё могут измениться (сразу после последнего пробела)
+        self._checkpoint: int = 0
+
+        # Статистика
+        self.chunks_fed: int = 0
+        self.chars_fed: int = 0
+        self.chars_scanned: int = 0
+        self.sentences_emitted: int = 0
+
+    @property
+    def remainder(self) -> str:
+        """Незавершённый хвост (аналог remainder провайдера)"""
+        return self._buffer.strip()
+
+    def reset(self) -> None:
+        """Сброс состояния (например, при замене буфера целиком)"""
+        self._buffer = ""
+        self._checkpoint = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Добавляет новый фрагмент текста.
+
+        Args:
+            text: Новый фрагмент (без уже переданного ранее текста)
+
+        Returns:
+            Список предложений, завершённых этим фрагментом
+        """
+        if not text:
+            return []
+
+        addition = f"{self.joiner}{text}" if self._buffer else text
+        addition = _WHITESPACE_RE.sub(' ', addition)
+        if not self._buffer:
+            addition = addition.lstrip(' ')
+        elif self._buffer.endswith(' ') and addition.startswith(' '):
+            addition = addition[1:]
+        if not addition:
+            return []
+
+        self.chunks_fed += 1
+        self.chars_fed += len(text)
+        self._buffer += addition
+        return self._scan()
+
+    def _scan(self) -> List[str]:
+        """Поиск границ предложений начиная с checkpoint"""
+        buf = self._buffer
+        n = len(buf)
+        sentences: List[str] = []
+        sentence_start = 0
+
+        # Состояние неперекрывающихся совпадений регулярок провайдера:
+        # p1 — (\w+)\.(\w{1,4})\b, p2 — (\d+)\.(\d+)(?:\.(\d+))?
+        p1_suffix_end = -1
+        p2_match_end = -1
+        p2_protected_dot = -1
+
+        i = self._checkpoint
+        self.chars_scanned += n - i
+        while i < n:
+            ch = buf[i]
+            if ch not in _TERMINATORS:
+                i += 1
+                continue
+
+            # Одиночная точка между \w-символами может быть защищена
+            if ch == '.' and 0 < i < n - 1 and _is_word(buf[i - 1]) and _is_word(buf[i + 1]):
+                suffix_end = i + 1
+                while suffix_end < n and suffix_end - i <= _MAX_PROTECTED_SUFFIX + 1 and _is_word(buf[suffix_end]):
+                    suffix_end += 1
+                suffix_len = suffix_end - i - 1
+                if i != p1_suffix_end and suffix_len <= _MAX_PROTECTED_SUFFIX:
+                    p1_suffix_end = suffix_end
+                    i += 1
+                    continue
+                if i == p2_protected_dot:
+                    i += 1
+                    continue
+                if i != p2_match_end and buf[i - 1].isdecimal() and buf[i + 1].isdecimal():
+                    digits_end = self._digits_end(buf, i + 1)
+                    p2_match_end = digits_end
+                    if (
+                        digits_end + 1 < n
+                        and buf[digits_end] == '.'
+                        and buf[digits_end + 1].isdecimal()
+                        and not self._is_short_suffix(buf, digits_end)
+                    ):
+                        p2_protected_dot = digits_end
+                        p2_match_end = self._digits_end(buf, digits_end + 1)
+                    i += 1
+                    continue
+
+            run_end = i + 1
+            while run_end < n and buf[run_end] in _TERMINATORS:
+                run_end += 1
+            run = buf[i:run_end]
+
+            at_end = run_end >= n or (run_end == n - 1 and buf[run_end] == ' ')
+            if run in _BOUNDARY_RUNS or at_end:
+                sentence = buf[sentence_start:run_end].strip()
+                if sentence:
+                    sentences.append(sentence)
+                sentence_start = run_end
+            i = run_end
+
+        if sentence_start:
+            buf = buf[sentence_start:].lstrip(' ')
+            self._buffer = buf
+        self._checkpoint = buf.rfind(' ') + 1
+        self.sentences_emitted += len(sentences)
+        return sentences
+
+    @staticmethod
+    def _digits_end(buf: str, start: int) -> int:
+        end = start
+        while end < len(buf) and buf[end].isdecimal():
+            end += 1
+        return end
+
+    @staticmethod
+    def _is_short_suffix(buf: str, dot: int) -> bool:
+        """Защищена ли точка правилом \\w+\\.\\w{1,4}\\b (левая часть заведомо свободна)"""
+        end = dot + 1
+        while end < len(buf) and end - dot <= _MAX_PROTECTED_SUFFIX + 1 and _is_word(buf[end]):
+            end += 1
+        return 1 <= end - dot - 1 <= _MAX_PROTECTED_SUFFIX
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика сегментатора"""
+        return {
+            'chunks_fed': self.chunks_fed,
+            'chars_fed': self.chars_fed,
+            'chars_scanned': self.chars_scanned,
+            'sentences_emitted': self.sentences_emitted,
+            'buffered_chars': len(self._buffer),
+        }
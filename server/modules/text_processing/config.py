@@ -59,6 +59,8 @@ class TextProcessingConfig:
         
         # Настройки производительности
         self.max_concurrent_requests = self.config.get('max_concurrent_requests', unified_config.text_processing.max_concurrent_requests)
+        self.llm_max_queue_size = self.config.get('llm_max_queue_size', unified_config.text_processing.llm_max_queue_size)
+        self.llm_queue_timeout_sec = self.config.get('llm_queue_timeout_sec', unified_config.text_processing.llm_queue_timeout_sec)
         self.request_timeout = self.config.get('request_timeout', unified_config.text_processing.request_timeout)
         
     def get_provider_config(self, provider_name: str) -> Dict[str, Any]:
@@ -165,5 +167,7 @@ class TextProcessingConfig:
             'log_requests': self.log_requests,
             'log_responses': self.log_responses,
             'max_concurrent_requests': self.max_concurrent_requests,
+            'llm_max_queue_size': self.llm_max_queue_size,
+            'llm_queue_timeout_sec': self.llm_queue_timeout_sec,
             'request_timeout': self.request_timeout
         }
@@ -0,0 +1,256 @@
+"""
+LLMAdmissionController - контроль допуска запросов к LLM
+
+TextProcessingConfig.max_concurrent_requests раньше только читался из env:
+каждый commit StreamAudio сразу шёл в llm.astream, и всплеск запросов
+выбивал квоту Gemini и раздувал хвост латентности для всех.
+
+Контроллер:
+- ограничивает число одновременных LLM стримов (max_concurrent)
+- держит ограниченную очередь ожидания (max_queue)
+- отклоняет запрос сразу, если очередь полна или ожидаемое ожидание
+  больше дедлайна, и по истечении дедлайна в очереди (AdmissionRejected
+  → RESOURCE_EXHAUSTED)
+- раздаёт освободившиеся слоты по weighted fair queuing: у каждого
+  hardware_id свой виртуальный finish tag, поэтому "болтливое"
+  устройство не вытесняет остальные
+- отдельно меряет время ожидания в очереди (метрика llm_admission_wait)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from utils.metrics_collector import percentile, record_decision_metric, record_metric
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Запрос к LLM не допущен (перегрузка)"""
+
+    error_code = "RESOURCE_EXHAUSTED"
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Waiter:
+    tag: float
+    seq: int
+    key: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMAdmissionController:
+    """Глобальный лимит LLM стримов + очередь с WFQ по hardware_id"""
+
+    def __init__(
+        self,
+        max_concurrent: int = 10,
+        max_queue: int = 50,
+        max_wait_sec: float = 10.0,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            max_concurrent: Одновременных LLM стримов
+            max_queue: Максимум ожидающих запросов
+            max_wait_sec: Дедлайн ожидания в очереди по умолчанию
+            weights: Веса hardware_id (по умолчанию 1.0)
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait_sec = max_wait_sec
+        self.weights = dict(weights or {})
+
+        self._in_flight = 0
+        self._heap: List[_Waiter] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        # WFQ: виртуальное время и последний finish tag по ключу
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        # EWMA длительности слота — для оценки ожидания
+        self._service_ewma_sec = 0.0
+
+        # Метрики
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.peak_queue = 0
+        self._wait_ms: Deque[float] = deque(maxlen=1024)
+
+    # ------------------------------------------------------------------
+    # Допуск
+    # ------------------------------------------------------------------
+
+    async def acquire(self, key: str, timeout: Optional[float] = None, weight: Optional[float] = None) -> float:
+        """
+        Занять слот LLM.
+
+        Args:
+            key: Ключ справедливости (hardware_id)
+            timeout: Дедлайн ожидания, сек (по умолчанию max_wait_sec)
+            weight: Вес ключа (больше — больше доля слотов)
+
+        Returns:
+            Время ожидания в очереди, мс
+
+        Raises:
+            AdmissionRejected: очередь полна / дедлайн недостижим / истёк
+        """
+        started = time.perf_counter()
+        timeout = self.max_wait_sec if timeout is None else timeout
+
+        if self._in_flight < self.max_concurrent and self._queued == 0:
+            self._in_flight += 1
+            return self._admitted(key, started)
+
+        if self._queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            self._reject(key, "queue_full")
+        expected_wait = self._expected_wait_sec()
+        if expected_wait > timeout:
+            self.rejected_deadline += 1
+            self._reject(key, "deadline", expected_wait)
+
+        weight = weight or self.weights.get(key, 1.0)
+        tag = max(self._virtual_time, self._last_tag.get(key, 0.0)) + 1.0 / max(weight, 1e-6)
+        self._last_tag[key] = tag
+        waiter = _Waiter(tag, next(self._seq), key, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self._queued += 1
+        self.queued_total += 1
+        self.peak_queue = max(self.peak_queue, self._queued)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                # Слот выдан одновременно с таймаутом — используем его
+                return self._admitted(key, started)
+            self.rejected_deadline += 1
+            self._reject(key, "deadline")
+        except asyncio.CancelledError:
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        return self._admitted(key, started)
+
+    def release(self, service_sec: Optional[float] = None) -> None:
+        """Освободить слот и передать его следующему по WFQ"""
+        if service_sec is not None:
+            self._service_ewma_sec = (
+                service_sec if self._service_ewma_sec == 0.0
+                else 0.8 * self._service_ewma_sec + 0.2 * service_sec
+            )
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            self._queued -= 1
+            self._virtual_time = waiter.tag
+            # Слот переходит ожидающему без декремента in_flight
+            waiter.future.set_result(None)
+            return
+        self._in_flight = max(0, self._in_flight - 1)
+
+    @asynccontextmanager
+    async def slot(self, key: str, timeout: Optional[float] = None) -> AsyncIterator[float]:
+        """async with controller.slot(hardware_id) as wait_ms: ..."""
+        wait_ms = await self.acquire(key, timeout=timeout)
+        started = time.perf_counter()
+        try:
+            yield wait_ms
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Снять ожидающего; False если слот уже выдан"""
+        if waiter.future.done() and not waiter.future.cancelled():
+            return False
+        waiter.future.cancel()
+        self._queued -= 1
+        return True
+
+    def _expected_wait_sec(self) -> float:
+        if self._service_ewma_sec <= 0:
+            return 0.0
+        return (self._queued + 1) * self._service_ewma_sec / self.max_concurrent
+
+    def _admitted(self, key: str, started: float) -> float:
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.admitted += 1
+        self._wait_ms.append(wait_ms)
+        record_metric("llm_admission_wait", wait_ms)
+        if len(self._last_tag) > 4 * (self.max_concurrent + self.max_queue):
+            # Ключи с tag позади виртуального времени ничего не меняют в порядке
+            self._last_tag = {k: t for k, t in self._last_tag.items() if t > self._virtual_time}
+        return wait_ms
+
+    def _reject(self, key: str, reason: str, expected_wait: Optional[float] = None) -> None:
+        record_decision_metric("llm_admission", "reject")
+        logger.warning(
+            f"⚠️ LLM admission rejected: {reason}",
+            extra={
+                'scope': 'text_processing',
+                'method': 'LLMAdmissionController.acquire',
+                'decision': 'reject',
+                'ctx': {
+                    'reason': reason,
+                    'key': key[:8],
+                    'in_flight': self._in_flight,
+                    'queued': self._queued,
+                    'expected_wait_sec': round(expected_wait, 3) if expected_wait is not None else None,
+                }
+            }
+        )
+        raise AdmissionRejected(reason, f"LLM is overloaded ({reason}), please retry later")
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика допуска и ожидания в очереди"""
+        return {
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self._in_flight,
+            'queued': self._queued,
+            'peak_queue': self.peak_queue,
+            'admitted': self.admitted,
+            'queued_total': self.queued_total,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_deadline': self.rejected_deadline,
+            'wait_p50_ms': round(percentile(self._wait_ms, 0.5), 3),
+            'wait_p95_ms': round(percentile(self._wait_ms, 0.95), 3),
+            'service_ewma_ms': round(self._service_ewma_sec * 1000, 3),
+        }
+
+
+_admission_controller: Optional[LLMAdmissionController] = None
+
+
+def get_llm_admission_controller() -> LLMAdmissionController:
+    """Общий контроллер допуска LLM (один на процесс; параметры из unified_config.text_processing)"""
+    global _admission_controller
+    if _admission_controller is None:
+        from config.unified_config import get_config
+
+        cfg = get_config().text_processing
+        _admission_controller = LLMAdmissionController(
+            max_concurrent=cfg.max_concurrent_requests,
+            max_queue=cfg.llm_max_queue_size,
+            max_wait_sec=cfg.llm_queue_timeout_sec,
+        )
+    return _admission_controller
@@ -7,15 +7,20 @@
 - Google Search (текст + изображение + поиск → поток текста)
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional, Union, AsyncGenerator
+from typing import Dict, Any, Optional, Union, AsyncGenerator, AsyncIterator, Callable
 from modules.text_processing.config import TextProcessingConfig
+from modules.text_processing.core.admission_controller import get_llm_admission_controller
 from modules.text_processing.providers.langchain_gemini_provider import LangChainGeminiProvider
 from config.unified_config import get_config
 from config.prompts import build_system_prompt, resolve_prompt_sections
 
 logger = logging.getLogger(__name__)
 
+# Конец потока LLM в очереди между генерацией и потребителем
+_STREAM_END = object()
+
 class TextProcessor:
     """
     Основной процессор текста с использованием LangChain провайдера
@@ -42,6 +47,9 @@ class TextProcessor:
             token_usage_tracker=self.token_usage_tracker
         )
         
+        # Admission control: глобальный лимит LLM стримов + WFQ по hardware_id
+        self.admission = get_llm_admission_controller()
+        
         self.is_initialized = False
         
         logger.info("TextProcessor initialized with LangChain provider")
@@ -111,7 +119,8 @@ class TextProcessor:
         text: str,
         image_data: Optional[Union[str, bytes]] = None,
         session_id: Optional[str] = None,
-        use_search: Optional[bool] = None
+        use_search: Optional[bool] = None,
+        hardware_id: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """
         Стриминговая обработка текста с изображением через LangChain провайдер
@@ -121,9 +130,13 @@ class TextProcessor:
             text: Текстовый запрос
             image_data: Base64 строка (str) или bytes изображения в формате WebP/JPEG (опционально)
             session_id: ID сессии (опционально, для контекста LLM)
+            hardware_id: ID устройства (ключ fair queuing в admission control)
             
         Yields:
             Части текстового ответа
+            
+        Raises:
+            AdmissionRejected: LLM перегружен (очередь полна или дедлайн ожидания)
         """
         try:
             if not self.is_initialized:
@@ -140,29 +153,80 @@ class TextProcessor:
                     use_search
                 )
             
-            # Вызываем правильный метод в зависимости от наличия изображения
-            if image_data:
-                async for chunk in self.live_provider.process_with_image(
-                    text,
-                    image_data,
-                    session_id=session_id,
-                    use_search=use_search,
-                    system_prompt_override=system_prompt_override
-                ):
-                    yield chunk
-            else:
-                async for chunk in self.live_provider.process(
+            def llm_stream() -> AsyncIterator[str]:
+                # Вызываем правильный метод в зависимости от наличия изображения
+                if image_data:
+                    return self.live_provider.process_with_image(
+                        text,
+                        image_data,
+                        session_id=session_id,
+                        use_search=use_search,
+                        system_prompt_override=system_prompt_override
+                    )
+                return self.live_provider.process(
                     text,
                     session_id=session_id,
                     use_search=use_search,
                     system_prompt_override=system_prompt_override
-                ):
+                )
+
+            stream = self._admitted_stream(hardware_id or session_id or "anonymous", llm_stream)
+            try:
+                async for chunk in stream:
                     yield chunk
+            finally:
+                # Ранний выход потребителя: сразу отменяем генерацию и отдаём слот
+                await stream.aclose()
                 
         except Exception as e:
             logger.error(f"Text streaming error: {e}")
             raise e
     
+    async def _admitted_stream(
+        self,
+        key: str,
+        stream_factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Поток LLM под слотом admission control.
+
+        Поток читается отдельной задачей в очередь: слот освобождается, как только
+        LLM закончил генерацию, а не когда потребитель (TTS между чанками) дочитает
+        ответ — иначе время потребителя попадает в EWMA обслуживания и держит слот.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump() -> None:
+            try:
+                async with self.admission.slot(key) as wait_ms:
+                    if wait_ms >= 1:
+                        logger.info(f"⏱️  LLM admission: ожидание в очереди {wait_ms:.2f}ms")
+                    async for chunk in stream_factory():
+                        queue.put_nowait(chunk)
+            except BaseException as e:
+                # AdmissionRejected / ошибка провайдера всплывают у потребителя
+                queue.put_nowait(e)
+                if not isinstance(e, Exception):
+                    raise
+                return
+            queue.put_nowait(_STREAM_END)
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Потребитель ушёл раньше (прерывание/ошибка): генерация не должна держать слот
+            if not pump_task.done():
+                pump_task.cancel()
+                # wait, а не await: собственная отмена потребителя не поглощается
+                await asyncio.wait([pump_task])
+
     async def cleanup(self) -> bool:
         """
         Очистка ресурсов процессора
@@ -195,7 +259,8 @@ class TextProcessor:
         status = {
             "is_initialized": self.is_initialized,
             "config_status": self.config.get_status(),
-            "live_provider": self.live_provider.get_status() if self.live_provider else None
+            "live_provider": self.live_provider.get_status() if self.live_provider else None,
+            "admission": self.admission.get_stats()
         }
         
         return status
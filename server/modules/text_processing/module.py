@@ -107,6 +107,7 @@ class TextProcessingModule(UniversalModuleInterface):
             image_data = request.get("image_data")
             use_search = request.get("use_search", None)
             session_id = request.get("session_id")
+            hardware_id = request.get("hardware_id")
             
             if not text:
                 raise ValueError("Текст для обработки не указан")
@@ -119,7 +120,8 @@ class TextProcessingModule(UniversalModuleInterface):
                         text,
                         image_data,
                         session_id=session_id,
-                        use_search=use_search
+                        use_search=use_search,
+                        hardware_id=hardware_id
                     ):
                         # Возвращаем текст напрямую
                         yield {"text": chunk, "type": "text_chunk"}
@@ -131,7 +133,8 @@ class TextProcessingModule(UniversalModuleInterface):
                     async for chunk in processor.process_text_streaming(
                         text,
                         session_id=session_id,
-                        use_search=use_search
+                        use_search=use_search,
+                        hardware_id=hardware_id
                     ):
                         # Возвращаем текст напрямую
                         yield {"text": chunk, "type": "text_chunk"}
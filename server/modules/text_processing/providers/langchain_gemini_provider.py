@@ -376,7 +376,7 @@ class LangChainGeminiProvider(UniversalProviderInterface):
                     # We will use 'unknown' for now and fix it in TextProcessor
                     target_id = 'unknown' # Placeholder
                     
-                    self.token_usage_tracker.record_usage(
+                    await self.token_usage_tracker.record_usage_async(
                         hardware_id=target_id, 
                         source='main_llm',
                         input_tokens=accumulated_usage.get('input_tokens', 0),
@@ -505,7 +505,7 @@ class LangChainGeminiProvider(UniversalProviderInterface):
                 try:
                     target_id = 'unknown' # Placeholder
                     
-                    self.token_usage_tracker.record_usage(
+                    await self.token_usage_tracker.record_usage_async(
                         hardware_id=target_id,
                         source='main_llm',
                         input_tokens=accumulated_usage.get('input_tokens', 0),
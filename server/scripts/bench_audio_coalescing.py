@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк склейки аудио StreamAudio: сообщений на секунду аудио
+
+Workflow-заглушка отдаёт ответ из нескольких предложений; аудио каждого
+предложения приходит фрагментами TTS по --fragment байт (по умолчанию
+4096 ≈ 43 мс при 48kHz mono). Сравниваются режимы:
+- before: каждый фрагмент — отдельный AudioChunk с полным форматом
+- coalesce: склейка по audio_coalesce_ms
+- coalesce+header: склейка и формат один раз (audio_header_once)
+
+Печатается число аудио сообщений на секунду аудио (его и считал прежний
+лимит max_message_rate_per_second) и байты сериализованных ответов.
+
+Запуск:
+    python scripts/bench_audio_coalescing.py [--sentences 6] [--sentence-ms 2500] [--fragment 4096] [--coalesce-ms 200]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.unified_config import get_config
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+
+
+def _servicer(sentences: int, fragments_per_sentence: int, fragment: bytes) -> NewStreamingServicer:
+    async def _process(request_data):
+        for index in range(sentences):
+            yield {"success": True, "text_response": f"Sentence {index + 1}."}
+            for _ in range(fragments_per_sentence):
+                yield {"success": True, "audio_chunk": fragment}
+
+    manager = Mock()
+    manager.process = _process
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    servicer.grpc_service_manager = manager
+    return servicer
+
+
+async def _measure(servicer: NewStreamingServicer, header_once: bool):
+    request = streaming_pb2.StreamRequest(
+        prompt="bench",
+        hardware_id="bench-hw",
+        session_id=str(uuid.uuid4()),
+        phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        audio_header_once=header_once,
+    )
+    audio_messages = 0
+    audio_bytes = 0
+    wire_bytes = 0
+    async for response in servicer.StreamAudio(request, Mock()):
+        kind = response.WhichOneof("content")
+        if kind in ("audio_chunk", "audio_header"):
+            wire_bytes += response.ByteSize()
+        if kind == "audio_chunk":
+            audio_messages += 1
+            audio_bytes += len(response.audio_chunk.audio_data)
+    return audio_messages, audio_bytes, wire_bytes
+
+
+async def main(args) -> None:
+    audio_config = get_config().audio
+    bytes_per_second = audio_config.sample_rate * audio_config.channels * 2
+    fragment = b"\x01\x00" * (args.fragment // 2)
+    fragments_per_sentence = max(1, bytes_per_second * args.sentence_ms // 1000 // len(fragment))
+
+    print(
+        f"📊 {args.sentences} предложений × {fragments_per_sentence} фрагментов по {len(fragment)} байт "
+        f"({audio_config.sample_rate} Hz, {audio_config.channels} ch):"
+    )
+    for name, coalesce_ms, header_once in (
+        ("before", 0, False),
+        ("coalesce", args.coalesce_ms, False),
+        ("coalesce+header", args.coalesce_ms, True),
+    ):
+        audio_config.audio_coalesce_ms = coalesce_ms
+        servicer = _servicer(args.sentences, fragments_per_sentence, fragment)
+        messages, audio_bytes, wire_bytes = await _measure(servicer, header_once)
+        audio_sec = audio_bytes / bytes_per_second
+        print(
+            f"   {name:<16} сообщений={messages:5d}  аудио={audio_sec:6.2f} с  "
+            f"сообщений/с аудио={messages / audio_sec:6.2f}  "
+            f"накладные байты={wire_bytes - audio_bytes:7d}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StreamAudio audio coalescing benchmark")
+    parser.add_argument("--sentences", type=int, default=6, help="Предложений в ответе")
+    parser.add_argument("--sentence-ms", type=int, default=2500, help="Длительность аудио предложения, мс")
+    parser.add_argument("--fragment", type=int, default=4096, help="Размер фрагмента TTS, байт")
+    parser.add_argument("--coalesce-ms", type=int, default=200, help="Целевая длительность сообщения, мс")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк транспорта аудио: raw PCM vs Opus
+
+Прогоняет синтетическую речь (гармоники с модуляцией + шум, 48kHz mono int16)
+через энкодеры StreamAudio в тех же фрагментах, что отдаёт Edge TTS,
+и считает байты "на проводе" (audio_data + packet_sizes в protobuf) и CPU
+кодирования на стрим.
+
+Запуск:
+    python scripts/bench_audio_codec.py [--seconds 10] [--streams 20] [--bitrate 24000]
+
+Opus требует opuslib и системный libopus; без них печатается только PCM.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core import audio_codec
+from modules.grpc_service.core.audio_codec import CODEC_OPUS, CODEC_PCM_S16LE, create_audio_encoder
+
+SAMPLE_RATE = 48000
+CHUNK_BYTES = 4096
+
+
+def _speech_like_pcm(seconds: float) -> bytes:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t).clip(0)
+    noise = np.random.default_rng(0).normal(0, 0.02, t.size)
+    signal = (voice * envelope * 0.2 + noise).clip(-1, 1)
+    return (signal * 32767).astype('<i2').tobytes()
+
+
+async def _run_stream(codec: int, pcm: bytes, bitrate: int):
+    encoder = create_audio_encoder(codec, SAMPLE_RATE, 1, bitrate=bitrate)
+    wire_bytes = 0
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        encoded = await encoder.encode(pcm[offset:offset + CHUNK_BYTES])
+        if encoded:
+            wire_bytes += _wire_size(encoded)
+    encoded = await encoder.flush()
+    if encoded:
+        wire_bytes += _wire_size(encoded)
+    return wire_bytes, encoder.get_stats()
+
+
+def _wire_size(encoded) -> int:
+    chunk = streaming_pb2.AudioChunk(
+        audio_data=encoded.data,
+        dtype='int16' if encoded.codec == CODEC_PCM_S16LE else 'opus',
+        sample_rate=SAMPLE_RATE,
+        channels=1,
+        codec=encoded.codec,
+        packet_sizes=encoded.packet_sizes,
+        frame_duration_ms=encoded.frame_duration_ms,
+    )
+    return streaming_pb2.StreamResponse(audio_chunk=chunk).ByteSize()
+
+
+async def _bench(name: str, codec: int, pcm: bytes, seconds: float, streams: int, bitrate: int) -> None:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_run_stream(codec, pcm, bitrate) for _ in range(streams)))
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    wire_bytes, stats = results[0]
+    cpu_ms = sum(r[1]['cpu_ms'] for r in results) / streams
+    kbps = wire_bytes * 8 / seconds / 1000
+    print(
+        f"   {name:<5} wire={wire_bytes / 1024:8.1f} KiB/stream  {kbps:7.1f} kbps  "
+        f"cpu={cpu_ms:7.2f} ms/stream ({cpu_ms / seconds / 10:.3f}% core)  "
+        f"wall={wall_ms:7.1f} ms for {streams} streams"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Audio transport codec benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Длительность аудио на стрим")
+    parser.add_argument("--streams", type=int, default=20, help="Количество параллельных стримов")
+    parser.add_argument("--bitrate", type=int, default=24000, help="Битрейт Opus, бит/с")
+    args = parser.parse_args()
+
+    pcm = _speech_like_pcm(args.seconds)
+    print(f"📊 {args.seconds:.0f} s речи на стрим, {args.streams} стримов, фрагменты {CHUNK_BYTES} байт:")
+    await _bench("pcm", CODEC_PCM_S16LE, pcm, args.seconds, args.streams, args.bitrate)
+    if audio_codec.OPUS_AVAILABLE:
+        await _bench("opus", CODEC_OPUS, pcm, args.seconds, args.streams, args.bitrate)
+    else:
+        print("   opus  пропущено: opuslib/libopus недоступны")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
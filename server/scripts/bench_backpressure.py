@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк rate limiter BackpressureManager: глобальный lock + скользящее окно vs token bucket
+
+Прежний check_message_rate брал общий asyncio.Lock и пересобирал список
+временных меток стрима на каждое сообщение. Сравниваются:
+- legacy: копия прежнего алгоритма (lock + list comprehension по окну 1 с)
+- bucket: текущий BackpressureManager (token bucket на стрим и устройство, без lock)
+
+Профили:
+- paced: --streams стримов по --rate сообщений/с в течение --seconds (реальное время);
+  печатается средняя стоимость вызова и общий CPU лимитера
+- saturated: те же стримы шлют сообщения без пауз (пропускная способность)
+
+Запуск:
+    python scripts/bench_backpressure.py [--streams 100] [--rate 50] [--seconds 3]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service.core.backpressure import BackpressureManager, StreamLimits
+
+
+class _LegacyLimiter:
+    """Прежний check_message_rate: общий lock, окно временных меток за 1 с"""
+
+    def __init__(self, max_rate: int):
+        self.max_rate = max_rate
+        self.lock = asyncio.Lock()
+        self.timestamps = {}
+
+    async def acquire_stream(self, stream_id: str, hardware_id: str):
+        async with self.lock:
+            self.timestamps[stream_id] = []
+        return True, None
+
+    async def check_message_rate(self, stream_id: str):
+        async with self.lock:
+            current_time = time.time()
+            window = [ts for ts in self.timestamps[stream_id] if current_time - ts < 1.0]
+            self.timestamps[stream_id] = window
+            if len(window) >= self.max_rate:
+                return False, "MESSAGE_RATE_EXCEEDED"
+            window.append(current_time)
+            return True, None
+
+
+def _limiters(rate: int):
+    limits = StreamLimits(max_concurrent_streams=100000, max_message_rate_per_second=rate * 2,
+                          max_message_rate_per_device=rate * 4)
+    return (("legacy", lambda: _LegacyLimiter(rate * 2)), ("bucket", lambda: BackpressureManager(limits)))
+
+
+async def _paced(limiter, streams: int, rate: int, seconds: float):
+    spent = [0.0]
+    calls = [0]
+
+    async def stream(i: int):
+        await limiter.acquire_stream(f"s-{i}", f"hw-{i % (streams // 2 or 1)}")
+        interval = 1.0 / rate
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await limiter.check_message_rate(f"s-{i}")
+            spent[0] += time.perf_counter() - started
+            calls[0] += 1
+            await asyncio.sleep(interval)
+
+    await asyncio.gather(*(stream(i) for i in range(streams)))
+    return spent[0] * 1000, calls[0]
+
+
+async def _saturated(limiter, streams: int, messages: int):
+    async def stream(i: int):
+        for _ in range(messages):
+            await limiter.check_message_rate(f"s-{i}")
+
+    for i in range(streams):
+        await limiter.acquire_stream(f"s-{i}", f"hw-{i}")
+    started = time.perf_counter()
+    await asyncio.gather(*(stream(i) for i in range(streams)))
+    return (time.perf_counter() - started) * 1000
+
+
+async def main(args) -> None:
+    print(f"📊 paced: {args.streams} стримов × {args.rate} msg/s × {args.seconds} с")
+    for name, factory in _limiters(args.rate):
+        spent_ms, calls = await _paced(factory(), args.streams, args.rate, args.seconds)
+        print(f"   {name:<7} вызовов={calls:6d}  CPU лимитера={spent_ms:8.1f} ms  на вызов={spent_ms * 1000 / calls:6.2f} µs")
+
+    messages = args.rate * 20
+    print(f"📊 saturated: {args.streams} стримов × {messages} сообщений без пауз")
+    for name, factory in _limiters(args.rate):
+        total_ms = await _saturated(factory(), args.streams, messages)
+        print(f"   {name:<7} всего={total_ms:8.1f} ms  на вызов={total_ms * 1000 / (args.streams * messages):6.2f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BackpressureManager rate limiter benchmark")
+    parser.add_argument("--streams", type=int, default=100, help="Одновременных стримов")
+    parser.add_argument("--rate", type=int, default=50, help="Сообщений в секунду на стрим")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Длительность paced профиля")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
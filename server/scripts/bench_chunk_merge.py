@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк слияния COLLECT чанков: перебор endswith vs префикс-функция
+
+Длинная диктовка приходит дельта-чанками с перекрытием назад; каждый
+чанк сливается с накопленным текстом. Сравнивается время поиска
+перекрытия прежним перебором, KMP и гибридом из merge_chunk_text
+(перебор на коротких окнах, KMP начиная с _KMP_MIN_WINDOW) на двух профилях:
+- natural: обычный текст (перебор обычно отсекается на первом символе)
+- filler: длинные серии одного символа (паузы, "ааа...", заикания) —
+  худший случай перебора: каждый endswith доходит до середины окна
+
+Запуск:
+    python scripts/bench_chunk_merge.py [--chars 20000] [--chunk 400] [--repeat 3]
+    python scripts/bench_chunk_merge.py --chars 200000 --chunk 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service.core.chunk_text_merge import _overlap, suffix_prefix_overlap
+
+
+def _bruteforce_overlap(existing: str, incoming: str) -> int:
+    for i in range(min(len(existing), len(incoming)), 0, -1):
+        if existing.endswith(incoming[:i]):
+            return i
+    return 0
+
+
+def _transcript(profile: str, chars: int, chunk: int) -> str:
+    if profile == "filler":
+        # Серия длиннее чанка: перекрытие дельты — длинный префикс из одинаковых символов
+        return ("a" * (2 * chunk) + "b") * (chars // (2 * chunk) + 1)
+    rng = random.Random(0)
+    words = ["open", "the", "door", "please", "and", "tell", "me", "about", "weather", "tomorrow"]
+    text = []
+    while sum(len(w) + 1 for w in text) < chars:
+        text.append(rng.choice(words))
+    return " ".join(text)
+
+
+def _chunks(transcript: str, chunk: int):
+    """Дельта-чанки с перекрытием в половину чанка"""
+    position = chunk
+    yield transcript[:chunk]
+    while position < len(transcript):
+        yield transcript[position - chunk // 2:position + chunk]
+        position += chunk
+
+
+def _run(overlap_fn, transcript: str, chunk: int):
+    merged = ""
+    started = time.perf_counter()
+    for piece in _chunks(transcript, chunk):
+        merged = merged + piece[overlap_fn(merged, piece):]
+    return (time.perf_counter() - started) * 1000, merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="COLLECT chunk overlap merge benchmark")
+    parser.add_argument("--chars", type=int, default=20000, help="Длина диктовки, символов")
+    parser.add_argument("--chunk", type=int, default=400, help="Размер чанка, символов")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов (берётся лучший)")
+    args = parser.parse_args()
+
+    print(f"📊 Диктовка {args.chars} символов, чанки по {args.chunk} (перекрытие {args.chunk // 2}):")
+    for profile in ("natural", "filler"):
+        transcript = _transcript(profile, args.chars, args.chunk)[:args.chars]
+        timings = {}
+        merged = set()
+        for name, overlap_fn in (("endswith", _bruteforce_overlap), ("kmp", suffix_prefix_overlap), ("hybrid", _overlap)):
+            runs = [_run(overlap_fn, transcript, args.chunk) for _ in range(args.repeat)]
+            timings[name] = min(ms for ms, _ in runs)
+            merged.add(runs[0][1])
+        assert len(merged) == 1
+        print(
+            f"   {profile:<8} endswith={timings['endswith']:9.2f} ms  kmp={timings['kmp']:9.2f} ms  "
+            f"hybrid={timings['hybrid']:9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Симуляция COLLECT pre-warm: commit → первый аудио-чанк
+
+Это не замер реального пути: gate подписки и память — заглушки с заданной
+"холодной" задержкой (asyncio.sleep) и кэшем, LLM/TTS — фиксированные
+задержки до первого токена/чанка. Настоящие здесь только servicer (COLLECT/
+COMMIT, хранение результата прогрева) и StreamingWorkflowIntegration, поэтому
+выигрыш определяется параметрами --gate-ms/--memory-ms: скрипт показывает,
+какая часть этих задержек уходит с критического пути, а не сами задержки.
+Реальный эффект смотреть по метрикам commit_to_first_audio_prewarmed/_cold.
+
+Сценарий одной реплики: первый COLLECT (частичный STT), пауза на остаток
+речи, COMMIT и потоковый workflow до первого audio_chunk.
+
+Запуск:
+    python scripts/bench_collect_prewarm.py [--requests 20] [--gate-ms 40] [--memory-ms 120] [--speech-ms 600]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import Mock
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import modules.subscription as subscription_package
+from config.unified_config import WorkflowConfig
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.subscription.subscription_module import CanProcessResult
+
+
+class _CachedGate:
+    """Gate с холодной задержкой и кэшем решений"""
+
+    def __init__(self, delay_sec: float):
+        self.delay_sec = delay_sec
+        self._cache = {}
+
+    async def _decision(self, hardware_id: str) -> CanProcessResult:
+        if hardware_id not in self._cache:
+            await asyncio.sleep(self.delay_sec)
+            self._cache[hardware_id] = CanProcessResult(allowed=True, reason='paid')
+        return self._cache[hardware_id]
+
+    async def prewarm(self, hardware_id: str) -> bool:
+        await self._decision(hardware_id)
+        return True
+
+    async def can_process(self, hardware_id: str) -> CanProcessResult:
+        return await self._decision(hardware_id)
+
+    async def increment_usage(self, hardware_id: str) -> bool:
+        self._cache.pop(hardware_id, None)
+        return True
+
+
+class _CachedMemory:
+    def __init__(self, delay_sec: float):
+        self.delay_sec = delay_sec
+        self._cache = {}
+
+    async def prefetch_memory(self, hardware_id: str) -> None:
+        return None
+
+    async def get_memory_context_parallel(self, hardware_id: str):
+        if hardware_id not in self._cache:
+            await asyncio.sleep(self.delay_sec)
+            self._cache[hardware_id] = {'recent_context': 'likes tea'}
+        return self._cache[hardware_id]
+
+
+def _module(name: str, delay_sec: float, item):
+    async def stream():
+        await asyncio.sleep(delay_sec)
+        yield item
+
+    async def process(*args, **kwargs):
+        return stream()
+
+    module = Mock()
+    module.is_initialized = True
+    module.name = name
+    module.process = process
+    return module
+
+
+async def _one_request(servicer: NewStreamingServicer, workflow, prewarm: bool, speech_sec: float) -> float:
+    hardware_id = f"bench-{uuid.uuid4().hex[:12]}"
+    session_id = str(uuid.uuid4())
+    servicer._prewarm_enabled = prewarm
+
+    collect = streaming_pb2.StreamRequest(
+        hardware_id=hardware_id,
+        session_id=session_id,
+        phase=streaming_pb2.REQUEST_PHASE_COLLECT,
+        chunk_text="what is the weather",
+        chunk_seq=1,
+    )
+    await servicer._handle_collect_phase(collect, hardware_id=hardware_id, session_id=session_id)
+    await asyncio.sleep(speech_sec)
+
+    commit = streaming_pb2.StreamRequest(
+        hardware_id=hardware_id,
+        session_id=session_id,
+        phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        prompt="what is the weather in Berlin",
+    )
+    started = time.perf_counter()
+    prompt, screenshot, _, _, prewarm_result, _ = await servicer._consume_collect_for_commit(
+        commit, hardware_id=hardware_id, session_id=session_id
+    )
+    first_audio_ms = 0.0
+    request_data = {
+        'hardware_id': hardware_id,
+        'session_id': session_id,
+        'text': prompt,
+        'screenshot': screenshot,
+        'prewarm': prewarm_result,
+    }
+    async for item in workflow.process_request_streaming(request_data):
+        if item.get('audio_chunk') and not first_audio_ms:
+            first_audio_ms = (time.perf_counter() - started) * 1000
+    return first_audio_ms
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="COLLECT pre-warm commit-to-first-audio simulation (mocked gate/memory/LLM/TTS)")
+    parser.add_argument("--requests", type=int, default=20, help="Реплик на режим")
+    parser.add_argument("--gate-ms", type=float, default=40.0, help="Холодный can_process, мс")
+    parser.add_argument("--memory-ms", type=float, default=120.0, help="Холодный контекст памяти, мс")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="LLM до первого предложения, мс")
+    parser.add_argument("--tts-ms", type=float, default=80.0, help="TTS до первого чанка, мс")
+    parser.add_argument("--speech-ms", type=float, default=600.0, help="От первого COLLECT до COMMIT, мс")
+    args = parser.parse_args()
+
+    subscription_package.get_subscription_module = lambda gate=_CachedGate(args.gate_ms / 1000): gate
+    workflow = StreamingWorkflowIntegration(
+        text_processor=_module("text_processing", args.llm_ms / 1000, "The weather is sunny."),
+        audio_processor=_module("audio_generation", args.tts_ms / 1000, b"\x00" * 4096),
+        memory_workflow=_CachedMemory(args.memory_ms / 1000),
+        workflow_config=WorkflowConfig(trace_write_behind_enabled=False),
+    )
+    await workflow.initialize()
+    servicer = NewStreamingServicer()
+    servicer.grpc_service_manager.streaming_workflow = workflow
+
+    print(
+        f"📊 Симуляция (заглушки с задержками), {args.requests} реплик: gate={args.gate_ms:.0f}ms memory={args.memory_ms:.0f}ms "
+        f"llm={args.llm_ms:.0f}ms tts={args.tts_ms:.0f}ms speech={args.speech_ms:.0f}ms"
+    )
+    for name, prewarm in (("cold", False), ("prewarm", True)):
+        samples = [
+            await _one_request(servicer, workflow, prewarm, args.speech_ms / 1000)
+            for _ in range(args.requests)
+        ]
+        print(
+            f"   {name:<8} commit→first audio p50={_percentile(samples, 0.5):7.1f} ms  "
+            f"p95={_percentile(samples, 0.95):7.1f} ms"
+        )
+    print(f"   prewarm stats: {servicer.get_prewarm_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
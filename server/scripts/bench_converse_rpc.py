@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов RPC на реплику: StreamAudio vs Converse
+
+Реплика — N COLLECT чанков partial STT и COMMIT. Через StreamAudio каждый
+чанк — отдельный вызов (HTTP/2 стрим, метаданные, интерсептор,
+COLLECT_ACCEPTED в ответ), через Converse — все сообщения реплики в одном
+bidi вызове. Сервер настоящий (grpc.aio на localhost с интерсептором),
+workflow — заглушка, мгновенно отдающая один текстовый ответ, поэтому
+измеряется только транспорт и маршрутизация.
+
+Запуск:
+    python scripts/bench_converse_rpc.py [--utterances 200] [--chunks 8] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import grpc
+import grpc.aio
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# grpc_server регистрирует streaming_pb2 под именем, которое ждёт streaming_pb2_grpc
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.grpc_service.core.grpc_interceptor import get_interceptor
+from modules.grpc_service import streaming_pb2, streaming_pb2_grpc
+
+
+async def _process(request_data):
+    yield {"success": True, "text_response": "ok"}
+
+
+def _servicer() -> NewStreamingServicer:
+    manager = Mock()
+    manager.process = _process
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    servicer.grpc_service_manager = manager
+    return servicer
+
+
+def _utterance(hardware_id: str, chunks: int):
+    session_id = str(uuid.uuid4())
+    messages = [
+        streaming_pb2.StreamRequest(
+            hardware_id=hardware_id,
+            session_id=session_id,
+            phase=streaming_pb2.REQUEST_PHASE_COLLECT,
+            chunk_seq=seq,
+            chunk_text=f"word{seq} ",
+        )
+        for seq in range(1, chunks + 1)
+    ]
+    messages.append(
+        streaming_pb2.StreamRequest(
+            hardware_id=hardware_id,
+            session_id=session_id,
+            phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        )
+    )
+    return messages
+
+
+async def _via_stream_audio(stub, messages) -> None:
+    for message in messages:
+        async for _ in stub.StreamAudio(message):
+            pass
+
+
+async def _via_converse(stub, messages) -> None:
+    async for _ in stub.Converse(iter(messages)):
+        pass
+
+
+async def _run(stub, mode, utterances: int, chunks: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        messages = _utterance(f"bench-hw-{i % concurrency}", chunks)
+        async with semaphore:
+            started = time.perf_counter()
+            await mode(stub, messages)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(utterances)))
+    return (time.perf_counter() - started) * 1000, latencies
+
+
+async def main(args) -> None:
+    server = grpc.aio.server(interceptors=[get_interceptor()])
+    streaming_pb2_grpc.add_StreamingServiceServicer_to_server(_servicer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stub = streaming_pb2_grpc.StreamingServiceStub(channel)
+            # Прогрев соединения
+            await _run(stub, _via_converse, 10, args.chunks, 1)
+
+            print(
+                f"📊 {args.utterances} реплик × ({args.chunks} COLLECT + COMMIT), "
+                f"параллельно {args.concurrency}:"
+            )
+            for name, mode in (("StreamAudio", _via_stream_audio), ("Converse", _via_converse)):
+                total_ms, latencies = await _run(stub, mode, args.utterances, args.chunks, args.concurrency)
+                latencies.sort()
+                print(
+                    f"   {name:<12} RPC на реплику={args.chunks + 1 if mode is _via_stream_audio else 1:<3} "
+                    f"p50={statistics.median(latencies):7.2f} ms  "
+                    f"p95={latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms  "
+                    f"всего={total_ms:8.1f} ms"
+                )
+    finally:
+        await server.stop(None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-utterance RPC overhead: StreamAudio vs Converse")
+    parser.add_argument("--utterances", type=int, default=200, help="Число реплик")
+    parser.add_argument("--chunks", type=int, default=8, help="COLLECT чанков на реплику")
+    parser.add_argument("--concurrency", type=int, default=8, help="Реплик параллельно")
+    logging.disable(logging.INFO)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк interrupt → stream end: опрос флага vs push-отмена
+
+Фейковый workflow отдаёт аудио по предложениям; каждое предложение —
+ожидание LLM + синтез (--step-ms). Прерывание приходит в случайный момент.
+- poll: прежняя схема — флаг проверяется между выданными элементами,
+  текущее ожидание (LLM/TTS) доигрывает до конца
+- push: CancellationToken.guard — ожидание отменяется сразу
+
+Запуск:
+    python scripts/bench_interrupt_latency.py [--runs 50] [--step-ms 300]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.cancellation import CancellationToken
+
+
+async def _workflow(step_ms: float, closed: list):
+    try:
+        while True:
+            # LLM + TTS одного предложения
+            await asyncio.sleep(step_ms / 1000)
+            yield b"\x00" * 3200
+    finally:
+        closed.append(time.monotonic())
+
+
+async def _poll(step_ms: float, delay: float) -> float:
+    flag = asyncio.Event()
+    closed: list = []
+
+    async def _consume():
+        source = _workflow(step_ms, closed)
+        async for _ in source:
+            if flag.is_set():
+                break
+        await source.aclose()
+
+    consumer = asyncio.create_task(_consume())
+    await asyncio.sleep(delay)
+    received_at = time.monotonic()
+    flag.set()
+    await consumer
+    return (closed[0] - received_at) * 1000
+
+
+async def _push(step_ms: float, delay: float) -> float:
+    token = CancellationToken("bench", "bench")
+    closed: list = []
+
+    async def _consume():
+        async for _ in token.guard(_workflow(step_ms, closed)):
+            pass
+
+    consumer = asyncio.create_task(_consume())
+    await asyncio.sleep(delay)
+    received_at = time.monotonic()
+    token.cancel("bench", received_at)
+    await consumer
+    return (closed[0] - received_at) * 1000
+
+
+async def _main(runs: int, step_ms: float) -> None:
+    rng = random.Random(0)
+    delays = [rng.uniform(step_ms, 4 * step_ms) / 1000 for _ in range(runs)]
+    print(f"📊 {runs} прерываний, шаг LLM+TTS {step_ms:.0f} ms:")
+    for name, run in (("poll", _poll), ("push", _push)):
+        latencies = sorted([await run(step_ms, delay) for delay in delays])
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"   {name:<5} interrupt→stream_end p50={statistics.median(latencies):7.2f} ms  "
+            f"p95={p95:7.2f} ms  max={latencies[-1]:7.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Interrupt latency benchmark")
+    parser.add_argument("--runs", type=int, default=50, help="Количество прерываний")
+    parser.add_argument("--step-ms", type=float, default=300.0, help="Длительность шага LLM+TTS, мс")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_main(args.runs, args.step_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Экономия LLM вызовов анализа памяти: вызов на реплику vs консолидация пачками
+
+Симуляция часа трафика в виртуальном времени через настоящий
+MemoryConsolidator (sweep вызывается симуляцией, flush мгновенный и только
+считает вызовы). Модель нагрузки: у каждого устройства разговоры приходят
+пуассоновским потоком (в среднем раз в --session-gap-min минут), в
+разговоре в среднем --turns-per-session реплик с паузами 3..30 с, доля
+реплик с «запомни» — --remember-rate (анализируются сразу).
+
+Печатается на каждую комбинацию (max_turns, idle_sec): LLM вызовов в час
+до/после, сэкономлено в час, реплик на вызов и задержка попадания реплики в
+память (p50/p95) — цена экономии.
+
+Запуск:
+    python scripts/bench_memory_consolidation.py [--devices 500] [--hours 1] [--max-turns 2,4,8] [--idle-sec 10,20,60]
+"""
+
+import argparse
+import asyncio
+import heapq
+import logging
+import random
+import statistics
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.memory_consolidation import MemoryConsolidator
+
+
+def _traffic(args: argparse.Namespace):
+    """Список (время, hardware_id, urgent) за args.hours часов"""
+    rng = random.Random(args.seed)
+    horizon = args.hours * 3600
+    events = []
+    for device in range(args.devices):
+        hardware_id = f"hw{device}"
+        t = rng.expovariate(1 / (args.session_gap_min * 60))
+        while t < horizon:
+            turns = 1 + int(rng.expovariate(1 / max(args.turns_per_session - 1, 1e-9)))
+            for _ in range(turns):
+                if t >= horizon:
+                    break
+                events.append((t, hardware_id, rng.random() < args.remember_rate))
+                t += rng.uniform(3, 30)
+            t += rng.expovariate(1 / (args.session_gap_min * 60))
+    heapq.heapify(events)
+    return [heapq.heappop(events) for _ in range(len(events))]
+
+
+async def _simulate(events, max_turns: int, idle_sec: float, hours: float) -> dict:
+    clock = {'now': 0.0}
+    delays = []
+    calls = 0
+
+    async def _flush(hardware_id, turns):
+        nonlocal calls
+        calls += 1
+        delays.extend(clock['now'] - turn['t'] for turn in turns)
+
+    consolidator = MemoryConsolidator(
+        max_turns=max_turns, idle_sec=idle_sec, workers=4, queue_max=100000,
+        max_buffered_turns=10000, sweep_interval_sec=0,
+    )
+    await consolidator.start(_flush)
+    next_sweep = 0.0
+    for t, hardware_id, urgent in events:
+        # Проверка тишины раз в секунду виртуального времени (как фоновый sweep)
+        while next_sweep <= t:
+            clock['now'] = next_sweep
+            consolidator.sweep(now=next_sweep)
+            await consolidator.wait_idle()
+            next_sweep += 1.0
+        clock['now'] = t
+        consolidator.add_turn(hardware_id, {'t': t}, urgent=urgent, now=t)
+        await consolidator.wait_idle()
+    clock['now'] = next_sweep + idle_sec
+    consolidator.sweep(now=clock['now'])
+    await consolidator.wait_idle()
+    stats = consolidator.get_stats()
+    await consolidator.stop()
+
+    delays.sort()
+    return {
+        'turns_per_hour': len(events) / hours,
+        'calls_per_hour': calls / hours,
+        'saved_per_hour': stats['llm_calls_saved'] / hours,
+        'turns_per_call': stats['turns_per_batch'],
+        'delay_p50': statistics.median(delays) if delays else 0.0,
+        'delay_p95': delays[int(len(delays) * 0.95)] if delays else 0.0,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    events = _traffic(args)
+    turns_per_hour = len(events) / args.hours
+    print(
+        f"📊 {args.devices} устройств, {turns_per_hour:.0f} реплик/час "
+        f"(разговор раз в {args.session_gap_min:g} мин, ~{args.turns_per_session:g} реплик, "
+        f"«запомни» {args.remember_rate:.0%}):"
+    )
+    print(f"   по вызову на реплику: {turns_per_hour:8.0f} LLM вызовов/час, задержка 0 s")
+    for max_turns in (int(n) for n in args.max_turns.split(",")):
+        for idle_sec in (float(n) for n in args.idle_sec.split(",")):
+            result = await _simulate(events, max_turns, idle_sec, args.hours)
+            print(
+                f"   max_turns={max_turns:<2} idle={idle_sec:4.0f}s: {result['calls_per_hour']:8.0f} вызовов/час  "
+                f"сэкономлено {result['saved_per_hour']:7.0f}/час ({result['saved_per_hour'] / turns_per_hour:4.0%})  "
+                f"{result['turns_per_call']:4.2f} реплик/вызов  "
+                f"задержка в память p50={result['delay_p50']:5.1f}s p95={result['delay_p95']:5.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM calls saved by batched memory consolidation")
+    parser.add_argument("--devices", type=int, default=500, help="Число устройств")
+    parser.add_argument("--hours", type=float, default=1.0, help="Длительность симуляции, часов")
+    parser.add_argument("--session-gap-min", type=float, default=20.0, help="Средний интервал между разговорами, мин")
+    parser.add_argument("--turns-per-session", type=float, default=5.0, help="Среднее число реплик в разговоре")
+    parser.add_argument("--remember-rate", type=float, default=0.03, help="Доля реплик с «запомни»")
+    parser.add_argument("--max-turns", default="2,4,8", help="Значения max_turns через запятую")
+    parser.add_argument("--idle-sec", default="10,20,60", help="Значения idle_sec через запятую")
+    parser.add_argument("--seed", type=int, default=7)
+    logging.disable(logging.INFO)
+    asyncio.run(main(parser.parse_args()))
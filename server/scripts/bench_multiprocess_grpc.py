@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест режима воркеров: N процессов gRPC сервера на одном порту
+
+Воркеры поднимает настоящий WorkerSupervisor (как main.py при
+grpc.workers > 1), каждый слушает один и тот же порт с SO_REUSEPORT и
+обслуживает StreamAudio через NewStreamingServicer. Workflow — заглушка с
+CPU-нагрузкой (--cpu-ms на запрос: очистка текста, JSON, вычисления),
+половина до первого аудио чанка, остальное между чанками; сериализация
+protobuf, интерсептор и логирование — настоящие.
+
+Клиенты — отдельные процессы, у каждого параллельного клиента свой канал
+(своё соединение: SO_REUSEPORT распределяет соединения, а не вызовы).
+Печатается пропускная способность, p50/p99 времени до первого аудио и
+распределение запросов по воркерам. Масштабирование ограничено числом
+ядер машины (os.cpu_count()): клиенты делят их с воркерами.
+
+Запуск:
+    python scripts/bench_multiprocess_grpc.py [--workers 1,2,4,8] [--duration 5] [--cpu-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import grpc
+import grpc.aio
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# grpc_server регистрирует streaming_pb2 под именем, которое ждёт streaming_pb2_grpc
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.grpc_service.core.grpc_interceptor import get_interceptor
+from modules.grpc_service import streaming_pb2, streaming_pb2_grpc
+from integrations.core.worker_supervisor import WorkerHeartbeat, WorkerSupervisor, get_worker_context
+from utils.metrics_collector import get_metrics_collector
+from utils.text_utils import clean_text
+
+PROMPT = "Открой, пожалуйста, **браузер** и найди погоду в Берлине на завтра… 🙂 " * 8
+AUDIO_CHUNKS = 4
+AUDIO_CHUNK_BYTES = 9600  # 100 ms PCM 48 kHz mono int16
+
+
+def _burn(cpu_ms: float) -> None:
+    """CPU-работа запроса: очистка текста и JSON до исчерпания бюджета процессорного времени"""
+    # thread_time, не часы: вытесненный процесс не должен «выполнять» работу даром
+    deadline = time.thread_time() + cpu_ms / 1000
+    while time.thread_time() < deadline:
+        json.loads(json.dumps({"text": clean_text(PROMPT), "tokens": list(range(32))}))
+
+
+def _servicer(cpu_ms: float) -> NewStreamingServicer:
+    async def _process(request_data):
+        _burn(cpu_ms / 2)
+        yield {"success": True, "text_response": clean_text(PROMPT)[:120]}
+        for _ in range(AUDIO_CHUNKS):
+            yield {"success": True, "audio_chunk": b"\x00" * AUDIO_CHUNK_BYTES}
+            _burn(cpu_ms / 2 / AUDIO_CHUNKS)
+
+    manager = Mock()
+    manager.process = _process
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    servicer.grpc_service_manager = manager
+    return servicer
+
+
+async def _serve_worker(port: int, cpu_ms: float) -> None:
+    """Процесс-воркер: gRPC на общем порту + heartbeat для супервизора"""
+    context = get_worker_context()
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    server = grpc.aio.server(interceptors=[get_interceptor()], options=[("grpc.so_reuseport", 1)])
+    streaming_pb2_grpc.add_StreamingServiceServicer_to_server(_servicer(cpu_ms), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+
+    def _stats() -> dict:
+        snapshot = get_metrics_collector().get_snapshot()
+        return {'metrics': {'total_requests': snapshot.total_requests}}
+
+    heartbeat = WorkerHeartbeat(context, interval_sec=0.2, stats_provider=_stats, on_orphaned=stop.set)
+    await heartbeat.start()
+    await stop.wait()
+    await server.stop(grace=2.0)
+    heartbeat.write()
+    await heartbeat.stop()
+
+
+async def _client_main(port: int, index: int, args: argparse.Namespace, start_at: float) -> dict:
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + args.duration
+    first_audio_ms = []
+    errors = 0
+
+    async def _client(client: int) -> None:
+        nonlocal errors
+        # Отдельный пул подканалов: у каждого клиента своё TCP соединение
+        async with grpc.aio.insecure_channel(
+            f"127.0.0.1:{port}", options=[("grpc.use_local_subchannel_pool", 1)]
+        ) as channel:
+            stub = streaming_pb2_grpc.StreamingServiceStub(channel)
+            hardware_id = f"bench-hw-{index}-{client}"
+            while time.time() < deadline:
+                request = streaming_pb2.StreamRequest(
+                    prompt=PROMPT, hardware_id=hardware_id, session_id=str(uuid.uuid4())
+                )
+                started = time.perf_counter()
+                first = None
+                try:
+                    async for response in stub.StreamAudio(request):
+                        if first is None and response.WhichOneof("content") == "audio_chunk":
+                            first = (time.perf_counter() - started) * 1000
+                except grpc.aio.AioRpcError:
+                    errors += 1
+                    continue
+                if first is None:
+                    errors += 1
+                else:
+                    first_audio_ms.append(first)
+
+    await asyncio.gather(*(_client(client) for client in range(args.concurrency)))
+    return {'first_audio_ms': first_audio_ms, 'errors': errors}
+
+
+def _client_process(port: int, index: int, args: argparse.Namespace, start_at: float, results) -> None:
+    logging.disable(logging.CRITICAL)
+    results.put(asyncio.run(_client_main(port, index, args, start_at)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run_level(workers: int, args: argparse.Namespace) -> dict:
+    port = _free_port()
+    state_dir = tempfile.TemporaryDirectory(prefix="bench-workers-")
+    supervisor = WorkerSupervisor(
+        command=[sys.executable, __file__, "--serve-worker", str(port), "--cpu-ms", str(args.cpu_ms)],
+        workers=workers,
+        heartbeat_timeout_sec=30.0,
+        drain_timeout_sec=10.0,
+        state_dir=state_dir.name,
+        cwd=str(project_root),
+    )
+    try:
+        deadline = time.time() + 60
+        while not all(worker.last_heartbeat for worker in supervisor.workers):
+            if time.time() > deadline:
+                raise RuntimeError("workers did not start")
+            supervisor.check_workers()
+            await asyncio.sleep(0.1)
+
+        results = multiprocessing.Queue()
+        start_at = time.time() + 0.5
+        clients = [
+            multiprocessing.Process(target=_client_process, args=(port, i, args, start_at, results))
+            for i in range(args.client_procs)
+        ]
+        for process in clients:
+            process.start()
+        stats = [await asyncio.to_thread(results.get, True, args.duration + 60) for _ in clients]
+        for process in clients:
+            process.join()
+    finally:
+        await supervisor.drain()
+
+    # Воркер пишет итоговый heartbeat при остановке
+    per_worker = []
+    for worker in supervisor.workers:
+        with open(os.path.join(state_dir.name, f"worker-{worker.index}.json"), encoding="utf-8") as f:
+            heartbeat = json.load(f)
+        per_worker.append(heartbeat['stats']['metrics']['total_requests'].get('StreamAudio', 0))
+    state_dir.cleanup()
+
+    latencies = sorted(ms for s in stats for ms in s['first_audio_ms'])
+    return {
+        'completed': len(latencies),
+        'errors': sum(s['errors'] for s in stats),
+        'latencies': latencies,
+        'per_worker': per_worker,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(
+        f"📊 StreamAudio через SO_REUSEPORT воркеры, {os.cpu_count()} CPU, {args.cpu_ms} ms CPU на запрос, "
+        f"{args.client_procs}×{args.concurrency} клиентов:"
+    )
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = await _run_level(workers, args)
+        latencies = result['latencies']
+        throughput = result['completed'] / args.duration
+        baseline = baseline or throughput
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+        print(
+            f"   workers={workers:<2} {throughput:7.1f} req/s  x{throughput / baseline:4.2f}  "
+            f"first audio p50={statistics.median(latencies) if latencies else 0.0:7.1f} ms  p99={p99:7.1f} ms  "
+            f"errors={result['errors']}  per worker={result['per_worker']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process gRPC serving (SO_REUSEPORT) load test")
+    parser.add_argument("--workers", default="1,2,4,8", help="Числа воркеров через запятую")
+    parser.add_argument("--duration", type=float, default=5.0, help="Длительность замера, сек")
+    parser.add_argument("--client-procs", type=int, default=2, help="Процессов-клиентов")
+    parser.add_argument("--concurrency", type=int, default=8, help="Параллельных клиентов на процесс")
+    parser.add_argument("--cpu-ms", type=float, default=20.0, help="CPU на запрос, мс")
+    parser.add_argument("--serve-worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    if args.serve_worker is not None:
+        asyncio.run(_serve_worker(args.serve_worker, args.cpu_ms))
+    else:
+        asyncio.run(main(args))
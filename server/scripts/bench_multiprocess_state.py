@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест общего состояния: N процессов-воркеров на одном KV хранилище
+
+Каждый воркер — отдельный процесс со своим event loop, как воркеры за
+SO_REUSEPORT. Запрос воркера повторяет путь StreamAudio по общему
+состоянию: single-flight (SharedInflight, запрет параллельных запросов
+устройства), место в общем лимите стримов (SharedStreamCounter),
+CPU-работа запроса (--cpu-ms, имитация кодирования/сериализации),
+освобождение. Хранилище — локальный stand-in (integrations.core.local_state_server).
+
+Печатается пропускная способность по числу воркеров и проверка инвариантов:
+число одновременно допущенных стримов не превышает --limit ни в одном воркере.
+Масштабирование ограничено числом ядер машины (os.cpu_count()).
+
+Запуск:
+    python scripts/bench_multiprocess_state.py [--workers 1,2,4] [--duration 3] [--cpu-ms 2]
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.shared_state import SharedInflight, SharedStreamCounter
+from integrations.core.state_backend import KVStateBackend
+
+
+def _burn(cpu_ms: float) -> None:
+    deadline = time.perf_counter() + cpu_ms / 1000
+    value = 0
+    while time.perf_counter() < deadline:
+        value += 1
+
+
+async def _worker_main(index: int, port: int, args: argparse.Namespace, start_at: float) -> dict:
+    backend = KVStateBackend("127.0.0.1", port, key_prefix="bench:", worker_id=f"bench-{index}", op_timeout_sec=2.0)
+    inflight = SharedInflight(backend, ttl_sec=30)
+    streams = SharedStreamCounter(backend, lease_ttl_sec=30)
+    await streams.heartbeat()
+    stats = {'completed': 0, 'rejected_inflight': 0, 'rejected_limit': 0, 'max_admitted': 0}
+
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + args.duration
+
+    async def _client(client: int) -> None:
+        request = 0
+        while time.time() < deadline:
+            request += 1
+            session_id = f"{index}-{client}-{request}"
+            hardware_id = f"hw{(index * args.concurrency + client) % args.devices}"
+            acquired = await inflight.try_acquire(session_id, hardware_id, prevent_concurrent_hardware=True)
+            if not acquired['ok']:
+                stats['rejected_inflight'] += 1
+                await asyncio.sleep(0)
+                continue
+            allowed, active = await streams.try_acquire(args.limit)
+            if allowed:
+                stats['max_admitted'] = max(stats['max_admitted'], active)
+                _burn(args.cpu_ms)
+                stats['completed'] += 1
+                await streams.release()
+            else:
+                stats['rejected_limit'] += 1
+            await inflight.release(session_id, hardware_id)
+
+    await asyncio.gather(*(_client(client) for client in range(args.concurrency)))
+    await backend.close()
+    return stats
+
+
+def _worker_process(index: int, port: int, args: argparse.Namespace, start_at: float, results) -> None:
+    logging.disable(logging.CRITICAL)
+    results.put(asyncio.run(_worker_main(index, port, args, start_at)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 5.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"state server on port {port} did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-process shared state load test")
+    parser.add_argument("--workers", default="1,2,4", help="Числа воркеров через запятую")
+    parser.add_argument("--duration", type=float, default=3.0, help="Длительность замера, сек")
+    parser.add_argument("--concurrency", type=int, default=8, help="Параллельных клиентов на воркер")
+    parser.add_argument("--devices", type=int, default=64, help="Число hardware_id")
+    parser.add_argument("--limit", type=int, default=16, help="Общий лимит одновременных стримов")
+    parser.add_argument("--cpu-ms", type=float, default=2.0, help="CPU на запрос, мс")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "integrations.core.local_state_server", "--port", str(port)],
+        cwd=str(project_root), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_port(port)
+        print(f"📊 Общее состояние через KV stand-in, {os.cpu_count()} CPU, {args.cpu_ms} ms CPU на запрос:")
+        baseline = None
+        for workers in (int(n) for n in args.workers.split(",")):
+            results = multiprocessing.Queue()
+            start_at = time.time() + 0.5
+            processes = [
+                multiprocessing.Process(target=_worker_process, args=(i, port, args, start_at, results))
+                for i in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            stats = [results.get(timeout=args.duration + 30) for _ in processes]
+            for process in processes:
+                process.join()
+
+            completed = sum(s['completed'] for s in stats)
+            throughput = completed / args.duration
+            baseline = baseline or throughput
+            max_admitted = max(s['max_admitted'] for s in stats)
+            print(
+                f"   workers={workers:<2} {throughput:8.0f} req/s  x{throughput / baseline:4.2f}  "
+                f"rejected: inflight={sum(s['rejected_inflight'] for s in stats)} "
+                f"limit={sum(s['rejected_limit'] for s in stats)}  "
+                f"max admitted={max_admitted}/{args.limit} {'✅' if max_admitted <= args.limit else '❌'}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
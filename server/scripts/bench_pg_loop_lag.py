@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки event loop при конкурентных запросах к PostgreSQL
+
+Сравнивает два режима под одинаковой нагрузкой (N корутин по M запросов
+"SELECT pg_sleep(d)"):
+  inline   — psycopg2 прямо в корутине (как было в PostgreSQLProvider)
+  executor — PgExecutor (ограниченный пул потоков, loop не блокируется)
+
+Параллельно тикер каждые 10 мс измеряет опоздание loop: в inline режиме
+оно растёт до длительности запроса, в executor — остаётся ~0.
+
+Запуск (нужен локальный Postgres):
+    DATABASE_URL=postgresql://postgres@localhost/postgres \\
+        python scripts/bench_pg_loop_lag.py [--clients 50] [--queries 10] [--sleep-ms 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg2.pool
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.database.core.pg_executor import PgExecutor
+
+TICK_SEC = 0.01
+
+
+def _query(conn, sleep_sec: float) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_sleep(%s)", (sleep_sec,))
+        cursor.fetchone()
+    conn.commit()
+
+
+async def _measure_lag(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SEC)
+        lags.append((time.perf_counter() - started - TICK_SEC) * 1000)
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def _run_mode(name: str, client, clients: int, queries: int, sleep_sec: float) -> None:
+    lags: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_lag(stop, lags))
+
+    async def worker():
+        for _ in range(queries):
+            await client(sleep_sec)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    total = clients * queries
+    print(
+        f"   {name:<8} {total / wall:8.1f} q/s  "
+        f"loop lag p50={_percentile(lags, 0.5):7.2f} ms  p99={_percentile(lags, 0.99):7.2f} ms  "
+        f"max={max(lags, default=0.0):7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="PostgreSQL event loop lag benchmark")
+    parser.add_argument("--clients", type=int, default=50, help="Конкурентные корутины")
+    parser.add_argument("--queries", type=int, default=10, help="Запросов на корутину")
+    parser.add_argument("--sleep-ms", type=float, default=5.0, help="Длительность запроса (pg_sleep)")
+    parser.add_argument("--pool", type=int, default=10, help="Размер пула соединений")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL", "postgresql://postgres@localhost/postgres")
+    sleep_sec = args.sleep_ms / 1000
+    print(f"📊 {args.clients} клиентов × {args.queries} запросов, pg_sleep={args.sleep_ms} мс, пул {args.pool}:")
+
+    # inline: синхронный psycopg2 в корутине
+    pool = psycopg2.pool.ThreadedConnectionPool(1, args.pool, dsn)
+
+    async def inline_client(seconds: float) -> None:
+        conn = pool.getconn()
+        try:
+            _query(conn, seconds)
+        finally:
+            pool.putconn(conn)
+
+    await _run_mode("inline", inline_client, args.clients, args.queries, sleep_sec)
+    pool.closeall()
+
+    executor = PgExecutor(min_connections=1, max_connections=args.pool, name="bench", dsn=dsn)
+    await executor.start()
+
+    async def executor_client(seconds: float) -> None:
+        await executor.run(_query, seconds)
+
+    await _run_mode("executor", executor_client, args.clients, args.queries, sleep_sec)
+    print(f"   executor stats: {executor.get_stats()}")
+    await executor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк латентности проверки квоты: соединение на операцию vs общий пул
+
+Прогоняет QuotaChecker.check_quota для тестового hardware_id в двух режимах:
+  connect — SubscriptionRepository без пула (psycopg2.connect на каждый запрос)
+  pool    — SubscriptionRepository на SharedConnectionPool, вызовы через run_async
+
+Запуск (нужна БД со схемой subscriptions):
+    DATABASE_URL=postgresql://postgres@localhost/voice_assistant_db \\
+        python scripts/bench_quota_check.py [--checks 200] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.database.core.shared_pool import SharedConnectionPool
+from modules.subscription.core.quota_checker import QuotaChecker
+from modules.subscription.repository.subscription_repository import SubscriptionRepository
+
+HARDWARE_ID = "bench_quota_check_hardware_id"
+
+
+def _report(name: str, latencies: list, wall: float) -> None:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    print(
+        f"   {name:<8} p50={percentile(0.5):7.2f} ms  p95={percentile(0.95):7.2f} ms  "
+        f"p99={percentile(0.99):7.2f} ms  {len(ordered) / wall:8.1f} checks/s"
+    )
+
+
+async def _bench(name: str, repository: SubscriptionRepository, checks: int, concurrency: int) -> None:
+    checker = QuotaChecker(repository=repository)
+    latencies: list = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_check() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await repository.run_async(checker.check_quota, HARDWARE_ID)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_check() for _ in range(checks)))
+    _report(name, latencies, time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Quota check latency benchmark")
+    parser.add_argument("--checks", type=int, default=200, help="Количество проверок")
+    parser.add_argument("--concurrency", type=int, default=20, help="Параллельные проверки")
+    parser.add_argument("--pool", type=int, default=10, help="Размер пула")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL", "postgresql://postgres@localhost/voice_assistant_db")
+    print(f"📊 {args.checks} проверок квоты, параллельность {args.concurrency}:")
+
+    await _bench("connect", SubscriptionRepository(db_url=dsn), args.checks, args.concurrency)
+
+    pool = SharedConnectionPool(dsn, max_connections=args.pool, name="bench")
+    await _bench("pool", SubscriptionRepository(db_url=dsn, connection_pool=pool), args.checks, args.concurrency)
+    print(f"   pool stats: {pool.get_stats()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сегментации stream_buffer: повторный split_sentences vs IncrementalSentenceSegmenter
+
+Показывает стоимость одного чанка LLM по мере роста ответа.
+Сценарии:
+  - prose: обычный текст с предложениями
+  - sparse: длинный ответ почти без знаков конца предложения (списки, код),
+    где буфер не сбрасывается и повторный split становится квадратичным
+
+Запуск:
+    python scripts/bench_sentence_segmenter.py [--chunks 4000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.text_filtering.core.incremental_sentence_segmenter import IncrementalSentenceSegmenter
+from modules.text_filtering.providers.sentence_processing_provider import SentenceProcessingProvider
+
+CHUNKS = {
+    'prose': ["The server ", "reads main.py ", "and version 1.2.3 ", "then answers. ", "Next step "],
+    'sparse': ["item one, ", "item two with main.py ", "and 3.14159 ", "plus 192.168.1.1 ", "more words "],
+}
+
+
+async def _resplit(provider: SentenceProcessingProvider, chunks: list) -> list:
+    """Прежний путь: stream_buffer += chunk; split_sentences(stream_buffer)"""
+    timings = []
+    buffer = ""
+    for chunk in chunks:
+        started = time.perf_counter()
+        buffer = f"{buffer} {chunk.strip()}" if buffer else chunk.strip()
+        result = await provider.split_sentences(buffer)
+        buffer = result["remainder"]
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _incremental(chunks: list) -> list:
+    timings = []
+    segmenter = IncrementalSentenceSegmenter()
+    for chunk in chunks:
+        started = time.perf_counter()
+        segmenter.feed(chunk.strip())
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(name: str, timings: list, buckets: int = 4) -> None:
+    size = max(1, len(timings) // buckets)
+    cells = []
+    for index in range(buckets):
+        part = timings[index * size:(index + 1) * size]
+        if part:
+            cells.append(f"{sum(part) / len(part) * 1e6:8.1f}")
+    print(f"   {name:<12} µs/chunk по четвертям ответа: {' '.join(cells)}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Sentence segmenter benchmark")
+    parser.add_argument("--chunks", type=int, default=4000, help="Количество чанков LLM в ответе")
+    args = parser.parse_args()
+
+    provider = SentenceProcessingProvider(Mock(config={}))
+    provider.is_initialized = True
+
+    for scenario, pattern in CHUNKS.items():
+        chunks = [pattern[i % len(pattern)] for i in range(args.chunks)]
+        print(f"📊 Сценарий '{scenario}' ({args.chunks} чанков):")
+        _report("resplit", await _resplit(provider, chunks))
+        _report("incremental", _incremental(chunks))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк SessionRegistry: стоимость прерывания, single-flight и очистки от числа сессий
+
+Реестр заполняется N сессиями (по 2 на устройство), затем замеряются:
+- interrupt: поиск сессий устройства + interrupt_session (как InterruptManager)
+  прежним обходом всех сессий и индексом по hardware_id
+- single-flight: try_acquire_inflight + release_inflight
+- cleanup: проход очистки, когда истёкших сессий нет — прежний обход
+  всех сессий vs expire_stale по куче
+
+Запуск:
+    python scripts/bench_session_registry.py [--sessions 100,1000,10000] [--ops 20000]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.session_management.core.session_registry import SessionData, SessionRegistry
+
+
+def _scan_by_hardware_id(registry: SessionRegistry, hardware_id: str):
+    """Прежний get_sessions_by_hardware_id: обход всех сессий"""
+    with registry._lock:
+        return [s for s in registry._active_sessions.values() if s.hardware_id == hardware_id]
+
+
+def _scan_expired(registry: SessionRegistry, now: float, ttl: float):
+    """Прежний _cleanup_expired_sessions: обход всех сессий"""
+    return [s.session_id for s in registry.get_all_sessions() if now - s.last_activity > ttl]
+
+
+def _per_op_us(fn, ops: int) -> float:
+    started = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def _fill(registry: SessionRegistry, sessions: int) -> int:
+    registry.clear()
+    now = time.time()
+    devices = max(1, sessions // 2)
+    for i in range(sessions):
+        registry.register_session(SessionData(
+            session_id=f"s{i}", hardware_id=f"hw{i % devices}", created_at=now, last_activity=now
+        ))
+    return devices
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SessionRegistry benchmark")
+    parser.add_argument("--sessions", default="100,1000,10000", help="Числа сессий через запятую")
+    parser.add_argument("--ops", type=int, default=20000, help="Операций на замер")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    registry = SessionRegistry()
+    registry.configure_expiry(session_ttl=3600.0, interrupted_ttl=3600.0)
+
+    print(f"📊 SessionRegistry, {args.ops} операций на замер (µs/op):")
+    for sessions in (int(n) for n in args.sessions.split(",")):
+        devices = _fill(registry, sessions)
+        ops = args.ops
+
+        def _interrupt_scan(i):
+            for s in _scan_by_hardware_id(registry, f"hw{i % devices}"):
+                registry.interrupt_session(s.session_id, "bench")
+
+        def _interrupt_indexed(i):
+            for s in registry.get_sessions_by_hardware_id(f"hw{i % devices}"):
+                registry.interrupt_session(s.session_id, "bench")
+
+        def _single_flight(i):
+            registry.try_acquire_inflight(f"s{i % sessions}", f"hw{i % devices}", prevent_concurrent_hardware=True)
+            registry.release_inflight(f"s{i % sessions}", f"hw{i % devices}")
+
+        now = time.time()
+        cleanup_ops = max(1, ops // 100)
+        scan_us = _per_op_us(_interrupt_scan, min(ops, 2000))
+        indexed_us = _per_op_us(_interrupt_indexed, ops)
+        flight_us = _per_op_us(_single_flight, ops)
+        cleanup_scan_us = _per_op_us(lambda i: _scan_expired(registry, now, 3600.0), cleanup_ops)
+        cleanup_heap_us = _per_op_us(lambda i: registry.expire_stale(now), cleanup_ops)
+        stats = registry.get_stats()
+        print(
+            f"   n={sessions:<6} interrupt scan={scan_us:9.2f}  indexed={indexed_us:6.2f}  "
+            f"single-flight={flight_us:5.2f}  cleanup scan={cleanup_scan_us:9.2f}  heap={cleanup_heap_us:5.2f}  "
+            f"memory≈{stats['approx_bytes'] / 1024:.0f} KiB"
+        )
+    registry.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import uuid
+from pathlib import Path
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.audio_codec import (
+    CODEC_PCM_S16LE,
+    AudioCoalescer,
+    OpusStreamEncoder,
+    PcmPassthroughEncoder,
+    create_audio_encoder,
+)
+from modules.grpc_service.core.backpressure import BackpressureManager, StreamLimits
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+
+# 4096 байт ≈ 43 мс при 48kHz mono int16 — размер фрагмента TTS
+FRAGMENT = b"\x01\x00" * 2048
+BYTES_PER_SECOND = 48000 * 2
+
+
+class FakeOpusEncoder:
+    def __init__(self, sample_rate, channels, *args):
+        pass
+
+    def encode(self, pcm, frame_size):
+        return b"\x00" * 3
+
+
+def test_coalescing_is_opt_in_by_duration():
+    assert isinstance(create_audio_encoder(CODEC_PCM_S16LE, 48000, 1), PcmPassthroughEncoder)
+    coalescer = create_audio_encoder(CODEC_PCM_S16LE, 48000, 1, coalesce_ms=200)
+    assert isinstance(coalescer, AudioCoalescer)
+    assert coalescer.target_bytes == 19200
+
+
+@pytest.mark.asyncio
+async def test_coalescer_packs_fragments_into_target_duration_messages():
+    coalescer = AudioCoalescer(PcmPassthroughEncoder(), 48000, 1, target_ms=200)
+    messages = []
+    for _ in range(50):
+        encoded = await coalescer.encode(FRAGMENT)
+        if encoded:
+            messages.append(encoded.data)
+    tail = await coalescer.flush()
+    if tail:
+        messages.append(tail.data)
+
+    # Первый фрагмент уходит сразу, дальше — не меньше 200 мс на сообщение
+    assert messages[0] == FRAGMENT
+    assert all(len(data) >= coalescer.target_bytes for data in messages[1:-1])
+    assert b"".join(messages) == FRAGMENT * 50
+    assert len(messages) < 50 // 4
+    assert await coalescer.flush() is None
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flush_merges_opus_tail_packets():
+    opus = OpusStreamEncoder(48000, 1, frame_ms=20, encoder_factory=FakeOpusEncoder)
+    coalescer = AudioCoalescer(opus, 48000, 1, target_ms=200)
+
+    first = await coalescer.encode(FRAGMENT)
+    assert first.packet_sizes == [3, 3]
+    assert await coalescer.encode(FRAGMENT) is None
+
+    # Накопленные фрагменты + неполный кадр энкодера — одним сообщением
+    tail = await coalescer.flush()
+    assert len(tail.data) == sum(tail.packet_sizes)
+    assert opus.bytes_in == len(FRAGMENT) * 2
+    assert len(tail.packet_sizes) == opus.packets - 2
+
+
+def _servicer(audio_fragments: int) -> NewStreamingServicer:
+    async def _process(request_data):
+        yield {"success": True, "text_response": "Hello there."}
+        for _ in range(audio_fragments):
+            yield {"success": True, "audio_chunk": FRAGMENT}
+
+    manager = Mock()
+    manager.process = _process
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    servicer.grpc_service_manager = manager
+    return servicer
+
+
+async def _stream(servicer: NewStreamingServicer, **fields):
+    request = streaming_pb2.StreamRequest(
+        prompt="hi",
+        hardware_id="hw-audio",
+        session_id=str(uuid.uuid4()),
+        phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        **fields,
+    )
+    return [resp async for resp in servicer.StreamAudio(request, Mock())]
+
+
+@pytest.mark.asyncio
+async def test_header_once_sends_format_before_first_audio_only():
+    responses = await _stream(_servicer(24), audio_header_once=True)
+    kinds = [resp.WhichOneof("content") for resp in responses]
+
+    assert kinds.count("audio_header") == 1
+    assert kinds.index("audio_header") < kinds.index("audio_chunk")
+    header = responses[kinds.index("audio_header")].audio_header
+    assert (header.dtype, header.sample_rate, header.channels) == ("int16", 48000, 1)
+    chunks = [resp.audio_chunk for resp in responses if resp.WhichOneof("content") == "audio_chunk"]
+    assert all(chunk.sample_rate == 0 and chunk.dtype == "" for chunk in chunks)
+    assert b"".join(chunk.audio_data for chunk in chunks) == FRAGMENT * 24
+
+
+@pytest.mark.asyncio
+async def test_legacy_clients_keep_format_in_every_chunk():
+    responses = await _stream(_servicer(24))
+    kinds = [resp.WhichOneof("content") for resp in responses]
+
+    assert "audio_header" not in kinds
+    chunks = [resp.audio_chunk for resp in responses if resp.WhichOneof("content") == "audio_chunk"]
+    assert chunks and all(chunk.sample_rate == 48000 and chunk.dtype == "int16" for chunk in chunks)
+    # Склейка по 200 мс: ~1 с аудио — единицы сообщений, а не 24
+    assert len(chunks) <= 7
+
+
+@pytest.mark.asyncio
+async def test_audio_rate_is_accounted_by_duration_not_message_count():
+    manager = BackpressureManager(StreamLimits(max_message_rate_per_second=5, max_audio_sec_per_second=2.0))
+    await manager.acquire_stream("s-1", "hw-1")
+
+    # 40 мелких фрагментов (~1.7 с аудио) проходят, хотя это в 8 раз больше лимита сообщений
+    for _ in range(40):
+        allowed, error = await manager.check_audio_rate("s-1", len(FRAGMENT), BYTES_PER_SECOND)
+        assert allowed, error
+
+    allowed, error = await manager.check_audio_rate("s-1", BYTES_PER_SECOND, BYTES_PER_SECOND)
+    assert not allowed and error.startswith("AUDIO_RATE_EXCEEDED")
+    assert manager.active_streams["s-1"].message_count == 0
+    assert manager.active_streams["s-1"].audio_bytes == len(FRAGMENT) * 40
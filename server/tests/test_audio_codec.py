@@ -0,0 +1,90 @@
+import threading
+from pathlib import Path
+import sys
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core import audio_codec
+from modules.grpc_service.core.audio_codec import (
+    CODEC_OPUS,
+    CODEC_PCM_S16LE,
+    OpusStreamEncoder,
+    PcmPassthroughEncoder,
+    create_audio_encoder,
+)
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.grpc_service.core.welcome_audio_store import WelcomeVariant
+
+# 20 мс при 48kHz mono int16
+FRAME_BYTES = 960 * 2
+
+
+class FakeOpusEncoder:
+    """Пакет = 4 байта: длина кадра + поток, в котором шло кодирование"""
+
+    def __init__(self, sample_rate, channels, *args):
+        self.threads = set()
+
+    def encode(self, pcm, frame_size):
+        assert len(pcm) == frame_size * 2
+        self.threads.add(threading.current_thread().name)
+        return len(pcm).to_bytes(4, 'little')
+
+
+def test_pcm_is_default_and_opus_falls_back_when_unavailable(monkeypatch):
+    assert isinstance(create_audio_encoder(CODEC_PCM_S16LE, 48000, 1), PcmPassthroughEncoder)
+
+    monkeypatch.setattr(audio_codec, "OPUS_AVAILABLE", False)
+    assert isinstance(create_audio_encoder(CODEC_OPUS, 48000, 1), PcmPassthroughEncoder)
+
+
+@pytest.mark.asyncio
+async def test_opus_encoder_frames_packets_off_loop():
+    encoder = OpusStreamEncoder(48000, 1, frame_ms=20, encoder_factory=FakeOpusEncoder)
+
+    # Меньше кадра — ждём следующего фрагмента
+    assert await encoder.encode(b"\x01" * 1000) is None
+
+    encoded = await encoder.encode(b"\x01" * (FRAME_BYTES * 2))
+    assert encoded.codec == CODEC_OPUS
+    assert encoded.packet_sizes == [4, 4]
+    assert encoded.frame_duration_ms == 20
+
+    # Хвост дополняется тишиной до целого кадра
+    tail = await encoder.flush()
+    assert tail.packet_sizes == [4]
+    assert await encoder.flush() is None
+
+    assert encoder.packets == 3
+    assert all(name.startswith("audio-encoder") for name in encoder._encoder.threads)
+
+
+@pytest.mark.asyncio
+async def test_welcome_audio_uses_negotiated_opus(monkeypatch):
+    fake_opuslib = SimpleNamespace(Encoder=FakeOpusEncoder, APPLICATION_VOIP=2049)
+    monkeypatch.setattr(audio_codec, "opuslib", fake_opuslib)
+    monkeypatch.setattr(audio_codec, "OPUS_AVAILABLE", True)
+
+    servicer = NewStreamingServicer()
+    servicer._welcome_store = Mock()
+    servicer._welcome_store.resolve = Mock(return_value=WelcomeVariant(text="Hi!"))
+
+    async def get(*args, **kwargs):
+        return SimpleNamespace(duration_sec=0.05, iter_chunks=lambda size: iter([b"\x00" * 4096, b"\x00" * 704]))
+
+    servicer._welcome_store.get = get
+
+    request = streaming_pb2.WelcomeRequest(audio_codec=streaming_pb2.AUDIO_CODEC_OPUS)
+    responses = [r async for r in servicer.GenerateWelcomeAudio(request, Mock())]
+    chunks = [r.audio_chunk for r in responses if r.WhichOneof("content") == "audio_chunk"]
+
+    assert chunks and all(c.codec == streaming_pb2.AUDIO_CODEC_OPUS and c.dtype == "opus" for c in chunks)
+    # 4800 байт PCM = 2 целых кадра + хвост
+    assert sum(len(c.packet_sizes) for c in chunks) == 3
+    assert all(len(c.audio_data) == sum(c.packet_sizes) for c in chunks)
@@ -0,0 +1,120 @@
+import asyncio
+from pathlib import Path
+import sys
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service.core.backpressure import (
+    REJECT_DEVICE_RATE,
+    REJECT_MESSAGE_RATE,
+    REJECT_STREAM_LIMIT,
+    BackpressureManager,
+    StreamLimits,
+    TokenBucket,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_lazily_up_to_capacity():
+    bucket = TokenBucket(rate=10, now=0.0)
+
+    assert all(bucket.try_consume(1, 0.0) for _ in range(10))
+    assert not bucket.try_consume(1, 0.0)
+    # 0.25 с → 2.5 токена
+    assert bucket.try_consume(1, 0.25) and bucket.try_consume(1, 0.25)
+    assert not bucket.try_consume(1, 0.25)
+    # Долгий простой не копит больше ёмкости
+    assert bucket.try_consume(1, 1000.0)
+    assert bucket.tokens == 9
+
+
+@pytest.mark.asyncio
+async def test_stream_rate_rejects_burst_and_recovers():
+    clock = _Clock()
+    manager = BackpressureManager(StreamLimits(max_message_rate_per_second=5), clock=clock)
+    await manager.acquire_stream("s-1", "hw-1")
+
+    results = [await manager.check_message_rate("s-1") for _ in range(6)]
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    assert results[-1][1].startswith(f"{REJECT_MESSAGE_RATE}:")
+
+    clock.now += 0.2
+    assert (await manager.check_message_rate("s-1"))[0]
+    assert manager.get_stats()['rejections'][REJECT_MESSAGE_RATE] == 1
+    assert manager.active_streams["s-1"].message_count == 6
+
+
+@pytest.mark.asyncio
+async def test_device_bucket_is_shared_across_streams_of_one_hardware_id():
+    clock = _Clock()
+    limits = StreamLimits(max_message_rate_per_second=10, max_message_rate_per_device=4)
+    manager = BackpressureManager(limits, clock=clock)
+    await manager.acquire_stream("s-1", "hw-1")
+    await manager.acquire_stream("s-2", "hw-1")
+    await manager.acquire_stream("s-3", "hw-2")
+
+    for stream_id in ("s-1", "s-2", "s-1", "s-2"):
+        assert (await manager.check_message_rate(stream_id))[0]
+    allowed, error = await manager.check_message_rate("s-1")
+    assert not allowed and error.startswith(f"{REJECT_DEVICE_RATE}:")
+    # Отказ устройства не тратит токен стрима
+    assert manager.active_streams["s-1"].message_bucket.tokens == 8
+    # Другое устройство не затронуто
+    assert (await manager.check_message_rate("s-3"))[0]
+
+    await manager.release_stream("s-1")
+    await manager.release_stream("s-2")
+    assert manager.get_stats()['active_devices'] == 1
+    assert "hw-1" not in manager._device_buckets
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquire_release_keeps_accounting_consistent():
+    manager = BackpressureManager(StreamLimits(max_concurrent_streams=50, max_message_rate_per_second=50))
+
+    async def stream(i: int):
+        acquired, _ = await manager.acquire_stream(f"s-{i}", f"hw-{i % 7}")
+        if not acquired:
+            return False
+        for _ in range(20):
+            await manager.check_message_rate(f"s-{i}")
+            await asyncio.sleep(0)
+        await manager.release_stream(f"s-{i}")
+        await manager.release_stream(f"s-{i}")
+        return True
+
+    results = await asyncio.gather(*(stream(i) for i in range(120)))
+
+    assert results.count(True) == 50
+    assert manager.get_stats()['rejections'][REJECT_STREAM_LIMIT] == 70
+    assert manager.active_streams == {} and manager.get_stats()['active_devices'] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_during_shared_acquire_rolls_back_local_registration():
+    manager = BackpressureManager(StreamLimits(max_concurrent_streams=5))
+    entered = asyncio.Event()
+
+    class _HangingSharedStreams:
+        async def try_acquire(self, limit):
+            entered.set()
+            await asyncio.sleep(10)
+
+    manager._shared_streams = _HangingSharedStreams()
+    acquire = asyncio.create_task(manager.acquire_stream("s-1", "hw-1"))
+    await entered.wait()
+    acquire.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await acquire
+
+    assert manager.active_streams == {} and manager.get_stats()['active_devices'] == 0
@@ -0,0 +1,107 @@
+from pathlib import Path
+import random
+import sys
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service.core import chunk_text_merge
+from modules.grpc_service.core.chunk_text_merge import (
+    merge_chunk_text,
+    prefix_function,
+    suffix_prefix_overlap,
+)
+
+
+def _reference_overlap(existing: str, incoming: str) -> int:
+    """Прежний перебор: наибольшее i, при котором existing.endswith(incoming[:i])"""
+    for i in range(min(len(existing), len(incoming)), 0, -1):
+        if existing.endswith(incoming[:i]):
+            return i
+    return 0
+
+
+def _reference_merge(existing: str, incoming: str) -> str:
+    existing = existing or ""
+    incoming = incoming or ""
+    if incoming == "":
+        return existing
+    if existing == "":
+        return incoming
+    if incoming == existing:
+        return existing
+    if incoming.startswith(existing):
+        return incoming
+    if existing.startswith(incoming):
+        return existing
+    if incoming in existing:
+        return existing
+    if existing in incoming:
+        return incoming
+    return existing + incoming[_reference_overlap(existing, incoming):]
+
+
+def _random_text(rng: random.Random, alphabet: str, max_len: int) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+def test_prefix_function_matches_definition():
+    rng = random.Random(17)
+    for _ in range(500):
+        s = _random_text(rng, "ab", 16)
+        expected = [
+            max((k for k in range(i + 1) if s[:k] == s[i + 1 - k:i + 1] and k <= i), default=0)
+            for i in range(len(s))
+        ]
+        assert prefix_function(s) == expected
+
+
+def test_overlap_is_identical_to_reference_on_random_strings():
+    rng = random.Random(2024)
+    for _ in range(20000):
+        # Маленький алфавит даёт много частичных и вложенных перекрытий
+        existing = _random_text(rng, "ab ", 14)
+        incoming = _random_text(rng, "ab ", 14)
+        assert suffix_prefix_overlap(existing, incoming) == _reference_overlap(existing, incoming), (existing, incoming)
+
+
+def test_merge_is_identical_to_reference_on_random_strings(monkeypatch):
+    # Порог 1: KMP на всех окнах, не только на длинных
+    monkeypatch.setattr(chunk_text_merge, "_KMP_MIN_WINDOW", 1)
+    rng = random.Random(7)
+    for _ in range(20000):
+        existing = _random_text(rng, "abc ", 12)
+        incoming = _random_text(rng, "abc ", 12)
+        assert merge_chunk_text(existing, incoming) == _reference_merge(existing, incoming), (existing, incoming)
+
+
+def test_merge_is_identical_to_reference_on_simulated_dictation(monkeypatch):
+    monkeypatch.setattr(chunk_text_merge, "_KMP_MIN_WINDOW", 1)
+    rng = random.Random(99)
+    words = ["open", "the", "door", "and", "then", "the", "window", "пожалуйста", "ok"]
+    for _ in range(300):
+        transcript = " ".join(rng.choice(words) for _ in range(rng.randint(1, 40)))
+        merged_new = merged_ref = ""
+        position = 0
+        while position < len(transcript):
+            step = rng.randint(1, 12)
+            if rng.random() < 0.5:
+                # Снимок: весь текст с начала
+                chunk = transcript[:position + step]
+            else:
+                # Дельта с перекрытием назад
+                back = rng.randint(0, min(position, 6))
+                chunk = transcript[position - back:position + step]
+            position += step
+            merged_new = merge_chunk_text(merged_new, chunk)
+            merged_ref = _reference_merge(merged_ref, chunk)
+            assert merged_new == merged_ref
+
+
+def test_long_windows_use_linear_overlap():
+    existing = "a" * 20000
+    incoming = "a" * 10000 + "b" + "a" * 10000
+
+    merged = merge_chunk_text(existing, incoming)
+
+    assert merged == existing + incoming[_reference_overlap(existing, incoming):]
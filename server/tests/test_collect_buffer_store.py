@@ -0,0 +1,109 @@
+import asyncio
+from pathlib import Path
+import sys
+import uuid
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.collect_buffer_store import CollectBufferStore
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _entry(text: str = "", screenshot: str = ""):
+    return lambda: {"chunk_text": text, "screenshot": screenshot}
+
+
+def test_abandoned_entries_expire_by_idle_ttl():
+    clock = _Clock()
+    evicted = []
+    store = CollectBufferStore(ttl_sec=10, clock=clock, on_evict=lambda entry, reason: evicted.append(reason))
+
+    store.get_or_create(("hw-1", "s-1"), _entry("hello"))
+    store.get_or_create(("hw-2", "s-2"), _entry("hi"))
+    clock.now = 8
+    store.touch(("hw-1", "s-1"))
+
+    clock.now = 15
+    assert store.sweep() == 1
+    assert ("hw-2", "s-2") not in store
+    assert store.pop(("hw-1", "s-1")) is not None
+
+    stats = store.get_stats()
+    assert evicted == ["ttl"]
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+    assert stats['evicted_ttl'] == 1 and stats['consumed'] == 1
+
+
+def test_byte_budget_evicts_least_recently_updated():
+    store = CollectBufferStore(max_bytes=4000, ttl_sec=0)
+    screenshot = "x" * 1000
+
+    for i in range(3):
+        store.get_or_create((f"hw-{i}", "s"), _entry(screenshot=screenshot))
+    store.touch(("hw-0", "s"))
+    store.get_or_create(("hw-3", "s"), _entry(screenshot=screenshot))
+
+    assert ("hw-1", "s") not in store
+    assert ("hw-0", "s") in store and ("hw-3", "s") in store
+    stats = store.get_stats()
+    assert stats['bytes'] <= 4000
+    assert stats['evicted_bytes'] >= 1
+
+
+def test_per_device_cap_evicts_oldest_session_of_that_device():
+    store = CollectBufferStore(max_entries_per_device=2, ttl_sec=0)
+
+    store.get_or_create(("hw-a", "s-1"), _entry("one"))
+    store.get_or_create(("hw-b", "s-1"), _entry("other device"))
+    store.get_or_create(("hw-a", "s-2"), _entry("two"))
+    store.get_or_create(("hw-a", "s-3"), _entry("three"))
+
+    assert ("hw-a", "s-1") not in store
+    assert ("hw-b", "s-1") in store
+    assert store.get_stats()['evicted_device_cap'] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_keep_their_own_collect_text():
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    sessions = [(f"hw-{i}", str(uuid.uuid4())) for i in range(150)]
+
+    async def stream(hardware_id: str, session_id: str):
+        for seq, word in enumerate(("open", "the", "door"), start=1):
+            request = streaming_pb2.StreamRequest(
+                hardware_id=hardware_id,
+                session_id=session_id,
+                phase=streaming_pb2.REQUEST_PHASE_COLLECT,
+                chunk_text=f"{word} ",
+                chunk_seq=seq,
+            )
+            await servicer._handle_collect_phase(request, hardware_id=hardware_id, session_id=session_id)
+            await asyncio.sleep(0)
+        commit = streaming_pb2.StreamRequest(
+            hardware_id=hardware_id,
+            session_id=session_id,
+            phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        )
+        prompt, *_ = await servicer._consume_collect_for_commit(
+            commit, hardware_id=hardware_id, session_id=session_id
+        )
+        return prompt
+
+    prompts = await asyncio.gather(*(stream(hw, sid) for hw, sid in sessions))
+
+    assert all(prompt == "open the door " for prompt in prompts)
+    assert len(servicer._collect_buffer) == 0
+    assert servicer._collect_buffer.get_stats()['bytes'] == 0
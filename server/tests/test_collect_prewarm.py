@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+import sys
+import uuid
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import modules.subscription as subscription_package
+from config.unified_config import WorkflowConfig
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+
+HARDWARE_ID = "hw-prewarm"
+
+
+def _collect(session_id: str, seq: int, text: str) -> streaming_pb2.StreamRequest:
+    return streaming_pb2.StreamRequest(
+        hardware_id=HARDWARE_ID,
+        session_id=session_id,
+        phase=streaming_pb2.REQUEST_PHASE_COLLECT,
+        chunk_text=text,
+        chunk_seq=seq,
+    )
+
+
+def _servicer(prewarm_result, ttl_sec: float = 30.0) -> NewStreamingServicer:
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = True
+    servicer._prewarm_ttl_sec = ttl_sec
+    workflow = Mock()
+    workflow.prewarm = AsyncMock(return_value=prewarm_result)
+    servicer.grpc_service_manager.streaming_workflow = workflow
+    return servicer
+
+
+async def _commit(servicer: NewStreamingServicer, session_id: str):
+    request = streaming_pb2.StreamRequest(
+        hardware_id=HARDWARE_ID,
+        session_id=session_id,
+        phase=streaming_pb2.REQUEST_PHASE_COMMIT,
+        prompt="weather today",
+    )
+    return await servicer._consume_collect_for_commit(request, hardware_id=HARDWARE_ID, session_id=session_id)
+
+
+@pytest.mark.asyncio
+async def test_first_collect_prewarms_once_and_commit_takes_result():
+    servicer = _servicer({'memory_context': {'recent_context': 'likes tea'}})
+    session_id = str(uuid.uuid4())
+
+    await servicer._handle_collect_phase(_collect(session_id, 1, "what is"), hardware_id=HARDWARE_ID, session_id=session_id)
+    await servicer._handle_collect_phase(_collect(session_id, 2, "the weather"), hardware_id=HARDWARE_ID, session_id=session_id)
+    await asyncio.sleep(0)
+
+    workflow = servicer.grpc_service_manager.streaming_workflow
+    workflow.prewarm.assert_awaited_once_with(HARDWARE_ID)
+
+    *_, prewarm, state = await _commit(servicer, session_id)
+    assert state == "prewarmed"
+    assert prewarm == {'memory_context': {'recent_context': 'likes tea'}}
+    assert servicer.get_prewarm_stats()['used'] == 1
+
+
+@pytest.mark.asyncio
+async def test_prewarm_result_is_discarded_after_ttl():
+    servicer = _servicer({'memory_context': {'recent_context': 'stale'}}, ttl_sec=0.02)
+    session_id = str(uuid.uuid4())
+
+    await servicer._handle_collect_phase(_collect(session_id, 1, "hello"), hardware_id=HARDWARE_ID, session_id=session_id)
+    await asyncio.sleep(0.05)
+
+    entry = servicer._collect_buffer[(HARDWARE_ID, session_id)]
+    assert "prewarm_task" not in entry
+    prompt, *_, prewarm, state = await _commit(servicer, session_id)
+    assert (prewarm, state) == (None, "cold")
+    assert prompt.startswith("hello")
+    assert servicer.get_prewarm_stats()['expired'] == 1
+
+
+@pytest.mark.asyncio
+async def test_workflow_prewarm_warms_gate_and_commit_reuses_memory(monkeypatch):
+    gate = Mock()
+    gate.prewarm = AsyncMock(return_value=True)
+    monkeypatch.setattr(subscription_package, "get_subscription_module", lambda: gate)
+
+    memory = Mock()
+    memory.prefetch_memory = AsyncMock(return_value=None)
+    memory.get_memory_context_parallel = AsyncMock(return_value={'recent_context': 'likes tea'})
+    workflow = StreamingWorkflowIntegration(memory_workflow=memory, workflow_config=WorkflowConfig())
+
+    result = await workflow.prewarm(HARDWARE_ID)
+
+    gate.prewarm.assert_awaited_once_with(HARDWARE_ID)
+    assert result['gate_warmed'] is True
+    assert result['memory_context'] == {'recent_context': 'likes tea'}
+
+    memory_context, memory_ms = await workflow._fetch_memory_context_timed(HARDWARE_ID, result['memory_context'])
+    assert memory_context == {'recent_context': 'likes tea'} and memory_ms == 0.0
+    assert memory.get_memory_context_parallel.await_count == 1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Tests for Converse: COLLECT chunks and COMMIT on one bidi call."""
+
+import sys
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+
+
+def _collect(hardware_id: str, session_id: str, seq: int, text: str) -> streaming_pb2.StreamRequest:
+    return streaming_pb2.StreamRequest(
+        hardware_id=hardware_id,
+        session_id=session_id,
+        phase=streaming_pb2.REQUEST_PHASE_COLLECT,
+        chunk_seq=seq,
+        chunk_text=text,
+    )
+
+
+async def _requests(*messages):
+    for message in messages:
+        yield message
+
+
+async def _drain(servicer: NewStreamingServicer, *messages):
+    responses = []
+    async for resp in servicer.Converse(_requests(*messages), Mock()):
+        responses.append(resp)
+    return responses
+
+
+@pytest.fixture
+def servicer() -> NewStreamingServicer:
+    manager = Mock()
+    manager.process = AsyncMock()
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+
+    s = NewStreamingServicer()
+    s._prewarm_enabled = False
+    s.grpc_service_manager = manager
+    return s
+
+
+@pytest.mark.asyncio
+async def test_collect_then_commit_on_one_call(servicer: NewStreamingServicer) -> None:
+    sid = str(uuid.uuid4())
+    prompts = []
+
+    async def _process(request_data):
+        prompts.append(request_data["text"])
+        yield {"success": True, "text_response": "ok"}
+
+    servicer.grpc_service_manager.process = _process
+
+    responses = await _drain(
+        servicer,
+        _collect("hw-converse", sid, 1, "open the"),
+        # Идентификаторы можно не повторять внутри реплики
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COLLECT, chunk_seq=2, chunk_text="the door"),
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COMMIT),
+    )
+
+    kinds = [resp.WhichOneof("content") for resp in responses]
+    # COLLECT не подтверждается: только ответ на COMMIT
+    assert "COLLECT_ACCEPTED" not in [resp.end_message for resp in responses]
+    assert kinds[0] == "text_chunk" and responses[0].text_chunk == "ok"
+    assert kinds[-1] == "end_message"
+    assert prompts == ["open the door"]
+    assert len(servicer._collect_buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_call_carries_several_utterances(servicer: NewStreamingServicer) -> None:
+    prompts = []
+
+    async def _process(request_data):
+        prompts.append((request_data["session_id"], request_data["text"]))
+        yield {"success": True, "text_response": f"answer {len(prompts)}"}
+
+    servicer.grpc_service_manager.process = _process
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+
+    responses = await _drain(
+        servicer,
+        _collect("hw-converse", first, 1, "what time"),
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COMMIT),
+        _collect("", second, 1, "and the weather"),
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COMMIT),
+    )
+
+    assert prompts == [(first, "what time"), (second, "and the weather")]
+    assert [resp.text_chunk for resp in responses if resp.WhichOneof("content") == "text_chunk"] == [
+        "answer 1",
+        "answer 2",
+    ]
+    assert sum(resp.WhichOneof("content") == "end_message" for resp in responses) == 2
+
+
+@pytest.mark.asyncio
+async def test_next_utterance_requires_new_session_id(servicer: NewStreamingServicer) -> None:
+    async def _process(request_data):
+        yield {"success": True, "text_response": "ok"}
+
+    servicer.grpc_service_manager.process = _process
+
+    responses = await _drain(
+        servicer,
+        _collect("hw-converse", str(uuid.uuid4()), 1, "hello"),
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COMMIT),
+        streaming_pb2.StreamRequest(phase=streaming_pb2.REQUEST_PHASE_COMMIT, prompt="again"),
+    )
+
+    assert responses[-1].WhichOneof("content") == "error_message"
+    assert "session_id" in responses[-1].error_message
+
+
+@pytest.mark.asyncio
+async def test_abandoned_utterance_releases_collect_buffer(servicer: NewStreamingServicer) -> None:
+    responses = await _drain(servicer, _collect("hw-converse", str(uuid.uuid4()), 1, "never committed"))
+
+    assert responses == []
+    assert len(servicer._collect_buffer) == 0
+    assert servicer.grpc_service_manager.process.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_switching_session_without_commit_releases_previous_buffer(servicer: NewStreamingServicer) -> None:
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+    dropped = []
+    drop_collect = servicer._drop_collect
+
+    async def _tracking_drop(key):
+        dropped.append(key)
+        await drop_collect(key)
+
+    servicer._drop_collect = _tracking_drop
+
+    responses = await _drain(
+        servicer,
+        _collect("hw-converse", first, 1, "first utterance"),
+        _collect("hw-converse", second, 1, "second utterance"),
+    )
+
+    assert responses == []
+    assert dropped == [("hw-converse", first), ("hw-converse", second)]
+    assert len(servicer._collect_buffer) == 0
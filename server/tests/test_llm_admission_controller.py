@@ -0,0 +1,144 @@
+import asyncio
+from pathlib import Path
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.text_processing.core.admission_controller import AdmissionRejected, LLMAdmissionController
+from modules.text_processing.core.text_processor import TextProcessor
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_enforced():
+    controller = LLMAdmissionController(max_concurrent=2, max_queue=10)
+    active = 0
+    peak = 0
+
+    async def request(key):
+        nonlocal active, peak
+        async with controller.slot(key):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+    await asyncio.gather(*(request(f"hw-{i}") for i in range(6)))
+
+    assert peak == 2
+    stats = controller.get_stats()
+    assert stats['admitted'] == 6
+    assert stats['in_flight'] == 0
+    assert stats['queued_total'] == 4
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    controller = LLMAdmissionController(max_concurrent=1, max_queue=1)
+    await controller.acquire("busy")
+    waiting = asyncio.create_task(controller.acquire("second"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire("third")
+
+    assert exc_info.value.reason == "queue_full"
+    assert exc_info.value.error_code == "RESOURCE_EXHAUSTED"
+    controller.release()
+    await waiting
+    controller.release()
+    assert controller.get_stats()['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_past_deadline_is_rejected_and_leaves_queue():
+    controller = LLMAdmissionController(max_concurrent=1, max_queue=5)
+    await controller.acquire("busy")
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire("late", timeout=0.02)
+
+    assert exc_info.value.reason == "deadline"
+    assert controller.get_stats()['queued'] == 0
+    controller.release()
+    assert controller.get_stats()['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_chatty_device_does_not_starve_others():
+    controller = LLMAdmissionController(max_concurrent=1, max_queue=10)
+    await controller.acquire("busy")
+    order = []
+
+    async def request(key):
+        await controller.acquire(key)
+        order.append(key)
+
+    tasks = [asyncio.create_task(request("chatty")) for _ in range(4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("quiet")))
+    await asyncio.sleep(0)
+
+    for _ in range(5):
+        controller.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+    assert order.index("quiet") <= 1
+
+
+def _text_processor(controller, provider_stream):
+    processor = TextProcessor.__new__(TextProcessor)
+    processor.is_initialized = True
+    processor.admission = controller
+    processor.live_provider = Mock()
+    processor.live_provider.process = Mock(side_effect=lambda *args, **kwargs: provider_stream())
+    return processor
+
+
+@pytest.mark.asyncio
+async def test_slot_is_released_when_llm_finishes_not_when_consumer_drains():
+    controller = LLMAdmissionController(max_concurrent=1, max_queue=10)
+
+    async def provider_stream():
+        for chunk in ("one.", "two.", "three."):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    processor = _text_processor(controller, provider_stream)
+    chunks = []
+    async for chunk in processor.process_text_streaming("", hardware_id="hw-1"):
+        chunks.append(chunk)
+        # Медленный потребитель (TTS): его время не должно занимать слот
+        await asyncio.sleep(0.1)
+        if len(chunks) == 1:
+            await asyncio.sleep(0.05)
+            assert controller.get_stats()['in_flight'] == 0
+
+    assert chunks == ["one.", "two.", "three."]
+    assert controller._service_ewma_sec < 0.1
+
+
+@pytest.mark.asyncio
+async def test_consumer_leaving_early_releases_slot_and_propagates_rejection():
+    controller = LLMAdmissionController(max_concurrent=1, max_queue=0)
+
+    async def endless_stream():
+        while True:
+            await asyncio.sleep(0.01)
+            yield "chunk"
+
+    processor = _text_processor(controller, endless_stream)
+    stream = processor.process_text_streaming("", hardware_id="hw-1")
+    assert await stream.__anext__() == "chunk"
+    await stream.aclose()
+    assert controller.get_stats()['in_flight'] == 0
+
+    await controller.acquire("busy")
+    with pytest.raises(AdmissionRejected):
+        async for _ in processor.process_text_streaming("", hardware_id="hw-2"):
+            pass
+    controller.release()
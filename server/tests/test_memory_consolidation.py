@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Tests for batched memory consolidation: per-device buffering, bounded pool, write-on-change."""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.memory_consolidation import MemoryConsolidator
+from integrations.workflow_integrations.memory_workflow_integration import MemoryWorkflowIntegration
+from modules.memory_management.core.memory_manager import MemoryManager
+
+
+class _Recorder:
+    """flush-callback: запоминает пачки, может блокироваться до release"""
+
+    def __init__(self, blocked: bool = False):
+        self.batches = []
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def __call__(self, hardware_id, turns):
+        await self.gate.wait()
+        self.batches.append((hardware_id, [turn["n"] for turn in turns]))
+
+
+@pytest.fixture
+async def consolidator():
+    instances = []
+
+    async def _make(flush, **kwargs):
+        instance = MemoryConsolidator(**kwargs)
+        await instance.start(flush)
+        instances.append(instance)
+        return instance
+
+    yield _make
+    for instance in instances:
+        await instance.stop(drain_timeout_sec=0.5)
+
+
+@pytest.mark.asyncio
+async def test_turns_are_batched_by_count_idle_and_urgency(consolidator) -> None:
+    recorder = _Recorder()
+    batcher = await consolidator(recorder, max_turns=3, idle_sec=10.0)
+
+    for n in range(7):
+        batcher.add_turn("hw1", {"n": n}, now=100.0 + n)
+        await batcher.wait_idle()
+    assert recorder.batches == [("hw1", [0, 1, 2]), ("hw1", [3, 4, 5])]
+
+    # Хвост уходит только после тишины idle_sec
+    assert batcher.sweep(now=110.0) == 0
+    assert batcher.sweep(now=116.5) == 1
+    await batcher.wait_idle()
+    assert recorder.batches[-1] == ("hw1", [6])
+
+    # «Запомни» — без ожидания
+    batcher.add_turn("hw2", {"n": 0}, urgent=True)
+    await batcher.wait_idle()
+    assert recorder.batches[-1] == ("hw2", [0])
+
+    stats = batcher.get_stats()
+    assert stats["turns_analyzed"] == 8 and stats["batches_total"] == 4
+    assert stats["llm_calls_saved"] == 4
+
+
+@pytest.mark.asyncio
+async def test_queue_cap_keeps_turns_buffered_and_bounded(consolidator) -> None:
+    recorder = _Recorder(blocked=True)
+    batcher = await consolidator(recorder, max_turns=1, workers=1, queue_max=1, max_buffered_turns=3)
+
+    batcher.add_turn("a", {"n": 0})
+    await asyncio.sleep(0)
+    for hardware_id in ("b", "c"):
+        batcher.add_turn(hardware_id, {"n": 0})
+    # Воркер занят "a", очередь (1) занята "b", "c" остаётся в буфере
+    assert batcher.get_stats()["queue_full"] >= 1
+    assert batcher.get_stats()["buffered_devices"] == 1
+
+    # Пока пачка устройства в работе, его реплики копятся, старые вытесняются по лимиту
+    for n in range(1, 6):
+        batcher.add_turn("a", {"n": n})
+    assert batcher.get_stats()["turns_dropped"] == 2
+
+    recorder.gate.set()
+    for _ in range(20):
+        batcher.sweep()
+        await batcher.wait_idle()
+        if not batcher.get_stats()["buffered_devices"]:
+            break
+    assert ("a", [0]) in recorder.batches and ("a", [3, 4, 5]) in recorder.batches
+    assert {hardware_id for hardware_id, _ in recorder.batches} == {"a", "b", "c"}
+
+
+@pytest.mark.asyncio
+async def test_random_interleaving_preserves_per_device_order(consolidator) -> None:
+    rng = random.Random(11)
+    recorder = _Recorder()
+    batcher = await consolidator(recorder, max_turns=3, idle_sec=5.0, workers=3, queue_max=4, max_buffered_turns=1000)
+    submitted = {f"hw{i}": [] for i in range(6)}
+    now = 0.0
+
+    for _ in range(400):
+        now += rng.uniform(0, 2)
+        hardware_id = rng.choice(list(submitted))
+        n = len(submitted[hardware_id])
+        submitted[hardware_id].append(n)
+        batcher.add_turn(hardware_id, {"n": n}, urgent=rng.random() < 0.05, now=now)
+        if rng.random() < 0.3:
+            batcher.sweep(now=now)
+        if rng.random() < 0.5:
+            await asyncio.sleep(0)
+
+    for _ in range(50):
+        batcher.sweep(force=True)
+        await batcher.wait_idle()
+        if not batcher.get_stats()["buffered_devices"]:
+            break
+
+    for hardware_id, turns in submitted.items():
+        delivered = [n for hw, batch in recorder.batches if hw == hardware_id for n in batch]
+        assert delivered == turns
+    assert len(recorder.batches) < sum(len(turns) for turns in submitted.values())
+
+
+@pytest.mark.asyncio
+async def test_batch_is_analyzed_once_and_unchanged_memory_is_not_written() -> None:
+    db_manager = Mock()
+    db_manager.update_user_memory = AsyncMock(return_value=True)
+    db_manager.get_user_memory = AsyncMock(return_value=None)
+    manager = MemoryManager(db_manager=db_manager)
+    manager.memory_analyzer = Mock()
+    manager.memory_analyzer.analyze_conversation = AsyncMock(return_value=("User plans a trip", "User lives in Berlin"))
+    turns = [
+        {"prompt": "weather in Montreal", "response": "Sunny"},
+        {"prompt": "and tomorrow?", "response": "Rain"},
+    ]
+
+    first = await manager.update_memory_batch("hw1", turns)
+    second = await manager.update_memory_batch("hw1", turns)
+
+    prompt, response = manager.memory_analyzer.analyze_conversation.await_args_list[0].args
+    assert prompt == "[1] weather in Montreal\n[2] and tomorrow?"
+    assert response == "[1] Sunny\n[2] Rain"
+    assert "- User: and tomorrow?" in first["short"] and first["long"] == "User lives in Berlin"
+    assert first["changed"] and not second["changed"]
+    assert db_manager.update_user_memory.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_integration_routes_turns_through_consolidator() -> None:
+    async def process(payload):
+        if payload["action"] == "note_turn":
+            return {"success": True, "recent_context": f"noted {payload['prompt']}"}
+        return {"success": True, "changed": True, "memory": {"recent_context": "batched", "long_term_context": ""}}
+
+    module = Mock()
+    module.process = AsyncMock(side_effect=process)
+    batcher = MemoryConsolidator(max_turns=2, idle_sec=60.0)
+    integration = MemoryWorkflowIntegration(memory_manager=module, consolidator=batcher)
+    integration.is_initialized = True
+    await batcher.start(integration._consolidate_turns)
+    try:
+        for n in range(2):
+            assert await integration.save_to_memory_background(
+                {"hardware_id": "hw-batch", "prompt": f"question {n}", "response": f"answer {n}"}
+            )
+        await batcher.wait_idle()
+    finally:
+        await batcher.stop()
+
+    payloads = [call.args[0] for call in module.process.await_args_list]
+    assert [payload["action"] for payload in payloads] == ["note_turn", "note_turn", "update_background"]
+    payload = payloads[-1]
+    assert [turn["prompt"] for turn in payload["turns"]] == ["question 0", "question 1"]
+    assert integration._get_cached_memory("hw-batch") == {"recent_context": "batched", "long_term_context": ""}
+
+
+@pytest.mark.asyncio
+async def test_short_term_summary_is_updated_per_turn_before_batch() -> None:
+    db_manager = Mock()
+    db_manager.get_user_memory = AsyncMock(return_value={"short": "older summary", "long": "User lives in Berlin"})
+    db_manager.update_user_memory = AsyncMock(return_value=False)
+    manager = MemoryManager(db_manager=db_manager)
+    manager.memory_analyzer = None
+
+    await manager.note_turn("hw1", "weather in Montreal", "Sunny")
+    context = await manager.get_memory_context("hw1")
+
+    # Реплика видна следующему запросу до анализа пачки; long-term — из БД
+    assert "- User: weather in Montreal" in context["recent_context"]
+    assert context["long_term_context"] == "User lives in Berlin"
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_for_identical_memory() -> None:
+    db_manager = Mock()
+    db_manager.get_user_memory = AsyncMock(return_value=None)
+    db_manager.update_user_memory = AsyncMock(side_effect=[False, True])
+    manager = MemoryManager(db_manager=db_manager)
+    manager.memory_analyzer = Mock()
+    manager.memory_analyzer.analyze_conversation = AsyncMock(return_value=("", "User lives in Berlin"))
+    turns = [{"prompt": "I live in Berlin", "response": "Noted"}]
+
+    await manager.update_memory_batch("hw1", turns)
+    second = await manager.update_memory_batch("hw1", turns)
+
+    # Несохранённая копия не считается записанной: повтор идёт в БД
+    assert second["changed"]
+    assert db_manager.update_user_memory.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_inflight_batch_up_to_flush_timeout() -> None:
+    finished = []
+
+    async def slow_flush(hardware_id, turns):
+        await asyncio.sleep(0.3)
+        finished.append(hardware_id)
+
+    batcher = MemoryConsolidator(max_turns=1, flush_timeout_sec=1.0)
+    await batcher.start(slow_flush)
+    batcher.add_turn("hw1", {"n": 0})
+    await asyncio.sleep(0.01)
+
+    await batcher.stop()
+
+    assert finished == ["hw1"]
+    assert batcher.batches_total == 1
@@ -4,7 +4,7 @@ import sys
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from utils.metrics_collector import MetricsCollector
+from utils.metrics_collector import MetricsCollector, percentile
 
 
 def test_normalize_full_grpc_method_for_request_and_decision() -> None:
@@ -28,3 +28,10 @@ def test_keep_short_method_as_is() -> None:
     snapshot = collector.get_snapshot()
 
     assert snapshot.total_requests["GenerateWelcomeAudio"] == 1
+
+
+def test_percentile_is_nearest_rank() -> None:
+    assert percentile([], 0.95) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile(range(100), 0.95) == 95
+    assert MetricsCollector()._calculate_p95([5.0]) == 5.0
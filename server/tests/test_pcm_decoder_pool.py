@@ -0,0 +1,131 @@
+import asyncio
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.audio_generation.core.pcm_decoder_pool import PcmDecoderPool
+
+# `cat` как декодер-тождество: проверяем механику пула без ffmpeg
+IDENTITY = ["cat"]
+
+
+async def _chunks(parts, delay: float = 0.0):
+    for part in parts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_decode_stream_passes_bytes_and_uses_warm_process():
+    pool = PcmDecoderPool(warm_size=2, max_active=4, command=IDENTITY)
+    await pool.start()
+    try:
+        assert pool.get_stats()['idle'] == 2
+
+        pcm = b''.join([c async for c in pool.decode_stream(_chunks([b"ab", b"cd", b"ef"]), read_size=2)])
+        assert pcm == b"abcdef"
+
+        # Резерв пополняется в фоне после выдачи процесса
+        for _ in range(50):
+            if pool.get_stats()['idle'] == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        stats = pool.get_stats()
+        assert stats['idle'] == 2
+        assert stats['warm_hits'] == 1
+        assert stats['cold_spawns'] == 0
+        assert stats['decodes_total'] == 1
+        assert stats['decode_errors'] == 0
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_decode_without_warm_reserve_spawns_cold():
+    pool = PcmDecoderPool(warm_size=0, max_active=2, command=IDENTITY)
+    await pool.start()
+    try:
+        assert await pool.decode(b"payload") == b"payload"
+        stats = pool.get_stats()
+        assert stats['cold_spawns'] == 1
+        assert stats['idle'] == 0
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_saturation_waits_are_counted():
+    pool = PcmDecoderPool(warm_size=1, max_active=1, command=IDENTITY)
+    await pool.start()
+
+    async def run(tag: bytes) -> bytes:
+        parts = [c async for c in pool.decode_stream(_chunks([tag, tag], delay=0.02))]
+        return b''.join(parts)
+
+    try:
+        results = await asyncio.gather(run(b"a"), run(b"b"))
+        assert sorted(results) == [b"aa", b"bb"]
+
+        stats = pool.get_stats()
+        assert stats['peak_active'] == 1
+        assert stats['saturation_waits'] == 1
+        assert stats['max_wait_ms'] > 0
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_terminates_idle_processes():
+    pool = PcmDecoderPool(warm_size=3, max_active=4, command=IDENTITY)
+    await pool.start()
+    idle = list(pool._idle)
+    assert len(idle) == 3
+
+    await pool.stop()
+
+    assert pool.get_stats()['idle'] == 0
+    assert all(process.returncode is not None for process in idle)
+
+
+@pytest.mark.asyncio
+async def test_consumer_closing_stream_is_not_a_decode_error():
+    pool = PcmDecoderPool(warm_size=1, max_active=2, command=IDENTITY)
+    await pool.start()
+    try:
+        stream = pool.decode_stream(_chunks([b"ab", b"cd"], delay=0.01), read_size=2)
+        assert await stream.__anext__() == b"ab"
+        # Прерывание: потребитель закрывает поток посреди декодирования
+        await stream.aclose()
+
+        stats = pool.get_stats()
+        assert stats['decode_errors'] == 0
+        assert stats['decodes_cancelled'] == 1
+        assert stats['active'] == 0
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_nonzero_decoder_exit_raises_after_partial_pcm():
+    # Декодер отдаёт часть PCM и завершается с ошибкой
+    pool = PcmDecoderPool(warm_size=0, max_active=1, command=["sh", "-c", "cat; exit 3"])
+    await pool.start()
+    try:
+        received = []
+        with pytest.raises(subprocess.CalledProcessError):
+            async for chunk in pool.decode_stream(_chunks([b"ab"]), read_size=2):
+                received.append(chunk)
+        assert received == [b"ab"]
+
+        with pytest.raises(subprocess.CalledProcessError):
+            await pool.decode(b"payload")
+        assert pool.get_stats()['decode_errors'] == 2
+    finally:
+        await pool.stop()
@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+import sys
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.database.core.pg_executor import PgExecutor
+
+
+class _FakeConnection:
+    """Соединение, чей "запрос" прерывается только через cancel()"""
+
+    def __init__(self):
+        self.closed = 0
+        self.cancel_event = threading.Event()
+        self.rollbacks = 0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class _FakePool:
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.free = [_FakeConnection() for _ in range(maxconn)]
+        self.returned = []
+
+    def getconn(self):
+        return self.free.pop()
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+        self.free.append(conn)
+
+    def closeall(self):
+        self.free.clear()
+
+
+def _slow_query(conn, seconds):
+    time.sleep(seconds)
+    return "ok"
+
+
+def _query_until_cancelled(conn):
+    if conn.cancel_event.wait(timeout=5):
+        raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+    return "finished"
+
+
+async def _started_executor(**kwargs):
+    executor = PgExecutor(max_connections=2, pool_factory=_FakePool, **kwargs)
+    await executor.start()
+    return executor
+
+
+@pytest.mark.asyncio
+async def test_query_does_not_block_event_loop():
+    executor = await _started_executor()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    result = await executor.run(_slow_query, 0.2)
+    ticker_task.cancel()
+
+    assert result == "ok"
+    assert ticks >= 10
+    await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_query_on_server_and_returns_connection():
+    executor = await _started_executor()
+    pool = executor.pool
+
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.run(_query_until_cancelled, timeout=0.05)
+
+    await asyncio.sleep(0.05)
+    conn, closed = pool.returned[-1]
+    assert conn.cancel_event.is_set()
+    assert conn.rollbacks == 1
+    assert closed is False
+    assert executor.get_stats()['timeouts'] == 1
+    await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_outer_wait_for_cancels_query():
+    executor = await _started_executor(default_timeout=None)
+    pool = executor.pool
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(executor.run(_query_until_cancelled), timeout=0.05)
+
+    await asyncio.sleep(0.05)
+    assert pool.returned[-1][0].cancel_event.is_set()
+    assert executor.get_stats()['cancelled'] == 1
+    await executor.close()
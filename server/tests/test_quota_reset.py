@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import sys
+from pathlib import Path
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.subscription.core.quota_checker import QuotaChecker
+from modules.subscription.repository.subscription_repository import SubscriptionRepository
+from modules.subscription.subscription_module import SubscriptionModule
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self._conn.statements.append((sql, params))
+        self.rowcount = self._conn.rowcounts.pop(0)
+
+
+class _FakeConnection:
+    def __init__(self, rowcounts):
+        self.rowcounts = list(rowcounts)
+        self.statements = []
+        self.commits = 0
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _repository(conn) -> SubscriptionRepository:
+    repository = SubscriptionRepository(db_url="postgresql://test")
+    repository._get_connection = lambda: conn
+    return repository
+
+
+def test_reset_is_one_statement_per_chunk():
+    conn = _FakeConnection([100, 100, 7])
+    repository = _repository(conn)
+
+    affected = repository.reset_usage_counters(
+        'usage_daily_count', date(2026, 1, 2), ['limited_free_trial'], chunk_size=100
+    )
+
+    assert affected == 207
+    assert len(conn.statements) == 3
+    assert conn.commits == 3
+    assert conn.closed
+    sql, params = conn.statements[0]
+    assert "UPDATE subscriptions" in sql and "usage_daily_count = 0" in sql
+    assert params == (['limited_free_trial'], date(2026, 1, 2), 100, date(2026, 1, 2))
+
+
+def test_reset_rejects_unknown_column():
+    repository = _repository(_FakeConnection([]))
+
+    with pytest.raises(ValueError):
+        repository.reset_usage_counters('status', date.today())
+
+
+def test_quota_checker_weekly_reset_returns_affected_count():
+    calls = []
+
+    class _Repo:
+        def reset_usage_counters(self, counter, reset_date, limited_statuses=None, chunk_size=0):
+            calls.append((counter, reset_date, limited_statuses, chunk_size))
+            return 42
+
+    config = SimpleNamespace(
+        quota_daily=5, quota_weekly=25, quota_monthly=50,
+        grandfathered_enabled=True, quota_reset_chunk_size=500,
+    )
+    result = QuotaChecker(repository=_Repo(), config=config).reset_weekly_counters()
+
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    assert result == {'success': True, 'reset_count': 42, 'reset_date': week_start.isoformat()}
+    assert calls == [('usage_weekly_count', week_start, ['limited_free_trial'], 500)]
+
+
+@pytest.mark.asyncio
+async def test_quota_reset_bumps_cache_epoch_instead_of_clearing():
+    class _Checker:
+        def reset_daily_counters(self):
+            return {'success': True, 'reset_count': 1, 'reset_date': date.today().isoformat()}
+
+    module = SubscriptionModule()
+    module._epoch_jitter_seconds = 0
+    module._quota_checker = _Checker()
+    module._set_cached("hw", {'allowed': True})
+
+    await module._run_daily_quota_reset()
+
+    assert "hw" in module._cache
+    assert module._get_cached("hw") is None
+    module._set_cached("hw", {'allowed': False})
+    assert module._get_cached("hw") == {'allowed': False}
@@ -0,0 +1,136 @@
+import asyncio
+from pathlib import Path
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.request_trace_writer import DROP_NEWEST, RequestTraceWriter
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+
+
+def _trace(index: int) -> dict:
+    return {'session_id': f"s{index}", 'hardware_id': "hw"}
+
+
+@pytest.mark.asyncio
+async def test_traces_are_flushed_in_batches():
+    batches = []
+
+    async def sink(batch):
+        batches.append([trace['session_id'] for trace in batch])
+
+    writer = RequestTraceWriter(sink=sink, batch_size=2, flush_interval_ms=10)
+    for index in range(5):
+        assert await writer.enqueue(_trace(index))
+
+    await asyncio.sleep(0.05)
+    await writer.drain()
+
+    assert [session for batch in batches for session in batch] == [f"s{i}" for i in range(5)]
+    assert all(len(batch) <= 2 for batch in batches)
+    stats = writer.get_stats()
+    assert stats['flushed'] == 5 and stats['queue_depth'] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_by_default():
+    sink = AsyncMock()
+    writer = RequestTraceWriter(sink=sink, max_queue_size=2, enqueue_timeout_ms=0)
+
+    for index in range(3):
+        assert await writer.enqueue(_trace(index))
+    await writer.drain()
+
+    flushed = [trace['session_id'] for call in sink.await_args_list for trace in call.args[0]]
+    assert flushed == ["s1", "s2"]
+    assert writer.get_stats()['dropped'] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drop_newest_rejects_trace():
+    sink = AsyncMock()
+    writer = RequestTraceWriter(sink=sink, max_queue_size=2, enqueue_timeout_ms=0, drop_policy=DROP_NEWEST)
+
+    results = [await writer.enqueue(_trace(index)) for index in range(3)]
+    await writer.drain()
+
+    assert results == [True, True, False]
+    flushed = [trace['session_id'] for call in sink.await_args_list for trace in call.args[0]]
+    assert flushed == ["s0", "s1"]
+
+
+@pytest.mark.asyncio
+async def test_sink_failure_is_counted_and_writer_keeps_running():
+    sink = AsyncMock(side_effect=[Exception("db down"), None])
+    writer = RequestTraceWriter(sink=sink, batch_size=1, flush_interval_ms=5)
+
+    await writer.enqueue(_trace(0))
+    await writer.enqueue(_trace(1))
+    await writer.drain()
+
+    stats = writer.get_stats()
+    assert stats['failed'] == 1
+    assert stats['flushed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_malformed_trace_fails_alone_after_batch_error():
+    written = []
+
+    async def sink(batch):
+        if any(trace['session_id'] == "s1" for trace in batch):
+            raise Exception("request_key is missing")
+        written.extend(trace['session_id'] for trace in batch)
+
+    writer = RequestTraceWriter(sink=sink, batch_size=3, flush_interval_ms=5)
+    for index in range(3):
+        await writer.enqueue(_trace(index))
+    await writer.drain()
+
+    assert written == ["s0", "s2"]
+    stats = writer.get_stats()
+    assert stats['failed'] == 1 and stats['flushed'] == 2
+    assert stats['row_fallbacks'] == 1
+
+
+@pytest.mark.asyncio
+async def test_workflow_sink_uses_batched_persistence():
+    workflow = StreamingWorkflowIntegration()
+    manager = Mock()
+    manager.is_initialized = True
+    manager.persist_request_traces = AsyncMock(return_value=2)
+    workflow.set_database_manager(manager)
+
+    traces = [
+        workflow._build_request_trace("s1", "hw", "hi", "hello", None, 1, 2, 3),
+        workflow._build_request_trace("s2", "hw", "hi", "hello", "aGk=", 1, 2, 3),
+    ]
+    await workflow._write_request_traces(traces)
+
+    manager.persist_request_traces.assert_awaited_once_with(traces)
+    assert traces[1]['screenshot_metadata'] == {'encoding': 'base64', 'size_b64': 4}
+
+
+@pytest.mark.asyncio
+async def test_workflow_sink_falls_back_to_sequential_ensure_calls():
+    workflow = StreamingWorkflowIntegration()
+    manager = Mock(spec=["is_initialized", "get_user_by_hardware_id", "ensure_session",
+                         "ensure_command", "ensure_llm_answer", "create_screenshot"])
+    manager.is_initialized = True
+    manager.get_user_by_hardware_id = AsyncMock(return_value={'id': "u1"})
+    manager.ensure_session = AsyncMock(return_value="s1")
+    manager.ensure_command = AsyncMock(return_value="c1")
+    manager.ensure_llm_answer = AsyncMock(return_value="a1")
+    manager.create_screenshot = AsyncMock(return_value="sc1")
+    workflow._database_manager = manager
+
+    await workflow._write_request_traces([workflow._build_request_trace("s1", "hw", "hi", "hello", None, 1, 2, 3)])
+
+    manager.ensure_command.assert_awaited_once()
+    assert manager.ensure_command.await_args.kwargs['metadata']['request_key'] == "s1"
+    manager.ensure_llm_answer.assert_awaited_once()
+    manager.create_screenshot.assert_not_awaited()
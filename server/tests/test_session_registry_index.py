@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for SessionRegistry: hardware_id index, heap expiry, memory accounting."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.session_management.core.session_registry import SessionData, SessionRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = SessionRegistry()
+    registry.clear()
+    registry.configure_expiry(session_ttl=60.0, interrupted_ttl=10.0)
+    yield registry
+    registry.clear()
+    registry.configure_expiry(
+        session_ttl=SessionRegistry.DEFAULT_SESSION_TTL,
+        interrupted_ttl=SessionRegistry.DEFAULT_INTERRUPTED_TTL,
+    )
+
+
+def _session(session_id: str, hardware_id: str, at: float) -> SessionData:
+    return SessionData(session_id=session_id, hardware_id=hardware_id, created_at=at, last_activity=at)
+
+
+def test_hardware_index_matches_scan(registry: SessionRegistry) -> None:
+    rng = random.Random(7)
+    now = time.time()
+    live = {}
+    for step in range(2000):
+        if live and rng.random() < 0.3:
+            session_id = rng.choice(sorted(live))
+            registry.unregister_session(session_id)
+            del live[session_id]
+        else:
+            session_id = f"s{step}"
+            hardware_id = f"hw{rng.randrange(20)}"
+            assert registry.register_session(_session(session_id, hardware_id, now))
+            live[session_id] = hardware_id
+
+    for hw in (f"hw{i}" for i in range(20)):
+        indexed = sorted(s.session_id for s in registry.get_sessions_by_hardware_id(hw))
+        assert indexed == sorted(sid for sid, owner in live.items() if owner == hw)
+    stats = registry.get_stats()
+    assert stats['active_sessions'] == len(live)
+    assert stats['hardware_ids'] == len(set(live.values()))
+
+
+def test_idle_sessions_expire_and_active_ones_survive(registry: SessionRegistry) -> None:
+    now = time.time()
+    registry.register_session(_session("idle", "hw1", now))
+    registry.register_session(_session("busy", "hw1", now))
+    # Активность после регистрации: запись в куче устарела, но сессия жива
+    registry.get_session("busy").last_activity = now + 30
+
+    expired = registry.expire_stale(now + 61)
+
+    assert [s.session_id for s in expired] == ["idle"]
+    assert expired[0].status == "expired"
+    assert [s.session_id for s in registry.get_sessions_by_hardware_id("hw1")] == ["busy"]
+    # Переставленная запись истекает по актуальному времени
+    assert registry.expire_stale(now + 89) == []
+    assert [s.session_id for s in registry.expire_stale(now + 91)] == ["busy"]
+    assert registry.get_stats()['activity_heap_size'] == 0
+
+
+def test_interrupted_sessions_expire_after_retention(registry: SessionRegistry) -> None:
+    now = time.time()
+    registry.register_session(_session("s1", "hw1", now))
+    registry.register_session(_session("s2", "hw1", now))
+    assert registry.interrupt_session("s1", "test")
+
+    assert registry.expire_stale(now + 1) == []
+    expired = registry.expire_stale(time.time() + 11)
+
+    assert [s.session_id for s in expired] == ["s1"]
+    assert registry.get_stats()['interrupted_sessions'] == 0
+    assert [s.session_id for s in registry.get_sessions_by_hardware_id("hw1")] == ["s2"]
+
+
+def test_memory_accounting_returns_to_baseline(registry: SessionRegistry) -> None:
+    baseline = registry.get_stats()['sessions_bytes']
+    now = time.time()
+    for i in range(100):
+        registry.register_session(_session(f"s{i}", f"hw{i % 10}", now))
+    grown = registry.get_stats()
+    assert grown['sessions_bytes'] > baseline
+    assert grown['approx_bytes'] > grown['sessions_bytes']
+
+    for i in range(100):
+        registry.unregister_session(f"s{i}")
+    assert registry.get_stats()['sessions_bytes'] == baseline
@@ -0,0 +1,142 @@
+import threading
+from pathlib import Path
+import sys
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.database.core.shared_pool import PoolTimeout, SharedConnectionPool
+from modules.subscription.repository.subscription_repository import SubscriptionRepository
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self._conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+        self._conn.queries.append(sql)
+
+    def fetchone(self):
+        return {'hardware_id': "hw", 'status': "paid"}
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.thread_ids = set()
+
+    def cursor(self, *args, **kwargs):
+        self.thread_ids.add(threading.get_ident())
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakePool:
+    def __init__(self, minconn, maxconn, dsn):
+        self.idle = []
+        self.closed_conns = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else _FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+            self.closed_conns.append(conn)
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        self.idle.clear()
+
+
+def _pool(**kwargs) -> SharedConnectionPool:
+    return SharedConnectionPool("postgresql://test", pool_factory=_FakePool, **kwargs)
+
+
+def test_connections_are_reused_instead_of_reconnecting():
+    pool = _pool(max_connections=2)
+
+    for _ in range(5):
+        conn = pool.connection()
+        conn.close()
+
+    stats = pool.get_stats()
+    assert stats['created'] == 1
+    assert stats['acquired'] == 5
+    assert stats['in_use'] == 0
+
+
+def test_idle_connection_failing_health_check_is_replaced():
+    pool = _pool(health_check_idle_sec=0)
+    first = pool.connection()
+    raw = first._conn
+    first.close()
+    raw.broken = True
+
+    second = pool.connection()
+
+    assert second._conn is not raw
+    stats = pool.get_stats()
+    assert stats['health_check_failures'] == 1
+    assert stats['discarded'] == 1
+    assert stats['created'] == 2
+    second.close()
+
+
+def test_pool_is_bounded_and_times_out():
+    pool = _pool(max_connections=1, acquire_timeout=0.05)
+    held = pool.connection()
+
+    with pytest.raises(PoolTimeout):
+        pool.connection()
+
+    held.close()
+    assert pool.get_stats()['acquire_timeouts'] == 1
+    pool.connection().close()
+
+
+@pytest.mark.asyncio
+async def test_repository_runs_on_pool_threads():
+    pool = _pool(max_connections=2)
+    repository = SubscriptionRepository(db_url="postgresql://test", connection_pool=pool)
+
+    subscription = await repository.run_async(repository.get_subscription, "hw")
+
+    assert subscription['status'] == "paid"
+    conn = pool._pool.idle[0]
+    assert threading.get_ident() not in conn.thread_ids
+    assert pool.get_stats()['in_use'] == 0
+    pool.close()
+
+
+def test_create_subscription_conflict_reuses_held_connection(monkeypatch):
+    pool = _pool(max_connections=1, acquire_timeout=0.05)
+    repository = SubscriptionRepository(db_url="postgresql://test", connection_pool=pool)
+    # ON CONFLICT DO NOTHING не вернул строку: существующая запись читается без второго захвата
+    rows = iter([None, {'hardware_id': "hw", 'status': "paid"}])
+    monkeypatch.setattr(_FakeCursor, "fetchone", lambda self: next(rows))
+
+    subscription = repository.create_subscription("hw")
+
+    assert subscription['status'] == "paid"
+    stats = pool.get_stats()
+    assert stats['acquired'] == 1 and stats['acquire_timeouts'] == 0
+    pool.close()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Tests for the shared state backend: in-memory vs KV (local stand-in), cross-worker components."""
+
+import asyncio
+import random
+import sys
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.cancellation import get_cancellation_registry
+from integrations.core.local_state_server import LocalStateServer
+from integrations.core.shared_state import SharedInflight, SharedStreamCounter
+from integrations.core.state_backend import InMemoryStateBackend, KVStateBackend, set_state_backend
+from integrations.workflow_integrations.interrupt_workflow_integration import InterruptWorkflowIntegration
+
+
+@pytest.fixture
+async def kv_server():
+    server = LocalStateServer("127.0.0.1", 0)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def workers(kv_server):
+    """Два воркера на одном хранилище"""
+    backends = [
+        KVStateBackend("127.0.0.1", kv_server.port, key_prefix="test:", worker_id=f"worker-{i}")
+        for i in range(2)
+    ]
+    yield backends
+    for backend in backends:
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_kv_backend_matches_in_memory(workers) -> None:
+    kv = workers[0]
+    memory = InMemoryStateBackend(key_prefix="test:")
+    rng = random.Random(3)
+    keys = ["a", "b", "c"]
+
+    for _ in range(300):
+        op = rng.choice(["get", "set", "setnx", "delete", "incr", "sadd", "srem", "smembers", "mget"])
+        key = "str:" + rng.choice(keys) if op in ("get", "set", "setnx", "delete", "incr", "mget") else "set:" + rng.choice(keys)
+        member = rng.choice(["x", "y", "z"])
+        if op == "get":
+            calls = [(b.get, (key,), {}) for b in (kv, memory)]
+        elif op in ("set", "setnx"):
+            value = str(rng.randrange(100))
+            calls = [(b.set, (key, value), {"nx": op == "setnx"}) for b in (kv, memory)]
+        elif op == "delete":
+            calls = [(b.delete, (key,), {}) for b in (kv, memory)]
+        elif op == "incr":
+            amount = rng.randrange(-3, 4)
+            # INCR по нечисловому значению — ошибка в обоих backend; держим ключи числовыми
+            calls = [(b.incr, (key, amount), {}) for b in (kv, memory)]
+        elif op == "sadd":
+            calls = [(b.sadd, (key, member), {}) for b in (kv, memory)]
+        elif op == "srem":
+            calls = [(b.srem, (key, member), {}) for b in (kv, memory)]
+        elif op == "smembers":
+            calls = [(b.smembers, (key,), {}) for b in (kv, memory)]
+        else:
+            calls = [(b.mget, (["str:" + k for k in keys],), {}) for b in (kv, memory)]
+        results = [await fn(*args, **kwargs) for fn, args, kwargs in calls]
+        assert results[0] == results[1], op
+
+
+@pytest.mark.asyncio
+async def test_ttl_expires_keys(workers) -> None:
+    kv = workers[0]
+    assert await kv.set("lease", "1", ttl_sec=0.05)
+    assert not await kv.set("lease", "2", ttl_sec=0.05, nx=True)
+    await asyncio.sleep(0.08)
+    assert await kv.get("lease") is None
+    assert await kv.set("lease", "3", nx=True)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_across_workers(workers) -> None:
+    first, second = (SharedInflight(backend, ttl_sec=5) for backend in workers)
+
+    assert (await first.try_acquire("s1", "hw1"))["ok"]
+    assert (await second.try_acquire("s1", "hw1"))["reason"] == "concurrent_request"
+
+    rejected = await second.try_acquire("s2", "hw1", prevent_concurrent_hardware=True)
+    assert rejected == {"ok": False, "reason": "concurrent_hardware_id", "active_sessions": ["s1"]}
+    # Без запрета параллельных сессий устройства — разрешено, с контекстом
+    assert await second.try_acquire("s3", "hw1") == {"ok": True, "active_sessions": ["s1"]}
+
+    await first.release("s1", "hw1")
+    await second.release("s3", "hw1")
+    assert (await second.try_acquire("s1", "hw1", prevent_concurrent_hardware=True))["ok"]
+
+
+@pytest.mark.asyncio
+async def test_stream_limit_is_shared_and_lease_expires(workers) -> None:
+    first, second = (SharedStreamCounter(backend, lease_ttl_sec=0.2) for backend in workers)
+
+    assert (await first.try_acquire(3))[0]
+    assert (await first.try_acquire(3))[0]
+    assert await second.try_acquire(3) == (True, 3)
+    assert await second.try_acquire(3) == (False, 3)
+
+    await second.release()
+    assert (await second.try_acquire(3))[0]
+
+    # Воркер упал (без release и heartbeat): его места освобождаются по истечении аренды
+    await asyncio.sleep(0.3)
+    await second.heartbeat()
+    assert await second.try_acquire(3) == (True, 2)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquire_rolls_back_shared_state(workers) -> None:
+    backend = workers[0]
+    inflight = SharedInflight(backend, ttl_sec=5)
+    streams = SharedStreamCounter(backend, lease_ttl_sec=5)
+    entered = asyncio.Event()
+    original_sadd = backend.sadd
+
+    async def hanging_sadd(*args, **kwargs):
+        entered.set()
+        await asyncio.sleep(10)
+
+    backend.sadd = hanging_sadd
+    for acquire in (inflight.try_acquire("s1", "hw1"), streams.try_acquire(3)):
+        entered.clear()
+        task = asyncio.create_task(acquire)
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    backend.sadd = original_sadd
+    await asyncio.sleep(0.05)
+
+    # Ключ сессии и место в лимите отпущены сразу, без ожидания TTL
+    assert (await inflight.try_acquire("s1", "hw1"))["ok"]
+    assert streams.local_streams == 0
+    assert await streams.try_acquire(1) == (True, 1)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_other_workers_only(workers) -> None:
+    received = {backend.worker_id: [] for backend in workers}
+    for backend in workers:
+        await backend.on_broadcast("events", lambda payload, wid=backend.worker_id: received[wid].append(payload))
+
+    await workers[0].broadcast("events", {"n": 1})
+    for _ in range(50):
+        if received["worker-1"]:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == {"worker-0": [], "worker-1": [{"n": 1}]}
+
+
+@pytest.mark.asyncio
+async def test_interrupt_reaches_stream_on_other_worker(workers) -> None:
+    sender, receiver = workers
+    set_state_backend(receiver)
+    try:
+        integration = InterruptWorkflowIntegration(interrupt_manager=Mock())
+        integration._call_interrupt_module = AsyncMock(return_value={"success": True, "cleaned_sessions": []})
+        assert await integration.initialize()
+
+        hardware_id = f"hw-{uuid.uuid4()}"
+        token = get_cancellation_registry().open(hardware_id, "s1")
+        await sender.broadcast("interrupt", {"hardware_id": hardware_id})
+        await asyncio.wait_for(token.wait(), timeout=1)
+
+        assert token.cancelled
+        get_cancellation_registry().close(token)
+    finally:
+        set_state_backend(None)
+
+
+@pytest.mark.asyncio
+async def test_unavailable_backend_fails_open() -> None:
+    backend = KVStateBackend("127.0.0.1", 1, op_timeout_sec=0.2)
+    inflight = SharedInflight(backend)
+
+    result = await inflight.try_acquire("s1", "hw1", prevent_concurrent_hardware=True)
+
+    assert result["ok"] and result["degraded"]
+    assert await SharedStreamCounter(backend).try_acquire(1) == (True, 1)
+    await backend.close()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Tests for push-based stream cancellation on InterruptSession."""
+
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.cancellation import CancellationRegistry, CancellationToken, get_cancellation_registry
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.interrupt_handling.core.interrupt_manager import InterruptManager
+
+
+@pytest.mark.asyncio
+async def test_guard_cancels_in_flight_await() -> None:
+    token = CancellationToken("hw-cancel", "s1")
+    events = []
+
+    async def _source():
+        try:
+            yield 1
+            # "Поток LLM": следующий элемент не придёт до отмены
+            await asyncio.sleep(10)
+            yield 2
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        finally:
+            events.append("closed")
+
+    items = []
+
+    async def _consume():
+        async for item in token.guard(_source()):
+            items.append(item)
+
+    consumer = asyncio.create_task(_consume())
+    await asyncio.sleep(0.01)
+    started = time.monotonic()
+    token.cancel("test")
+    await asyncio.wait_for(consumer, timeout=1)
+
+    assert items == [1]
+    assert events == ["cancelled", "closed"]
+    assert time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_consumer_cancel_mid_step_closes_source_before_consumer_ends() -> None:
+    token = CancellationToken("hw-cancel", "s2")
+    events = []
+
+    async def _workflow():
+        try:
+            yield "step1"
+            await asyncio.sleep(0.2)
+            events.append("step2 done")
+            yield "step2"
+        finally:
+            events.append("workflow finally")
+
+    async def _handler():
+        try:
+            async for _ in token.guard(_workflow()):
+                pass
+        except asyncio.CancelledError:
+            events.append("handler cancelled")
+            raise
+
+    # Отключение клиента: gRPC отменяет задачу обработчика посреди шага workflow
+    handler = asyncio.create_task(_handler())
+    await asyncio.sleep(0.01)
+    handler.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await handler
+    await asyncio.sleep(0.3)
+
+    assert events == ["workflow finally", "handler cancelled"]
+    assert not token.cancelled
+
+
+@pytest.mark.asyncio
+async def test_token_cancel_does_not_swallow_external_cancel() -> None:
+    token = CancellationToken("hw-cancel", "s3")
+
+    async def _source():
+        yield 1
+        await asyncio.sleep(10)
+
+    async def _consume():
+        async for _ in token.guard(_source()):
+            pass
+        # Отмена токена — не ошибка: задача продолжает работу до следующей точки ожидания
+        await asyncio.sleep(0)
+
+    consumer = asyncio.create_task(_consume())
+    await asyncio.sleep(0.01)
+    token.cancel("test")
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(consumer, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_silence_measured_from_interrupt_receipt() -> None:
+    now = [100.0]
+    registry = CancellationRegistry(clock=lambda: now[0])
+    token = registry.open("hw-cancel", "s1")
+    token.note_audio()
+
+    assert registry.cancel("hw-cancel", received_at=100.5) == ["s1"]
+    # Повторное прерывание не отменяет уже отменённый стрим
+    assert registry.cancel("hw-cancel") == []
+
+    now[0] = 100.52
+    token.note_audio()
+    assert token.silence_ms() == pytest.approx(20.0)
+
+    registry.close(token)
+    assert registry.get("hw-cancel", "s1") is None
+    assert registry.get_stats() == {'active_streams': 0, 'active_devices': 0, 'cancelled_total': 1}
+
+
+@pytest.mark.asyncio
+async def test_stream_audio_stops_on_interrupt() -> None:
+    manager = Mock()
+    manager.interrupt_workflow = Mock()
+    manager.interrupt_workflow.check_interrupts = AsyncMock(return_value=False)
+    reached_end = []
+
+    async def _process(request_data):
+        yield {"success": True, "text_response": "first"}
+        await asyncio.sleep(10)
+        reached_end.append(True)
+        yield {"success": True, "text_response": "second"}
+
+    manager.process = _process
+    servicer = NewStreamingServicer()
+    servicer._prewarm_enabled = False
+    servicer.grpc_service_manager = manager
+
+    hardware_id = f"hw-{uuid.uuid4()}"
+    session_id = str(uuid.uuid4())
+    request = streaming_pb2.StreamRequest(hardware_id=hardware_id, session_id=session_id, prompt="tell me a story")
+    responses = []
+
+    async def _stream():
+        async for resp in servicer.StreamAudio(request, Mock()):
+            responses.append(resp)
+
+    stream = asyncio.create_task(_stream())
+    for _ in range(100):
+        if responses:
+            break
+        await asyncio.sleep(0.01)
+    assert get_cancellation_registry().get(hardware_id, session_id) is not None
+
+    assert get_cancellation_registry().cancel(hardware_id) == [session_id]
+    await asyncio.wait_for(stream, timeout=1)
+
+    assert [resp.text_chunk for resp in responses if resp.WhichOneof("content") == "text_chunk"] == ["first"]
+    assert not any(resp.WhichOneof("content") == "end_message" for resp in responses)
+    assert not reached_end
+    assert get_cancellation_registry().get(hardware_id, session_id) is None
+
+
+@pytest.mark.asyncio
+async def test_modules_interrupted_concurrently() -> None:
+    config = Mock()
+    config.is_module_interrupt_enabled = Mock(return_value=True)
+    config.get_module_interrupt_methods = Mock(return_value=["interrupt"])
+    config.get_module_timeout = Mock(return_value=5.0)
+    manager = InterruptManager(config=config)
+
+    class _SlowModule:
+        def __init__(self):
+            self.interrupted = False
+
+        async def interrupt(self):
+            await asyncio.sleep(0.2)
+            self.interrupted = True
+
+    modules = {name: _SlowModule() for name in ("text_processing", "audio_generation", "memory")}
+    manager.registered_modules.update(modules)
+
+    started = time.monotonic()
+    interrupted = await manager._interrupt_all_modules("hw-cancel")
+    elapsed = time.monotonic() - started
+
+    assert interrupted == list(modules)
+    assert all(module.interrupted for module in modules.values())
+    # Параллельно: ~0.2 с, последовательно было бы ~0.6 с
+    assert elapsed < 0.45
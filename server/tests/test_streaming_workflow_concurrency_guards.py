@@ -113,3 +113,33 @@ async def test_rejects_concurrent_request_with_same_hardware_id_when_guard_enabl
 
     unblock.set()
     await first_task
+
+
+@pytest.mark.asyncio
+async def test_cancel_during_shared_acquire_releases_local_entry(mock_audio_module, monkeypatch):
+    import integrations.workflow_integrations.streaming_workflow_integration as workflow_module
+
+    entered = asyncio.Event()
+    shared_inflight = Mock()
+    shared_inflight.release = AsyncMock()
+
+    async def hanging_acquire(**kwargs):
+        entered.set()
+        await asyncio.sleep(10)
+
+    shared_inflight.try_acquire = hanging_acquire
+    monkeypatch.setattr(workflow_module, "get_shared_inflight", lambda: shared_inflight)
+
+    text_module = Mock()
+    text_module.is_initialized = True
+    text_module.name = "text_processing"
+    workflow = StreamingWorkflowIntegration(text_processor=text_module, audio_processor=mock_audio_module)
+    await workflow.initialize()
+    task = asyncio.create_task(_collect_results(workflow, {"text": "hi", "session_id": "sid-c", "hardware_id": "hw-c"}))
+    await asyncio.wait_for(entered.wait(), timeout=1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert "sid-c" not in SessionRegistry().get_inflight_session_ids()
+    shared_inflight.release.assert_not_called()
@@ -0,0 +1,146 @@
+import asyncio
+from pathlib import Path
+import sys
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import modules.subscription as subscription_package
+from config.unified_config import WorkflowConfig
+from integrations.workflow_integrations.streaming_workflow_integration import StreamingWorkflowIntegration
+from modules.session_management.core.session_registry import SessionRegistry
+from modules.subscription.subscription_module import CanProcessResult
+
+
+@pytest.fixture(autouse=True)
+def clear_session_registry():
+    registry = SessionRegistry()
+    registry.clear()
+    yield
+    registry.clear()
+
+
+class _SlowGate:
+    def __init__(self, delay: float, allowed: bool = True):
+        self.delay = delay
+        self.allowed = allowed
+        self.increments = 0
+
+    async def can_process(self, hardware_id: str) -> CanProcessResult:
+        await asyncio.sleep(self.delay)
+        return CanProcessResult(allowed=self.allowed, reason='paid' if self.allowed else 'daily_limit_exceeded')
+
+    async def increment_usage(self, hardware_id: str) -> bool:
+        self.increments += 1
+        return True
+
+
+def _memory_workflow(delay: float):
+    async def get_memory(hardware_id):
+        await asyncio.sleep(delay)
+        return {'recent_context': 'likes tea'}
+
+    memory = Mock()
+    memory.prefetch_memory = AsyncMock(return_value=None)
+    memory.get_memory_context_parallel = AsyncMock(side_effect=get_memory)
+    return memory
+
+
+async def _make_workflow(speculation: str, text_calls: list):
+    async def text_stream():
+        text_calls.append(time.monotonic())
+        yield "Hello there."
+
+    text_module = Mock()
+    text_module.is_initialized = True
+    text_module.name = "text_processing"
+    text_module.process = AsyncMock(side_effect=lambda *args, **kwargs: text_stream())
+
+    async def generate_audio(*args, **kwargs):
+        yield b"audio"
+
+    audio_module = Mock()
+    audio_module.is_initialized = True
+    audio_module.name = "audio_generation"
+    audio_module.process = AsyncMock(side_effect=lambda *args, **kwargs: generate_audio())
+
+    workflow = StreamingWorkflowIntegration(
+        text_processor=text_module,
+        audio_processor=audio_module,
+        memory_workflow=_memory_workflow(0.1),
+        workflow_config=WorkflowConfig(pre_llm_speculation=speculation),
+    )
+    await workflow.initialize()
+    return workflow
+
+
+async def _run(workflow):
+    return [item async for item in workflow.process_request_streaming(
+        {"text": "hi", "session_id": "sid-pre-llm", "hardware_id": "hw-pre-llm"}
+    )]
+
+
+@pytest.mark.asyncio
+async def test_gate_and_memory_run_concurrently(monkeypatch):
+    gate = _SlowGate(0.1)
+    monkeypatch.setattr(subscription_package, "get_subscription_module", lambda: gate)
+    text_calls = []
+    workflow = await _make_workflow("off", text_calls)
+
+    started = time.monotonic()
+    results = await _run(workflow)
+
+    assert results[-1]['is_final'] is True
+    assert text_calls[0] - started < 0.18
+    assert gate.increments == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_llm_is_cancelled_when_gate_denies(monkeypatch):
+    monkeypatch.setattr(subscription_package, "get_subscription_module", lambda: _SlowGate(0.3, allowed=False))
+    text_calls = []
+    workflow = await _make_workflow("on", text_calls)
+
+    results = await _run(workflow)
+
+    assert len(text_calls) == 1
+    assert results[0]['error_code'] == 'PERMISSION_DENIED'
+    stats = workflow.get_speculation_stats()
+    assert stats['aborted'] == 1 and stats['wasted'] == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_llm_is_committed_and_reports_saved_time(monkeypatch):
+    monkeypatch.setattr(subscription_package, "get_subscription_module", lambda: _SlowGate(0.3))
+    text_calls = []
+    workflow = await _make_workflow("on", text_calls)
+
+    results = await _run(workflow)
+
+    assert results[-1]['is_final'] is True
+    assert len(text_calls) == 1
+    stats = workflow.get_speculation_stats()
+    assert stats['committed'] == 1
+    assert stats['saved_ms_avg'] > 100
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_starts_no_pre_llm_work(monkeypatch):
+    gate = _SlowGate(0.0)
+    gate.can_process = AsyncMock(side_effect=gate.can_process)
+    monkeypatch.setattr(subscription_package, "get_subscription_module", lambda: gate)
+    workflow = await _make_workflow("off", [])
+    registry = SessionRegistry()
+    assert registry.try_acquire_inflight(session_id="sid-pre-llm", hardware_id="hw-other")['ok']
+
+    results = await _run(workflow)
+
+    assert results[0]['error_type'] == 'concurrent_request'
+    gate.can_process.assert_not_called()
+    workflow.memory_workflow.prefetch_memory.assert_not_called()
+    # Запись активного запроса не освобождается отклонённым
+    assert "sid-pre-llm" in registry.get_inflight_session_ids()
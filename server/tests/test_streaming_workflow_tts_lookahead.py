@@ -0,0 +1,184 @@
+import asyncio
+from pathlib import Path
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.unified_config import WorkflowConfig
+from integrations.core.sentence_synthesis_pipeline import SentenceSynthesisPipeline
+from integrations.workflow_integrations.streaming_workflow_integration import RequestContext, StreamingWorkflowIntegration
+from modules.session_management.core.session_registry import SessionRegistry
+
+
+@pytest.fixture(autouse=True)
+def clear_session_registry():
+    registry = SessionRegistry()
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def _text_event(index: int) -> dict:
+    return {'success': True, 'text_response': f"s{index}", 'sentence_index': index}
+
+
+@pytest.mark.asyncio
+async def test_workflow_synthesizes_ahead_and_keeps_sentence_order():
+    active = 0
+    peak = 0
+
+    async def generate_audio(payload):
+        nonlocal active, peak
+        text = payload["text"]
+        active += 1
+        peak = max(peak, active)
+        try:
+            # Первое предложение синтезируется дольше остальных
+            await asyncio.sleep(0.05 if text.startswith("First") else 0.005)
+            for part in range(2):
+                yield f"{text[:5]}-{part}".encode()
+        finally:
+            active -= 1
+
+    audio_module = Mock()
+    audio_module.is_initialized = True
+    audio_module.name = "audio_generation"
+    audio_module.process = AsyncMock(side_effect=lambda payload, *args, **kwargs: generate_audio(payload))
+
+    async def text_stream():
+        for sentence in ("First sentence is here.", "Second sentence is here.", "Third sentence is here."):
+            yield sentence
+
+    text_module = Mock()
+    text_module.is_initialized = True
+    text_module.name = "text_processing"
+    text_module.process = AsyncMock(side_effect=lambda *args, **kwargs: text_stream())
+
+    workflow = StreamingWorkflowIntegration(
+        text_processor=text_module,
+        audio_processor=audio_module,
+        workflow_config=WorkflowConfig(tts_lookahead_max_inflight=3),
+    )
+    await workflow.initialize()
+
+    results = []
+    async for item in workflow.process_request_streaming(
+        {"text": "hi", "session_id": "sid-lookahead", "hardware_id": "hw-lookahead"}
+    ):
+        results.append(item)
+
+    assert peak > 1, "Синтез следующих предложений должен идти параллельно"
+
+    stream = [
+        ('text', r['sentence_index']) if 'text_response' in r and r.get('text_response') else ('audio', r['sentence_index'])
+        for r in results if not r.get('is_final')
+    ]
+    assert stream == [
+        ('text', 1), ('audio', 1), ('audio', 1),
+        ('text', 2), ('audio', 2), ('audio', 2),
+        ('text', 3), ('audio', 3), ('audio', 3),
+    ]
+
+    final = results[-1]
+    assert final['is_final'] is True
+    assert final['audio_chunks_processed'] == 6
+    assert final['sentence_audio_map'] == {1: 2, 2: 2, 3: 2}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_respects_max_inflight():
+    active = 0
+    peak = 0
+
+    async def synthesize(text, index):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        yield text.encode()
+
+    pipeline = SentenceSynthesisPipeline(synthesize, max_inflight=2)
+    for index in range(1, 6):
+        pipeline.submit(index, _text_event(index), f"s{index}")
+
+    events = [event async for event in pipeline.drain()]
+
+    assert peak == 2
+    assert [e['sentence_index'] for e in events if 'audio_chunk' in e] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_byte_cap_pauses_only_future_sentences():
+    head_release = asyncio.Event()
+
+    async def synthesize(text, index):
+        if index == 1:
+            await head_release.wait()
+        for _ in range(4):
+            yield b"x" * 10
+            await asyncio.sleep(0)
+
+    pipeline = SentenceSynthesisPipeline(synthesize, max_inflight=3, max_buffered_bytes=20)
+    for index in range(1, 4):
+        pipeline.submit(index, _text_event(index), f"s{index}")
+
+    for _ in range(20):
+        await asyncio.sleep(0)
+    # Пока головное предложение не готово, будущие упираются в лимит буфера
+    assert pipeline.buffered_bytes <= 20
+    assert pipeline.backpressure_waits > 0
+
+    head_release.set()
+    events = [event async for event in pipeline.drain()]
+
+    audio_indexes = [e['sentence_index'] for e in events if 'audio_chunk' in e]
+    assert audio_indexes == [1] * 4 + [2] * 4 + [3] * 4
+    assert pipeline.buffered_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_raises_synthesis_error_in_order():
+    async def synthesize(text, index):
+        if index == 2:
+            raise RuntimeError("tts failed")
+        yield b"ok"
+
+    pipeline = SentenceSynthesisPipeline(synthesize, max_inflight=3)
+    for index in range(1, 4):
+        pipeline.submit(index, _text_event(index), f"s{index}")
+
+    events = []
+    with pytest.raises(RuntimeError, match="tts failed"):
+        async for event in pipeline.drain():
+            events.append(event)
+
+    assert [e['sentence_index'] for e in events] == [1, 1, 2]
+    await pipeline.aclose()
+
+
+@pytest.mark.asyncio
+async def test_interleave_closes_source_when_consumer_stops_between_items():
+    closed = asyncio.Event()
+
+    async def llm_stream():
+        try:
+            yield "first"
+            yield "second"
+        finally:
+            # Здесь TextProcessor освобождает слот LLM admission
+            closed.set()
+
+    workflow = StreamingWorkflowIntegration(text_processor=Mock(), audio_processor=Mock())
+    ctx = RequestContext(session_id="sid-interleave")
+    interleaved = workflow._interleave_synthesis(llm_stream(), ctx)
+
+    assert await interleaved.__anext__() == ('source', "first")
+    await interleaved.aclose()
+
+    # Закрыт явно, а не финализацией генератора позже
+    assert closed.is_set()
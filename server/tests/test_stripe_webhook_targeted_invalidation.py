@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import json
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from api.webhooks import stripe_webhook as webhook_module
+from modules.subscription.core.decision_cache import DecisionCache
+from modules.subscription.subscription_module import SubscriptionModule
+
+
+class _ReqStub:
+    def __init__(self, payload: bytes):
+        self._payload = payload
+        self.headers = {"Stripe-Signature": "test"}
+
+    async def read(self) -> bytes:
+        return self._payload
+
+
+class _SubscriptionConfigStub:
+    stripe_webhook_secret = "whsec_test"
+
+    @staticmethod
+    def is_active() -> bool:
+        return True
+
+
+class _ConfigStub:
+    subscription = _SubscriptionConfigStub()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _deliver(monkeypatch, module, result):
+    payload = b'{"id":"evt_test","type":"invoice.payment_succeeded","data":{"object":{}}}'
+    monkeypatch.setattr("config.unified_config.get_config", lambda: _ConfigStub())
+    monkeypatch.setattr("modules.subscription.get_subscription_module", lambda: module)
+    monkeypatch.setattr(
+        webhook_module,
+        "_verify_and_construct_event",
+        AsyncMock(return_value=json.loads(payload.decode("utf-8"))),
+    )
+    monkeypatch.setattr(webhook_module, "_process_event", AsyncMock(return_value=result))
+    return await webhook_module.stripe_webhook_handler(_ReqStub(payload))  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_webhook_invalidates_only_affected_hardware_id(monkeypatch):
+    module = SubscriptionModule()
+    module._set_cached("HW_PAID", {'allowed': False})
+    module._set_cached("HW_OTHER", {'allowed': True})
+
+    response = await _deliver(monkeypatch, module, {'status': 'processed', 'hardware_id': "HW_PAID"})
+
+    assert response.status == 200
+    assert module._get_cached("HW_PAID") is None
+    assert module._get_cached("HW_OTHER") == {'allowed': True}
+    assert module._cache.epoch == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_without_hardware_id_bumps_epoch(monkeypatch):
+    module = SubscriptionModule()
+    module._set_cached("HW_OTHER", {'allowed': True})
+
+    await _deliver(monkeypatch, module, {'status': 'processed'})
+    await _deliver(monkeypatch, module, {'status': 'ignored'})
+
+    assert module._cache.epoch == 1
+
+
+def test_epoch_bump_expires_entries_spread_over_jitter_window():
+    clock = _Clock()
+    cache = DecisionCache(ttl_seconds=1000, clock=clock)
+    keys = [f"hw-{i}" for i in range(200)]
+    for key in keys:
+        cache.set(key, key)
+
+    cache.bump_epoch(jitter_seconds=10)
+
+    clock.now = 5
+    alive = [key for key in keys if cache.get(key) is not None]
+    assert 0 < len(alive) < len(keys)
+
+    clock.now = 10
+    assert all(cache.get(key) is None for key in keys)
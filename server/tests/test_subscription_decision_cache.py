@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.subscription.core.decision_cache import DecisionCache
+from modules.subscription.subscription_module import SubscriptionModule
+
+
+class _ConfigStub:
+    grandfathered_enabled = True
+
+    @staticmethod
+    def is_active() -> bool:
+        return True
+
+
+class _SlowQuotaChecker:
+    def __init__(self):
+        self.calls = 0
+
+    def check_quota(self, hardware_id: str):
+        self.calls += 1
+        time.sleep(0.05)
+        return {'allowed': True, 'reason': 'paid', 'status': 'paid'}
+
+
+class _DatabaseManagerStub:
+    def __init__(self):
+        self.lookups = 0
+
+    async def get_user_by_hardware_id(self, hardware_id: str):
+        self.lookups += 1
+        return {'hardware_id': hardware_id}
+
+
+def _make_module():
+    module = SubscriptionModule()
+    module.config = _ConfigStub()
+    module._initialized = True
+    module._quota_checker = _SlowQuotaChecker()
+    module._database_manager = _DatabaseManagerStub()
+    return module
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_quota_check():
+    module = _make_module()
+
+    results = await asyncio.gather(*(module.can_process("hw-1") for _ in range(10)))
+
+    assert all(result.allowed for result in results)
+    assert module._quota_checker.calls == 1
+    stats = module.get_gate_stats()
+    assert stats['decision_cache']['coalesced'] == 9
+    assert stats['gate_p99_ms'] >= stats['gate_p50_ms'] > 0
+
+
+@pytest.mark.asyncio
+async def test_user_anchor_runs_once_per_device():
+    module = _make_module()
+    hardware_id = "A" * 32
+
+    await module.can_process(hardware_id)
+    module.invalidate_all_cache()
+    await module.can_process(hardware_id)
+
+    assert module._database_manager.lookups == 1
+    assert module._quota_checker.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing():
+    clock = _Clock()
+    cache = DecisionCache(ttl_seconds=10, stale_ttl_seconds=10, clock=clock)
+    loads = []
+
+    async def loader():
+        loads.append(clock.now)
+        return len(loads)
+
+    assert await cache.get_or_load("hw", loader) == 1
+    clock.now = 15
+    assert await cache.get_or_load("hw", loader) == 1
+    await asyncio.sleep(0)
+    assert await cache.get_or_load("hw", loader) == 2
+
+    clock.now = 100
+    assert await cache.get_or_load("hw", loader) == 3
+    assert cache.get_stats()['stale_hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_and_skips_results_invalidated_mid_load():
+    cache = DecisionCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    assert "a" not in cache and len(cache) == 2
+    assert cache.get_stats()['evictions'] == 1
+
+    async def loader():
+        cache.invalidate("d")
+        return "old"
+
+    assert await cache.get_or_load("d", loader) == "old"
+    assert "d" not in cache
+
+
+@pytest.mark.asyncio
+async def test_invalidating_other_key_keeps_inflight_load_cacheable():
+    cache = DecisionCache()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "A"
+
+    load = asyncio.create_task(cache.get_or_load("A", loader))
+    await asyncio.sleep(0)
+    # increment_usage другого устройства инвалидирует только его ключ
+    cache.invalidate("B")
+    release.set()
+
+    assert await load == "A"
+    assert "A" in cache
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_coalesced_followers():
+    cache = DecisionCache()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(cache.get_or_load("hw", loader))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.get_or_load("hw", loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await follower == "value"
+    assert leader.cancelled()
+    assert cache.get("hw") == "value"
+
+
+@pytest.mark.asyncio
+async def test_coalesced_misses_reserve_pending_per_request():
+    module = _make_module()
+    limits = {'daily': {'used': 1, 'limit': 3}}
+    module._quota_checker.check_quota = lambda hardware_id: {
+        'allowed': True, 'reason': 'limited_free_trial', 'status': 'limited_free_trial', 'limits': limits
+    }
+
+    results = await asyncio.gather(*(module.can_process("hw-limited") for _ in range(5)))
+
+    # used=1 из 3: пропускаются два запроса, остальные упираются в in-flight guard
+    assert sum(result.allowed for result in results) == 2
+    assert {result.reason for result in results if not result.allowed} == {'daily_limit_exceeded'}
+    assert module._prune_pending("hw-limited", now_ts=time.time()) == 2
+
+
+@pytest.mark.asyncio
+async def test_commit_coalescing_onto_prewarm_still_reserves_pending():
+    module = _make_module()
+    limits = {'daily': {'used': 0, 'limit': 3}}
+    module._quota_checker.check_quota = lambda hardware_id: {
+        'allowed': True, 'reason': 'limited_free_trial', 'status': 'limited_free_trial', 'limits': limits
+    }
+
+    # COMMIT приходит, пока загрузка прогрева COLLECT ещё идёт
+    prewarm = asyncio.create_task(module.prewarm("hw-prewarm"))
+    await asyncio.sleep(0)
+    result = await module.can_process("hw-prewarm")
+    assert await prewarm
+
+    assert result.allowed
+    assert module.get_gate_stats()['decision_cache']['coalesced'] == 1
+    assert module._prune_pending("hw-prewarm", now_ts=time.time()) == 1
@@ -0,0 +1,160 @@
+import asyncio
+from pathlib import Path
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.audio_generation.core.audio_processor import AudioProcessor
+from modules.audio_generation.core.tts_audio_cache import TtsAudioCache
+
+
+def test_key_normalizes_text_and_includes_voice_params():
+    base = TtsAudioCache.make_key("Opening  Safari\nfor you.", voice="a", rate="+0%")
+    assert base == TtsAudioCache.make_key(" Opening Safari for you. ", rate="+0%", voice="a")
+    assert base != TtsAudioCache.make_key("Opening Safari for you.", voice="b", rate="+0%")
+
+
+@pytest.mark.asyncio
+async def test_memory_lru_is_bounded_by_bytes():
+    cache = TtsAudioCache(max_memory_bytes=10, disk_dir=None)
+    await cache.put("a", b"12345")
+    await cache.put("b", b"12345")
+    assert await cache.get("a") == b"12345"  # a становится самым свежим
+
+    await cache.put("c", b"12345")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"12345"
+    stats = cache.get_stats()
+    assert stats['memory_bytes'] == 10
+    assert stats['evictions'] == 1
+    assert stats['misses'] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart_and_invalidate_clears_it(tmp_path):
+    cache = TtsAudioCache(disk_dir=tmp_path)
+    key = TtsAudioCache.make_key("Welcome back", voice="a")
+    assert await cache.put(key, [b"pcm-", b"data"])
+
+    restarted = TtsAudioCache(disk_dir=tmp_path)
+    assert await restarted.get(key) == b"pcm-data"
+    assert restarted.get_stats()['disk_hits'] == 1
+    # После подъёма с диска запись отдаётся из памяти
+    assert await restarted.get(key) == b"pcm-data"
+    assert restarted.get_stats()['memory_hits'] == 1
+
+    cleanup = restarted.invalidate()
+    assert await restarted.get(key) is None
+    await cleanup
+    assert list(tmp_path.glob("*.pcm")) == []
+
+
+def _processor(tmp_path, calls, fail_after=None):
+    async def process(text, status=None):
+        calls.append(text)
+        for n, part in enumerate((b"aa", b"bb", b"cc")):
+            if n == fail_after:
+                # Провайдер проглотил обрыв потока Edge TTS: аудио обрезано
+                status.error = "stream reset"
+                break
+            yield part
+        if status is not None:
+            status.complete = status.error is None
+
+    processor = AudioProcessor({'tts_cache_disk_dir': str(tmp_path), 'streaming_chunk_size': 4})
+    provider = Mock()
+    provider.process = process
+    processor.provider = provider
+    processor.is_initialized = True
+    return processor
+
+
+@pytest.mark.asyncio
+async def test_processor_serves_repeated_phrase_from_cache(tmp_path):
+    calls = []
+    processor = _processor(tmp_path, calls)
+
+    first = [c async for c in processor.generate_speech_streaming("Opening Safari for you.")]
+    second = [c async for c in processor.generate_speech_streaming("Opening Safari for you.")]
+    third = [c async for c in processor.generate_speech_streaming("Opening Safari for you.")]
+
+    # Фраза допускается в кэш со второго появления
+    assert calls == ["Opening Safari for you."] * 2
+    assert first == second == [b"aa", b"bb", b"cc"]
+    # Из кэша — чанками streaming_chunk_size
+    assert third == [b"aabb", b"cc"]
+    stats = processor.get_metrics()['audio_cache']
+    assert stats['memory_hits'] == 1 and stats['admission_skips'] == 1
+
+
+@pytest.mark.asyncio
+async def test_unique_sentences_stay_out_of_cache(tmp_path):
+    calls = []
+    processor = _processor(tmp_path, calls)
+
+    for n in range(3):
+        _ = [c async for c in processor.generate_speech_streaming(f"Unique answer sentence {n}.")]
+    _ = [c async for c in processor.generate_speech_streaming("Here is a long answer. " * 10)]
+
+    stats = processor.get_metrics()['audio_cache']
+    assert stats['stores'] == 0 and stats['memory_entries'] == 0
+    assert list(tmp_path.glob("*.pcm")) == []
+
+
+@pytest.mark.asyncio
+async def test_cacheable_flag_overrides_admission(tmp_path):
+    calls = []
+    processor = _processor(tmp_path, calls)
+
+    # Фиксированная фраза кэшируется сразу, клиентский текст — никогда
+    _ = [c async for c in processor.generate_speech_streaming("Welcome back.", cacheable=True)]
+    _ = [c async for c in processor.generate_speech_streaming("Welcome back.")]
+    for _n in range(3):
+        _ = [c async for c in processor.generate_speech_streaming("Client text.", cacheable=False)]
+
+    assert calls == ["Welcome back."] + ["Client text."] * 3
+    stats = processor.get_metrics()['audio_cache']
+    assert stats['stores'] == 1 and stats['memory_hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_voice_settings_update_invalidates_cache(tmp_path):
+    calls = []
+    processor = _processor(tmp_path, calls)
+
+    _ = [c async for c in processor.generate_speech_streaming("Done.")]
+    assert processor.update_voice_settings({'voice_name': 'en-US-GuyNeural'})
+    _ = [c async for c in processor.generate_speech_streaming("Done.")]
+
+    assert calls == ["Done.", "Done."]
+    assert processor.get_metrics()['audio_cache']['invalidations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_truncated_synthesis_is_not_cached(tmp_path):
+    calls = []
+    processor = _processor(tmp_path, calls, fail_after=2)
+
+    first = [c async for c in processor.generate_speech_streaming("Done.", cacheable=True)]
+    second = [c async for c in processor.generate_speech_streaming("Done.", cacheable=True)]
+
+    assert first == second == [b"aa", b"bb"]
+    assert calls == ["Done.", "Done."]
+    assert processor.get_metrics()['audio_cache']['stores'] == 0
+
+
+@pytest.mark.asyncio
+async def test_write_started_before_invalidation_is_not_indexed(tmp_path):
+    cache = TtsAudioCache(disk_dir=tmp_path)
+    put = asyncio.create_task(cache.put("old-voice", b"pcm"))
+    await asyncio.sleep(0)
+    await cache.invalidate()
+    await put
+
+    assert cache.get_stats()['disk_entries'] == 0
+    assert list(tmp_path.glob("*.pcm")) == []
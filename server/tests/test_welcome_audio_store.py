@@ -0,0 +1,165 @@
+import asyncio
+from pathlib import Path
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.grpc_service import streaming_pb2
+from modules.grpc_service.core.grpc_server import NewStreamingServicer
+from modules.grpc_service.core.welcome_audio_store import WelcomeAudioStore, WelcomeVariant
+
+# 0.5 сек PCM: 48kHz, mono, int16
+PCM = b"\x01\x00" * 24000
+
+
+def _renderer(calls, delay: float = 0.0, cache_flags=None):
+    async def render(text, voice, cacheable=None):
+        calls.append((text, voice))
+        if cache_flags is not None:
+            cache_flags.append(cacheable)
+        if delay:
+            await asyncio.sleep(delay)
+        yield PCM[:len(PCM) // 2]
+        yield PCM[len(PCM) // 2:]
+    return render
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_render_once(tmp_path):
+    calls = []
+    store = WelcomeAudioStore(_renderer(calls, delay=0.02), tmp_path)
+
+    results = await asyncio.gather(*(store.get("Hi!") for _ in range(5)))
+
+    assert calls == [("Hi!", None)]
+    assert all(result.duration_sec == pytest.approx(0.5) for result in results)
+    assert store.get_stats()['coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_prerendered_file_is_mapped_after_restart(tmp_path):
+    calls = []
+    store = WelcomeAudioStore(_renderer(calls), tmp_path)
+    assert await store.prerender([WelcomeVariant(text="Hi!"), WelcomeVariant(text="Привет!", language="ru")]) == 2
+
+    restarted = WelcomeAudioStore(_renderer(calls), tmp_path)
+    welcome = await restarted.get("Привет!", language="ru")
+
+    assert len(calls) == 2
+    assert restarted.get_stats()['disk_loads'] == 1
+    assert b"".join(welcome.iter_chunks(4096)) == PCM
+
+
+@pytest.mark.asyncio
+async def test_voice_fingerprint_change_rerenders(tmp_path):
+    calls = []
+    fingerprint = {'value': 'aria'}
+    store = WelcomeAudioStore(_renderer(calls), tmp_path, fingerprint_provider=lambda: fingerprint['value'])
+
+    await store.get("Hi!")
+    await store.get("Hi!")
+    fingerprint['value'] = 'guy'
+    await store.get("Hi!")
+
+    assert len(calls) == 2
+    assert store.get_stats()['invalidations'] == 1
+    await store.close()
+    # Остаётся только файл новых настроек
+    assert len(list(tmp_path.rglob("*.pcm"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_keeps_files_of_new_fingerprint(tmp_path):
+    calls = []
+    old_worker = WelcomeAudioStore(_renderer(calls), tmp_path, fingerprint_provider=lambda: "aria")
+    await old_worker.get("Hi!")
+
+    # Другой воркер уже отрендерил приветствие новым голосом в общую директорию
+    new_worker = WelcomeAudioStore(_renderer(calls), tmp_path, fingerprint_provider=lambda: "guy")
+    await new_worker.get("Hi!")
+    assert len(list(tmp_path.rglob("*.pcm"))) == 2
+
+    await old_worker.invalidate("guy")
+
+    assert len(list(tmp_path.rglob("*.pcm"))) == 1
+    restarted = WelcomeAudioStore(_renderer(calls), tmp_path, fingerprint_provider=lambda: "guy")
+    await restarted.get("Hi!")
+    assert len(calls) == 2 and restarted.get_stats()['disk_loads'] == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_welcome_audio_reports_duration_and_serves_cached(tmp_path):
+    calls = []
+
+    async def stream_audio(text):
+        calls.append(text)
+        yield {"audio": PCM, "type": "audio_chunk"}
+
+    audio_module = Mock()
+    audio_module.process = AsyncMock(side_effect=lambda request: stream_audio(request["text"]))
+    audio_module.get_voice_fingerprint = Mock(return_value="aria")
+    manager = Mock()
+    manager._get_module = Mock(return_value=audio_module)
+
+    servicer = NewStreamingServicer()
+    servicer.grpc_service_manager = manager
+    servicer._welcome_store.storage_dir = tmp_path
+
+    for _ in range(2):
+        responses = [r async for r in servicer.GenerateWelcomeAudio(streaming_pb2.WelcomeRequest(), Mock())]
+        kinds = [r.WhichOneof("content") for r in responses]
+        assert kinds[0] == "metadata"
+        assert kinds[-1] == "end_message"
+        assert responses[0].metadata.duration_sec == pytest.approx(0.5)
+        assert b"".join(r.audio_chunk.audio_data for r in responses if r.WhichOneof("content") == "audio_chunk") == PCM
+
+    assert len(calls) == 1
+    await servicer._welcome_store.close()
+
+
+@pytest.mark.asyncio
+async def test_arbitrary_text_and_voice_bypass_store(tmp_path):
+    calls = []
+    cache_flags = []
+    store = WelcomeAudioStore(
+        _renderer(calls, cache_flags=cache_flags), tmp_path,
+        variants=[WelcomeVariant(text="Hi!"), WelcomeVariant(text="Привет!", language="ru")],
+    )
+
+    # Язык без своего варианта получает приветствие по умолчанию
+    assert store.resolve("", None, "de").text == "Hi!"
+    assert store.resolve("", None, "ru").text == "Привет!"
+    assert store.resolve("Привет!", None, None).language == "ru"
+    assert store.resolve("anything else", None, None) is None
+    assert store.resolve("", "custom-voice", None) is None
+
+    for n in range(3):
+        welcome = await store.render_uncached(f"client text {n}")
+        assert welcome.size == len(PCM)
+
+    stats = store.get_stats()
+    assert stats['entries'] == 0 and stats['uncached_renders'] == 3
+    assert not list(tmp_path.rglob("*.pcm"))
+    # Произвольный текст идёт мимо кэша TTS
+    assert cache_flags == [False] * 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_first_request_does_not_fail_coalesced(tmp_path):
+    calls = []
+    store = WelcomeAudioStore(_renderer(calls, delay=0.05), tmp_path)
+
+    first = asyncio.create_task(store.get("Hi!"))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(store.get("Hi!"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    welcome = await second
+    assert welcome.duration_sec == pytest.approx(0.5)
+    assert len(calls) == 1 and store.get_stats()['entries'] == 1
+    await store.close()
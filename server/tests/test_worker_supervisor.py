@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests for the multi-process worker supervisor: heartbeats, restarts, coordinated drain, aggregated metrics."""
+
+import asyncio
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from integrations.core.worker_supervisor import WorkerContext, WorkerHeartbeat, WorkerSupervisor
+
+# Воркер: heartbeat через WorkerHeartbeat, на SIGTERM пишет маркер и выходит
+WORKER_SCRIPT = textwrap.dedent("""
+    import asyncio, os, signal, sys
+    sys.path.insert(0, {root!r})
+    from integrations.core.worker_supervisor import WorkerHeartbeat, get_worker_context
+
+    async def main():
+        context = get_worker_context()
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        stats = lambda: {{'metrics': {{'total_requests': {{'StreamAudio': 10 + context.index}},
+                                     'p95_latency': {{'StreamAudio': 100.0 * (context.index + 1)}}}},
+                         'backpressure': {{'active_streams': 1}}}}
+        heartbeat = WorkerHeartbeat(context, interval_sec=0.05, stats_provider=stats)
+        await heartbeat.start()
+        await stop.wait()
+        await heartbeat.stop()
+        open(os.path.join(context.state_dir, f"drained-{{context.index}}"), "w").close()
+
+    asyncio.run(main())
+""").format(root=str(project_root))
+
+
+def _supervisor(tmp_path, command, workers=2, **kwargs) -> WorkerSupervisor:
+    return WorkerSupervisor(command=command, workers=workers, state_dir=str(tmp_path), **kwargs)
+
+
+async def _wait_for(predicate, supervisor: WorkerSupervisor, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        supervisor.check_workers()
+        if predicate():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_are_aggregated_and_drain_is_coordinated(tmp_path) -> None:
+    supervisor = _supervisor(tmp_path, [sys.executable, "-c", WORKER_SCRIPT], drain_timeout_sec=5.0)
+    try:
+        await _wait_for(lambda: all(w.last_heartbeat for w in supervisor.workers), supervisor)
+
+        stats = supervisor.aggregate()
+        assert stats['alive'] == 2
+        assert stats['total_requests'] == {'StreamAudio': 21}
+        assert stats['p95_latency'] == {'StreamAudio': 200.0}
+        assert stats['active_streams'] == 2
+    finally:
+        await supervisor.drain()
+
+    assert supervisor.draining
+    assert all(not w.alive for w in supervisor.workers)
+    assert {p.name for p in tmp_path.glob("drained-*")} == {"drained-0", "drained-1"}
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_restarted_with_backoff(tmp_path) -> None:
+    supervisor = _supervisor(
+        tmp_path, [sys.executable, "-c", "import sys; sys.exit(3)"],
+        workers=1, restart_backoff_sec=0.2, drain_timeout_sec=1.0
+    )
+    worker = supervisor.workers[0]
+    try:
+        supervisor.check_workers()
+        first_pid = worker.process.pid
+        worker.process.wait()
+
+        supervisor.check_workers()
+        assert worker.process is None and worker.restarts == 1
+        assert worker.backoff_sec == pytest.approx(0.2)
+
+        supervisor.check_workers()
+        assert worker.process is None  # ждём backoff
+        await asyncio.sleep(0.25)
+        supervisor.check_workers()
+        assert worker.process is not None and worker.process.pid != first_pid
+
+        # Повторное быстрое падение удваивает задержку
+        worker.process.wait()
+        supervisor.check_workers()
+        assert worker.backoff_sec == pytest.approx(0.4)
+    finally:
+        await supervisor.drain()
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_without_heartbeat_is_killed(tmp_path) -> None:
+    supervisor = _supervisor(
+        tmp_path, [sys.executable, "-c", "import time; time.sleep(60)"],
+        workers=1, startup_timeout_sec=0.2, restart_backoff_sec=0.0, drain_timeout_sec=1.0
+    )
+    worker = supervisor.workers[0]
+    try:
+        supervisor.check_workers()
+        hung = worker.process
+        await asyncio.sleep(0.3)
+        supervisor.check_workers()
+
+        assert hung.poll() is not None
+        assert worker.restarts == 1
+    finally:
+        await supervisor.drain()
+
+
+@pytest.mark.asyncio
+async def test_drain_kills_workers_ignoring_sigterm(tmp_path) -> None:
+    script = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)"
+    supervisor = _supervisor(tmp_path, [sys.executable, "-c", script], workers=1, drain_timeout_sec=0.3)
+    supervisor.check_workers()
+    await asyncio.sleep(0.3)
+
+    started = time.monotonic()
+    await supervisor.drain()
+
+    assert time.monotonic() - started < 2.0
+    assert supervisor.workers[0].process.poll() is not None
+    # После drain упавшие воркеры больше не перезапускаются
+    supervisor.check_workers()
+    assert supervisor.workers[0].restarts == 0
+
+
+def test_worker_context_primary_and_heartbeat_file(tmp_path) -> None:
+    context = WorkerContext(index=0, count=2, state_dir=str(tmp_path), supervisor_pid=0)
+    WorkerHeartbeat(context, stats_provider=lambda: {'metrics': {}}).write()
+
+    assert context.primary
+    assert not WorkerContext(index=1, count=2, state_dir=str(tmp_path), supervisor_pid=0).primary
+    assert Path(context.heartbeat_path).exists()
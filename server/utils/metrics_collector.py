@@ -9,7 +9,7 @@
 import time
 import logging
 from collections import defaultdict
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime
 from dataclasses import dataclass, field
 from threading import Lock
@@ -17,6 +17,18 @@ from threading import Lock
 logger = logging.getLogger(__name__)
 
 
+def percentile(values: Iterable[float], q: float) -> float:
+    """
+    Перцентиль по ближайшему рангу (q от 0 до 1); 0.0 для пустой выборки.
+
+    Общий расчёт для get_stats() компонентов и p95 сборщика метрик.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
 @dataclass
 class MetricSnapshot:
     """Снапшот метрик"""
@@ -108,12 +120,7 @@ class MetricsCollector:
     
     def _calculate_p95(self, latencies: List[float]) -> float:
         """Вычисление p95 latency"""
-        if not latencies:
-            return 0.0
-        
-        sorted_latencies = sorted(latencies)
-        index = int(len(sorted_latencies) * 0.95)
-        return sorted_latencies[index] if index < len(sorted_latencies) else sorted_latencies[-1]
+        return percentile(latencies, 0.95)
     
     def _calculate_error_rate(self, errors: int, requests: int) -> float:
         """Вычисление error rate"""